@@ -9,9 +9,41 @@ Created on Sun Mar 16 15:34:31 2025
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTabWidget, 
                             QLabel, QPushButton, QComboBox, QSpinBox, 
                             QDoubleSpinBox, QGroupBox, QFormLayout, QFileDialog,
-                            QCheckBox, QTableWidget, QTableWidgetItem, QMessageBox)
+                            QCheckBox, QTableWidget, QTableWidgetItem, QMessageBox,
+                            QLineEdit)
 from PyQt5.QtCore import pyqtSignal, Qt
 import os
+import numpy as np
+
+from src.openfoam.block_mesh import BlockMesh
+from src.openfoam.surface_cleanup import load_surface, LENGTH_UNITS
+from src.openfoam.features import write_surface_features, merge_snappy_features
+from src.openfoam.snappy_estimate import estimate_snappy_cells
+from src.openfoam.bvh import validate_location_in_mesh
+from src.openfoam.polymesh import PolyMesh
+from src.openfoam.boundary_surface import BoundaryLOD, PREVIEW_TRIANGLE_BUDGET
+from src.openfoam.vtk_io import write_vtk_polydata, read_vtk_mesh
+from src.openfoam.fluent_mesh import read_fluent_mesh
+from src.openfoam.gmsh_mesh import read_gmsh_mesh, is_gmsh_file
+from src.openfoam.renumber import renumber_case
+from src.openfoam.decompose import (plan_decompositions, write_manual_decomposition,
+                                    DEFAULT_IMBALANCE)
+
+# Point welding tolerance in meters used when cleaning STL topology
+STL_WELD_TOLERANCE = 1e-6
+
+# Partitioning methods offered for decomposition planning
+DECOMPOSITION_METHOD_NAMES = {
+    "Multilevel graph": "multilevel",
+    "Coordinate bisection": "rcb",
+}
+
+# Native converters of the importable mesh formats
+MESH_READERS = {
+    "Fluent (.msh)": read_fluent_mesh,
+    "Gmsh (.msh)": read_gmsh_mesh,
+    "VTK (.vtk)": read_vtk_mesh,
+}
 
 class MeshWidget(QWidget):
     """Main widget for mesh generation and manipulation."""
@@ -23,6 +55,10 @@ class MeshWidget(QWidget):
         self.parent = parent
         self.mesh_file = None
         self.mesh_type = None
+        self.mesh = None
+        self.surface = None
+        self.stl_files = []
+        self.case_dir = None
         self.setup_ui()
         
     def setup_ui(self):
@@ -52,6 +88,11 @@ class MeshWidget(QWidget):
         self.setup_quality_tab()
         self.tabs.addTab(self.quality_tab, "Quality Check")
         
+        # Parallel decomposition tab
+        self.decompose_tab = QWidget()
+        self.setup_decompose_tab()
+        self.tabs.addTab(self.decompose_tab, "Decomposition")
+        
         main_layout.addWidget(self.tabs)
         
         # Mesh information section
@@ -83,6 +124,12 @@ class MeshWidget(QWidget):
         
         button_layout.addStretch(1)
         
+        self.renumber_cells = QCheckBox("Renumber cells (RCM)")
+        self.renumber_cells.setChecked(True)
+        self.renumber_cells.setToolTip("Reorder cells for a narrower matrix band before writing; "
+                                        "fields, zones and sets of the case are reordered too")
+        button_layout.addWidget(self.renumber_cells)
+        
         self.apply_button = QPushButton("Apply")
         self.apply_button.clicked.connect(self.apply_mesh)
         button_layout.addWidget(self.apply_button)
@@ -102,7 +149,8 @@ class MeshWidget(QWidget):
         format_layout = QFormLayout()
         
         self.mesh_format = QComboBox()
-        self.mesh_format.addItems(["OpenFOAM", "STL", "Fluent (.msh)", "CGNS", "Other"])
+        self.mesh_format.addItems(["OpenFOAM", "STL", "Fluent (.msh)", "Gmsh (.msh)", "VTK (.vtk)",
+                                   "CGNS", "Other"])
         format_layout.addRow("Format:", self.mesh_format)
         
         format_group.setLayout(format_layout)
@@ -135,6 +183,11 @@ class MeshWidget(QWidget):
         self.convert_to_meters.setChecked(True)
         options_layout.addRow("", self.convert_to_meters)
         
+        self.source_units = QComboBox()
+        self.source_units.addItems(list(LENGTH_UNITS))
+        self.source_units.setCurrentText("m")
+        options_layout.addRow("Source Units:", self.source_units)
+        
         self.clean_topology = QCheckBox("Clean topology")
         self.clean_topology.setChecked(True)
         options_layout.addRow("", self.clean_topology)
@@ -158,7 +211,8 @@ class MeshWidget(QWidget):
         mesh_type_layout = QFormLayout()
         
         self.base_mesh_type = QComboBox()
-        self.base_mesh_type.addItems(["Block Mesh", "Hex Mesh", "Tetrahedral Mesh", "Polyhedral Mesh"])
+        self.base_mesh_type.addItems(["Block Mesh", "Hex Mesh", "Tetrahedral Mesh",
+                                      "Polyhedral Mesh"])
         self.base_mesh_type.currentIndexChanged.connect(self.update_mesh_options)
         mesh_type_layout.addRow("Type:", self.base_mesh_type)
         
@@ -189,6 +243,8 @@ class MeshWidget(QWidget):
         self.mesh_grading.setValue(1.0)
         self.mesh_params_layout.addRow("Grading:", self.mesh_grading)
         
+        self.add_domain_size_rows()
+        
         self.mesh_params_group.setLayout(self.mesh_params_layout)
         layout.addWidget(self.mesh_params_group)
         
@@ -228,6 +284,10 @@ class MeshWidget(QWidget):
         stl_group.setLayout(stl_layout)
         layout.addWidget(stl_group)
         
+        self.stl_info = QLabel("")
+        self.stl_info.setWordWrap(True)
+        layout.addWidget(self.stl_info)
+        
         # Snappy parameters
         snappy_group = QGroupBox("SnappyHexMesh Parameters")
         snappy_layout = QFormLayout()
@@ -254,11 +314,39 @@ class MeshWidget(QWidget):
         self.num_layers.setValue(3)
         snappy_layout.addRow("Number of Layers:", self.num_layers)
         
+        location_layout = QHBoxLayout()
+        self.location_in_mesh = []
+        for axis in "XYZ":
+            coordinate = QDoubleSpinBox()
+            coordinate.setRange(-10000, 10000)
+            coordinate.setDecimals(4)
+            coordinate.setValue(0.5)
+            coordinate.setPrefix(f"{axis}: ")
+            location_layout.addWidget(coordinate)
+            self.location_in_mesh.append(coordinate)
+        snappy_layout.addRow("Location In Mesh:", location_layout)
+        
+        self.feature_angle = QDoubleSpinBox()
+        self.feature_angle.setRange(0.0, 180.0)
+        self.feature_angle.setValue(150.0)
+        self.feature_angle.setSuffix(" deg")
+        snappy_layout.addRow("Included Angle:", self.feature_angle)
+        
         snappy_group.setLayout(snappy_layout)
         layout.addWidget(snappy_group)
         
+        # Location in mesh check
+        self.check_location_btn = QPushButton("Check Location In Mesh")
+        self.check_location_btn.clicked.connect(self.check_location_in_mesh)
+        layout.addWidget(self.check_location_btn)
+        
+        # Feature edge extraction
+        self.extract_features_btn = QPushButton("Extract Feature Edges")
+        self.extract_features_btn.clicked.connect(self.extract_feature_edges)
+        layout.addWidget(self.extract_features_btn)
+        
         # Run snappyHexMesh button
-        self.run_snappy_btn = QPushButton("Run SnappyHexMesh")
+        self.run_snappy_btn = QPushButton("Predict SnappyHexMesh")
         self.run_snappy_btn.clicked.connect(self.run_snappy_hex_mesh)
         layout.addWidget(self.run_snappy_btn)
         
@@ -318,9 +406,55 @@ class MeshWidget(QWidget):
         self.check_quality_btn.clicked.connect(self.check_mesh_quality)
         layout.addWidget(self.check_quality_btn)
         
+    def setup_decompose_tab(self):
+        """Setup the parallel decomposition planning tab."""
+        layout = QVBoxLayout(self.decompose_tab)
+        
+        settings_group = QGroupBox("Decomposition Settings")
+        settings_layout = QFormLayout()
+        
+        self.decomposition_method = QComboBox()
+        self.decomposition_method.addItems(list(DECOMPOSITION_METHOD_NAMES))
+        settings_layout.addRow("Method:", self.decomposition_method)
+        
+        self.subdomain_counts = QLineEdit("2, 4, 8, 16")
+        settings_layout.addRow("Subdomain Counts:", self.subdomain_counts)
+        
+        self.max_imbalance = QDoubleSpinBox()
+        self.max_imbalance.setRange(0, 50)
+        self.max_imbalance.setValue(100 * DEFAULT_IMBALANCE)
+        self.max_imbalance.setSuffix(" %")
+        settings_layout.addRow("Max Imbalance:", self.max_imbalance)
+        
+        settings_group.setLayout(settings_layout)
+        layout.addWidget(settings_group)
+        
+        # Plan table, one row per subdomain count
+        self.decomposition_results = QTableWidget(0, 6)
+        self.decomposition_results.setHorizontalHeaderLabels(
+            ["Subdomains", "Min Cells", "Max Cells", "Imbalance", "Shared Faces", "Max Neighbours"])
+        self.decomposition_results.setSelectionBehavior(QTableWidget.SelectRows)
+        layout.addWidget(self.decomposition_results)
+        
+        buttons_layout = QHBoxLayout()
+        
+        self.plan_decomposition_btn = QPushButton("Plan Decomposition")
+        self.plan_decomposition_btn.clicked.connect(self.plan_decomposition)
+        buttons_layout.addWidget(self.plan_decomposition_btn)
+        
+        self.write_decomposition_btn = QPushButton("Write Selected")
+        self.write_decomposition_btn.clicked.connect(self.write_decomposition)
+        self.write_decomposition_btn.setEnabled(False)
+        buttons_layout.addWidget(self.write_decomposition_btn)
+        
+        layout.addLayout(buttons_layout)
+        
+        self.decomposition_plans = []
+        
     def browse_mesh_file(self):
         """Open file dialog to browse for mesh files."""
-        file_filter = "All Files (*);;OpenFOAM (*constant/polyMesh*);;STL Files (*.stl);;Fluent Mesh (*.msh);;CGNS Files (*.cgns)"
+        file_filter = ("All Files (*);;OpenFOAM (*constant/polyMesh*);;STL Files (*.stl);;"
+                       "Fluent/Gmsh Mesh (*.msh);;VTK Files (*.vtk);;CGNS Files (*.cgns)")
         file_path, _ = QFileDialog.getOpenFileName(self, "Select Mesh File", "", file_filter)
         if file_path:
             self.file_path.setText(file_path)
@@ -330,15 +464,52 @@ class MeshWidget(QWidget):
             elif file_path.lower().endswith(".stl"):
                 self.mesh_format.setCurrentText("STL")
             elif file_path.lower().endswith(".msh"):
-                self.mesh_format.setCurrentText("Fluent (.msh)")
+                self.mesh_format.setCurrentText("Gmsh (.msh)" if is_gmsh_file(file_path)
+                                                else "Fluent (.msh)")
+            elif file_path.lower().endswith(".vtk"):
+                self.mesh_format.setCurrentText("VTK (.vtk)")
             elif file_path.lower().endswith(".cgns"):
                 self.mesh_format.setCurrentText("CGNS")
     
     def browse_stl_file(self):
-        """Open file dialog to browse for STL files."""
-        file_path, _ = QFileDialog.getOpenFileName(self, "Select STL File", "", "STL Files (*.stl)")
-        if file_path:
-            self.stl_path.setText(file_path)
+        """Open file dialog to browse for one or more STL files."""
+        file_paths, _ = QFileDialog.getOpenFileNames(self, "Select STL Files", "",
+                                                     "STL Files (*.stl)")
+        if file_paths:
+            self.stl_path.setText("; ".join(file_paths))
+            self.load_stl_surface(file_paths)
+    
+    def load_stl_surface(self, file_paths):
+        """Read, clean and merge the STL geometry and show its surface statistics."""
+        if isinstance(file_paths, str):
+            file_paths = [file_paths]
+        units = self.source_units.currentText() if self.convert_to_meters.isChecked() else "m"
+        clean = self.clean_topology.isChecked()
+        try:
+            self.surface, report = load_surface(
+                file_paths, scale_factor=self.scale_factor.value(), units=units,
+                weld_tolerance=STL_WELD_TOLERANCE if clean else 0.0, clean=clean, orient=clean)
+        except Exception as e:
+            self.surface = None
+            self.stl_files = []
+            self.stl_info.setText("")
+            QMessageBox.warning(self, "Warning", f"Could not read STL file: {str(e)}")
+            return
+        self.stl_files = list(file_paths)
+        
+        stats = self.surface.statistics()
+        size = stats["size"]
+        lines = [
+            f"Triangles: {stats['triangles']}  Points: {stats['points']}",
+            f"Size: {size[0]:.4g} x {size[1]:.4g} x {size[2]:.4g}  Area: {stats['area']:.4g}",
+            f"Open edges: {stats['open_edges']}  Non-manifold edges: {stats['non_manifold_edges']}",
+            "Solids: " + ", ".join(f"{name} ({n})" for name, n in stats["regions"].items()),
+        ]
+        if clean:
+            lines.append(f"Cleaned: {report['degenerate_triangles']} degenerate, "
+                         f"{report['duplicate_triangles']} duplicate, "
+                         f"{report['flipped_triangles']} flipped triangles")
+        self.stl_info.setText("\n".join(lines))
     
     def update_mesh_options(self):
         """Update mesh parameters based on selected mesh type."""
@@ -371,6 +542,8 @@ class MeshWidget(QWidget):
             self.mesh_grading.setValue(1.0)
             self.mesh_params_layout.addRow("Grading:", self.mesh_grading)
             
+            self.add_domain_size_rows()
+            
         elif mesh_type == "Tetrahedral Mesh":
             self.max_cell_size = QDoubleSpinBox()
             self.max_cell_size.setRange(0.001, 1000)
@@ -389,37 +562,119 @@ class MeshWidget(QWidget):
             self.base_cell_size.setValue(0.1)
             self.mesh_params_layout.addRow("Base Cell Size:", self.base_cell_size)
     
+    def add_domain_size_rows(self):
+        """Add the domain size inputs used by the block mesh generator."""
+        self.domain_size = []
+        for axis in "XYZ":
+            length = QDoubleSpinBox()
+            length.setRange(0.001, 10000)
+            length.setDecimals(3)
+            length.setValue(1.0)
+            self.mesh_params_layout.addRow(f"Length {axis}:", length)
+            self.domain_size.append(length)
+    
+    def get_case_directory(self):
+        """Return the case directory, asking the user if none is set yet."""
+        if self.case_dir is None:
+            case_dir = QFileDialog.getExistingDirectory(self, "Select Case Directory")
+            if case_dir:
+                self.case_dir = case_dir
+        return self.case_dir
+    
     def import_mesh(self):
         """Import mesh from file."""
         file_path = self.file_path.text()
         if file_path == "No file selected":
             QMessageBox.warning(self, "Warning", "Please select a mesh file first.")
             return
-            
-        # This would normally call OpenFOAM tools to import the mesh
-        # For now, we'll just update the UI to simulate success
-        self.mesh_file = file_path
-        self.mesh_type = self.mesh_format.currentText()
+        
+        if self.mesh_format.currentText() == "STL":
+            self.import_stl_geometry(file_path)
+            return
+
+        mesh_format = self.mesh_format.currentText()
+        if mesh_format == "OpenFOAM":
+            self.import_openfoam_mesh(file_path)
+            return
+        if mesh_format not in MESH_READERS:
+            QMessageBox.warning(self, "Warning",
+                                f"Import of {mesh_format} meshes is not supported.")
+            return
+        
+        case_dir = self.get_case_directory()
+        if not case_dir:
+            QMessageBox.warning(self, "Warning", "Please select a case directory first.")
+            return
+        
+        try:
+            self.mesh = MESH_READERS[mesh_format](file_path)
+            self.mesh.write(case_dir, binary=True)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Mesh import failed: {str(e)}")
+            return
+        
+        self.mesh_file = os.path.join(case_dir, "constant", "polyMesh")
+        self.mesh_type = mesh_format
         
         # Update mesh information
         self.mesh_status.setText("Mesh loaded from file")
-        self.cell_count.setText("125000")  # Simulated values
-        self.face_count.setText("375000")
-        self.boundary_count.setText("6")
+        self.cell_count.setText(str(self.mesh.n_cells))
+        self.face_count.setText(str(self.mesh.n_faces))
+        self.boundary_count.setText(str(len(self.mesh.patches)))
         
         self.view_mesh_btn.setEnabled(True)
         
-        QMessageBox.information(self, "Success", "Mesh imported successfully!")
+        QMessageBox.information(self, "Success",
+                                f"Mesh with {self.mesh.n_cells} cells imported to {case_dir}")
+
+    def import_openfoam_mesh(self, file_path):
+        """Load an existing polyMesh, given any path inside its polyMesh directory."""
+        mesh_dir = file_path if os.path.isdir(file_path) else os.path.dirname(file_path)
+        case_dir = os.path.dirname(os.path.dirname(mesh_dir))
+        try:
+            self.mesh = PolyMesh.read(case_dir)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Mesh import failed: {str(e)}")
+            return
+
+        self.mesh_file = mesh_dir
+        self.mesh_type = "OpenFOAM"
+
+        self.mesh_status.setText("Mesh loaded from file")
+        self.cell_count.setText(str(self.mesh.n_cells))
+        self.face_count.setText(str(self.mesh.n_faces))
+        self.boundary_count.setText(str(len(self.mesh.patches)))
+
+        self.view_mesh_btn.setEnabled(True)
+
+        QMessageBox.information(self, "Success", f"Mesh with {self.mesh.n_cells} cells loaded")
+
+    def import_stl_geometry(self, file_path):
+        """Import an STL file as the snappyHexMesh geometry."""
+        self.load_stl_surface(file_path)
+        if self.surface is None:
+            return
+        
+        self.stl_path.setText(file_path)
+        QMessageBox.information(self, "Success",
+                                f"STL geometry with {self.surface.n_triangles} triangles "
+                                f"imported.\n\n"
+                                + self.stl_info.text())
         
     def generate_mesh(self):
         """Generate mesh based on parameters."""
         mesh_type = self.base_mesh_type.currentText()
         
+        if mesh_type == "Block Mesh":
+            self.generate_block_mesh()
+            return
+        
         # This would normally call OpenFOAM tools to generate the mesh
         # For now, we'll just update the UI to simulate success
         
         # Calculate simulated cell count
-        cell_count = self.cell_count_x.value() * self.cell_count_y.value() * self.cell_count_z.value()
+        cell_count = (self.cell_count_x.value() * self.cell_count_y.value()
+                      * self.cell_count_z.value())
         
         # Update mesh information
         self.mesh_file = f"Generated {mesh_type}"
@@ -433,8 +688,110 @@ class MeshWidget(QWidget):
         
         QMessageBox.information(self, "Success", "Mesh generated successfully!")
         
+    def generate_block_mesh(self):
+        """Generate a box mesh natively and write it to the case directory."""
+        case_dir = self.get_case_directory()
+        if not case_dir:
+            QMessageBox.warning(self, "Warning", "Please select a case directory first.")
+            return
+        
+        cells = (self.cell_count_x.value(), self.cell_count_y.value(), self.cell_count_z.value())
+        lengths = [length.value() for length in self.domain_size]
+        grading = self.mesh_grading.value()
+        
+        try:
+            block_mesh = BlockMesh.box((0.0, 0.0, 0.0), lengths, cells, (grading, grading, grading))
+            self.mesh = block_mesh.write(case_dir, binary=True)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Block mesh generation failed: {str(e)}")
+            return
+        
+        self.mesh_file = os.path.join(case_dir, "constant", "polyMesh")
+        self.mesh_type = "Block Mesh"
+        self.mesh_status.setText("Generated Block Mesh")
+        self.cell_count.setText(str(self.mesh.n_cells))
+        self.face_count.setText(str(self.mesh.n_faces))
+        self.boundary_count.setText(str(len(self.mesh.patches)))
+        
+        self.view_mesh_btn.setEnabled(True)
+        
+        QMessageBox.information(self, "Success",
+                                f"Block mesh with {self.mesh.n_cells} cells written to {case_dir}")
+        
+    def extract_feature_edges(self):
+        """Extract surface feature edges and write them as an .eMesh file."""
+        if self.surface is None:
+            QMessageBox.warning(self, "Warning", "Please select an STL file first.")
+            return
+        
+        case_dir = self.get_case_directory()
+        if not case_dir:
+            QMessageBox.warning(self, "Warning", "Please select a case directory first.")
+            return
+        
+        if len(self.stl_files) == 1:
+            name = os.path.splitext(os.path.basename(self.stl_files[0]))[0]
+        else:
+            name = "geometry"
+        try:
+            features = write_surface_features(self.surface, case_dir, name,
+                                              self.feature_angle.value())
+            dict_path = merge_snappy_features(
+                case_dir, {f"{name}.eMesh": self.refinement_level.value()})
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Feature extraction failed: {str(e)}")
+            return
+        
+        counts = features.counts()
+        QMessageBox.information(
+            self, "Success",
+            f"{features.n_edges} feature edges written ({counts['feature']} angle, "
+            f"{counts['open']} open, {counts['non_manifold']} non-manifold).\n\n"
+            f"Added {name}.eMesh to the features of {dict_path}")
+        
+    def snappy_background(self):
+        """Return the corners and cell counts of the snappyHexMesh background mesh."""
+        if self.mesh is not None:
+            lower, upper = self.mesh.bounds()
+            size = upper - lower
+            cell_size = (np.prod(size) / self.mesh.n_cells) ** (1.0 / 3.0)
+            cells = np.maximum(np.round(size / cell_size), 1).astype(int)
+            return lower, upper, cells
+        
+        cells = (self.cell_count_x.value(), self.cell_count_y.value(), self.cell_count_z.value())
+        if self.base_mesh_type.currentText() == "Block Mesh":
+            return (0.0, 0.0, 0.0), [length.value() for length in self.domain_size], cells
+        
+        # Fall back to a box around the geometry
+        lower, upper = self.surface.bounds()
+        margin = 0.1 * np.max(upper - lower)
+        return lower - margin, upper + margin, cells
+        
+    def check_location_in_mesh(self, show_success=True):
+        """Check that the location in mesh is usable for snappyHexMesh."""
+        if self.surface is None:
+            QMessageBox.warning(self, "Warning", "Please select an STL file first.")
+            return False
+        
+        lower, upper, cells = self.snappy_background()
+        cell_size = np.min((np.asarray(upper) - np.asarray(lower)) / np.asarray(cells))
+        point = [coordinate.value() for coordinate in self.location_in_mesh]
+        valid, inside, problems = validate_location_in_mesh(
+            self.surface, point, lower, upper, cell_size / 2 ** self.refinement_level.value())
+        
+        if not valid:
+            QMessageBox.warning(self, "Warning",
+                                "Invalid location in mesh:\n" + "\n".join(problems))
+            return False
+        if show_success:
+            side = "inside" if inside else "outside"
+            QMessageBox.information(self, "Location In Mesh",
+                                    f"Location is valid; the mesh will be kept {side} "
+                                    f"the geometry.")
+        return True
+        
     def run_snappy_hex_mesh(self):
-        """Run snappyHexMesh on the base mesh."""
+        """Predict the snappyHexMesh result on the base mesh."""
         if not self.use_current_mesh.isChecked() and (self.mesh_file is None):
             QMessageBox.warning(self, "Warning", "Please generate or import a base mesh first.")
             return
@@ -444,28 +801,39 @@ class MeshWidget(QWidget):
             QMessageBox.warning(self, "Warning", "Please select an STL file first.")
             return
             
-        # This would normally call OpenFOAM's snappyHexMesh
-        # For now, we'll just update the UI to simulate success
+        if self.surface is None:
+            self.load_stl_surface(stl_path.split("; "))
+            if self.surface is None:
+                return
         
-        # Update mesh information
-        self.mesh_file = "SnappyHexMesh result"
-        self.mesh_type = "SnappyHexMesh"
-        self.mesh_status.setText("SnappyHexMesh completed")
-        
-        # Simulated values - would normally come from actual mesh
-        if self.use_current_mesh.isChecked():
-            current_cells = int(self.cell_count.text())
-            new_cells = current_cells * (2 ** self.refinement_level.value()) // 2
-        else:
-            new_cells = 125000 * (2 ** self.refinement_level.value()) // 2
-            
-        self.cell_count.setText(str(new_cells))
-        self.face_count.setText(str(new_cells * 4))  # Approximate for snappy
-        self.boundary_count.setText("12")  # Typical for snappy with one STL
+        if not self.check_location_in_mesh(show_success=False):
+            return
         
-        self.view_mesh_btn.setEnabled(True)
+        # Predict the mesh size from the STL and the background mesh
+        lower, upper, cells = self.snappy_background()
+        level = self.refinement_level.value()
+        try:
+            estimate = estimate_snappy_cells(
+                self.surface, lower, upper, cells,
+                surface_levels=(level, level),
+                location_in_mesh=[coordinate.value() for coordinate in self.location_in_mesh],
+                n_layers=self.num_layers.value() if self.add_layers.isChecked() else 0)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Mesh size prediction failed: {str(e)}")
+            return
         
-        QMessageBox.information(self, "Success", "SnappyHexMesh completed successfully!")
+        # snappyHexMesh itself is not run, so the current mesh stays as it is
+        memory = estimate.memory_bytes / 1024 ** 3
+        self.mesh_status.setText(
+            f"SnappyHexMesh prediction: ~{estimate.n_cells} cells, ~{memory:.2f} GB")
+        
+        QMessageBox.information(
+            self, "SnappyHexMesh Prediction",
+            f"Predicted snappyHexMesh result (snappyHexMesh was not run):\n\n"
+            f"Cells: ~{estimate.n_cells}\n"
+            f"Faces: ~{estimate.n_faces}\n"
+            f"Patches: {6 + len(self.surface.region_names)}\n"
+            f"Memory: ~{memory:.2f} GB")
         
     def check_mesh_quality(self):
         """Check the quality of the current mesh."""
@@ -518,16 +886,93 @@ class MeshWidget(QWidget):
         
         self.quality_results.resizeColumnsToContents()
         
+    def plan_decomposition(self):
+        """Partition the current mesh for each requested subdomain count."""
+        if self.mesh is None:
+            QMessageBox.warning(self, "Warning", "Please generate or import a mesh first.")
+            return
+        
+        try:
+            text = self.subdomain_counts.text().replace(",", " ")
+            counts = [int(count) for count in text.split()]
+        except ValueError:
+            QMessageBox.warning(self, "Warning", "Subdomain counts must be integers.")
+            return
+        if not counts or min(counts) < 1:
+            QMessageBox.warning(self, "Warning", "Please enter at least one subdomain count.")
+            return
+        
+        method = DECOMPOSITION_METHOD_NAMES[self.decomposition_method.currentText()]
+        try:
+            self.decomposition_plans = plan_decompositions(self.mesh, counts, method,
+                                                           self.max_imbalance.value() / 100)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Decomposition planning failed: {str(e)}")
+            return
+        
+        self.decomposition_results.setRowCount(len(self.decomposition_plans))
+        for i, plan in enumerate(self.decomposition_plans):
+            summary = plan.summary()
+            values = [summary["subdomains"], summary["min_cells"], summary["max_cells"],
+                      f"{100 * summary['imbalance']:.1f} %", summary["shared_faces"],
+                      summary["max_neighbours"]]
+            for j, value in enumerate(values):
+                self.decomposition_results.setItem(i, j, QTableWidgetItem(str(value)))
+        self.decomposition_results.resizeColumnsToContents()
+        self.decomposition_results.selectRow(0)
+        
+        self.write_decomposition_btn.setEnabled(True)
+        
+    def write_decomposition(self):
+        """Write the selected plan as a manual decomposition of the case."""
+        row = self.decomposition_results.currentRow()
+        if row < 0 or row >= len(self.decomposition_plans):
+            QMessageBox.warning(self, "Warning", "Please select a decomposition plan first.")
+            return
+        
+        case_dir = self.get_case_directory()
+        if not case_dir:
+            QMessageBox.warning(self, "Warning", "Please select a case directory first.")
+            return
+        
+        plan = self.decomposition_plans[row]
+        try:
+            file_path = write_manual_decomposition(case_dir, plan)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Writing the decomposition failed: {str(e)}")
+            return
+        
+        QMessageBox.information(self, "Success",
+                                f"Manual decomposition into {plan.n_subdomains} subdomains "
+                                f"written to {file_path}")
+        
     def view_mesh(self):
-        """View the current mesh in a 3D viewer."""
+        """Export a decimated boundary preview of the current mesh for viewing."""
         if self.mesh_file is None:
             return
-            
-        # This would normally open ParaView or other viewer
-        # For now, just show a message
-        QMessageBox.information(self, "View Mesh", 
-                               f"Opening mesh viewer for {self.mesh_file}.\n"
-                               "This would normally launch ParaView or integrated viewer.")
+        
+        case_dir = self.get_case_directory()
+        if not case_dir:
+            QMessageBox.warning(self, "Warning", "Please select a case directory first.")
+            return
+        
+        try:
+            if self.mesh is None:
+                self.mesh = PolyMesh.read(case_dir)
+            lod = BoundaryLOD.build(self.mesh)
+            preview = lod.level_for_budget(PREVIEW_TRIANGLE_BUDGET)
+            preview_file = os.path.join(case_dir, "VTK", "boundary_preview.vtk")
+            write_vtk_polydata(preview_file, preview.points, preview.triangles,
+                               cell_data={"patch": preview.regions})
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Mesh preview failed: {str(e)}")
+            return
+        
+        levels = "\n".join(f"  {level['triangles']} triangles ({level['megabytes']:.1f} MB)"
+                           for level in lod.summary())
+        QMessageBox.information(self, "View Mesh",
+                                f"Boundary preview with {preview.n_triangles} triangles "
+                                f"written to {preview_file}.\n\nDetail levels:\n{levels}")
         
     def apply_mesh(self):
         """Apply the current mesh to the simulation."""
@@ -535,15 +980,37 @@ class MeshWidget(QWidget):
             QMessageBox.warning(self, "Warning", "Please generate or import a mesh first.")
             return
             
-        # This would normally copy/link the mesh to the OpenFOAM case directory
+        message = "Mesh applied to simulation case."
+        if self.mesh is not None and self.renumber_cells.isChecked():
+            case_dir = self.get_case_directory()
+            if not case_dir:
+                QMessageBox.warning(self, "Warning", "Please select a case directory first.")
+                return
+            try:
+                # Fields, zones and sets of the case are renumbered with the mesh
+                self.mesh, report = renumber_case(case_dir, self.mesh)
+                if report.improved:
+                    self.mesh_file = PolyMesh.poly_mesh_dir(case_dir)
+                    # Planned decompositions refer to the old cell labels
+                    self.decomposition_plans = []
+                    self.decomposition_results.setRowCount(0)
+                    self.write_decomposition_btn.setEnabled(False)
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Mesh renumbering failed: {str(e)}")
+                return
+            message += (f"\n\nMatrix bandwidth: {report.bandwidth_before} -> "
+                        f"{report.bandwidth_after}\nMatrix profile: {report.profile_before} -> "
+                        f"{report.profile_after}")
+        
         self.mesh_changed.emit()
         
-        QMessageBox.information(self, "Success", "Mesh applied to simulation case.")
+        QMessageBox.information(self, "Success", message)
         
     def reset_mesh(self):
         """Reset the mesh settings."""
         self.mesh_file = None
         self.mesh_type = None
+        self.mesh = None
         
         # Reset UI elements
         self.mesh_status.setText("No mesh loaded")
@@ -553,12 +1020,21 @@ class MeshWidget(QWidget):
         
         self.file_path.setText("No file selected")
         self.stl_path.setText("No STL file selected")
+        self.stl_info.setText("")
+        self.surface = None
+        self.stl_files = []
         
         self.view_mesh_btn.setEnabled(False)
         
+        self.decomposition_plans = []
+        self.decomposition_results.setRowCount(0)
+        self.write_decomposition_btn.setEnabled(False)
+        
         # Reset other parameters to defaults
+        self.renumber_cells.setChecked(True)
         self.scale_factor.setValue(1.0)
         self.convert_to_meters.setChecked(True)
+        self.source_units.setCurrentText("mm")
         self.clean_topology.setChecked(True)
         
         self.base_mesh_type.setCurrentIndex(0)
@@ -570,6 +1046,9 @@ class MeshWidget(QWidget):
         self.add_layers.setChecked(True)
         self.refinement_level.setValue(2)
         self.num_layers.setValue(3)
+        self.feature_angle.setValue(150.0)
+        for coordinate in self.location_in_mesh:
+            coordinate.setValue(0.5)
         
         # Clear quality results
         self.quality_results.setRowCount(0)
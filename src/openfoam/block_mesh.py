@@ -0,0 +1,452 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:02:17 2026
+
+@author: adamp
+"""
+
+"""
+Native hex-block mesh generator for box-shaped domains.
+
+The domain is split along each axis into segments, each with its own cell
+count and simpleGrading expansion ratio. The tensor product of the segments
+defines the blocks; individual blocks can be removed to build L-shaped or
+stepped domains. The polyMesh is built with vectorized index arithmetic on
+the structured lattice, so no OpenFOAM installation is needed, and the
+equivalent ``system/blockMeshDict`` is written for reproducibility.
+"""
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.openfoam.dictionary import OpenFOAMDict
+from src.openfoam.foam_io import LABEL_DTYPE, SCALAR_DTYPE
+from src.openfoam.polymesh import PolyMesh, Patch
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Domain sides in the order their patches are written
+SIDES = ["xMin", "xMax", "yMin", "yMax", "zMin", "zMax"]
+
+
+class BlockMeshError(Exception):
+    """Exception raised for invalid block mesh definitions."""
+    pass
+
+
+def graded_spacing(n_cells: int, grading: float) -> np.ndarray:
+    """Return normalised node positions of a graded edge.
+
+    Follows blockMesh's simpleGrading convention: ``grading`` is the ratio of
+    the last cell size to the first.
+
+    Args:
+        n_cells: Number of cells along the edge
+        grading: Expansion ratio (last/first cell size)
+
+    Returns:
+        Array of ``n_cells + 1`` positions from 0 to 1
+    """
+    if n_cells < 1:
+        raise BlockMeshError("Number of cells must be at least 1")
+    if grading <= 0:
+        raise BlockMeshError("Grading must be positive")
+    if n_cells == 1 or np.isclose(grading, 1.0):
+        return np.linspace(0.0, 1.0, n_cells + 1)
+    ratio = grading ** (1.0 / (n_cells - 1))
+    sizes = ratio ** np.arange(n_cells)
+    positions = np.concatenate([[0.0], np.cumsum(sizes)])
+    return positions / positions[-1]
+
+
+class BlockAxis:
+    """Segmentation of one coordinate axis into graded blocks."""
+
+    def __init__(self, breakpoints: Sequence[float], cells: Sequence[int],
+                 gradings: Optional[Sequence[float]] = None) -> None:
+        """Initialize the axis.
+
+        Args:
+            breakpoints: Increasing block boundary coordinates (nSegments+1)
+            cells: Number of cells in each segment
+            gradings: Expansion ratio of each segment (1 if None)
+        """
+        self.breakpoints = np.asarray(breakpoints, dtype=float)
+        self.cells = [int(n) for n in cells]
+        self.gradings = [float(g) for g in (gradings or [1.0] * len(self.cells))]
+
+        if len(self.breakpoints) != len(self.cells) + 1:
+            raise BlockMeshError("Number of breakpoints must be number of segments + 1")
+        if len(self.gradings) != len(self.cells):
+            raise BlockMeshError("One grading is required per segment")
+        if np.any(np.diff(self.breakpoints) <= 0):
+            raise BlockMeshError("Block breakpoints must be strictly increasing")
+
+    @property
+    def n_segments(self) -> int:
+        """Number of blocks along the axis."""
+        return len(self.cells)
+
+    @property
+    def n_cells(self) -> int:
+        """Total number of cells along the axis."""
+        return sum(self.cells)
+
+    def nodes(self) -> np.ndarray:
+        """Return the node coordinates along the axis."""
+        parts = [self.breakpoints[:1]]
+        for s in range(self.n_segments):
+            start, end = self.breakpoints[s], self.breakpoints[s + 1]
+            spacing = graded_spacing(self.cells[s], self.gradings[s])
+            parts.append(start + (end - start) * spacing[1:])
+        return np.concatenate(parts)
+
+    def cell_segments(self) -> np.ndarray:
+        """Return the segment index of every cell along the axis."""
+        return np.repeat(np.arange(self.n_segments), self.cells)
+
+
+class BlockMesh:
+    """Hex-block mesh of a (possibly stepped) box domain.
+
+    Cells are numbered with x varying fastest, then y, then z. Faces are
+    ordered as OpenFOAM requires: internal faces sorted by owner and then
+    neighbour, followed by the boundary faces grouped by patch.
+    """
+
+    def __init__(self, x_axis: BlockAxis, y_axis: BlockAxis, z_axis: BlockAxis,
+                 patch_names: Optional[Dict[str, str]] = None,
+                 patch_types: Optional[Dict[str, str]] = None,
+                 active_blocks: Optional[np.ndarray] = None,
+                 internal_wall_name: str = "walls",
+                 convert_to_meters: float = 1.0) -> None:
+        """Initialize the block mesh definition.
+
+        Args:
+            x_axis: Segmentation along x
+            y_axis: Segmentation along y
+            z_axis: Segmentation along z
+            patch_names: Patch name for each domain side (``xMin``...``zMax``);
+                sides mapped to the same name are merged into one patch
+            patch_types: OpenFOAM type of each patch name (``patch`` by default)
+            active_blocks: Boolean mask of shape (nz, ny, nx) segments;
+                removed blocks leave holes bounded by ``internal_wall_name``
+            internal_wall_name: Patch receiving faces exposed by removed blocks
+            convert_to_meters: Scale factor applied to all coordinates
+        """
+        self.axes = (x_axis, y_axis, z_axis)
+        self.patch_names = {side: side for side in SIDES}
+        self.patch_names.update(patch_names or {})
+        unknown = set(self.patch_names) - set(SIDES)
+        if unknown:
+            raise BlockMeshError(f"Unknown domain sides: {sorted(unknown)}")
+
+        self.patch_types: Dict[str, str] = {internal_wall_name: "wall"}
+        self.patch_types.update(patch_types or {})
+        self.internal_wall_name = internal_wall_name
+        self.convert_to_meters = float(convert_to_meters)
+
+        shape = (z_axis.n_segments, y_axis.n_segments, x_axis.n_segments)
+        if active_blocks is None:
+            active_blocks = np.ones(shape, dtype=bool)
+        self.active_blocks = np.asarray(active_blocks, dtype=bool)
+        if self.active_blocks.shape != shape:
+            raise BlockMeshError(f"active_blocks must have shape {shape}")
+        if not self.active_blocks.any():
+            raise BlockMeshError("At least one block must be active")
+
+    @classmethod
+    def box(cls, min_corner: Sequence[float], max_corner: Sequence[float],
+            cells: Sequence[int], grading: Sequence[float] = (1.0, 1.0, 1.0),
+            **kwargs) -> "BlockMesh":
+        """Create a single-block box mesh.
+
+        Args:
+            min_corner: Minimum (x, y, z) corner
+            max_corner: Maximum (x, y, z) corner
+            cells: Number of cells in x, y and z
+            grading: simpleGrading expansion ratios in x, y and z
+            **kwargs: Further arguments passed to the constructor
+        """
+        axes = [BlockAxis([min_corner[d], max_corner[d]], [cells[d]], [grading[d]])
+                for d in range(3)]
+        return cls(*axes, **kwargs)
+
+    @property
+    def cell_shape(self) -> Tuple[int, int, int]:
+        """Lattice shape in cells as (nz, ny, nx)."""
+        return (self.axes[2].n_cells, self.axes[1].n_cells, self.axes[0].n_cells)
+
+    def _active_cells(self) -> np.ndarray:
+        """Expand the block mask to a (nz, ny, nx) cell mask."""
+        segments = [axis.cell_segments() for axis in self.axes]
+        return self.active_blocks[np.ix_(segments[2], segments[1], segments[0])]
+
+    def n_cells(self) -> int:
+        """Return the number of cells the mesh will have."""
+        cells = [np.bincount(axis.cell_segments()) for axis in self.axes]
+        counts = cells[2][:, None, None] * cells[1][None, :, None] * cells[0][None, None, :]
+        return int(counts[self.active_blocks].sum())
+
+    def patch_order(self) -> List[str]:
+        """Return the patch names in the order they are written."""
+        names: List[str] = []
+        for side in SIDES:
+            if self.patch_names[side] not in names:
+                names.append(self.patch_names[side])
+        if self.internal_wall_name not in names and not self.active_blocks.all():
+            names.append(self.internal_wall_name)
+        return names
+
+    def build(self) -> PolyMesh:
+        """Build the polyMesh arrays.
+
+        Internal faces are scattered directly into their final upper-triangular
+        position, so no sort over the faces is needed and peak memory stays
+        close to the size of the resulting mesh.
+
+        Returns:
+            The generated mesh
+        """
+        nz, ny, nx = self.cell_shape
+        logger.info(f"Building block mesh with {nx}x{ny}x{nz} cell lattice")
+
+        active = self._active_cells()
+        n_cells = int(active.sum())
+        cell_id = np.full(active.size, -1, dtype=LABEL_DTYPE)
+        cell_id[active.ravel()] = np.arange(n_cells, dtype=LABEL_DTYPE)
+
+        # Lattice point ids, x fastest: pid = i + (nx+1) * (j + (ny+1) * k)
+        sx, sy, sz = 1, nx + 1, (nx + 1) * (ny + 1)
+        cell_strides = (1, nx, nx * ny)
+        point_strides = (sx, sy, sz)
+
+        # Offsets of the four face corners for each normal direction, ordered
+        # so that the right-hand normal points in the positive direction
+        corner_offsets = (
+            np.array([0, sy, sy + sz, sz], dtype=LABEL_DTYPE),
+            np.array([0, sz, sz + sx, sx], dtype=LABEL_DTYPE),
+            np.array([0, sx, sx + sy, sy], dtype=LABEL_DTYPE),
+        )
+
+        def base_point(flat_cells: np.ndarray) -> np.ndarray:
+            """Lattice point at the minimum corner of the given flat cells."""
+            j = (flat_cells // nx) % ny
+            k = flat_cells // (nx * ny)
+            return (flat_cells + j + k * (nx + ny + 1)).astype(LABEL_DTYPE)
+
+        # Which cells own an internal face in each direction
+        has_face = []
+        for d in range(3):
+            axis = 2 - d
+            lo = [slice(None)] * 3
+            hi = [slice(None)] * 3
+            lo[axis] = slice(None, -1)
+            hi[axis] = slice(1, None)
+            mask = np.zeros(active.shape, dtype=bool)
+            mask[tuple(lo)] = active[tuple(lo)] & active[tuple(hi)]
+            has_face.append(mask.ravel())
+
+        boundary_owner, boundary_faces, boundary_patch = self._boundary_faces(
+            active, cell_id, base_point, point_strides, corner_offsets)
+
+        # Internal faces of a cell are ordered x, y, z (increasing neighbour)
+        active_flat = np.flatnonzero(active.ravel())
+        counts = (has_face[0][active_flat].astype(np.int64)
+                  + has_face[1][active_flat] + has_face[2][active_flat])
+        first_face = np.zeros(n_cells, dtype=np.int64)
+        np.cumsum(counts[:-1], out=first_face[1:])
+        n_internal = int(counts.sum())
+        del active_flat, counts
+
+        n_faces = n_internal + len(boundary_owner)
+        faces = np.empty((n_faces, 4), dtype=LABEL_DTYPE)
+        owner = np.empty(n_faces, dtype=LABEL_DTYPE)
+        neighbour = np.empty(n_internal, dtype=LABEL_DTYPE)
+
+        for d in range(3):
+            flat = np.flatnonzero(has_face[d])
+            own = cell_id[flat]
+            position = first_face[own]
+            for previous in range(d):
+                position += has_face[previous][flat]
+            owner[position] = own
+            neighbour[position] = cell_id[flat + cell_strides[d]]
+            faces[position] = (base_point(flat) + point_strides[d])[:, None] + corner_offsets[d]
+            del flat, own, position
+        del has_face, first_face
+
+        faces[n_internal:] = boundary_faces
+        owner[n_internal:] = boundary_owner
+
+        # Lattice point coordinates, filled by broadcasting along each axis
+        x, y, z = (axis.nodes() * self.convert_to_meters for axis in self.axes)
+        lattice = np.empty((nz + 1, ny + 1, nx + 1, 3), dtype=SCALAR_DTYPE)
+        lattice[..., 0] = x[None, None, :]
+        lattice[..., 1] = y[None, :, None]
+        lattice[..., 2] = z[:, None, None]
+        points = lattice.reshape(-1, 3)
+
+        # Drop lattice points that are not used by any active cell
+        if not active.all():
+            used = np.zeros(len(points), dtype=bool)
+            used[faces.ravel()] = True
+            point_id = (np.cumsum(used) - 1).astype(LABEL_DTYPE)
+            points = points[used]
+            faces = point_id[faces]
+
+        face_offsets = np.arange(0, 4 * n_faces + 1, 4, dtype=np.int64)
+
+        patches = []
+        patch_names = self.patch_order()
+        patch_counts = np.bincount(boundary_patch, minlength=len(patch_names))
+        start = n_internal
+        for index, name in enumerate(patch_names):
+            patches.append(Patch(name, self.patch_types.get(name, "patch"),
+                                 patch_counts[index], start))
+            start += patch_counts[index]
+
+        return PolyMesh(points, face_offsets, faces.ravel(), owner, neighbour, patches, n_cells)
+
+    def _boundary_faces(self, active: np.ndarray, cell_id: np.ndarray, base_point,
+                        point_strides: Tuple[int, int, int],
+                        corner_offsets: Tuple[np.ndarray, ...]
+                        ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Collect the boundary faces, sorted by patch and then owner.
+
+        Returns:
+            Tuple of (owner cells, face point array, patch index of every face)
+        """
+        patch_index = {name: i for i, name in enumerate(self.patch_order())}
+        wall_index = patch_index.get(self.internal_wall_name, -1)
+        owners, faces, patch_ids = [], [], []
+
+        for d in range(3):
+            axis = 2 - d
+            for upper in (False, True):
+                inner = [slice(None)] * 3
+                outer = [slice(None)] * 3
+                edge = [slice(None)] * 3
+                inner[axis] = slice(None, -1) if upper else slice(1, None)
+                outer[axis] = slice(1, None) if upper else slice(None, -1)
+                edge[axis] = slice(-1, None) if upper else slice(None, 1)
+
+                # A cell side is exposed if the cell beyond it is missing
+                exposed = active.copy()
+                exposed[tuple(inner)] &= ~active[tuple(outer)]
+                at_domain = np.zeros(active.shape, dtype=bool)
+                at_domain[tuple(edge)] = True
+
+                flat = np.flatnonzero(exposed.ravel())
+                base = base_point(flat)
+                if upper:
+                    faces.append((base + point_strides[d])[:, None] + corner_offsets[d])
+                else:
+                    faces.append(base[:, None] + corner_offsets[d][::-1])
+                owners.append(cell_id[flat])
+                side_patch = patch_index[self.patch_names[SIDES[2 * d + int(upper)]]]
+                patch_ids.append(np.where(at_domain.ravel()[flat], side_patch, wall_index))
+
+        owner = np.concatenate(owners)
+        face_array = np.concatenate(faces)
+        patch = np.concatenate(patch_ids)
+        order = np.lexsort((owner, patch))
+        return owner[order], face_array[order], patch[order]
+
+    # ------------------------------------------------------------------
+    # blockMeshDict
+    # ------------------------------------------------------------------
+
+    def block_mesh_dict(self) -> OpenFOAMDict:
+        """Return the equivalent blockMeshDict.
+
+        Returns:
+            Dictionary describing the same blocks, grading and patches
+        """
+        nbx, nby, nbz = (axis.n_segments for axis in self.axes)
+        sx, sy, sz = 1, nbx + 1, (nbx + 1) * (nby + 1)
+
+        # Block corner vertices, numbered like the lattice and compacted
+        used = np.zeros((nbz + 1) * (nby + 1) * (nbx + 1), dtype=bool)
+        blocks = np.argwhere(self.active_blocks)
+        corners = np.array([0, sx, sx + sy, sy, sz, sz + sx, sz + sx + sy, sz + sy])
+        block_base = blocks[:, 2] * sx + blocks[:, 1] * sy + blocks[:, 0] * sz
+        block_vertices = block_base[:, None] + corners
+        used[block_vertices.ravel()] = True
+        vertex_id = np.cumsum(used) - 1
+
+        bx, by, bz = (axis.breakpoints for axis in self.axes)
+        zz, yy, xx = np.meshgrid(bz, by, bx, indexing="ij")
+        vertices = np.column_stack([xx.ravel(), yy.ravel(), zz.ravel()])[used]
+
+        vertex_lines = [f"    ({v[0]:.12g} {v[1]:.12g} {v[2]:.12g})" for v in vertices]
+
+        block_lines = []
+        for (k, j, i), verts in zip(blocks, vertex_id[block_vertices]):
+            cells = (self.axes[0].cells[i], self.axes[1].cells[j], self.axes[2].cells[k])
+            grading = (self.axes[0].gradings[i], self.axes[1].gradings[j], self.axes[2].gradings[k])
+            block_lines.append(
+                "    hex ({}) ({} {} {}) simpleGrading ({:g} {:g} {:g})".format(
+                    " ".join(str(v) for v in verts), *cells, *grading))
+
+        # Block faces on the domain sides or next to removed blocks
+        face_corners = {
+            "xMin": [0, 4, 7, 3], "xMax": [1, 2, 6, 5],
+            "yMin": [0, 1, 5, 4], "yMax": [3, 7, 6, 2],
+            "zMin": [0, 3, 2, 1], "zMax": [4, 5, 6, 7],
+        }
+        patch_faces: Dict[str, List[str]] = {name: [] for name in self.patch_order()}
+        shape = self.active_blocks.shape
+        for (k, j, i), verts in zip(blocks, vertex_id[block_vertices]):
+            for side_index, side in enumerate(SIDES):
+                d, sign = divmod(side_index, 2)
+                idx = [k, j, i]
+                idx[2 - d] += 1 if sign else -1
+                if idx[2 - d] < 0 or idx[2 - d] >= shape[2 - d]:
+                    name = self.patch_names[side]
+                elif not self.active_blocks[tuple(idx)]:
+                    name = self.internal_wall_name
+                else:
+                    continue
+                patch_faces[name].append(
+                    "            (" + " ".join(str(verts[c]) for c in face_corners[side]) + ")")
+
+        boundary_lines = []
+        for name, face_lines in patch_faces.items():
+            boundary_lines.append(f"    {name}")
+            boundary_lines.append("    {")
+            boundary_lines.append(f"        type {self.patch_types.get(name, 'patch')};")
+            boundary_lines.append("        faces")
+            boundary_lines.append("        (")
+            boundary_lines.extend(face_lines)
+            boundary_lines.append("        );")
+            boundary_lines.append("    }")
+
+        block_dict = OpenFOAMDict()
+        block_dict["scale"] = f"{self.convert_to_meters:g}"
+        block_dict["vertices"] = "\n(\n" + "\n".join(vertex_lines) + "\n)"
+        block_dict["blocks"] = "\n(\n" + "\n".join(block_lines) + "\n)"
+        block_dict["edges"] = "()"
+        block_dict["boundary"] = "\n(\n" + "\n".join(boundary_lines) + "\n)"
+        block_dict["mergePatchPairs"] = "()"
+        return block_dict
+
+    def write(self, case_dir: str, binary: bool = True) -> PolyMesh:
+        """Build the mesh and write both polyMesh and ``system/blockMeshDict``.
+
+        Args:
+            case_dir: Path to the OpenFOAM case directory
+            binary: Whether to write the polyMesh in binary format
+
+        Returns:
+            The generated mesh
+        """
+        mesh = self.build()
+        mesh.write(case_dir, binary=binary)
+        system_dir = os.path.join(case_dir, "system")
+        os.makedirs(system_dir, exist_ok=True)
+        self.block_mesh_dict().write(os.path.join(system_dir, "blockMeshDict"), "blockMeshDict")
+        logger.info(f"Block mesh with {mesh.n_cells} cells written to {case_dir}")
+        return mesh
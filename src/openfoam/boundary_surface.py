@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 21:34:09 2026
+
+@author: adamp
+"""
+
+"""
+Boundary surface extraction and level-of-detail decimation for mesh preview.
+
+The mesh is read in full, but only its boundary faces (index >= nInternalFaces)
+are fan-triangulated into a TriSurface with one region per patch. Coarser levels
+are built by vertex clustering: points are snapped to a uniform grid, every
+grid cell collapses to the mean of its points and the triangles that
+degenerate are dropped. Each level is clustered from the previous one, and
+the whole hierarchy is cached per mesh content hash.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.openfoam.polymesh import PolyMesh
+from src.openfoam.stl import TriSurface, unique_rows
+from src.openfoam.surface_cleanup import remove_degenerate_triangles, remove_duplicate_triangles
+from src.utils.cache import ArrayCache
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Clustering grid resolutions (cells along the largest extent) of the LOD levels
+LOD_RESOLUTIONS = (512, 256, 128, 64, 32)
+
+# Default triangle budget of an interactive preview
+PREVIEW_TRIANGLE_BUDGET = 250000
+
+
+def triangulate_faces(face_offsets: np.ndarray,
+                      face_points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Fan-triangulate polygons given in compact form.
+
+    Args:
+        face_offsets: Offsets of every face into ``face_points``, shape (nFaces+1,)
+        face_points: Flat point labels
+
+    Returns:
+        Tuple of (triangles (nTriangles, 3), face index of every triangle)
+    """
+    sizes = np.diff(face_offsets)
+    counts = np.maximum(sizes - 2, 0)
+    face = np.repeat(np.arange(len(sizes)), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    start = face_offsets[:-1][face]
+    triangles = np.stack([face_points[start], face_points[start + local + 1],
+                          face_points[start + local + 2]], axis=1)
+    return triangles, face
+
+
+def extract_boundary_surface(mesh: PolyMesh, patches: Optional[Sequence[str]] = None) -> TriSurface:
+    """Extract the boundary faces of a mesh as a triangulated surface.
+
+    Args:
+        mesh: Mesh to extract from
+        patches: Names of the patches to include; all patches if None
+
+    Returns:
+        Surface with one region per patch, named after the patches
+    """
+    selected = [p for p in mesh.patches if patches is None or p.name in patches]
+    offsets, labels, regions = [np.zeros(1, dtype=np.int64)], [], []
+    for index, patch in enumerate(selected):
+        first = mesh.face_offsets[patch.start_face]
+        last = mesh.face_offsets[patch.start_face + patch.n_faces]
+        offsets.append(mesh.face_offsets[patch.start_face + 1:patch.start_face + patch.n_faces + 1]
+                       - first + offsets[-1][-1])
+        labels.append(mesh.face_points[first:last])
+        regions.append(np.full(patch.n_faces, index, dtype=np.int32))
+
+    face_points = np.concatenate(labels) if labels else np.zeros(0, dtype=np.int32)
+    triangles, face = triangulate_faces(np.concatenate(offsets), face_points)
+    face_regions = np.concatenate(regions) if regions else np.zeros(0, dtype=np.int32)
+
+    # Keep only the points used by the boundary
+    used = np.zeros(mesh.n_points, dtype=bool)
+    used[face_points] = True
+    renumber = np.cumsum(used) - 1
+    return TriSurface(mesh.points[used], renumber[triangles], face_regions[face],
+                      [p.name for p in selected] or None)
+
+
+def cluster_vertices(surface: TriSurface, resolution: int) -> TriSurface:
+    """Decimate a surface by vertex clustering on a uniform grid.
+
+    Args:
+        surface: Surface to decimate
+        resolution: Number of grid cells along the largest bounding box extent
+
+    Returns:
+        The decimated surface
+    """
+    if surface.n_points == 0:
+        return surface
+    lower, upper = surface.bounds()
+    cell_size = max(float(np.max(upper - lower)), 1e-300) / resolution
+    cells = np.floor((surface.points - lower) / cell_size)
+    first, cluster = unique_rows(cells)
+
+    # Every cluster collapses to the mean of its points
+    counts = np.bincount(cluster, minlength=len(first))
+    points = np.stack([np.bincount(cluster, surface.points[:, i], minlength=len(first))
+                       for i in range(3)], axis=1) / counts[:, None]
+    decimated = TriSurface(points, cluster[surface.triangles], surface.regions,
+                           surface.region_names)
+    decimated, _ = remove_degenerate_triangles(decimated)
+    decimated, _ = remove_duplicate_triangles(decimated)
+    return decimated
+
+
+class BoundaryLOD:
+    """Multi-resolution boundary surface of a mesh."""
+
+    def __init__(self, levels: List[TriSurface], resolutions: Sequence[int]) -> None:
+        """Initialize the hierarchy.
+
+        Args:
+            levels: Surfaces from the full boundary to the coarsest level
+            resolutions: Clustering resolution of every level (0 for the full boundary)
+        """
+        self.levels = levels
+        self.resolutions = list(resolutions)
+
+    @classmethod
+    def build(cls, mesh: PolyMesh, resolutions: Sequence[int] = LOD_RESOLUTIONS,
+              cache: Optional[ArrayCache] = None) -> "BoundaryLOD":
+        """Build the hierarchy of a mesh, or load it from the cache.
+
+        Args:
+            mesh: Mesh whose boundary is previewed
+            resolutions: Clustering resolutions, from fine to coarse
+            cache: Cache for the levels; the default LOD cache if None
+
+        Returns:
+            The boundary hierarchy
+        """
+        cache = cache or ArrayCache("boundary_lod")
+        resolutions = [0] + sorted(resolutions, reverse=True)
+        key = ArrayCache.make_key(mesh.content_hash(), resolutions)
+        cached = cache.load(key)
+        if cached is not None:
+            names = cached["metadata"]["region_names"]
+            levels = [TriSurface(cached[f"points_{i}"], cached[f"triangles_{i}"],
+                                 cached[f"regions_{i}"], names)
+                      for i in range(len(resolutions))]
+            logger.debug(f"Boundary LOD loaded from cache for mesh {key}")
+            return cls(levels, resolutions)
+
+        levels = [extract_boundary_surface(mesh)]
+        for resolution in resolutions[1:]:
+            levels.append(cluster_vertices(levels[-1], resolution))
+
+        arrays = {}
+        for i, level in enumerate(levels):
+            arrays[f"points_{i}"] = level.points.astype(np.float32)
+            arrays[f"triangles_{i}"] = level.triangles
+            arrays[f"regions_{i}"] = level.regions
+        cache.save(key, arrays, {"region_names": levels[0].region_names})
+        lod = cls(levels, resolutions)
+        logger.info(f"Built boundary LOD: {lod.summary()}")
+        return lod
+
+    def level_for_budget(self, max_triangles: int = PREVIEW_TRIANGLE_BUDGET) -> TriSurface:
+        """Return the finest level with at most ``max_triangles`` triangles."""
+        for level in self.levels:
+            if level.n_triangles <= max_triangles:
+                return level
+        return self.levels[-1]
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Return the size of every level."""
+        return [{
+            "resolution": resolution,
+            "triangles": level.n_triangles,
+            "points": level.n_points,
+            "megabytes": (level.n_points * 12 + level.n_triangles * 12) / 1024 ** 2,
+        } for resolution, level in zip(self.resolutions, self.levels)]
@@ -0,0 +1,467 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 18:41:55 2026
+
+@author: adamp
+"""
+
+"""
+Bounding volume hierarchy over triangle surfaces.
+
+The tree is built top-down one depth at a time: the triangles of all nodes
+of a depth are sorted together along the longest centroid axis of their node
+and split at the median. Nodes are stored as flat arrays. Queries are batched.
+Ray casts traverse the tree breadth-first on (query, node) pairs. Nearest
+point queries descend nearest child first, with one node stack per query, and
+drop every node farther than the best distance found so far. Every step is a
+handful of vectorized box or triangle tests over all active pairs.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from src.openfoam.stl import TriSurface
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Number of queries traversed together
+QUERY_CHUNK_SIZE = 1 << 16
+
+# Number of nodes popped together from the stacks of a nearest search step
+NEAREST_STEP_PAIRS = 1 << 12
+
+# Initial stack depth of every query of a nearest search (grown on demand)
+NEAREST_STACK_SIZE = 64
+
+# Number of point-triangle pairs of inside/outside tests evaluated together
+PARITY_CHUNK_SIZE = 1 << 21
+
+
+def _dot(u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    return np.einsum("ij,ij->i", u, v)
+
+
+def closest_points_on_triangles(points: np.ndarray, a: np.ndarray, b: np.ndarray,
+                                c: np.ndarray) -> np.ndarray:
+    """Return the closest point on each triangle (a, b, c) to each point.
+
+    Vectorized form of the Voronoi region test of Ericson, Real-Time
+    Collision Detection, section 5.1.5.
+    """
+    ab, ac, ap = b - a, c - a, points - a
+    bp, cp = points - b, points - c
+    d1, d2 = _dot(ab, ap), _dot(ac, ap)
+    d3, d4 = _dot(ab, bp), _dot(ac, bp)
+    d5, d6 = _dot(ab, cp), _dot(ac, cp)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denom = va + vb + vc
+        result = a + ab * (vb / denom)[:, None] + ac * (vc / denom)[:, None]
+
+        # Regions in reverse order of precedence, so earlier tests win
+        mask = (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)
+        w = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        result[mask] = (b + (c - b) * w[:, None])[mask]
+        mask = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+        result[mask] = (a + ac * (d2 / (d2 - d6))[:, None])[mask]
+        mask = (d6 >= 0) & (d5 <= d6)
+        result[mask] = c[mask]
+        mask = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+        result[mask] = (a + ab * (d1 / (d1 - d3))[:, None])[mask]
+        mask = (d3 >= 0) & (d4 <= d3)
+        result[mask] = b[mask]
+        mask = (d1 <= 0) & (d2 <= 0)
+        result[mask] = a[mask]
+
+    # Fully degenerate triangles (all vertices equal)
+    bad = ~np.isfinite(result).all(axis=1)
+    result[bad] = a[bad]
+    return result
+
+
+def ray_triangle_intersections(origins: np.ndarray, directions: np.ndarray, a: np.ndarray,
+                               b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """Return the ray parameter of each ray/triangle pair (inf for a miss).
+
+    Vectorized Moller-Trumbore test.
+    """
+    e1, e2 = b - a, c - a
+    p = np.cross(directions, e2)
+    det = _dot(e1, p)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inv = 1.0 / det
+        s = origins - a
+        u = _dot(s, p) * inv
+        q = np.cross(s, e1)
+        v = _dot(directions, q) * inv
+        t = _dot(e2, q) * inv
+    hit = (det != 0) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0)
+    return np.where(hit, t, np.inf)
+
+
+def points_inside_surface(surface: TriSurface, points: np.ndarray) -> np.ndarray:
+    """Test which points lie inside a closed surface by ray parity.
+
+    Rays are cast along +x. Triangles are binned on a uniform grid in the
+    y-z plane so every point is only tested against the triangles of its bin.
+
+    Args:
+        surface: Closed triangle surface
+        points: Query points, shape (N, 3)
+
+    Returns:
+        Boolean mask of the points inside the surface
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    vertices = surface.triangle_vertices()
+    lower, upper = surface.bounds()
+    size = np.maximum(upper - lower, 1e-300)
+    inside = np.zeros(len(points), dtype=bool)
+    if surface.n_triangles == 0 or len(points) == 0:
+        return inside
+
+    # Offset rays slightly so they do not run exactly through edges and vertices
+    yz = points[:, 1:] + size[1:] * np.array([1.234567e-7, 2.345678e-7])
+    n_bins = int(np.clip(np.sqrt(surface.n_triangles), 1, 1024))
+    bin_size = size[1:] / n_bins
+
+    # Triangle to bin pairs in CSR order
+    tri_min = np.floor((vertices[:, :, 1:].min(axis=1) - lower[1:]) / bin_size).astype(np.int64)
+    tri_max = np.floor((vertices[:, :, 1:].max(axis=1) - lower[1:]) / bin_size).astype(np.int64)
+    tri_min = np.clip(tri_min, 0, n_bins - 1)
+    tri_max = np.clip(tri_max, 0, n_bins - 1)
+    extent = tri_max - tri_min + 1
+    per_tri = extent[:, 0] * extent[:, 1]
+    tri = np.repeat(np.arange(surface.n_triangles), per_tri)
+    local = np.arange(len(tri)) - np.repeat(np.cumsum(per_tri) - per_tri, per_tri)
+    bins = ((tri_min[tri, 0] + local // extent[tri, 1]) * n_bins
+            + tri_min[tri, 1] + local % extent[tri, 1])
+    order = np.argsort(bins, kind="stable")
+    bin_triangles = tri[order]
+    bin_start = np.searchsorted(bins[order], np.arange(n_bins * n_bins + 1))
+
+    cell = np.floor((yz - lower[1:]) / bin_size).astype(np.int64)
+    in_range = np.all((cell >= 0) & (cell < n_bins), axis=1)
+    candidates = np.flatnonzero(in_range)
+    point_bin = cell[candidates, 0] * n_bins + cell[candidates, 1]
+    n_pairs = bin_start[point_bin + 1] - bin_start[point_bin]
+
+    crossings = np.zeros(len(points), dtype=np.int64)
+    bounds = np.searchsorted(np.cumsum(n_pairs),
+                             np.arange(PARITY_CHUNK_SIZE, n_pairs.sum(), PARITY_CHUNK_SIZE))
+    for chunk in np.split(np.arange(len(candidates)), np.unique(bounds)):
+        counts = n_pairs[chunk]
+        if counts.sum() == 0:
+            continue
+        pair_point = np.repeat(candidates[chunk], counts)
+        first = np.cumsum(counts) - counts
+        local = np.arange(counts.sum()) - np.repeat(first, counts)
+        pair_tri = bin_triangles[np.repeat(bin_start[point_bin[chunk]], counts) + local]
+
+        a, b, c = vertices[pair_tri, 0], vertices[pair_tri, 1], vertices[pair_tri, 2]
+        p = yz[pair_point]
+
+        def edge(u, v, w):
+            return ((v[:, 1] - u[:, 1]) * (w[:, 1] - u[:, 2])
+                    - (v[:, 2] - u[:, 2]) * (w[:, 0] - u[:, 1]))
+
+        wa, wb, wc = edge(b, c, p), edge(c, a, p), edge(a, b, p)
+        area = wa + wb + wc
+        same_sign = ((wa >= 0) & (wb >= 0) & (wc >= 0)) | ((wa <= 0) & (wb <= 0) & (wc <= 0))
+        hit = same_sign & (area != 0)
+        x_hit = (wa[hit] * a[hit, 0] + wb[hit] * b[hit, 0] + wc[hit] * c[hit, 0]) / area[hit]
+        ahead = pair_point[hit][x_hit > points[pair_point[hit], 0]]
+        crossings += np.bincount(ahead, minlength=len(points))
+
+    inside[:] = crossings % 2 == 1
+    return inside
+
+
+class SurfaceBVH:
+    """Bounding volume hierarchy over the triangles of a surface."""
+
+    def __init__(self, surface: TriSurface, leaf_size: int = 8) -> None:
+        """Build the hierarchy.
+
+        Args:
+            surface: Triangle surface
+            leaf_size: Maximum number of triangles in a leaf node
+        """
+        self.surface = surface
+        self.leaf_size = max(int(leaf_size), 1)
+        self.vertices = surface.triangle_vertices()
+        self._build()
+
+    @property
+    def n_nodes(self) -> int:
+        """Number of nodes in the tree."""
+        return len(self.node_child)
+
+    def _build(self) -> None:
+        """Build the node arrays breadth-first."""
+        tri_min = self.vertices.min(axis=1)
+        tri_max = self.vertices.max(axis=1)
+        centroids = self.vertices.mean(axis=1)
+        n_triangles = len(self.vertices)
+        order = np.arange(n_triangles)
+
+        starts = np.zeros(1, dtype=np.int64)
+        counts = np.array([n_triangles], dtype=np.int64)
+        lows, highs, children, node_starts, node_counts = [], [], [], [], []
+        n_nodes = 1
+
+        while len(starts):
+            first = np.cumsum(counts) - counts
+            positions = np.repeat(starts - first, counts) + np.arange(counts.sum())
+            ordered = order[positions]
+            lows.append(np.minimum.reduceat(tri_min[ordered], first) if len(ordered) else
+                        np.zeros((len(starts), 3)))
+            highs.append(np.maximum.reduceat(tri_max[ordered], first) if len(ordered) else
+                         np.zeros((len(starts), 3)))
+            node_starts.append(starts)
+            node_counts.append(counts)
+
+            split = counts > self.leaf_size
+            child = np.full(len(starts), -1, dtype=np.int64)
+            child[split] = n_nodes + 2 * np.arange(np.count_nonzero(split))
+            children.append(child)
+            n_nodes += 2 * np.count_nonzero(split)
+            if not split.any():
+                break
+
+            # Sort the triangles of every split node along its longest centroid axis
+            segment = np.repeat(np.arange(len(starts)), counts)
+            c_min = np.minimum.reduceat(centroids[ordered], first)
+            c_max = np.maximum.reduceat(centroids[ordered], first)
+            axis = np.argmax(c_max - c_min, axis=1)
+            key = centroids[ordered, axis[segment]]
+            permutation = np.lexsort((key, segment))
+            order[positions] = ordered[permutation]
+
+            half = counts[split] // 2
+            starts = np.stack([starts[split], starts[split] + half], axis=1).ravel()
+            counts = np.stack([half, counts[split] - half], axis=1).ravel()
+
+        self.order = order
+        self.node_min = np.concatenate(lows)
+        self.node_max = np.concatenate(highs)
+        self.node_child = np.concatenate(children)
+        self.node_start = np.concatenate(node_starts)
+        self.node_count = np.concatenate(node_counts)
+        logger.debug(f"Built BVH with {self.n_nodes} nodes over {n_triangles} triangles")
+
+    def _leaf_pairs(self, queries: np.ndarray, nodes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Expand (query, leaf node) pairs to (query, triangle) pairs."""
+        counts = self.node_count[nodes]
+        first = np.cumsum(counts) - counts
+        local = np.arange(counts.sum()) - np.repeat(first, counts)
+        triangles = self.order[np.repeat(self.node_start[nodes], counts) + local]
+        return np.repeat(queries, counts), triangles
+
+    def _children(self, queries: np.ndarray, nodes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Replace (query, internal node) pairs by pairs with both children."""
+        child = self.node_child[nodes]
+        return np.repeat(queries, 2), np.stack([child, child + 1], axis=1).ravel()
+
+    def _box_distance2(self, points: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+        """Squared distance from points to node boxes (0 inside)."""
+        gap = np.maximum(np.maximum(self.node_min[nodes] - points,
+                                    points - self.node_max[nodes]), 0)
+        return np.sum(gap ** 2, axis=1)
+
+    def _ray_boxes(self, origins: np.ndarray, inverse: np.ndarray,
+                   nodes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Slab test returning the entry and exit ray parameters of node boxes."""
+        with np.errstate(invalid="ignore"):
+            t0 = (self.node_min[nodes] - origins) * inverse
+            t1 = (self.node_max[nodes] - origins) * inverse
+        t0 = np.nan_to_num(t0, nan=-np.inf)
+        t1 = np.nan_to_num(t1, nan=np.inf)
+        return np.minimum(t0, t1).max(axis=1), np.maximum(t0, t1).min(axis=1)
+
+    def nearest(self, points: np.ndarray,
+                max_distance: float = np.inf) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Find the nearest surface point of every query point.
+
+        Args:
+            points: Query points, shape (N, 3)
+            max_distance: Search radius; points farther away get no result
+
+        Returns:
+            Distances (inf if nothing within range), nearest triangles (-1 if
+            none) and nearest surface points
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        distance = np.full(len(points), np.inf)
+        triangle = np.full(len(points), -1, dtype=np.int64)
+        nearest = np.full((len(points), 3), np.nan)
+        if len(self.vertices) == 0:
+            return distance, triangle, nearest
+
+        best = np.full(len(points), max_distance ** 2)
+
+        def visit_leaves(queries, nodes):
+            pair_query, pair_tri = self._leaf_pairs(queries, nodes)
+            v = self.vertices[pair_tri]
+            closest = closest_points_on_triangles(points[pair_query], v[:, 0], v[:, 1], v[:, 2])
+            d2 = np.sum((closest - points[pair_query]) ** 2, axis=1)
+            ranking = np.lexsort((d2, pair_query))
+            winner = ranking[np.r_[True, np.diff(pair_query[ranking]) != 0]]
+            winner = winner[d2[winner] <= best[pair_query[winner]]]
+            q = pair_query[winner]
+            best[q] = d2[winner]
+            distance[q] = np.sqrt(d2[winner])
+            triangle[q] = pair_tri[winner]
+            nearest[q] = closest[winner]
+
+        for begin in range(0, len(points), QUERY_CHUNK_SIZE):
+            chunk = np.arange(begin, min(begin + QUERY_CHUNK_SIZE, len(points)))
+
+            # Greedy descent to one leaf per query gives a tight initial bound
+            nodes = np.zeros(len(chunk), dtype=np.int64)
+            internal = self.node_child[nodes] >= 0
+            while internal.any():
+                child = self.node_child[nodes[internal]]
+                p = points[chunk[internal]]
+                right_closer = self._box_distance2(p, child + 1) < self._box_distance2(p, child)
+                nodes[internal] = child + right_closer
+                internal = self.node_child[nodes] >= 0
+            visit_leaves(chunk, nodes)
+
+            # Every query keeps a stack of nodes and their squared box
+            # distances, nearest on top. A step pops the top nodes of every
+            # query; the fewer queries remain active, the more each one pops.
+            stack = np.zeros((len(chunk), NEAREST_STACK_SIZE), dtype=np.int64)
+            bound = np.zeros((len(chunk), NEAREST_STACK_SIZE))
+            bound[:, 0] = self._box_distance2(points[chunk], stack[:, 0])
+            top = np.ones(len(chunk), dtype=np.int64)
+            active = np.arange(len(chunk))
+            while len(active):
+                width = max(NEAREST_STEP_PAIRS // len(active), 1)
+                pair = np.repeat(active, np.minimum(top[active], width))
+                position = top[pair] - 1 - (np.arange(len(pair)) - np.searchsorted(pair, pair))
+                top[active] = np.maximum(top[active] - width, 0)
+                nodes, queries = stack[pair, position], chunk[pair]
+                keep = bound[pair, position] <= best[queries]
+                leaf = keep & (self.node_child[nodes] < 0)
+                if leaf.any():
+                    visit_leaves(queries[leaf], nodes[leaf])
+
+                # Push the children that may still hold a nearer triangle,
+                # the farthest first so the nearest ends up on top
+                pair, children = self._children(pair[keep & ~leaf], nodes[keep & ~leaf])
+                d2 = self._box_distance2(points[chunk[pair]], children)
+                near = np.flatnonzero(d2 <= best[chunk[pair]])
+                near = near[np.lexsort((-d2[near], pair[near]))]
+                pair, children, d2 = pair[near], children[near], d2[near]
+                position = top[pair] + np.arange(len(pair)) - np.searchsorted(pair, pair)
+                if len(position) and position.max() >= stack.shape[1]:
+                    stack = np.pad(stack, ((0, 0), (0, stack.shape[1])))
+                    bound = np.pad(bound, ((0, 0), (0, bound.shape[1])))
+                stack[pair, position] = children
+                bound[pair, position] = d2
+                top += np.bincount(pair, minlength=len(chunk))
+                active = np.flatnonzero(top)
+
+        return distance, triangle, nearest
+
+    def ray_cast(self, origins: np.ndarray, directions: np.ndarray,
+                 max_length: float = np.inf) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the first surface hit of every ray.
+
+        Args:
+            origins: Ray origins, shape (N, 3)
+            directions: Ray directions, shape (N, 3) or (3,)
+            max_length: Maximum ray parameter
+
+        Returns:
+            Ray parameter of the first hit (inf for a miss) and the hit
+            triangle (-1 for a miss)
+        """
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        directions = np.broadcast_to(np.asarray(directions, dtype=np.float64), origins.shape)
+        hit_t = np.full(len(origins), float(max_length))
+        hit_triangle = np.full(len(origins), -1, dtype=np.int64)
+        if len(self.vertices) == 0:
+            return np.full(len(origins), np.inf), hit_triangle
+
+        with np.errstate(divide="ignore"):
+            inverse = 1.0 / directions
+        for begin in range(0, len(origins), QUERY_CHUNK_SIZE):
+            chunk = np.arange(begin, min(begin + QUERY_CHUNK_SIZE, len(origins)))
+            queries, nodes = chunk, np.zeros(len(chunk), dtype=np.int64)
+            while len(queries):
+                t_in, t_out = self._ray_boxes(origins[queries], inverse[queries], nodes)
+                keep = (t_in <= t_out) & (t_out >= 0) & (t_in <= hit_t[queries])
+                queries, nodes = queries[keep], nodes[keep]
+
+                leaf = self.node_child[nodes] < 0
+                if leaf.any():
+                    pair_query, pair_tri = self._leaf_pairs(queries[leaf], nodes[leaf])
+                    v = self.vertices[pair_tri]
+                    t = ray_triangle_intersections(origins[pair_query], directions[pair_query],
+                                                   v[:, 0], v[:, 1], v[:, 2])
+                    ranking = np.lexsort((t, pair_query))
+                    winner = ranking[np.r_[True, np.diff(pair_query[ranking]) != 0]]
+                    winner = winner[t[winner] <= hit_t[pair_query[winner]]]
+                    hit_t[pair_query[winner]] = t[winner]
+                    hit_triangle[pair_query[winner]] = pair_tri[winner]
+                queries, nodes = self._children(queries[~leaf], nodes[~leaf])
+
+        hit_t[hit_triangle < 0] = np.inf
+        return hit_t, hit_triangle
+
+    def inside(self, points: np.ndarray) -> np.ndarray:
+        """Test which points lie inside the surface by ray parity.
+
+        The result is only meaningful for closed surfaces. This is
+        :func:`points_inside_surface`, whose binned +x rays are cheaper than
+        traversing the hierarchy.
+
+        Args:
+            points: Query points, shape (N, 3)
+
+        Returns:
+            Boolean mask of the points inside the surface
+        """
+        return points_inside_surface(self.surface, points)
+
+
+def validate_location_in_mesh(surface: TriSurface, point, background_min=None,
+                              background_max=None, min_distance: float = 0.0,
+                              bvh: Optional[SurfaceBVH] = None) -> Tuple[bool, bool, list]:
+    """Check a ``locationInMesh`` point before running snappyHexMesh.
+
+    Args:
+        surface: STL geometry
+        point: Location in mesh
+        background_min: Lower corner of the background mesh, if known
+        background_max: Upper corner of the background mesh, if known
+        min_distance: Minimum distance to the surface, typically one cell size
+        bvh: Hierarchy over the surface; built if None
+
+    Returns:
+        Whether the point is valid, whether it lies inside the surface, and
+        the list of problems found
+    """
+    point = np.asarray(point, dtype=np.float64).reshape(1, 3)
+    problems = []
+    if background_min is not None and background_max is not None:
+        if (np.any(point[0] <= np.asarray(background_min))
+                or np.any(point[0] >= np.asarray(background_max))):
+            problems.append("locationInMesh lies outside the background mesh")
+
+    bvh = bvh or SurfaceBVH(surface)
+    distance = bvh.nearest(point)[0][0]
+    if distance <= min_distance:
+        problems.append(f"locationInMesh is {distance:.4g} from the surface "
+                        f"(minimum {min_distance:.4g})")
+
+    inside = False
+    if np.all(surface.edges()[2] == 2):
+        inside = bool(bvh.inside(point)[0])
+    return not problems, inside, problems
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 03:20:57 2026
+
+@author: adamp
+"""
+
+"""
+topoSet-style selection of cells from geometric shapes, surfaces and fields.
+
+Sources (box, cylinder, sphere, closed surface, field range) are evaluated
+against the cell centres with component-wise NumPy expressions. The centres
+are binned once on a coarse uniform grid, so a source with a bounded extent
+only tests the cells of the bins it overlaps. Centres and bins are cached on
+disk per mesh. Selections come out as bitmap sets (see ``mesh_sets``) and can
+be combined with topoSet actions and written as cellSets or cellZones.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.openfoam.polymesh import PolyMesh
+from src.openfoam.stl import TriSurface
+from src.openfoam.bvh import points_inside_surface
+from src.openfoam.mesh_sets import (MeshSet, MeshZone, write_mesh_set, read_zones, write_zones,
+                                    mesh_sizes)
+from src.utils.cache import ArrayCache
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Supported sources and topoSet actions
+SOURCE_TYPES = ("box", "cylinder", "sphere", "surface", "field")
+SET_ACTIONS = ("new", "add", "subtract", "invert", "delete")
+
+# Number of bins per axis of the cell centre index
+SELECTION_BINS = 32
+
+# Fraction of the bins above which a source tests all cells directly
+FULL_SCAN_FRACTION = 0.5
+
+
+class CellSource:
+    """A cell source of a topoSet action (``boxToCell``, ``sphereToCell``...)."""
+
+    def __init__(self, source: str, **parameters) -> None:
+        """Initialize the source.
+
+        Args:
+            source: One of ``SOURCE_TYPES``
+            **parameters: Source parameters:
+                box: ``min``, ``max``
+                cylinder: ``point1``, ``point2``, ``radius``, optional ``inner_radius``
+                sphere: ``centre``, ``radius``, optional ``inner_radius``
+                surface: ``surface`` (closed TriSurface), optional ``outside``
+                field: ``values`` (per cell, vectors use their magnitude),
+                optional ``min`` and ``max``
+        """
+        if source not in SOURCE_TYPES:
+            raise ValueError(f"Unsupported cell source: {source}")
+        required = {"box": ("min", "max"), "cylinder": ("point1", "point2", "radius"),
+                    "sphere": ("centre", "radius"), "surface": ("surface",),
+                    "field": ("values",)}[source]
+        missing = [name for name in required if name not in parameters]
+        if missing:
+            raise ValueError(f"{source} source needs {', '.join(missing)}")
+        self.source = source
+        self.parameters = parameters
+
+    def _vector(self, name: str) -> np.ndarray:
+        """Return a parameter as a float vector."""
+        return np.asarray(self.parameters[name], dtype=np.float64)
+
+    def bounds(self) -> Optional[np.ndarray]:
+        """Bounding box of the selected region as (2, 3), or None if unbounded."""
+        p = self.parameters
+        if self.source == "box":
+            return np.array([self._vector("min"), self._vector("max")])
+        if self.source == "sphere":
+            centre, radius = self._vector("centre"), float(p["radius"])
+            return np.array([centre - radius, centre + radius])
+        if self.source == "cylinder":
+            ends = np.array([self._vector("point1"), self._vector("point2")])
+            radius = float(p["radius"])
+            return np.array([ends.min(axis=0) - radius, ends.max(axis=0) + radius])
+        if self.source == "surface" and not p.get("outside", False):
+            surface: TriSurface = p["surface"]
+            return surface.bounds()
+        return None
+
+    def mask(self, points: np.ndarray, cells: Optional[np.ndarray] = None) -> np.ndarray:
+        """Evaluate the source.
+
+        Args:
+            points: Cell centres of the tested cells, shape (n, 3)
+            cells: Labels of the tested cells (needed by field sources); all
+                cells if None
+
+        Returns:
+            Boolean mask of the selected points
+        """
+        p = self.parameters
+        n = len(points)
+        if self.source == "box":
+            lower, upper = self._vector("min"), self._vector("max")
+            inside = np.ones(n, dtype=bool)
+            for d in range(3):
+                inside &= (points[:, d] >= lower[d]) & (points[:, d] <= upper[d])
+            return inside
+
+        if self.source == "sphere":
+            centre = self._vector("centre")
+            distance2 = np.zeros(n)
+            for d in range(3):
+                distance2 += (points[:, d] - centre[d]) ** 2
+            inner = float(p.get("inner_radius", 0.0))
+            return (distance2 <= float(p["radius"]) ** 2) & (distance2 >= inner ** 2)
+
+        if self.source == "cylinder":
+            start, axis = self._vector("point1"), self._vector("point2") - self._vector("point1")
+            t = np.zeros(n)
+            for d in range(3):
+                t += (points[:, d] - start[d]) * axis[d]
+            t /= np.dot(axis, axis)
+            radial2 = np.zeros(n)
+            for d in range(3):
+                radial2 += (points[:, d] - start[d] - t * axis[d]) ** 2
+            inner = float(p.get("inner_radius", 0.0))
+            return ((t >= 0) & (t <= 1) & (radial2 <= float(p["radius"]) ** 2)
+                    & (radial2 >= inner ** 2))
+
+        if self.source == "surface":
+            inside = points_inside_surface(p["surface"], points)
+            return ~inside if p.get("outside", False) else inside
+
+        values = np.asarray(p["values"])
+        if cells is not None:
+            values = values[cells]
+        if values.ndim > 1:
+            values = np.linalg.norm(values, axis=1)
+        return (values >= p.get("min", -np.inf)) & (values <= p.get("max", np.inf))
+
+    def __repr__(self) -> str:
+        return f"CellSource({self.source!r})"
+
+
+class CellSelector:
+    """Evaluates cell sources against the (cached) cell centres of a mesh."""
+
+    def __init__(self, mesh: PolyMesh, cache: Optional[ArrayCache] = None,
+                 bins: int = SELECTION_BINS) -> None:
+        """Initialize the selector and build or load the centre index.
+
+        Args:
+            mesh: The mesh
+            cache: Cache of the centre index; the default ``cell_selection`` cache if None
+            bins: Number of bins per axis of the index
+        """
+        self.mesh = mesh
+        self.bins = int(bins)
+        cache = cache or ArrayCache("cell_selection")
+        key = ArrayCache.make_key(mesh.content_hash(), self.bins)
+        cached = cache.load(key)
+        if cached is not None:
+            self.centres = cached["centres"]
+            self.order = cached["order"]
+            self.bin_start = cached["bin_start"]
+            self.lower, self.bin_size = cached["lower"], cached["bin_size"]
+            return
+
+        self.centres = mesh.cell_centres
+        self.lower = self.centres.min(axis=0) if mesh.n_cells else np.zeros(3)
+        extent = (self.centres.max(axis=0) - self.lower) if mesh.n_cells else np.ones(3)
+        self.bin_size = np.maximum(extent, 1e-300) / self.bins * (1 + 1e-9)
+        cell_bin = self._bin_coordinates(self.centres) @ np.array([self.bins ** 2, self.bins, 1])
+        self.order = np.argsort(cell_bin, kind="stable").astype(np.int32)
+        self.bin_start = np.searchsorted(cell_bin[self.order], np.arange(self.bins ** 3 + 1))
+        cache.save(key, {"centres": self.centres, "order": self.order,
+                         "bin_start": self.bin_start, "lower": self.lower,
+                         "bin_size": self.bin_size})
+
+    def _bin_coordinates(self, points: np.ndarray) -> np.ndarray:
+        """Integer bin coordinates of points, clipped to the grid."""
+        ijk = np.floor((points - self.lower) / self.bin_size).astype(np.int64)
+        return np.clip(ijk, 0, self.bins - 1)
+
+    def candidates(self, bounds: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """Cells in the bins overlapping a bounding box.
+
+        Returns:
+            Cell labels, or None if the box covers most of the mesh (then all
+            cells should be tested)
+        """
+        if bounds is None:
+            return None
+        ijk = self._bin_coordinates(np.asarray(bounds))
+        counts = ijk[1] - ijk[0] + 1
+        if np.prod(counts) > FULL_SCAN_FRACTION * self.bins ** 3:
+            return None
+        i, j, k = np.meshgrid(*[np.arange(ijk[0, d], ijk[1, d] + 1) for d in range(3)],
+                              indexing="ij")
+        bins = (i * self.bins ** 2 + j * self.bins + k).ravel()
+        starts, stops = self.bin_start[bins], self.bin_start[bins + 1]
+        sizes = stops - starts
+        slots = np.repeat(starts - np.cumsum(sizes) + sizes, sizes) + np.arange(sizes.sum())
+        return self.order[slots].astype(np.int64)
+
+    def select(self, source: CellSource, name: str = "selection") -> MeshSet:
+        """Evaluate a source as a cell set.
+
+        Args:
+            source: The cell source
+            name: Name of the returned set
+
+        Returns:
+            Set of the selected cells
+        """
+        cells = self.candidates(source.bounds())
+        if cells is None:
+            return MeshSet.from_mask(name, "cell", source.mask(self.centres))
+        selected = cells[source.mask(self.centres[cells], cells)]
+        return MeshSet.from_labels(name, "cell", self.mesh.n_cells, selected)
+
+    def run_actions(self, actions: Sequence[Tuple[str, str, Optional[CellSource]]],
+                    sets: Optional[Dict[str, MeshSet]] = None) -> Dict[str, MeshSet]:
+        """Apply topoSet actions in order.
+
+        Args:
+            actions: (set name, action, source) triples; ``action`` is one of
+                ``SET_ACTIONS`` and the source is ignored for ``invert`` and
+                ``delete``
+            sets: Existing sets the actions may modify
+
+        Returns:
+            The sets after all actions
+        """
+        sets = dict(sets or {})
+        for name, action, source in actions:
+            if action not in SET_ACTIONS:
+                raise ValueError(f"Unsupported topoSet action: {action}")
+            current = sets.get(name, MeshSet(name, "cell", self.mesh.n_cells))
+            if action == "delete":
+                sets.pop(name, None)
+            elif action == "invert":
+                sets[name] = ~current
+            else:
+                if source is None:
+                    raise ValueError(f"Action {action} on {name} needs a source")
+                selected = self.select(source, name)
+                sets[name] = {"new": selected, "add": current | selected,
+                              "subtract": current - selected}[action]
+            logger.info(f"topoSet {action} {name}: {len(sets[name]) if name in sets else 0} cells")
+        return sets
+
+
+def write_selections(case_dir: str, sets: Dict[str, MeshSet], zones: Sequence[str] = (),
+                     binary: bool = False) -> List[str]:
+    """Write selected sets as cellSets, and some of them also as cellZones.
+
+    Existing cellZones are kept, except those replaced by a zone of the same name.
+
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+        sets: Cell sets by name
+        zones: Names of the sets also written as cellZones
+        binary: Whether to write binary label lists
+
+    Returns:
+        Paths of the written files
+    """
+    paths = [write_mesh_set(case_dir, cell_set, binary) for cell_set in sets.values()]
+    if zones:
+        existing = read_zones(case_dir, "cell", mesh_sizes(case_dir))
+        new_zones = [MeshZone.from_set(sets[name]) for name in zones]
+        names = set(zones)
+        kept = [zone for zone in existing if zone.name not in names]
+        paths.append(write_zones(case_dir, "cell", kept + new_zones, binary))
+    return paths
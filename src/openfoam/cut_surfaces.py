@@ -0,0 +1,407 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 16:24:51 2026
+
+@author: adamp
+"""
+
+"""
+Cutting planes and isosurfaces of polyMesh fields.
+
+A surface is the zero level of a point function: the signed distance to a
+plane, or a cell field interpolated to the points minus the iso value.
+The face point lists are scanned in chunks for edges whose end points lie
+on opposite sides; each crossing becomes a surface point, linearly
+interpolated along its edge and shared by all faces using the edge. The
+crossings of a face pair up into a segment, and every cut cell is
+triangulated as a fan from the centre of its segments, oriented so the
+triangle normals follow the increasing function. Sampling a field on the
+surface is a gather of a sparse (point, cell, weight) stencil, and
+sampled surfaces are cached per time, field and cut parameters. The
+cell-to-point stencil of the whole mesh is cached on the mesh content.
+"""
+import os
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.openfoam.fields import field_path, read_field
+from src.openfoam.polymesh import PolyMesh
+from src.openfoam.probes import point_weights
+from src.openfoam.vtk_io import write_vtk_polydata
+from src.utils.cache import ArrayCache
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Number of faces (or points for interpolation) processed at once
+CUT_CHUNK_SIZE = 1 << 18
+
+
+class CutSurface:
+    """Triangulated cut of a mesh with the cell stencil of its points."""
+
+    def __init__(self, points: np.ndarray, triangles: np.ndarray, cells: np.ndarray,
+                 stencil_point: np.ndarray, stencil_cell: np.ndarray,
+                 stencil_weight: np.ndarray) -> None:
+        """Initialize the surface.
+
+        Args:
+            points: Surface points, (nPoints, 3)
+            triangles: Point labels of the triangles, (nTriangles, 3)
+            cells: Cut cell of every triangle
+            stencil_point: Surface point of every stencil entry, sorted
+            stencil_cell: Cell of every stencil entry
+            stencil_weight: Weight of every stencil entry
+        """
+        self.points = points
+        self.triangles = triangles
+        self.cells = cells
+        self.stencil_point = stencil_point
+        self.stencil_cell = stencil_cell
+        self.stencil_weight = stencil_weight
+        self.point_data: Dict[str, np.ndarray] = {}
+        self.cell_data: Dict[str, np.ndarray] = {}
+
+    @property
+    def n_points(self) -> int:
+        """Number of surface points."""
+        return len(self.points)
+
+    @property
+    def n_triangles(self) -> int:
+        """Number of surface triangles."""
+        return len(self.triangles)
+
+    def area_vectors(self) -> np.ndarray:
+        """Area vectors of the triangles, (nTriangles, 3)."""
+        a, b, c = (self.points[self.triangles[:, k]] for k in range(3))
+        return 0.5 * np.cross(b - a, c - a)
+
+    @property
+    def area(self) -> float:
+        """Total area of the surface."""
+        return float(np.linalg.norm(self.area_vectors(), axis=1).sum())
+
+    def sample(self, values: np.ndarray) -> np.ndarray:
+        """Interpolate cell values of shape (nCells[, nComponents]) to the surface points."""
+        values = np.asarray(values, dtype=np.float64)
+        if not len(self.stencil_point):
+            return np.zeros((0,) + values.shape[1:])
+        weights = self.stencil_weight.reshape((-1,) + (1,) * (values.ndim - 1))
+        starts = np.r_[0, np.flatnonzero(np.diff(self.stencil_point)) + 1]
+        return np.add.reduceat(values[self.stencil_cell] * weights, starts, axis=0)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Geometry, stencil and sampled data as named arrays."""
+        arrays = {"points": self.points, "triangles": self.triangles, "cells": self.cells,
+                  "stencil_point": self.stencil_point, "stencil_cell": self.stencil_cell,
+                  "stencil_weight": self.stencil_weight}
+        arrays.update({f"point:{name}": values for name, values in self.point_data.items()})
+        arrays.update({f"cell:{name}": values for name, values in self.cell_data.items()})
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "CutSurface":
+        """Rebuild a surface stored with ``arrays``."""
+        surface = cls(arrays["points"], arrays["triangles"], arrays["cells"],
+                      arrays["stencil_point"], arrays["stencil_cell"], arrays["stencil_weight"])
+        for name, values in arrays.items():
+            if name.startswith("point:"):
+                surface.point_data[name[6:]] = values
+            elif name.startswith("cell:"):
+                surface.cell_data[name[5:]] = values
+        return surface
+
+    def write_vtk(self, file_path: str, title: str = "Project_Flow") -> None:
+        """Write the surface and its sampled fields as VTK polydata."""
+        write_vtk_polydata(file_path, self.points, self.triangles, cell_data=self.cell_data,
+                           point_data=self.point_data, title=title)
+
+
+class PointInterpolation:
+    """Inverse-distance cell-to-point stencil of a mesh, in CSR form over the points."""
+
+    def __init__(self, mesh: PolyMesh, cache: Optional[ArrayCache] = None,
+                 chunk_size: int = CUT_CHUNK_SIZE) -> None:
+        """Build or load the stencil of a mesh.
+
+        Args:
+            mesh: The mesh
+            cache: Stencil cache; the default ``point_stencil`` cache if None
+            chunk_size: Number of points built or interpolated at once
+        """
+        self.n_points = mesh.n_points
+        self.chunk_size = chunk_size
+        cache = cache or ArrayCache("point_stencil")
+        key = ArrayCache.make_key(mesh.content_hash(), "point_stencil")
+        cached = cache.load(key)
+        if cached is None:
+            cached = self._build(mesh, chunk_size)
+            cache.save(key, cached)
+        self.offsets = cached["offsets"]
+        self.cells = cached["cells"]
+        self.weights = cached["weights"]
+
+    @staticmethod
+    def _build(mesh: PolyMesh, chunk_size: int) -> Dict[str, np.ndarray]:
+        """Gather the (point, cell, weight) pairs of all points, sorted by point."""
+        counts = np.zeros(mesh.n_points, dtype=np.int64)
+        cells, weights = [], []
+        for start in range(0, mesh.n_points, chunk_size):
+            points = np.arange(start, min(start + chunk_size, mesh.n_points))
+            position, cell, weight = point_weights(mesh, points)
+            counts[points] = np.bincount(position, minlength=len(points))
+            cells.append(cell)
+            weights.append(weight)
+        offsets = np.zeros(mesh.n_points + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return {"offsets": offsets, "cells": np.concatenate(cells).astype(np.int64),
+                "weights": np.concatenate(weights)}
+
+    def __call__(self, values: np.ndarray) -> np.ndarray:
+        """Interpolate cell values, (nCells[, nComponents]), to every mesh point."""
+        values = np.asarray(values, dtype=np.float64)
+        result = np.zeros((self.n_points,) + values.shape[1:])
+        for start in range(0, self.n_points, self.chunk_size):
+            stop = min(start + self.chunk_size, self.n_points)
+            entries = slice(self.offsets[start], self.offsets[stop])
+            weight = self.weights[entries].reshape((-1,) + (1,) * (values.ndim - 1))
+            # Points outside any cell keep zero; empty segments would break reduceat
+            used = np.flatnonzero(np.diff(self.offsets[start:stop + 1]))
+            if len(used):
+                result[start + used] = np.add.reduceat(
+                    values[self.cells[entries]] * weight,
+                    self.offsets[start + used] - self.offsets[start], axis=0)
+        return result
+
+
+def cell_to_point(mesh: PolyMesh, values: np.ndarray, chunk_size: int = CUT_CHUNK_SIZE,
+                  cache: Optional[ArrayCache] = None) -> np.ndarray:
+    """Inverse-distance interpolation of cell values to every mesh point.
+
+    Args:
+        mesh: The mesh
+        values: Cell values, (nCells[, nComponents])
+        chunk_size: Number of points interpolated at once
+        cache: Stencil cache; the default ``point_stencil`` cache if None
+
+    Returns:
+        Point values, (nPoints[, nComponents])
+    """
+    return PointInterpolation(mesh, cache, chunk_size)(values)
+
+
+def _edge_crossings(mesh: PolyMesh, positive: np.ndarray,
+                    chunk_size: int) -> Tuple[np.ndarray, ...]:
+    """Face, end points and direction of every face edge crossing the surface."""
+    faces, starts, ends, up = [], [], [], []
+    for f0 in range(0, mesh.n_faces, chunk_size):
+        f1 = min(f0 + chunk_size, mesh.n_faces)
+        lo, hi = mesh.face_offsets[f0], mesh.face_offsets[f1]
+        sizes = np.diff(mesh.face_offsets[f0:f1 + 1])
+        entry = np.arange(lo, hi)
+        first = np.repeat(mesh.face_offsets[f0:f1], sizes)
+        following = np.where(entry == first + np.repeat(sizes, sizes) - 1, first, entry + 1)
+        a, b = mesh.face_points[lo:hi], mesh.face_points[following]
+        crossed = positive[a] != positive[b]
+        if not crossed.any():
+            continue
+        faces.append(np.repeat(np.arange(f0, f1), sizes)[crossed])
+        starts.append(a[crossed])
+        ends.append(b[crossed])
+        up.append(positive[b[crossed]])
+    if not faces:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, np.zeros(0, dtype=bool)
+    return (np.concatenate(faces), np.concatenate(starts).astype(np.int64),
+            np.concatenate(ends).astype(np.int64), np.concatenate(up))
+
+
+def cut_surface(mesh: PolyMesh, point_values: np.ndarray, level: float = 0.0,
+                chunk_size: int = CUT_CHUNK_SIZE) -> CutSurface:
+    """Triangulated level surface of a point function.
+
+    Args:
+        mesh: The mesh
+        point_values: Function values at the mesh points
+        level: Level of the surface
+        chunk_size: Number of faces scanned at once
+
+    Returns:
+        The surface; triangle normals point towards increasing values
+    """
+    phi = np.asarray(point_values, dtype=np.float64) - level
+    positive = phi > 0
+    face, a, b, up = _edge_crossings(mesh, positive, chunk_size)
+    if not len(face):
+        empty = np.zeros(0, dtype=np.int64)
+        return CutSurface(np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64), empty, empty,
+                          empty, np.zeros(0))
+
+    # One surface point per cut edge, whichever faces share it
+    key = np.minimum(a, b) * mesh.n_points + np.maximum(a, b)
+    _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+    a, b = a[first], b[first]
+    t = phi[a] / (phi[a] - phi[b])
+    edge_points = mesh.points[a] + t[:, None] * (mesh.points[b] - mesh.points[a])
+
+    # Crossings alternate around a face; each upward one starts a segment
+    group = np.r_[True, face[1:] != face[:-1]]
+    group_start = np.maximum.accumulate(np.where(group, np.arange(len(face)), 0))
+    following = np.arange(1, len(face) + 1)
+    last = np.r_[group[1:], True]
+    following[last] = group_start[last]
+    rising = np.flatnonzero(up)
+    start, end, seg_face = inverse[rising], inverse[following[rising]], face[rising]
+
+    # Segments run clockwise around the owner cell's cut, anticlockwise around the neighbour's
+    internal = seg_face < mesh.n_internal_faces
+    cells = np.concatenate([mesh.owner[seg_face], mesh.neighbour[seg_face[internal]]])
+    first_vertex = np.concatenate([end, start[internal]])
+    second_vertex = np.concatenate([start, end[internal]])
+    cut_cells, centre = np.unique(cells, return_inverse=True)
+    count = np.bincount(centre)
+    centres = np.stack([np.bincount(centre, edge_points[first_vertex, k]) / count
+                        for k in range(3)], axis=1)
+    n_edges = len(edge_points)
+    triangles = np.stack([n_edges + centre, first_vertex, second_vertex], axis=1)
+
+    # Mesh point stencil of the edge points and of the fan centres
+    point = np.concatenate([np.arange(n_edges), np.arange(n_edges), n_edges + centre,
+                            n_edges + centre])
+    mesh_point = np.concatenate([a, b, a[first_vertex], b[first_vertex]])
+    weight = np.concatenate([1 - t, t, (1 - t[first_vertex]) / count[centre],
+                             t[first_vertex] / count[centre]])
+    stencil = _cell_stencil(mesh, point, mesh_point, weight)
+    logger.debug(f"Cut {len(cut_cells)} cells into {len(triangles)} triangles")
+    return CutSurface(np.concatenate([edge_points, centres]), triangles, cells, *stencil)
+
+
+def _cell_stencil(mesh: PolyMesh, point: np.ndarray, mesh_point: np.ndarray,
+                  weight: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Compose a surface point to mesh point stencil with cell-to-point weights."""
+    labels, slot = np.unique(mesh_point, return_inverse=True)
+    around, around_cell, around_weight = point_weights(mesh, labels)
+    offsets = np.zeros(len(labels) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(around, minlength=len(labels)), out=offsets[1:])
+    counts = offsets[slot + 1] - offsets[slot]
+    entry = np.repeat(offsets[slot], counts) + np.arange(counts.sum()) - \
+        np.repeat(np.cumsum(counts) - counts, counts)
+    key, inverse = np.unique(np.repeat(point, counts) * mesh.n_cells + around_cell[entry],
+                             return_inverse=True)
+    return (key // mesh.n_cells, key % mesh.n_cells,
+            np.bincount(inverse, np.repeat(weight, counts) * around_weight[entry]))
+
+
+def plane_cut(mesh: PolyMesh, origin: Sequence[float], normal: Sequence[float],
+              chunk_size: int = CUT_CHUNK_SIZE) -> CutSurface:
+    """Cut of the mesh by a plane, with triangle normals along the plane normal."""
+    normal = np.asarray(normal, dtype=np.float64)
+    if not np.linalg.norm(normal):
+        raise ValueError("The plane normal must not be zero")
+    distance = (mesh.points - np.asarray(origin, dtype=np.float64)) @ normal
+    return cut_surface(mesh, distance / np.linalg.norm(normal), 0.0, chunk_size)
+
+
+def isosurface(mesh: PolyMesh, values: np.ndarray, level: float,
+               chunk_size: int = CUT_CHUNK_SIZE, cache: Optional[ArrayCache] = None
+               ) -> CutSurface:
+    """Isosurface of cell values (magnitudes for vectors) interpolated to the points.
+
+    The cell-to-point stencil is taken from ``cache`` (the default
+    ``point_stencil`` cache if None).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim > 1:
+        values = np.linalg.norm(values.reshape(len(values), -1), axis=1)
+    return cut_surface(mesh, cell_to_point(mesh, values, chunk_size, cache), level, chunk_size)
+
+
+class SurfaceExtractor:
+    """Cached cutting planes and isosurfaces of the fields of a case."""
+
+    def __init__(self, case_dir: str, mesh: Optional[PolyMesh] = None,
+                 cache: Optional[ArrayCache] = None,
+                 chunk_size: int = CUT_CHUNK_SIZE) -> None:
+        """Initialize the extractor.
+
+        Args:
+            case_dir: Case directory
+            mesh: The mesh of the case, if already read
+            cache: Surface and point stencil cache; the default ``cut_surfaces``
+                cache if None
+            chunk_size: Number of faces scanned at once
+        """
+        self.case_dir = case_dir
+        self.mesh = mesh or PolyMesh.read(case_dir)
+        self.cache = cache or ArrayCache("cut_surfaces")
+        self.chunk_size = chunk_size
+        self._mesh_hash = self.mesh.content_hash()
+
+    def _path(self, name: str, time: str) -> str:
+        """Path of a field file, compressed or not."""
+        path = field_path(self.case_dir, name, time)
+        if not os.path.exists(path) and os.path.exists(path + ".gz"):
+            return path + ".gz"
+        return path
+
+    def _values(self, name: str, time: str) -> np.ndarray:
+        """Cell values of a field."""
+        return read_field(self._path(name, time), self.mesh.n_cells).values
+
+    def _extract(self, time: str, cut: Tuple, fields: Sequence[str], build) -> CutSurface:
+        """Load a sampled surface from the cache, or build, sample and store it."""
+        stamps = []
+        for name in sorted(set(fields) | set(cut[1:2] if cut[0] == "iso" else ())):
+            stat = os.stat(self._path(name, time))
+            stamps.append((name, stat.st_size, stat.st_mtime_ns))
+        key = ArrayCache.make_key(self._mesh_hash, cut, time, list(fields), stamps)
+        cached = self.cache.load(key)
+        if cached is not None:
+            return CutSurface.from_arrays(cached)
+
+        surface = build()
+        for name in fields:
+            values = self._values(name, time)
+            surface.cell_data[name] = values[surface.cells]
+            surface.point_data[name] = surface.sample(values)
+        self.cache.save(key, surface.arrays())
+        logger.info(f"Extracted {cut[0]} surface with {surface.n_triangles} triangles at "
+                    f"time {time}")
+        return surface
+
+    def plane(self, time: str, origin: Sequence[float], normal: Sequence[float],
+              fields: Sequence[str] = ()) -> CutSurface:
+        """Cutting plane sampling fields at a time.
+
+        Args:
+            time: Time directory
+            origin: A point of the plane
+            normal: Plane normal
+            fields: Fields sampled on the surface
+
+        Returns:
+            The surface with cell and point data of the fields
+        """
+        cut = ("plane", tuple(map(float, origin)), tuple(map(float, normal)))
+        return self._extract(time, cut, fields,
+                             lambda: plane_cut(self.mesh, origin, normal, self.chunk_size))
+
+    def isosurface(self, time: str, field: str, level: float,
+                   fields: Sequence[str] = ()) -> CutSurface:
+        """Isosurface of a field sampling fields at a time.
+
+        Args:
+            time: Time directory
+            field: Field whose (magnitude) level is extracted
+            level: Iso value
+            fields: Fields sampled on the surface
+
+        Returns:
+            The surface with cell and point data of the fields
+        """
+        cut = ("iso", field, float(level))
+        return self._extract(time, cut, fields,
+                             lambda: isosurface(self.mesh, self._values(field, time), level,
+                                                self.chunk_size, self.cache))
@@ -0,0 +1,624 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 00:27:40 2026
+
+@author: adamp
+"""
+
+"""
+Domain decomposition planning for parallel runs.
+
+Cells are partitioned either geometrically (recursive coordinate bisection
+of the cell centres) or on the cell graph with a multilevel scheme in the
+spirit of METIS: the graph is coarsened by heavy-edge matching, the
+coarsest graph is split by recursive graph-growing bisection, and the
+partition is projected back level by level with Fiduccia-Mattheyses k-way
+boundary refinement. A refined coordinate bisection of the cells competes
+with the result, so the graph partition never cuts more faces than the
+geometric one. Every plan reports its load balance and the number of faces
+that become processor boundaries, and the chosen one can be written as a
+``manual`` decomposition for ``decomposePar``.
+"""
+import os
+import heapq
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.openfoam.dictionary import merge_dict_file
+from src.openfoam.foam_io import open_foam_file, write_list, foam_footer
+from src.openfoam.polymesh import PolyMesh
+from src.openfoam.renumber import pseudo_peripheral_cell
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Supported partitioning methods
+DECOMPOSITION_METHODS = ("multilevel", "rcb")
+
+# Allowed relative excess of the heaviest subdomain over the average
+DEFAULT_IMBALANCE = 0.03
+
+# Coarsening stops once the graph has this many vertices per subdomain
+COARSEST_VERTICES_PER_PART = 40
+
+# Coarsening also stops when a level removes less than this fraction of vertices
+MIN_COARSENING = 0.1
+
+# Rounds of mutual heavy-edge proposals per coarsening level
+MATCHING_ROUNDS = 4
+
+# Regions grown per bisection of the coarsest graph
+INITIAL_TRIALS = 4
+
+# Boundary refinement passes per level
+REFINEMENT_PASSES = 8
+
+# Moves without a new best cut before a refinement pass is rolled back
+HILL_CLIMB_MOVES = 100
+
+# Name of the cell-to-processor file in constant/
+CELL_DECOMPOSITION_FILE = "cellDecomposition"
+
+
+def _split_weighted(order: np.ndarray, weights: np.ndarray, fraction: float) -> int:
+    """Number of leading items of ``order`` whose weight is closest to ``fraction`` of the total."""
+    cumulative = np.cumsum(weights[order])
+    target = cumulative[-1] * fraction
+    cut = int(np.searchsorted(cumulative, target))
+    if cut < len(order) and cumulative[cut] - target < target - (cumulative[cut - 1] if cut else 0):
+        cut += 1
+    return cut
+
+
+def recursive_coordinate_bisection(points: np.ndarray, n_parts: int,
+                                   weights: Optional[np.ndarray] = None) -> np.ndarray:
+    """Partition points by recursively halving them across their longest extent.
+
+    Parts that cannot be halved evenly are split in proportion to the number
+    of subdomains on either side, so any ``n_parts`` is balanced.
+
+    Args:
+        points: Point coordinates, shape (n, 3)
+        n_parts: Number of parts
+        weights: Optional point weights; equal weights if None
+
+    Returns:
+        Part index of every point
+    """
+    if n_parts < 1:
+        raise ValueError("Number of parts must be at least 1")
+    points = np.asarray(points, dtype=float)
+    weights = np.ones(len(points)) if weights is None else np.asarray(weights, dtype=float)
+    part = np.zeros(len(points), dtype=np.int64)
+
+    stack = [(np.arange(len(points)), 0, n_parts)]
+    while stack:
+        items, first, parts = stack.pop()
+        if parts == 1 or len(items) == 0:
+            part[items] = first
+            continue
+        left_parts = parts // 2
+        p = points[items]
+        axis = int(np.argmax(p.max(axis=0) - p.min(axis=0)))
+        order = items[np.argsort(p[:, axis], kind="stable")]
+        cut = _split_weighted(order, weights, left_parts / parts)
+        stack.append((order[:cut], first, left_parts))
+        stack.append((order[cut:], first + left_parts, parts - left_parts))
+    return part
+
+
+def _graph_csr(n: int, u: np.ndarray, v: np.ndarray,
+               w: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """CSR adjacency of an undirected graph given by its weighted edge list.
+
+    Returns:
+        Tuple of (offsets, neighbours, edge weights)
+    """
+    rows = np.concatenate([u, v])
+    order = np.argsort(rows, kind="stable")
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=offsets[1:])
+    return offsets, np.concatenate([v, u])[order], np.concatenate([w, w])[order]
+
+
+def _heavy_edge_matching(n: int, u: np.ndarray, v: np.ndarray, w: np.ndarray,
+                         vertex_weights: np.ndarray, max_vertex_weight: float,
+                         rng: np.random.Generator) -> np.ndarray:
+    """Match vertices along heavy edges by mutual proposals.
+
+    Every free vertex proposes to the neighbour across its heaviest free
+    edge (ties broken randomly) and mutual proposals are matched.
+
+    Returns:
+        Matched partner of every vertex (itself if unmatched)
+    """
+    match = np.arange(n)
+    if len(u) == 0:
+        return match
+    match[:] = -1
+    score = w + rng.random(len(w)) * 0.5
+    score[vertex_weights[u] + vertex_weights[v] > max_vertex_weight] = -np.inf
+
+    # Edge ends grouped by vertex, so that best edges are segment maxima
+    ends = np.concatenate([u, v])
+    order = np.argsort(ends, kind="stable")
+    ends, others = ends[order], np.concatenate([v, u])[order]
+    edge = order % len(u)
+    starts = np.flatnonzero(np.diff(ends, prepend=-1))
+    counts = np.diff(np.append(starts, len(ends)))
+
+    for _ in range(MATCHING_ROUNDS):
+        free = np.where((match[u] < 0) & (match[v] < 0), score, -np.inf)[edge]
+        best = np.maximum.reduceat(free, starts)
+        if not np.any(best > -np.inf):
+            break
+        chosen = np.flatnonzero((free == np.repeat(best, counts)) & (free > -np.inf))
+        proposal = np.full(n, -1, dtype=np.int64)
+        proposal[ends[chosen]] = others[chosen]
+        proposers = np.flatnonzero(proposal >= 0)
+        mutual = proposers[proposal[proposal[proposers]] == proposers]
+        match[mutual] = proposal[mutual]
+    unmatched = match < 0
+    match[unmatched] = np.flatnonzero(unmatched)
+    return match
+
+
+def _coarsen(n: int, u: np.ndarray, v: np.ndarray, w: np.ndarray, vertex_weights: np.ndarray,
+             match: np.ndarray) -> Tuple[np.ndarray, int, np.ndarray, np.ndarray, np.ndarray,
+                                         np.ndarray]:
+    """Collapse matched vertex pairs.
+
+    Returns:
+        Tuple of (coarse vertex of every vertex, number of coarse vertices,
+        coarse edges u, v, their summed weights, coarse vertex weights)
+    """
+    _, coarse = np.unique(np.minimum(np.arange(n), match), return_inverse=True)
+    n_coarse = int(coarse.max()) + 1
+    cu, cv = coarse[u], coarse[v]
+    keep = cu != cv
+    low = np.minimum(cu[keep], cv[keep])
+    high = np.maximum(cu[keep], cv[keep])
+    keys, inverse = np.unique(low * n_coarse + high, return_inverse=True)
+    return (coarse, n_coarse, keys // n_coarse, keys % n_coarse,
+            np.bincount(inverse, w[keep], len(keys)),
+            np.bincount(coarse, vertex_weights, n_coarse))
+
+
+def _grow_region(offsets: np.ndarray, adjacency: np.ndarray, edge_weights: np.ndarray,
+                 vertex_weights: np.ndarray, start: int, target: float) -> np.ndarray:
+    """Greedily grow a connected region of about ``target`` weight.
+
+    The frontier vertex whose addition increases the cut the least is added
+    next (greedy graph growing). Disconnected graphs are continued from the
+    first unreached vertex.
+
+    Returns:
+        Mask of the region
+    """
+    offsets = offsets.tolist()
+    adjacency = adjacency.tolist()
+    edge_weights = edge_weights.tolist()
+    weights = vertex_weights.tolist()
+    n = len(weights)
+    in_region = [False] * n
+    gain: Dict[int, float] = {}
+    heap = []
+    region_weight = 0.0
+    next_seed = 0
+
+    def push(vertex: int) -> None:
+        row = range(offsets[vertex], offsets[vertex + 1])
+        gain[vertex] = sum(2 * edge_weights[i] if in_region[adjacency[i]] else -edge_weights[i]
+                           for i in row)
+        heapq.heappush(heap, (-gain[vertex], vertex))
+
+    push(start)
+    while region_weight < target:
+        if not heap:
+            while next_seed < n and in_region[next_seed]:
+                next_seed += 1
+            if next_seed == n:
+                break
+            push(next_seed)
+        negative_gain, vertex = heapq.heappop(heap)
+        if in_region[vertex] or -negative_gain != gain[vertex]:
+            continue
+        if region_weight + weights[vertex] - target > target - region_weight:
+            break
+        in_region[vertex] = True
+        region_weight += weights[vertex]
+        for i in range(offsets[vertex], offsets[vertex + 1]):
+            other = adjacency[i]
+            if in_region[other]:
+                continue
+            if other in gain:
+                gain[other] += 2 * edge_weights[i]
+                heapq.heappush(heap, (-gain[other], other))
+            else:
+                push(other)
+    return np.array(in_region)
+
+
+def _bisect(n: int, u: np.ndarray, v: np.ndarray, w: np.ndarray, vertex_weights: np.ndarray,
+            fraction: float, imbalance: float, rng: np.random.Generator) -> np.ndarray:
+    """Split a graph in two parts holding ``fraction`` and ``1 - fraction`` of its weight.
+
+    Several regions are grown from a pseudo-peripheral vertex and random
+    vertices, each is refined, and the split with the smallest cut is kept.
+
+    Returns:
+        Mask of the vertices of the first part
+    """
+    offsets, adjacency, edge_weights = _graph_csr(n, u, v, w)
+    degree = np.diff(offsets)
+    total = vertex_weights.sum()
+    capacity = (1.0 + imbalance) * total * np.array([fraction, 1.0 - fraction])
+    visited = np.zeros(n, dtype=bool)
+    starts = [pseudo_peripheral_cell(offsets, adjacency, degree, int(np.argmin(degree)), visited)]
+    starts += rng.integers(0, n, INITIAL_TRIALS - 1).tolist()
+
+    best, best_cut = None, np.inf
+    for start in starts:
+        region = _grow_region(offsets, adjacency, edge_weights, vertex_weights, start,
+                              fraction * total)
+        part = _refine((~region).astype(np.int64), 2, u, v, w, vertex_weights, capacity)
+        cut = w[part[u] != part[v]].sum()
+        if cut < best_cut:
+            best, best_cut = part == 0, cut
+    return best
+
+
+def _recursive_bisection(n: int, u: np.ndarray, v: np.ndarray, w: np.ndarray,
+                         vertex_weights: np.ndarray, n_parts: int, imbalance: float,
+                         rng: np.random.Generator) -> np.ndarray:
+    """Initial k-way partition of the coarsest graph by recursive bisection."""
+    part = np.zeros(n, dtype=np.int64)
+    stack = [(np.arange(n), 0, n_parts)]
+    local = np.empty(n, dtype=np.int64)
+    while stack:
+        items, first, parts = stack.pop()
+        if parts == 1 or len(items) < 2:
+            part[items] = first
+            continue
+        inside = np.zeros(n, dtype=bool)
+        inside[items] = True
+        keep = inside[u] & inside[v]
+        local[items] = np.arange(len(items))
+        left_parts = parts // 2
+        left = _bisect(len(items), local[u[keep]], local[v[keep]], w[keep], vertex_weights[items],
+                       left_parts / parts, imbalance, rng)
+        stack.append((items[left], first, left_parts))
+        stack.append((items[~left], first + left_parts, parts - left_parts))
+    return part
+
+
+def _refine(part: np.ndarray, n_parts: int, u: np.ndarray, v: np.ndarray, w: np.ndarray,
+            vertex_weights: np.ndarray, max_part_weight: Union[float, np.ndarray]) -> np.ndarray:
+    """Fiduccia-Mattheyses k-way boundary refinement.
+
+    Overweight parts are first relieved by moving their boundary vertices,
+    best gain first, to the adjacent parts with room. Each pass then moves
+    boundary vertices one at a time in order of gain (the decrease of the
+    cut), every vertex at most once and only into parts with room. Moves
+    that increase the cut are taken too, so the search can climb out of
+    local minima; the pass stops after ``HILL_CLIMB_MOVES`` moves without a
+    new best cut and is rolled back to the best cut it reached. Passes are
+    repeated until one brings no improvement.
+    """
+    n = len(part)
+    capacity = np.broadcast_to(np.asarray(max_part_weight, dtype=float), (n_parts,)).tolist()
+    offsets, adjacency, edge_weights = (array.tolist() for array in _graph_csr(n, u, v, w))
+    weights = vertex_weights.tolist()
+    labels = part.tolist()
+    loads = np.bincount(part, vertex_weights, n_parts).tolist()
+
+    def best_move(vertex: int) -> Optional[Tuple[float, int]]:
+        """Largest gain of moving a vertex into an adjacent part with room, and that part."""
+        connection: Dict[int, float] = {}
+        for i in range(offsets[vertex], offsets[vertex + 1]):
+            other = labels[adjacency[i]]
+            connection[other] = connection.get(other, 0.0) + edge_weights[i]
+        own = connection.pop(labels[vertex], 0.0)
+        best = None
+        for target, weight in connection.items():
+            if loads[target] + weights[vertex] > capacity[target]:
+                continue
+            # Ties go to the lighter part
+            if best is None or (weight - own, -loads[target]) > (best[0], -loads[best[1]]):
+                best = (weight - own, target)
+        return best
+
+    def move(vertex: int, target: int) -> int:
+        """Move a vertex and return its previous part."""
+        source = labels[vertex]
+        labels[vertex] = target
+        loads[source] -= weights[vertex]
+        loads[target] += weights[vertex]
+        return source
+
+    def boundary_heap(vertices) -> List[Tuple[float, int]]:
+        """Heap of the best moves of vertices, largest gain first."""
+        heap = []
+        for vertex in vertices:
+            best = best_move(vertex)
+            if best is not None:
+                heap.append((-best[0], vertex))
+        heapq.heapify(heap)
+        return heap
+
+    def boundary() -> List[int]:
+        """Vertices with a neighbour in another part."""
+        labelled = np.array(labels)
+        cut = labelled[u] != labelled[v]
+        return np.unique(np.concatenate([u[cut], v[cut]])).tolist()
+
+    # Balancing: relieve overweight parts through their boundary
+    overweight = [loads[p] > capacity[p] for p in range(n_parts)]
+    if any(overweight):
+        heap = boundary_heap(vertex for vertex in boundary() if overweight[labels[vertex]])
+        while heap and any(overweight):
+            negative_gain, vertex = heapq.heappop(heap)
+            if not overweight[labels[vertex]]:
+                continue
+            best = best_move(vertex)
+            if best is None:
+                continue
+            if best[0] != -negative_gain:
+                heapq.heappush(heap, (-best[0], vertex))
+                continue
+            source = move(vertex, best[1])
+            overweight[source] = loads[source] > capacity[source]
+            for i in range(offsets[vertex], offsets[vertex + 1]):
+                other = adjacency[i]
+                if overweight[labels[other]]:
+                    best = best_move(other)
+                    if best is not None:
+                        heapq.heappush(heap, (-best[0], other))
+
+    # Refinement passes with hill climbing and rollback to the best cut
+    for _ in range(REFINEMENT_PASSES):
+        heap = boundary_heap(boundary())
+        locked = set()
+        moves: List[Tuple[int, int]] = []
+        change = best_change = 0.0
+        best_length = 0
+        while heap and len(moves) - best_length < HILL_CLIMB_MOVES:
+            negative_gain, vertex = heapq.heappop(heap)
+            if vertex in locked:
+                continue
+            best = best_move(vertex)
+            if best is None:
+                continue
+            if best[0] != -negative_gain:
+                heapq.heappush(heap, (-best[0], vertex))
+                continue
+            moves.append((vertex, move(vertex, best[1])))
+            locked.add(vertex)
+            change -= best[0]
+            if change < best_change:
+                best_change, best_length = change, len(moves)
+            for i in range(offsets[vertex], offsets[vertex + 1]):
+                other = adjacency[i]
+                if other not in locked:
+                    best = best_move(other)
+                    if best is not None:
+                        heapq.heappush(heap, (-best[0], other))
+        for vertex, source in reversed(moves[best_length:]):
+            move(vertex, source)
+        if best_length == 0:
+            break
+    return np.array(labels, dtype=np.int64)
+
+
+def multilevel_partition(mesh: PolyMesh, n_parts: int, imbalance: float = DEFAULT_IMBALANCE,
+                         seed: int = 0) -> np.ndarray:
+    """Partition the cell graph with a multilevel scheme.
+
+    Args:
+        mesh: The mesh
+        n_parts: Number of subdomains
+        imbalance: Allowed relative excess of a subdomain over the average
+        seed: Seed of the random tie-breaking in the matching
+
+    Returns:
+        Subdomain of every cell
+    """
+    if n_parts < 1:
+        raise ValueError("Number of parts must be at least 1")
+    if n_parts == 1 or mesh.n_cells == 0:
+        return np.zeros(mesh.n_cells, dtype=np.int64)
+
+    rng = np.random.default_rng(seed)
+    n = mesh.n_cells
+    u = mesh.owner[:mesh.n_internal_faces].astype(np.int64)
+    v = mesh.neighbour.astype(np.int64)
+    w = np.ones(len(u))
+    vertex_weights = np.ones(n)
+    centres = mesh.cell_centres
+    max_part_weight = (1.0 + imbalance) * n / n_parts
+    max_vertex_weight = 1.5 * n / (n_parts * COARSEST_VERTICES_PER_PART)
+
+    # Coarsening
+    levels = [(n, u, v, w, vertex_weights)]
+    maps = []
+    while n > COARSEST_VERTICES_PER_PART * n_parts:
+        match = _heavy_edge_matching(n, u, v, w, vertex_weights, max_vertex_weight, rng)
+        coarse, n_coarse, cu, cv, cw, cvw = _coarsen(n, u, v, w, vertex_weights, match)
+        if n_coarse > (1.0 - MIN_COARSENING) * n:
+            break
+        maps.append(coarse)
+        centres = np.stack([np.bincount(coarse, vertex_weights * centres[:, k], n_coarse)
+                            for k in range(3)], axis=1) / cvw[:, None]
+        n, u, v, w, vertex_weights = n_coarse, cu, cv, cw, cvw
+        levels.append((n, u, v, w, vertex_weights))
+    logger.info(f"Coarsened {mesh.n_cells} cells to {n} vertices in {len(maps)} levels")
+
+    # Initial partitions of the coarsest graph, by graph growing and by coordinates
+    best_cut = np.inf
+    for initial in (_recursive_bisection(n, u, v, w, vertex_weights, n_parts, imbalance, rng),
+                    recursive_coordinate_bisection(centres, n_parts, vertex_weights)):
+        candidate = _refine(initial, n_parts, u, v, w, vertex_weights, max_part_weight)
+        cut = w[candidate[u] != candidate[v]].sum()
+        if cut < best_cut:
+            part, best_cut = candidate, cut
+
+    # Projection and refinement
+    for (_, u, v, w, vertex_weights), coarse in zip(reversed(levels[:-1]), reversed(maps)):
+        part = _refine(part[coarse], n_parts, u, v, w, vertex_weights, max_part_weight)
+
+    # Straight cuts of structured meshes are hard to recover from coarse
+    # aggregates, so the refined coordinate bisection of the cells competes
+    geometric = _refine(recursive_coordinate_bisection(mesh.cell_centres, n_parts), n_parts,
+                        u, v, w, vertex_weights, max_part_weight)
+    if w[geometric[u] != geometric[v]].sum() < w[part[u] != part[v]].sum():
+        part = geometric
+    return part
+
+
+class DecompositionPlan:
+    """A cell-to-processor assignment and its load-balance statistics."""
+
+    def __init__(self, method: str, cell_processor: np.ndarray, shared_faces: int,
+                 processor_neighbours: np.ndarray) -> None:
+        """Initialize the plan.
+
+        Args:
+            method: Partitioning method that produced the plan
+            cell_processor: Processor of every cell
+            shared_faces: Number of internal faces between different processors
+            processor_neighbours: Number of neighbouring processors of every processor
+        """
+        self.method = method
+        self.cell_processor = cell_processor
+        self.shared_faces = shared_faces
+        self.processor_neighbours = processor_neighbours
+
+    @property
+    def n_subdomains(self) -> int:
+        """Number of processors."""
+        return len(self.processor_neighbours)
+
+    @property
+    def cells_per_processor(self) -> np.ndarray:
+        """Number of cells on every processor."""
+        return np.bincount(self.cell_processor, minlength=self.n_subdomains)
+
+    @property
+    def imbalance(self) -> float:
+        """Relative excess of the largest subdomain over the average."""
+        cells = self.cells_per_processor
+        return float(cells.max() / cells.mean() - 1.0) if len(cells) and cells.mean() else 0.0
+
+    def summary(self) -> Dict[str, object]:
+        """Return the plan statistics as a dictionary."""
+        cells = self.cells_per_processor
+        return {
+            "method": self.method,
+            "subdomains": self.n_subdomains,
+            "min_cells": int(cells.min()),
+            "max_cells": int(cells.max()),
+            "imbalance": self.imbalance,
+            "shared_faces": self.shared_faces,
+            "max_neighbours": int(self.processor_neighbours.max()),
+        }
+
+
+def evaluate_decomposition(mesh: PolyMesh, cell_processor: np.ndarray, n_subdomains: int,
+                           method: str = "manual") -> DecompositionPlan:
+    """Compute the statistics of a cell-to-processor assignment.
+
+    Args:
+        mesh: The mesh
+        cell_processor: Processor of every cell
+        n_subdomains: Number of processors
+        method: Name of the method recorded in the plan
+
+    Returns:
+        The plan
+    """
+    cell_processor = np.asarray(cell_processor, dtype=np.int64)
+    owner = cell_processor[mesh.owner[:mesh.n_internal_faces]]
+    neighbour = cell_processor[mesh.neighbour]
+    shared = owner != neighbour
+    pairs = np.unique(np.minimum(owner[shared], neighbour[shared]) * n_subdomains
+                      + np.maximum(owner[shared], neighbour[shared]))
+    processor_neighbours = np.bincount(np.concatenate([pairs // n_subdomains,
+                                                       pairs % n_subdomains]),
+                                       minlength=n_subdomains)
+    return DecompositionPlan(method, cell_processor, int(np.count_nonzero(shared)),
+                             processor_neighbours)
+
+
+def decompose_mesh(mesh: PolyMesh, n_subdomains: int, method: str = "multilevel",
+                   imbalance: float = DEFAULT_IMBALANCE) -> DecompositionPlan:
+    """Partition a mesh and evaluate the result.
+
+    Args:
+        mesh: The mesh
+        n_subdomains: Number of processors
+        method: ``multilevel`` (graph) or ``rcb`` (coordinate bisection)
+        imbalance: Allowed imbalance of the multilevel partitioner
+
+    Returns:
+        The decomposition plan
+    """
+    if method == "multilevel":
+        cell_processor = multilevel_partition(mesh, n_subdomains, imbalance)
+    elif method == "rcb":
+        cell_processor = recursive_coordinate_bisection(mesh.cell_centres, n_subdomains)
+    else:
+        raise ValueError(f"Unknown decomposition method: {method}")
+    plan = evaluate_decomposition(mesh, cell_processor, n_subdomains, method)
+    logger.info(f"Decomposed {mesh.n_cells} cells into {n_subdomains} subdomains ({method}): "
+                f"imbalance {plan.imbalance:.1%}, {plan.shared_faces} shared faces")
+    return plan
+
+
+def plan_decompositions(mesh: PolyMesh, subdomain_counts: Sequence[int],
+                        method: str = "multilevel",
+                        imbalance: float = DEFAULT_IMBALANCE) -> List[DecompositionPlan]:
+    """Partition a mesh for several processor counts.
+
+    Args:
+        mesh: The mesh
+        subdomain_counts: Processor counts to plan for
+        method: Partitioning method, see ``decompose_mesh``
+        imbalance: Allowed imbalance of the multilevel partitioner
+
+    Returns:
+        One plan per processor count
+    """
+    return [decompose_mesh(mesh, count, method, imbalance) for count in subdomain_counts]
+
+
+def write_manual_decomposition(case_dir: str, plan: DecompositionPlan, binary: bool = True,
+                               data_file: str = CELL_DECOMPOSITION_FILE) -> str:
+    """Write a plan as a ``manual`` decomposition of a case.
+
+    The cell-to-processor list goes to ``constant/<data_file>``, and
+    ``numberOfSubdomains``, ``method`` and ``manualCoeffs/dataFile`` are set
+    in ``system/decomposeParDict``, keeping its other entries.
+
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+        plan: The decomposition plan
+        binary: Whether to write the cell list in binary
+        data_file: Name of the cell-to-processor file
+
+    Returns:
+        Path of the written cell-to-processor file
+    """
+    file_path = os.path.join(case_dir, "constant", data_file)
+    with open_foam_file(file_path, "labelList", data_file, "constant", binary) as f:
+        write_list(f, plan.cell_processor, binary)
+        f.write(foam_footer().encode())
+
+    merge_dict_file(os.path.join(case_dir, "system", "decomposeParDict"), {
+        "numberOfSubdomains": str(plan.n_subdomains),
+        "method": "manual",
+        "manualCoeffs/dataFile": f'"{data_file}"',
+    })
+
+    logger.info(f"Wrote manual decomposition into {plan.n_subdomains} subdomains to {file_path}")
+    return file_path
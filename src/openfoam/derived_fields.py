@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 14:31:10 2026
+
+@author: adamp
+"""
+
+"""
+Gradient-based derived fields (``grad(U)``, vorticity, Q-criterion, wall
+shear stress, y+) computed without running ``postProcess -func``.
+
+The Gauss gradient with linear face interpolation is linear in the cell
+values and the boundary face values, so it is assembled once per mesh as a
+CSR matrix from cells to (cells + boundary faces) with a face-area vector
+coefficient per entry. Gradients of any field at any time are then a gather
+and a segmented sum over the rows. The operator is cached on the mesh
+content hash.
+"""
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from src.openfoam.fields import (VolField, read_field, write_field, field_path, default_boundary,
+                                 parse_boundary)
+from src.openfoam.map_fields import patch_entries
+from src.openfoam.polymesh import PolyMesh
+from src.utils.cache import ArrayCache
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Quantities computed by ``derived_fields``
+DERIVED_QUANTITIES = ("grad(U)", "vorticity", "Q", "wallShearStress", "yPlus")
+
+# Dimension sets of the derived quantities of a velocity field
+DERIVED_DIMENSIONS = {"grad(U)": "[0 0 -1 0 0 0 0]", "vorticity": "[0 0 -1 0 0 0 0]",
+                      "Q": "[0 0 -2 0 0 0 0]", "wallShearStress": "[0 2 -2 0 0 0 0]",
+                      "yPlus": "[0 0 0 0 0 0 0]"}
+
+# Boundary conditions whose face value is zero without a value entry
+ZERO_VALUE_TYPES = ("noSlip",)
+
+# Number of cells whose gradients are summed at once
+GRADIENT_CHUNK_SIZE = 1 << 18
+
+# Files holding the kinematic viscosity, by solver generation
+VISCOSITY_FILES = ("transportProperties", "physicalProperties")
+
+# Turbulent viscosity field added to the laminar viscosity at the walls
+TURBULENT_VISCOSITY = "nut"
+
+_NU_RE = re.compile(r"^\s*nu\s+(?:\[[^\]]*\]\s*)?([-+.\deE]+)\s*;", re.MULTILINE)
+
+
+class GaussGradient:
+    """Gauss gradient operator of a mesh as a CSR matrix."""
+
+    def __init__(self, mesh: PolyMesh, cache: Optional[ArrayCache] = None) -> None:
+        """Assemble (or load) the operator of a mesh.
+
+        Args:
+            mesh: The mesh
+            cache: Operator cache; the default ``gauss_gradient`` cache if None
+        """
+        self.mesh = mesh
+        self.n_cells = mesh.n_cells
+        self.n_boundary_faces = mesh.n_faces - mesh.n_internal_faces
+        cache = cache or ArrayCache("gauss_gradient")
+        key = ArrayCache.make_key(mesh.content_hash())
+        cached = cache.load(key)
+        if cached is not None:
+            self.offsets = cached["offsets"]
+            self.columns = cached["columns"]
+            self.coefficients = cached["coefficients"]
+            return
+        self._assemble()
+        cache.save(key, {"offsets": self.offsets, "columns": self.columns,
+                         "coefficients": self.coefficients})
+
+    def _assemble(self) -> None:
+        """Build the CSR arrays from the owner/neighbour/area arrays."""
+        mesh = self.mesh
+        n_internal = mesh.n_internal_faces
+        owner, neighbour = mesh.owner, mesh.neighbour
+        areas, centres = mesh.face_areas, mesh.face_centres
+
+        # Linear interpolation weights of the owner values at internal faces
+        internal_owner = owner[:n_internal]
+        to_owner = np.abs(np.einsum("ij,ij->i", areas[:n_internal],
+                                    centres[:n_internal] - mesh.cell_centres[internal_owner]))
+        to_neighbour = np.abs(np.einsum("ij,ij->i", areas[:n_internal],
+                                        mesh.cell_centres[neighbour] - centres[:n_internal]))
+        weights = (to_neighbour / (to_owner + to_neighbour))[:, None]
+        owner_part = areas[:n_internal] * weights
+        neighbour_part = areas[:n_internal] - owner_part
+
+        boundary_faces = np.arange(self.n_boundary_faces)
+        rows = np.concatenate([internal_owner, internal_owner, neighbour, neighbour,
+                               owner[n_internal:]])
+        columns = np.concatenate([internal_owner, neighbour, internal_owner, neighbour,
+                                  self.n_cells + boundary_faces])
+        coefficients = np.concatenate([owner_part, neighbour_part, -owner_part,
+                                       -neighbour_part, areas[n_internal:]])
+        coefficients /= mesh.cell_volumes[rows, None]
+
+        # Sum duplicate entries; the sorted keys give the CSR order
+        width = self.n_cells + self.n_boundary_faces
+        keys, inverse = np.unique(rows.astype(np.int64) * width + columns, return_inverse=True)
+        self.coefficients = np.stack([np.bincount(inverse, coefficients[:, k],
+                                                  minlength=len(keys)) for k in range(3)], axis=1)
+        self.columns = (keys % width).astype(np.int64)
+        counts = np.bincount(keys // width, minlength=self.n_cells)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        logger.info(f"Assembled Gauss gradient operator with {len(keys)} entries "
+                    f"for {self.n_cells} cells")
+
+    def boundary_values(self, values: np.ndarray) -> np.ndarray:
+        """Boundary face values extrapolated from the owner cells (zero gradient)."""
+        return np.asarray(values)[self.mesh.owner[self.mesh.n_internal_faces:]]
+
+    def __call__(self, values: np.ndarray,
+                 boundary_values: Optional[np.ndarray] = None) -> np.ndarray:
+        """Gradient of cell values.
+
+        Args:
+            values: Cell values, (nCells,) or (nCells, nComponents)
+            boundary_values: Boundary face values in face order; zero
+                gradient extrapolation if None
+
+        Returns:
+            Gradient of shape (nCells, 3), or (nCells, 3, nComponents) with
+            ``gradient[:, i, j]`` the derivative of component j along i
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) != self.n_cells:
+            raise ValueError(f"Gradient of {len(values)} values on {self.n_cells} cells")
+        if boundary_values is None:
+            boundary_values = self.boundary_values(values)
+        extended = np.concatenate([values, np.asarray(boundary_values, dtype=np.float64)])
+        result = np.empty((self.n_cells, 3) + values.shape[1:])
+        for start in range(0, self.n_cells, GRADIENT_CHUNK_SIZE):
+            stop = min(start + GRADIENT_CHUNK_SIZE, self.n_cells)
+            entries = slice(self.offsets[start], self.offsets[stop])
+            gathered = extended[self.columns[entries]]
+            coefficients = self.coefficients[entries]
+            if values.ndim == 1:
+                products = coefficients * gathered[:, None]
+            else:
+                products = coefficients[:, :, None] * gathered[:, None, :]
+            result[start:stop] = np.add.reduceat(products, self.offsets[start:stop]
+                                                 - self.offsets[start], axis=0)
+        return result
+
+
+def boundary_face_values(mesh: PolyMesh, field: VolField) -> np.ndarray:
+    """Boundary face values of a field, in face order.
+
+    Patches with a ``value`` entry (fixedValue, calculated, inletOutlet...)
+    take it, ``noSlip`` patches are zero, and the others extrapolate the
+    owner cell values.
+    """
+    values = field.values[mesh.owner[mesh.n_internal_faces:]].copy()
+    boundary = parse_boundary(field)
+    for patch in mesh.patches:
+        entries = patch_entries(boundary, patch.name)
+        if entries is None or patch.n_faces == 0:
+            continue
+        faces = slice(patch.start_face - mesh.n_internal_faces,
+                      patch.start_face - mesh.n_internal_faces + patch.n_faces)
+        if entries.get("type") in ZERO_VALUE_TYPES:
+            values[faces] = 0
+            continue
+        value = entries.get("value")
+        if isinstance(value, np.ndarray):
+            values[faces] = value
+        elif isinstance(value, str) and value.startswith("uniform"):
+            parsed = np.array(value[len("uniform"):].replace("(", " ").replace(")", " ").split(),
+                              dtype=np.float64)
+            values[faces] = parsed if values.ndim > 1 else parsed[0]
+    return values
+
+
+def vorticity(gradient: np.ndarray) -> np.ndarray:
+    """Curl of a velocity field from its gradient."""
+    return np.stack([gradient[:, 1, 2] - gradient[:, 2, 1],
+                     gradient[:, 2, 0] - gradient[:, 0, 2],
+                     gradient[:, 0, 1] - gradient[:, 1, 0]], axis=1)
+
+
+def q_criterion(gradient: np.ndarray) -> np.ndarray:
+    """Q-criterion, half the difference of the squared rotation and strain norms."""
+    transpose = gradient.transpose(0, 2, 1)
+    rotation = 0.5 * (gradient - transpose)
+    strain = 0.5 * (gradient + transpose)
+    return 0.5 * (np.square(rotation).sum(axis=(1, 2)) - np.square(strain).sum(axis=(1, 2)))
+
+
+def _wall_patches(mesh: PolyMesh, patches: Optional[Sequence[str]]) -> List:
+    """Patches of the wall quantities; the wall patches if None."""
+    if patches is None:
+        return [patch for patch in mesh.patches if patch.type == "wall" and patch.n_faces]
+    return [mesh.patch(name) for name in patches]
+
+
+def wall_shear_stress(mesh: PolyMesh, velocity: np.ndarray, viscosity: Union[float, np.ndarray],
+                      patches: Optional[Sequence[str]] = None,
+                      boundary_values: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """Kinematic wall shear stress on wall faces, as ``wallShearStress`` reports it.
+
+    The tangential velocity gradient is taken between the wall face and the
+    centre of its cell, and the result is the stress the wall exerts on the
+    fluid.
+
+    Args:
+        mesh: The mesh
+        velocity: Cell velocities, (nCells, 3)
+        viscosity: Effective kinematic viscosity, per face of all patches or constant
+        patches: Patch names; the wall patches if None
+        boundary_values: Boundary face velocities; zero (no slip) if None
+
+    Returns:
+        Face stresses of each patch, (nFaces, 3)
+    """
+    stresses = {}
+    for patch in _wall_patches(mesh, patches):
+        faces = patch.face_slice
+        cells = mesh.owner[faces]
+        normals = mesh.face_areas[faces] / np.linalg.norm(mesh.face_areas[faces], axis=1,
+                                                          keepdims=True)
+        distance = np.einsum("ij,ij->i", normals, mesh.face_centres[faces]
+                             - mesh.cell_centres[cells])
+        difference = velocity[cells].copy()
+        if boundary_values is not None:
+            difference -= boundary_values[faces.start - mesh.n_internal_faces:
+                                          faces.stop - mesh.n_internal_faces]
+        tangential = difference - np.einsum("ij,ij->i", difference, normals)[:, None] * normals
+        nu = viscosity if np.isscalar(viscosity) else np.asarray(viscosity)[
+            faces.start - mesh.n_internal_faces:faces.stop - mesh.n_internal_faces, None]
+        stresses[patch.name] = -nu * tangential / distance[:, None]
+    return stresses
+
+
+def y_plus(mesh: PolyMesh, velocity: np.ndarray, viscosity: Union[float, np.ndarray],
+           patches: Optional[Sequence[str]] = None,
+           boundary_values: Optional[np.ndarray] = None,
+           effective: Optional[Union[float, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+    """Dimensionless wall distance of the wall cell centres, per patch face.
+
+    Args:
+        mesh: The mesh
+        velocity: Cell velocities, (nCells, 3)
+        viscosity: Laminar kinematic viscosity of the wall units
+        patches: Patch names; the wall patches if None
+        boundary_values: Boundary face velocities; zero (no slip) if None
+        effective: Effective viscosity of the wall shear stress, per face
+            of all patches or constant; ``viscosity`` if None
+
+    Returns:
+        Face values of each patch
+    """
+    result = {}
+    stresses = wall_shear_stress(mesh, velocity, viscosity if effective is None else effective,
+                                 patches, boundary_values)
+    for patch in _wall_patches(mesh, patches):
+        faces = patch.face_slice
+        normals = mesh.face_areas[faces] / np.linalg.norm(mesh.face_areas[faces], axis=1,
+                                                          keepdims=True)
+        distance = np.einsum("ij,ij->i", normals, mesh.face_centres[faces]
+                             - mesh.cell_centres[mesh.owner[faces]])
+        nu = viscosity if np.isscalar(viscosity) else np.asarray(viscosity)[
+            faces.start - mesh.n_internal_faces:faces.stop - mesh.n_internal_faces]
+        friction_velocity = np.sqrt(np.linalg.norm(stresses[patch.name], axis=1))
+        result[patch.name] = distance * friction_velocity / nu
+    return result
+
+
+def read_viscosity(case_dir: str) -> float:
+    """Read the kinematic viscosity ``nu`` of a case.
+
+    Raises:
+        FileNotFoundError: If no properties file defines ``nu``
+    """
+    for name in VISCOSITY_FILES:
+        path = os.path.join(case_dir, "constant", name)
+        if os.path.exists(path):
+            with open(path, errors="replace") as f:
+                match = _NU_RE.search(f.read())
+            if match:
+                return float(match.group(1))
+    raise FileNotFoundError(f"No kinematic viscosity nu in the constant directory of {case_dir}")
+
+
+def effective_viscosity(case_dir: str, time: str, mesh: PolyMesh,
+                        viscosity: Optional[float] = None) -> Union[float, np.ndarray]:
+    """Effective kinematic viscosity ``nu + nut`` of the boundary faces.
+
+    The wall values of ``nut`` carry the wall-function viscosity of
+    turbulent cases; laminar cases without ``nut`` get the constant ``nu``.
+
+    Args:
+        case_dir: Case directory
+        time: Time directory
+        mesh: The mesh of the case
+        viscosity: Laminar kinematic viscosity; read from the case if None
+
+    Returns:
+        ``nu``, or ``nu + nut`` per boundary face in face order
+    """
+    nu = viscosity if viscosity is not None else read_viscosity(case_dir)
+    path = field_path(case_dir, TURBULENT_VISCOSITY, time)
+    if not (os.path.exists(path) or os.path.exists(path + ".gz")):
+        return nu
+    return nu + boundary_face_values(mesh, read_field(path, mesh.n_cells))
+
+
+def derived_fields(case_dir: str, time: str, quantities: Sequence[str] = DERIVED_QUANTITIES,
+                   velocity: str = "U", viscosity: Optional[float] = None,
+                   mesh: Optional[PolyMesh] = None, cache: Optional[ArrayCache] = None,
+                   binary: Optional[bool] = None) -> List[str]:
+    """Compute gradient-based fields of a time directory and write them.
+
+    Wall quantities are written on the wall patches of otherwise zero fields,
+    like the corresponding function objects. The wall shear stress uses the
+    effective viscosity ``nu + nut`` when the time holds a ``nut`` field,
+    and y+ is scaled by the laminar ``nu``.
+
+    Args:
+        case_dir: Case directory
+        time: Time directory
+        quantities: Subset of ``DERIVED_QUANTITIES``
+        velocity: Name of the velocity field
+        viscosity: Laminar kinematic viscosity; read from the case if None
+        mesh: The mesh of the case, if already read
+        cache: Gradient operator cache
+        binary: Whether to write binary; the format of the velocity field if None
+
+    Returns:
+        Paths of the written fields
+    """
+    unknown = set(quantities) - set(DERIVED_QUANTITIES)
+    if unknown:
+        raise ValueError(f"Unsupported derived quantities: {', '.join(sorted(unknown))}")
+    mesh = mesh or PolyMesh.read(case_dir)
+    field = read_field(field_path(case_dir, velocity, time), mesh.n_cells)
+    binary = field.binary if binary is None else binary
+    boundary_values = boundary_face_values(mesh, field)
+    gradient = GaussGradient(mesh, cache)(field.values, boundary_values)
+
+    outputs = []
+    cell_values = {"grad(U)": lambda: gradient.reshape(-1, 9),
+                   "vorticity": lambda: vorticity(gradient),
+                   "Q": lambda: q_criterion(gradient)}
+    for name in quantities:
+        if name in cell_values:
+            outputs.append(VolField(name if name != "grad(U)" else f"grad({velocity})",
+                                    cell_values[name](), DERIVED_DIMENSIONS[name],
+                                    default_boundary(mesh.patches), binary))
+
+    wall_quantities = [name for name in quantities if name not in cell_values]
+    if wall_quantities:
+        nu = viscosity if viscosity is not None else read_viscosity(case_dir)
+        nu_effective = effective_viscosity(case_dir, time, mesh, nu)
+        for name in wall_quantities:
+            if name == "wallShearStress":
+                values = wall_shear_stress(mesh, field.values, nu_effective,
+                                           boundary_values=boundary_values)
+            else:
+                values = y_plus(mesh, field.values, nu, boundary_values=boundary_values,
+                                effective=nu_effective)
+            boundary = default_boundary(mesh.patches)
+            for patch_name, patch_values in values.items():
+                boundary[patch_name] = {"type": "calculated", "value": patch_values}
+            internal = np.zeros((mesh.n_cells, 3)) if name == "wallShearStress" else \
+                np.zeros(mesh.n_cells)
+            outputs.append(VolField(name, internal, DERIVED_DIMENSIONS[name], boundary, binary))
+    paths = [write_field(case_dir, output, time, binary) for output in outputs]
+    logger.info(f"Wrote {len(paths)} derived fields of {velocity} at time {time}")
+    return paths
@@ -10,12 +10,18 @@ Parser and writer for OpenFOAM dictionary files.
 """
 import re
 import os
-from typing import Dict, List, Union, Optional, Any, TextIO
+from typing import Dict, Iterator, List, Union, Optional, Any, Sequence, TextIO, Tuple
 
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Keyword of a dictionary entry
+_KEYWORD_RE = re.compile(r'[^\s;{}()"/]+')
+
+# End of the FoamFile header banner
+_HEADER_END_RE = re.compile(r"// \* \* \* [* ]*//")
+
 class DictParseError(Exception):
     """Exception raised for errors during dictionary parsing."""
     pass
@@ -219,3 +225,188 @@ FoamFile
         
         return "\n".join(result)
 
+
+def _skip_blank(content: str, i: int, end: int) -> int:
+    """Return the position of the next character that is not blank or a comment."""
+    while i < end:
+        if content[i].isspace():
+            i += 1
+        elif content.startswith("//", i):
+            newline = content.find("\n", i)
+            i = end if newline < 0 else newline + 1
+        elif content.startswith("/*", i):
+            close = content.find("*/", i + 2)
+            i = end if close < 0 else close + 2
+        else:
+            break
+    return min(i, end)
+
+
+def _statement_end(content: str, i: int, end: int) -> int:
+    """Return the position after the statement whose value starts at ``i``.
+
+    A statement ends at the first ``;`` outside brackets or, for a
+    sub-dictionary, after its closing brace.
+    """
+    block = i < end and content[i] == "{"
+    depth = 0
+    while i < end:
+        char = content[i]
+        if char == '"':
+            close = content.find('"', i + 1)
+            i = end if close < 0 else close + 1
+            continue
+        if content.startswith("//", i) or content.startswith("/*", i):
+            i = _skip_blank(content, i, end)
+            continue
+        if char in "({[":
+            depth += 1
+        elif char in ")}]":
+            depth -= 1
+            if block and depth == 0:
+                return i + 1
+        elif char == ";" and depth == 0:
+            return i + 1
+        i += 1
+    raise DictParseError("Unterminated dictionary entry")
+
+
+def _entries(content: str, start: int, end: int) -> Iterator[Tuple[str, int, int, int]]:
+    """Iterate over the top-level entries of the dictionary text between ``start`` and ``end``.
+
+    Yields:
+        Tuples of (keyword, entry start, value start, entry end)
+    """
+    i = _skip_blank(content, start, end)
+    while i < end:
+        if content[i] == "#":
+            # Directives such as #include take the rest of the line
+            newline = content.find("\n", i)
+            i = _skip_blank(content, end if newline < 0 else newline, end)
+            continue
+        if content[i] == '"':
+            word_end = content.find('"', i + 1) + 1
+        else:
+            match = _KEYWORD_RE.match(content, i)
+            if match is None:
+                raise DictParseError(f"Unexpected character {content[i]!r} in dictionary")
+            word_end = match.end()
+        value_start = _skip_blank(content, word_end, end)
+        entry_end = _statement_end(content, value_start, end)
+        yield content[i:word_end], i, value_start, entry_end
+        i = _skip_blank(content, entry_end, end)
+
+
+def set_dict_entry(content: str, keys: Sequence[str], value: str) -> str:
+    """Set an entry in the text of a dictionary, leaving the rest untouched.
+
+    Unlike a round trip through :class:`OpenFOAMDict`, lists, comments and
+    directives of the file are preserved. Missing sub-dictionaries along
+    ``keys`` are created.
+
+    Args:
+        content: Dictionary file content, without or with the FoamFile header
+        keys: Path of the entry, e.g. ``["castellatedMeshControls", "features"]``
+        value: Entry value text, without the trailing ``;``
+
+    Returns:
+        The updated content
+
+    Raises:
+        DictParseError: If the content cannot be scanned or a parent entry
+            along ``keys`` is not a sub-dictionary
+    """
+    start, end = 0, len(content)
+    for depth, key in enumerate(keys):
+        insert = start
+        for keyword, _, value_start, entry_end in _entries(content, start, end):
+            if keyword == key:
+                break
+            insert = entry_end
+        else:
+            # Append the entry and its missing parents after the last entry
+            separator = "" if value.startswith("\n") else " "
+            text = f"{keys[-1]}{separator}{value};"
+            for parent in reversed(keys[depth:-1]):
+                text = f"{parent}\n{{\n    {_indent(text, 1)}\n}}"
+            text = "\n" + "    " * depth + _indent(text, depth)
+            if "\n" not in content[insert:end]:
+                # Keep the closing brace of an inline block on its own line
+                text += "\n" + "    " * (depth - 1)
+            return content[:insert] + text + content[insert:]
+        if depth == len(keys) - 1:
+            return content[:value_start] + _indent(value.lstrip(), depth) + ";" + \
+                content[entry_end:]
+        if content[value_start] != "{":
+            raise DictParseError(f"Entry {key} is not a sub-dictionary")
+        start, end = value_start + 1, entry_end - 1
+    return content
+
+
+def _indent(text: str, depth: int) -> str:
+    """Indent all but the first line of an entry text by ``depth`` levels."""
+    lines = text.split("\n")
+    return "\n".join(lines[:1] + ["    " * depth + line if line else line for line in lines[1:]])
+
+
+def _find_entry(content: str, keys: Sequence[str]) -> Optional[Tuple[int, int]]:
+    """Return the value start and entry end of an entry of the dictionary text."""
+    start, end = 0, len(content)
+    for depth, key in enumerate(keys):
+        for keyword, _, value_start, entry_end in _entries(content, start, end):
+            if keyword == key:
+                break
+        else:
+            return None
+        if depth == len(keys) - 1:
+            return value_start, entry_end
+        if content[value_start] != "{":
+            return None
+        start, end = value_start + 1, entry_end - 1
+    return None
+
+
+def get_dict_entry(content: str, keys: Sequence[str]) -> Optional[str]:
+    """Return the value text of an entry in the text of a dictionary.
+
+    Args:
+        content: Dictionary file content
+        keys: Path of the entry, e.g. ``["castellatedMeshControls", "features"]``
+
+    Returns:
+        Value text without the trailing ``;``, or None if the entry is absent
+    """
+    found = _find_entry(content, keys)
+    if found is None:
+        return None
+    value_start, entry_end = found
+    value = content[value_start:entry_end]
+    return value[:-1] if value.endswith(";") else value
+
+
+def merge_dict_file(file_path: str, entries: Dict[str, str],
+                    object_name: Optional[str] = None) -> None:
+    """Set entries in a dictionary file, creating the file if necessary.
+
+    Args:
+        file_path: Path to the OpenFOAM dictionary file
+        entries: Values by entry path, sub-dictionaries separated by ``/``
+        object_name: Header object name of a new file, defaults to the file name
+    """
+    if os.path.exists(file_path):
+        with open(file_path, "r") as f:
+            content = f.read()
+    else:
+        header = OpenFOAMDict()
+        header.set_header_object(object_name or os.path.basename(file_path))
+        content = header._header + "\n// " + "*" * 73 + " //\n"
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+
+    # Entries go after the FoamFile header
+    body = _HEADER_END_RE.search(content)
+    offset = body.end() if body else 0
+    for path, value in entries.items():
+        content = content[:offset] + set_dict_entry(content[offset:], path.split("/"), value)
+    with open(file_path, "w") as f:
+        f.write(content)
+    logger.info(f"Set {', '.join(entries)} in {file_path}")
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:40:19 2026
+
+@author: adamp
+"""
+
+"""
+Surface feature edge extraction (surfaceFeatureExtract replacement).
+
+Feature edges are found on the merged STL arrays: every triangle side is
+reduced to a sorted edge key, the two triangles of each manifold edge are
+paired with one stable sort, and edges are marked by the angle between the
+triangle normals. Open and non-manifold edges are added on request. Results
+are cached against the STL content hash and written as ``.eMesh`` files.
+"""
+import os
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.openfoam.dictionary import get_dict_entry, merge_dict_file
+from src.openfoam.foam_io import LABEL_DTYPE, open_foam_file, write_list, foam_footer
+from src.openfoam.stl import TriSurface
+from src.utils.cache import ArrayCache
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Edge type codes stored in FeatureEdges.edge_types
+FEATURE_EDGE = 0
+OPEN_EDGE = 1
+NON_MANIFOLD_EDGE = 2
+REGION_EDGE = 3
+
+# Entries of the snappyHexMeshDict features list and their file and level keywords
+_FEATURE_ENTRY_RE = re.compile(r"\{([^{}]*)\}")
+_FEATURE_FILE_RE = re.compile(r'(?<![\w.])file\s+"([^"]+)"\s*;')
+_FEATURE_LEVEL_RE = re.compile(r"(?<![\w.])level\s+(\d+)\s*;")
+
+
+class FeatureEdges:
+    """Set of feature edges extracted from a surface."""
+
+    def __init__(self, points: np.ndarray, edges: np.ndarray, edge_types: np.ndarray) -> None:
+        """Initialize the feature edge set.
+
+        Args:
+            points: Coordinates of the points used by the edges
+            edges: Point labels of every edge, shape (nEdges, 2)
+            edge_types: Type code of every edge (``FEATURE_EDGE``...)
+        """
+        self.points = np.asarray(points, dtype=np.float64)
+        self.edges = np.asarray(edges, dtype=LABEL_DTYPE).reshape(-1, 2)
+        self.edge_types = np.asarray(edge_types, dtype=np.uint8)
+
+    @property
+    def n_edges(self) -> int:
+        """Number of feature edges."""
+        return len(self.edges)
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of edges of each type."""
+        counts = np.bincount(self.edge_types, minlength=4)
+        return {
+            "feature": int(counts[FEATURE_EDGE]),
+            "open": int(counts[OPEN_EDGE]),
+            "non_manifold": int(counts[NON_MANIFOLD_EDGE]),
+            "region": int(counts[REGION_EDGE]),
+        }
+
+    def total_length(self) -> float:
+        """Return the summed length of all edges."""
+        vectors = self.points[self.edges[:, 1]] - self.points[self.edges[:, 0]]
+        return float(np.linalg.norm(vectors, axis=1).sum())
+
+    def write_emesh(self, file_path: str) -> None:
+        """Write the edges as an OpenFOAM ``featureEdgeMesh`` (.eMesh) file.
+
+        Args:
+            file_path: Destination path, usually in ``constant/triSurface``
+        """
+        object_name = os.path.basename(file_path)
+        with open_foam_file(file_path, "featureEdgeMesh", object_name,
+                            "constant/triSurface") as f:
+            f.write(b"// points:\n\n")
+            write_list(f, self.points)
+            f.write(b"\n\n// edges:\n\n")
+            write_list(f, self.edges)
+            f.write(foam_footer().encode())
+        logger.info(f"Wrote {self.n_edges} feature edges to {file_path}")
+
+
+def _edge_faces(side_edge: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Return the first two triangles of every edge (-1 where missing)."""
+    order = np.argsort(side_edge.ravel(), kind="stable")
+    start = np.zeros(len(counts), dtype=np.int64)
+    np.cumsum(counts[:-1], out=start[1:])
+    faces = np.full((len(counts), 2), -1, dtype=np.int64)
+    faces[:, 0] = order[start] // 3
+    shared = counts >= 2
+    faces[shared, 1] = order[start[shared] + 1] // 3
+    return faces
+
+
+def extract_feature_edges(surface: TriSurface, included_angle: float = 150.0,
+                          open_edges: bool = True, non_manifold_edges: bool = True,
+                          region_edges: bool = False,
+                          cache: Optional[ArrayCache] = None) -> FeatureEdges:
+    """Extract feature edges from a surface.
+
+    Uses the ``surfaceFeatureExtract`` convention: an edge is a feature if
+    the angle between its two surface normals exceeds
+    ``180 - included_angle`` degrees (0 selects no edges, 180 all).
+
+    Args:
+        surface: Merged triangle surface
+        included_angle: Included angle threshold in degrees
+        open_edges: Include edges with a single triangle
+        non_manifold_edges: Include edges shared by more than two triangles
+        region_edges: Include edges between different STL solids
+        cache: Cache for the result; the default feature cache if None.
+            Caching is skipped for surfaces without a source hash.
+
+    Returns:
+        The extracted feature edges
+    """
+    key = None
+    if surface.source_hash:
+        cache = cache or ArrayCache("features")
+        key = ArrayCache.make_key(surface.source_hash, float(included_angle),
+                                  open_edges, non_manifold_edges, region_edges)
+        cached = cache.load(key)
+        if cached is not None:
+            logger.debug(f"Feature edges loaded from cache for {surface.source_hash}")
+            return FeatureEdges(cached["points"], cached["edges"], cached["edge_types"])
+
+    edges, side_edge, counts = surface.edges()
+    faces = _edge_faces(side_edge, counts)
+    edge_types = np.full(len(edges), 255, dtype=np.uint8)
+
+    # Angle between the normals of the two triangles of manifold edges
+    manifold = counts == 2
+    normals = surface.triangle_normals()
+    n0 = normals[faces[manifold, 0]]
+    n1 = normals[faces[manifold, 1]]
+    cos_angle = np.einsum("ij,ij->i", n0, n1)
+    valid = np.any(n0 != 0, axis=1) & np.any(n1 != 0, axis=1)
+    threshold = np.cos(np.radians(180.0 - included_angle))
+    if included_angle >= 180.0:
+        sharp = valid
+    elif included_angle <= 0.0:
+        sharp = np.zeros_like(valid)
+    else:
+        sharp = valid & (cos_angle < threshold)
+    edge_types[np.flatnonzero(manifold)[sharp]] = FEATURE_EDGE
+
+    if region_edges:
+        regions = surface.regions
+        crossing = manifold & (regions[faces[:, 0]] != regions[np.maximum(faces[:, 1], 0)])
+        edge_types[crossing & (edge_types == 255)] = REGION_EDGE
+    if open_edges:
+        edge_types[counts == 1] = OPEN_EDGE
+    if non_manifold_edges:
+        edge_types[counts > 2] = NON_MANIFOLD_EDGE
+
+    selected = edge_types != 255
+    feature_edges = edges[selected]
+    used, local = np.unique(feature_edges, return_inverse=True)
+    result = FeatureEdges(surface.points[used], local.reshape(-1, 2), edge_types[selected])
+
+    if key is not None:
+        cache.save(key, {"points": result.points, "edges": result.edges,
+                         "edge_types": result.edge_types})
+    logger.info(f"Extracted {result.n_edges} feature edges ({result.counts()})")
+    return result
+
+
+def snappy_feature_entry(emesh_name: str, level: int) -> str:
+    """Return the ``features`` list entry for snappyHexMeshDict.
+
+    Args:
+        emesh_name: File name of the .eMesh in ``constant/triSurface``
+        level: Feature refinement level
+
+    Returns:
+        Dictionary entry text for one feature file
+    """
+    return f'{{\n    file "{emesh_name}";\n    level {int(level)};\n}}'
+
+
+def snappy_features_list(entries: Dict[str, int]) -> str:
+    """Return the full ``features`` list value for snappyHexMeshDict.
+
+    Args:
+        entries: Mapping of .eMesh file name to refinement level
+
+    Returns:
+        List text to assign to ``castellatedMeshControls/features``
+    """
+    return _format_features_list([snappy_feature_entry(name, level)
+                                  for name, level in entries.items()])
+
+
+def _format_features_list(items: List[str]) -> str:
+    """Return the ``features`` list value holding the given entry texts."""
+    body = "\n".join("    " + line for item in items for line in item.split("\n"))
+    return "\n(\n" + body + "\n)"
+
+
+def _parse_features_list(text: str) -> Dict[str, str]:
+    """Return the entry text of every file in a ``features`` list.
+
+    The ``file`` and ``level`` keywords are matched independently, so their
+    order does not matter. Entries without a single ``level`` (``levels``
+    distance lists) are kept as written.
+    """
+    entries: Dict[str, str] = {}
+    for match in _FEATURE_ENTRY_RE.finditer(text):
+        name = _FEATURE_FILE_RE.search(match.group(1))
+        if name is None:
+            continue
+        level = _FEATURE_LEVEL_RE.search(match.group(1))
+        if level is not None:
+            entries[name.group(1)] = snappy_feature_entry(name.group(1), int(level.group(1)))
+        else:
+            lines = [line.strip() for line in match.group(1).strip().split("\n")]
+            entries[name.group(1)] = "{\n" + "\n".join("    " + line for line in lines) + "\n}"
+    return entries
+
+
+def merge_snappy_features(case_dir: str, entries: Dict[str, int]) -> str:
+    """Add feature files to ``castellatedMeshControls/features`` of snappyHexMeshDict.
+
+    Existing entries for other files are kept and the rest of the dictionary
+    is left untouched. A missing dictionary is created with only this entry.
+
+    Args:
+        case_dir: OpenFOAM case directory
+        entries: Mapping of .eMesh file name to refinement level
+
+    Returns:
+        Path of the snappyHexMeshDict
+    """
+    file_path = os.path.join(case_dir, "system", "snappyHexMeshDict")
+    merged: Dict[str, str] = {}
+    if os.path.exists(file_path):
+        with open(file_path, "r") as f:
+            current = get_dict_entry(f.read(), ["castellatedMeshControls", "features"])
+        merged = _parse_features_list(current or "")
+    for name, level in entries.items():
+        merged[name] = snappy_feature_entry(name, level)
+    merge_dict_file(file_path, {"castellatedMeshControls/features":
+                                _format_features_list(list(merged.values()))})
+    return file_path
+
+
+def write_surface_features(surface: TriSurface, case_dir: str, name: str,
+                           included_angle: float = 150.0,
+                           cache: Optional[ArrayCache] = None) -> FeatureEdges:
+    """Extract features and write ``constant/triSurface/<name>.eMesh``.
+
+    Args:
+        surface: Merged triangle surface
+        case_dir: OpenFOAM case directory
+        name: Surface name used for the .eMesh file
+        included_angle: Included angle threshold in degrees
+        cache: Optional feature cache
+
+    Returns:
+        The extracted feature edges
+    """
+    features = extract_feature_edges(surface, included_angle, cache=cache)
+    features.write_emesh(os.path.join(case_dir, "constant", "triSurface", f"{name}.eMesh"))
+    return features
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 10:31:15 2026
+
+@author: adamp
+"""
+
+"""
+Statistics of volume fields over the time directories of a case.
+
+Time directories are spread over a process pool. Each worker reads the
+fields of its times and reduces them over the whole mesh and over each
+region with vectorized, volume-weighted operations, in chunks of cells
+merged with the parallel (Chan/Welford) update so temporaries stay bounded.
+The per-time results can be merged again into statistics over all times.
+Cell volumes are computed once per mesh and cached.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.openfoam.fields import read_field, field_path, time_directories
+from src.openfoam.map_fields import list_vol_fields
+from src.openfoam.mesh_sets import MeshSet
+from src.openfoam.polymesh import PolyMesh
+from src.utils.cache import ArrayCache
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Region name of statistics over the whole mesh
+WHOLE_MESH = "all"
+
+# Time label of statistics merged over all times
+ALL_TIMES = "all"
+
+# Default percentiles, volume-weighted
+DEFAULT_PERCENTILES = (5.0, 50.0, 95.0)
+
+# Number of cells reduced at once
+STAT_CHUNK_SIZE = 1 << 20
+
+# Statistics columns of the result table, before the percentiles
+STATISTICS = ("count", "volume", "min", "max", "mean", "std", "weighted_mean", "weighted_std")
+
+Region = Union[np.ndarray, MeshSet]
+
+
+class RunningStats:
+    """Streaming count, extrema, mean and variance, plain and volume-weighted."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.weight = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.weighted_mean = 0.0
+        self.weighted_m2 = 0.0
+
+    def update(self, values: np.ndarray, weights: np.ndarray) -> "RunningStats":
+        """Add a batch of values with their weights."""
+        batch = RunningStats()
+        batch.count = len(values)
+        if batch.count == 0:
+            return self
+        batch.weight = float(weights.sum())
+        batch.min, batch.max = float(values.min()), float(values.max())
+        batch.mean = float(values.mean())
+        batch.m2 = float(np.square(values - batch.mean).sum())
+        if batch.weight > 0:
+            batch.weighted_mean = float(np.dot(weights, values) / batch.weight)
+            batch.weighted_m2 = float(np.dot(weights, np.square(values - batch.weighted_mean)))
+        return self.merge(batch)
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        """Merge the statistics of a disjoint set of values into these."""
+        if other.count == 0:
+            return self
+        count, weight = self.count + other.count, self.weight + other.weight
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        if weight > 0:
+            delta = other.weighted_mean - self.weighted_mean
+            self.weighted_m2 += (other.weighted_m2
+                                 + delta * delta * self.weight * other.weight / weight)
+            self.weighted_mean += delta * other.weight / weight
+        self.count, self.weight = count, weight
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        return self
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation."""
+        return float(np.sqrt(self.m2 / self.count)) if self.count else np.nan
+
+    @property
+    def weighted_std(self) -> float:
+        """Volume-weighted standard deviation."""
+        return float(np.sqrt(self.weighted_m2 / self.weight)) if self.weight > 0 else np.nan
+
+    def row(self) -> Tuple[float, ...]:
+        """Values of the ``STATISTICS`` columns."""
+        if self.count == 0:
+            return (0, 0.0) + (np.nan,) * (len(STATISTICS) - 2)
+        return (self.count, self.weight, self.min, self.max, self.mean, self.std,
+                self.weighted_mean, self.weighted_std)
+
+
+def weighted_percentiles(values: np.ndarray, weights: np.ndarray,
+                         percentiles: Sequence[float]) -> np.ndarray:
+    """Percentiles of values, each counting in proportion to its weight."""
+    if len(values) == 0:
+        return np.full(len(percentiles), np.nan)
+    order = np.argsort(values, kind="stable")
+    cumulative = np.cumsum(weights[order])
+    if cumulative[-1] <= 0:
+        return np.percentile(values, percentiles)
+    # Each value sits at the middle of its share of the total weight
+    positions = (cumulative - 0.5 * weights[order]) / cumulative[-1]
+    return np.interp(np.asarray(percentiles) / 100.0, positions, values[order])
+
+
+def _field_statistics(values: np.ndarray, weights: np.ndarray,
+                      percentiles: Sequence[float]) -> Tuple[RunningStats, np.ndarray]:
+    """Statistics and percentiles of one field over one region."""
+    stats = RunningStats()
+    for start in range(0, len(values), STAT_CHUNK_SIZE):
+        stats.update(values[start:start + STAT_CHUNK_SIZE],
+                     weights[start:start + STAT_CHUNK_SIZE])
+    return stats, weighted_percentiles(values, weights, percentiles)
+
+
+def cached_cell_volumes(case_dir: str, cache: Optional[ArrayCache] = None) -> np.ndarray:
+    """Cell volumes of the mesh of a case, cached on the mesh files.
+
+    The cache key is made of the size and modification time of the polyMesh
+    files, so a cached mesh is not read at all.
+    """
+    mesh_dir = PolyMesh.poly_mesh_dir(case_dir)
+    stamps = []
+    for name in sorted(os.listdir(mesh_dir)) if os.path.isdir(mesh_dir) else []:
+        stat = os.stat(os.path.join(mesh_dir, name))
+        stamps.append((name, stat.st_size, stat.st_mtime_ns))
+    cache = cache or ArrayCache("cell_volumes")
+    key = ArrayCache.make_key(os.path.abspath(mesh_dir), stamps)
+    cached = cache.load(key)
+    if cached is not None:
+        return cached["volumes"]
+    volumes = PolyMesh.read(case_dir).cell_volumes
+    cache.save(key, {"volumes": volumes})
+    return volumes
+
+
+# Cell volumes and region labels of the worker processes
+_VOLUMES: Optional[np.ndarray] = None
+_REGIONS: Dict[str, Optional[np.ndarray]] = {}
+
+
+def _init_worker(volumes: np.ndarray, regions: Dict[str, Optional[np.ndarray]]) -> None:
+    """Share the cell volumes and regions with a worker process."""
+    global _VOLUMES, _REGIONS
+    _VOLUMES, _REGIONS = volumes, regions
+
+
+def _time_statistics(case_dir: str, time: str, fields: Optional[Sequence[str]],
+                     percentiles: Sequence[float]) -> List[Tuple]:
+    """Statistics of the fields of one time directory for every region.
+
+    Vector and tensor fields are reduced by magnitude.
+    """
+    rows = []
+    names = list(fields) if fields is not None else list_vol_fields(case_dir, time)
+    for name in names:
+        path = field_path(case_dir, name, time)
+        if not (os.path.exists(path) or os.path.exists(path + ".gz")):
+            continue
+        values = read_field(path, len(_VOLUMES)).values
+        if values.ndim > 1:
+            values = np.linalg.norm(values, axis=1)
+        for region, labels in _REGIONS.items():
+            region_values = values if labels is None else values[labels]
+            weights = _VOLUMES if labels is None else _VOLUMES[labels]
+            stats, quantiles = _field_statistics(region_values, weights, percentiles)
+            rows.append((time, name, region, stats, quantiles))
+    return rows
+
+
+def field_statistics(case_dir: str, fields: Optional[Sequence[str]] = None,
+                     times: Optional[Sequence[str]] = None,
+                     regions: Optional[Mapping[str, Region]] = None,
+                     percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                     workers: Optional[int] = None, overall: bool = False,
+                     cache: Optional[ArrayCache] = None) -> Dict[str, np.ndarray]:
+    """Compute statistics of fields at every time of a case.
+
+    Args:
+        case_dir: Case directory
+        fields: Field names; all volume fields of each time if None
+        times: Time directories; all of them if None
+        regions: Cell labels (or cell sets) of regions reduced besides the whole mesh
+        percentiles: Volume-weighted percentiles to compute
+        workers: Number of worker processes; the CPU count if None, none if 1
+        overall: Whether to add rows merged over all times, labelled ``ALL_TIMES``
+        cache: Cache of the cell volumes; the default ``cell_volumes`` cache if None
+
+    Returns:
+        Table with ``time``, ``field`` and ``region`` columns, the
+        ``STATISTICS`` columns and one ``p<q>`` column per percentile
+    """
+    times = list(times) if times is not None else time_directories(case_dir)
+    volumes = cached_cell_volumes(case_dir, cache)
+    region_labels: Dict[str, Optional[np.ndarray]] = {WHOLE_MESH: None}
+    for name, region in (regions or {}).items():
+        region_labels[name] = region.labels() if isinstance(region, MeshSet) else \
+            np.asarray(region, dtype=np.int64)
+
+    workers = workers or os.cpu_count() or 1
+    results: List[Tuple] = []
+    if workers == 1 or len(times) <= 1:
+        _init_worker(volumes, region_labels)
+        for time in times:
+            results.extend(_time_statistics(case_dir, time, fields, percentiles))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(times)), initializer=_init_worker,
+                                 initargs=(volumes, region_labels)) as pool:
+            futures = [pool.submit(_time_statistics, case_dir, time, fields, percentiles)
+                       for time in times]
+            for future in futures:
+                results.extend(future.result())
+
+    if overall:
+        merged: Dict[Tuple[str, str], RunningStats] = {}
+        for _, name, region, stats, _ in results:
+            merged.setdefault((name, region), RunningStats()).merge(stats)
+        results.extend((ALL_TIMES, name, region, stats, np.full(len(percentiles), np.nan))
+                       for (name, region), stats in merged.items())
+
+    table: Dict[str, np.ndarray] = {
+        "time": np.array([row[0] for row in results], dtype=str),
+        "field": np.array([row[1] for row in results], dtype=str),
+        "region": np.array([row[2] for row in results], dtype=str)}
+    values = np.array([row[3].row() for row in results], dtype=np.float64).reshape(
+        -1, len(STATISTICS))
+    for i, column in enumerate(STATISTICS):
+        table[column] = values[:, i]
+    quantiles = np.array([row[4] for row in results], dtype=np.float64).reshape(
+        -1, len(percentiles))
+    for i, q in enumerate(percentiles):
+        table[f"p{q:g}"] = quantiles[:, i]
+    logger.info(f"Computed statistics of {len(set(table['field']))} fields at "
+                f"{len(times)} times in {case_dir}")
+    return table
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 04:05:33 2026
+
+@author: adamp
+"""
+
+"""
+Reading and writing of OpenFOAM volume fields (``0/alpha.water``, ``0/U``...).
+
+The internal field is converted to and from a NumPy array in one pass with
+the list routines of ``foam_io``, in ASCII or binary format. The
+``boundaryField`` of a field read from disk is kept verbatim, so rewriting
+the internal values never disturbs the boundary conditions.
+"""
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from src.openfoam.foam_io import (FoamFileError, SCALAR_DTYPE, read_foam_file, header_is_binary,
+                                  header_dtypes, parse_list, write_list, open_foam_file,
+                                  foam_footer, _skip_comments)
+from src.openfoam.polymesh import Patch
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Field classes and list element types by number of components
+FIELD_CLASSES = {1: "volScalarField", 3: "volVectorField", 6: "volSymmTensorField",
+                 9: "volTensorField"}
+FIELD_ELEMENTS = {1: "scalar", 3: "vector", 6: "symmTensor", 9: "tensor"}
+
+# Dimension set of dimensionless fields such as phase fractions
+DIMENSIONLESS = "[0 0 0 0 0 0 0]"
+
+# Patch types whose field type must match the patch type
+CONSTRAINT_PATCH_TYPES = ("empty", "symmetry", "symmetryPlane", "wedge", "cyclic",
+                          "cyclicAMI", "processor")
+
+_DIMENSIONS_RE = re.compile(rb"dimensions\s+(\[[^\]]*\])\s*;")
+_INTERNAL_RE = re.compile(rb"internalField\s+(uniform|nonuniform)\s*")
+_LIST_TYPE_RE = re.compile(rb"List<\w+>\s*")
+_NONUNIFORM_RE = re.compile(rb"nonuniform\s+List<(\w+)>\s*")
+_TOKEN_RE = re.compile(rb"[^\s{};]+")
+
+# Boundary conditions per patch; nonuniform list values are arrays
+BoundaryEntries = Dict[str, Dict[str, Union[str, np.ndarray]]]
+
+
+def format_value(value: Union[float, Sequence[float]]) -> str:
+    """Format a scalar or a vector/tensor value as written in OpenFOAM files."""
+    values = np.atleast_1d(np.asarray(value, dtype=np.float64))
+    text = " ".join(f"{v:.12g}" for v in values)
+    return text if values.size == 1 else f"({text})"
+
+
+class VolField:
+    """Internal values and boundary conditions of a volume field."""
+
+    def __init__(self, name: str, values: np.ndarray, dimensions: str = DIMENSIONLESS,
+                 boundary: Union[BoundaryEntries, bytes, None] = None,
+                 binary: bool = False) -> None:
+        """Initialize the field.
+
+        Args:
+            name: Field name, e.g. ``alpha.water``
+            values: Cell values of shape (nCells,) or (nCells, nComponents)
+            dimensions: Dimension set, e.g. ``[0 1 -1 0 0 0 0]``
+            boundary: Boundary conditions as entries per patch, or the raw
+                ``boundaryField`` entry of a field read from disk
+            binary: Format the field was read in
+        """
+        self.name = name
+        self.values = np.asarray(values, dtype=np.float64)
+        if self.width not in FIELD_CLASSES:
+            raise ValueError(f"Unsupported number of field components: {self.width}")
+        self.dimensions = dimensions
+        self.boundary = boundary if boundary is not None else {}
+        self.binary = binary
+
+    @classmethod
+    def uniform(cls, name: str, n_cells: int, value: Union[float, Sequence[float]],
+                patches: Sequence[Patch], dimensions: str = DIMENSIONLESS,
+                patch_type: str = "zeroGradient") -> "VolField":
+        """Create a uniform field with one boundary condition on all patches.
+
+        Constraint patches (empty, symmetry, cyclic...) get their own type.
+
+        Args:
+            name: Field name
+            n_cells: Number of cells
+            value: Scalar or vector value
+            patches: Mesh patches
+            dimensions: Dimension set
+            patch_type: Boundary condition of the other patches
+
+        Returns:
+            The field
+        """
+        value = np.asarray(value, dtype=np.float64)
+        values = np.tile(value, (n_cells, 1)) if value.ndim else np.full(n_cells, float(value))
+        return cls(name, values, dimensions, default_boundary(patches, patch_type))
+
+    @property
+    def width(self) -> int:
+        """Number of components per cell."""
+        return 1 if self.values.ndim == 1 else self.values.shape[1]
+
+    @property
+    def class_name(self) -> str:
+        """OpenFOAM class of the field."""
+        return FIELD_CLASSES[self.width]
+
+    def __repr__(self) -> str:
+        return f"VolField({self.name!r}, {self.class_name}, nCells={len(self.values)})"
+
+
+def default_boundary(patches: Sequence[Patch],
+                     patch_type: str = "zeroGradient") -> Dict[str, Dict[str, str]]:
+    """Boundary conditions with one type on all patches except constraint patches.
+
+    Args:
+        patches: Mesh patches
+        patch_type: Boundary condition of the non-constraint patches
+
+    Returns:
+        Entries per patch name
+    """
+    return {patch.name: {"type": patch.type if patch.type in CONSTRAINT_PATCH_TYPES
+                         else patch_type} for patch in patches}
+
+
+def field_path(case_dir: str, name: str, time: str = "0") -> str:
+    """Return the path of a field file in a time directory."""
+    return os.path.join(case_dir, time, name)
+
+
+def read_field(file_path: str, n_cells: Optional[int] = None) -> VolField:
+    """Read a volume field file.
+
+    Args:
+        file_path: Path to the field file
+        n_cells: Number of cells, needed to expand a uniform internal field
+
+    Returns:
+        The field, with its boundaryField kept verbatim
+
+    Raises:
+        FoamFileError: If the file has no internal field
+        ValueError: If the internal field is uniform and ``n_cells`` is not given
+    """
+    header, body = read_foam_file(file_path)
+    binary = header_is_binary(header)
+    _, scalar_dtype = header_dtypes(header)
+    width = {class_name: w for w, class_name in FIELD_CLASSES.items()}.get(
+        header.get("class", ""), 1)
+
+    dimensions_match = _DIMENSIONS_RE.search(body)
+    dimensions = dimensions_match.group(1).decode() if dimensions_match else DIMENSIONLESS
+    match = _INTERNAL_RE.search(body)
+    if not match:
+        raise FoamFileError(f"No internalField in {file_path}")
+
+    if match.group(1) == b"uniform":
+        end = body.index(b";", match.end())
+        value = np.fromstring(body[match.end():end].replace(b"(", b" ").replace(b")", b" "),
+                              sep=" ")
+        if n_cells is None:
+            raise ValueError(f"Number of cells needed to read uniform field {file_path}")
+        values = np.tile(value, (n_cells, 1)) if width > 1 else np.full(n_cells, value[0])
+        pos = end + 1
+    else:
+        list_match = _LIST_TYPE_RE.match(body, match.end())
+        pos = list_match.end() if list_match else match.end()
+        values, pos = parse_list(body, pos, scalar_dtype if binary else np.float64, width, binary)
+
+    start = body.find(b"boundaryField", pos)
+    boundary = body[start:body.rindex(b"}") + 1] if start >= 0 else {}
+    name = header.get("object", os.path.basename(file_path))
+    return VolField(name, values, dimensions, boundary, binary)
+
+
+def _token_end(body: bytes, pos: int) -> int:
+    """Return the end of the whitespace-delimited token starting at ``pos``."""
+    match = _TOKEN_RE.match(body, pos)
+    if not match:
+        raise FoamFileError(f"Expected a keyword at byte {pos}")
+    return match.end()
+
+
+def _value_end(body: bytes, pos: int) -> int:
+    """Return the position of the ``;`` ending an entry value, skipping sub-dictionaries."""
+    depth = 0
+    while pos < len(body):
+        char = body[pos:pos + 1]
+        if char == b"{":
+            depth += 1
+        elif char == b"}":
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+        elif char == b";" and depth == 0:
+            return pos
+        pos += 1
+    raise FoamFileError("Unterminated entry in boundaryField")
+
+
+def parse_boundary(field: VolField) -> BoundaryEntries:
+    """Parse the boundaryField of a field into entries per patch.
+
+    Nonuniform list values (``value nonuniform List<scalar> ...``) are
+    returned as arrays, all other values as text.
+
+    Args:
+        field: Field read from disk (or with entries already per patch)
+
+    Returns:
+        Entries per patch name (regular expression keys keep their quotes)
+    """
+    if not isinstance(field.boundary, bytes):
+        return {patch: dict(entries) for patch, entries in field.boundary.items()}
+    body = field.boundary
+    pos = _skip_comments(body, body.find(b"{") + 1)
+    boundary: BoundaryEntries = {}
+    while pos < len(body) and body[pos:pos + 1] != b"}":
+        end = _token_end(body, pos)
+        patch = body[pos:end].decode()
+        pos = _skip_comments(body, end)
+        if body[pos:pos + 1] != b"{":
+            raise FoamFileError(f"Expected '{{' after patch {patch}")
+        pos = _skip_comments(body, pos + 1)
+        entries: Dict[str, Union[str, np.ndarray]] = {}
+        while body[pos:pos + 1] != b"}":
+            end = _token_end(body, pos)
+            key = body[pos:end].decode()
+            pos = _skip_comments(body, end)
+            if key.startswith("#"):
+                end = body.find(b"\n", pos)
+                end = len(body) if end < 0 else end
+                entries[key] = body[pos:end].decode().strip()
+                pos = _skip_comments(body, end)
+                continue
+            match = _NONUNIFORM_RE.match(body, pos)
+            if match:
+                width = {e: w for w, e in FIELD_ELEMENTS.items()}[match.group(1).decode()]
+                dtype = SCALAR_DTYPE if field.binary else np.float64
+                entries[key], pos = parse_list(body, match.end(), dtype, width, field.binary)
+                pos = _skip_comments(body, pos)
+            else:
+                end = _value_end(body, pos)
+                entries[key] = body[pos:end].decode().strip()
+                pos = end
+            pos = _skip_comments(body, pos + (body[pos:pos + 1] == b";"))
+        boundary[patch] = entries
+        pos = _skip_comments(body, pos + 1)
+    return boundary
+
+
+def _write_boundary(f, boundary: BoundaryEntries, binary: bool = False) -> None:
+    """Write a boundaryField entry from entries per patch."""
+    f.write(b"boundaryField\n{\n")
+    for patch, entries in boundary.items():
+        f.write(f"    {patch}\n    {{\n".encode())
+        for key, value in entries.items():
+            if isinstance(value, np.ndarray):
+                width = 1 if value.ndim == 1 else value.shape[1]
+                f.write(f"        {key:<16}nonuniform List<{FIELD_ELEMENTS[width]}> ".encode())
+                write_list(f, value, binary)
+                f.write(b";\n")
+            elif key.startswith("#"):
+                f.write(f"        {key} {value}\n".encode())
+            else:
+                f.write(f"        {key:<16}{value};\n".encode())
+        f.write(b"    }\n")
+    f.write(b"}")
+
+
+def time_directories(case_dir: str) -> List[str]:
+    """Return the time directory names of a case, in time order."""
+    times = []
+    for name in os.listdir(case_dir) if os.path.isdir(case_dir) else []:
+        try:
+            value = float(name)
+        except ValueError:
+            continue
+        if os.path.isdir(os.path.join(case_dir, name)):
+            times.append((value, name))
+    return [name for _, name in sorted(times)]
+
+
+def write_field(case_dir: str, field: VolField, time: str = "0",
+                binary: Optional[bool] = None) -> str:
+    """Write a volume field to a time directory.
+
+    Constant fields are written as ``uniform``.
+
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+        field: The field
+        time: Time directory
+        binary: Whether to write binary; the format the field was read in if None
+
+    Returns:
+        Path of the written file
+
+    Raises:
+        ValueError: If a verbatim boundary holding nonuniform lists would
+            change format
+    """
+    binary = field.binary if binary is None else binary
+    raw_boundary = isinstance(field.boundary, bytes)
+    if raw_boundary and binary != field.binary and b"nonuniform" in field.boundary:
+        raise ValueError(f"Cannot change the format of {field.name}: its boundaryField "
+                         f"holds {'binary' if field.binary else 'ASCII'} lists")
+
+    path = field_path(case_dir, field.name, time)
+    values = field.values
+    with open_foam_file(path, field.class_name, field.name, time, binary) as f:
+        f.write(f"dimensions      {field.dimensions};\n\n".encode())
+        if len(values) and np.all(values == values[0]):
+            f.write(f"internalField   uniform {format_value(values[0])};\n\n".encode())
+        else:
+            f.write(f"internalField   nonuniform List<{FIELD_ELEMENTS[field.width]}> ".encode())
+            write_list(f, values, binary)
+            f.write(b";\n\n")
+        if raw_boundary:
+            f.write(field.boundary)
+        else:
+            _write_boundary(f, field.boundary, binary)
+        f.write(foam_footer().encode())
+    logger.info(f"Wrote field {field.name} ({len(values)} cells) to {path}")
+    return path
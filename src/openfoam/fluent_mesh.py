@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 22:47:51 2026
+
+@author: adamp
+"""
+
+"""
+Streaming reader for Fluent ``.msh`` files.
+
+The file is a sequence of parenthesized sections. Node (10), face (13) and
+zone (39/45) sections are decoded; every other section is skipped without
+being parsed. ASCII sections are parsed in line-aligned chunks (face and
+cell data are hexadecimal, see ``parse_hex_ints``), binary sections (index
+2000+ for single, 3000+ for double precision) are read straight into
+arrays. Fluent faces already carry the cells on either side, so the faces
+only need to be oriented and ordered to become a polyMesh.
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from src.openfoam.mesh_conversion import (MeshImportError, MeshStream, parse_hex_ints,
+                                          record_starts, faces_to_polymesh)
+from src.openfoam.polymesh import PolyMesh
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Fluent boundary condition codes of face zones
+FLUENT_BC_TYPES = {
+    2: "interior",
+    3: "wall",
+    4: "pressure-inlet",
+    5: "pressure-outlet",
+    7: "symmetry",
+    8: "periodic-shadow",
+    9: "pressure-far-field",
+    10: "velocity-inlet",
+    12: "periodic",
+    14: "fan",
+    20: "mass-flow-inlet",
+    24: "interface",
+    31: "parent",
+    36: "outflow",
+    37: "axis",
+}
+
+# OpenFOAM patch types of Fluent zone types; others become ``patch``
+FLUENT_PATCH_TYPES = {
+    "wall": "wall",
+    "symmetry": "symmetry",
+}
+
+# Points per face of the fixed face types (0 = mixed, 5 = polygonal)
+_FACE_TYPE_SIZES = {2: 2, 3: 3, 4: 4}
+
+_BINARY_END = b"End of Binary Section"
+
+
+def _has_data(stream: MeshStream) -> bool:
+    """Consume the end of a section header; True if a data block follows."""
+    stream.skip_whitespace()
+    char = stream.read_bytes(1)
+    if char == b")":
+        return False
+    if char != b"(":
+        raise MeshImportError(f"Unexpected {char!r} in section of {stream.file_path}")
+    return True
+
+
+def _parse_floats(text: bytes) -> np.ndarray:
+    """Parse whitespace-separated decimal numbers."""
+    return np.fromstring(text, sep=" ")
+
+
+def _read_block(stream: MeshStream, binary: bool, dtype: str, count: int = -1) -> np.ndarray:
+    """Read the data block of a section and consume the rest of the section.
+
+    Args:
+        stream: Stream positioned after the opening parenthesis of the data
+        binary: Whether the block is binary
+        dtype: On-disk dtype of binary data; its kind selects the ASCII parser
+            (hexadecimal integers or decimal floats)
+        count: Number of values if known, else -1 (read up to the block end)
+
+    Returns:
+        The values as int64 or float64
+    """
+    native = np.int64 if np.dtype(dtype).kind == "i" else np.float64
+    if binary:
+        if count >= 0:
+            values = stream.read_array(count, dtype)
+            stream.read_until(_BINARY_END)
+        else:
+            values = np.frombuffer(stream.read_until(b")" + _BINARY_END), dtype=dtype)
+    else:
+        parse = parse_hex_ints if native is np.int64 else _parse_floats
+        chunks = [parse(chunk) for chunk in stream.iter_until(b")")]
+        values = np.concatenate(chunks) if chunks else np.zeros(0)
+    stream.read_until(b")")
+    return values.astype(native)
+
+
+def _split_faces(data: np.ndarray, face_type: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray,
+                                                              np.ndarray]:
+    """Split face records into (sizes, point labels, c0, c1), all still 1-based."""
+    if face_type in _FACE_TYPE_SIZES:
+        size = _FACE_TYPE_SIZES[face_type]
+        records = data.reshape(-1, size + 2)
+        sizes = np.full(len(records), size, dtype=np.int64)
+        return sizes, records[:, :size].ravel(), records[:, size], records[:, size + 1]
+    if face_type not in (0, 5):
+        raise MeshImportError(f"Unsupported Fluent face type {face_type}")
+
+    # Mixed and polygonal faces are prefixed by their number of points
+    starts = record_starts(data + 3)
+    sizes = data[starts]
+    slots = np.repeat(starts + 1 - np.cumsum(sizes) + sizes, sizes) + np.arange(sizes.sum())
+    return sizes, data[slots], data[starts + sizes + 1], data[starts + sizes + 2]
+
+
+def read_fluent_mesh(file_path: str) -> PolyMesh:
+    """Read a 3D Fluent mesh file (ASCII and/or binary sections) as a polyMesh.
+
+    Args:
+        file_path: Path to the ``.msh`` file
+
+    Returns:
+        The converted mesh, with one patch per boundary face zone
+
+    Raises:
+        MeshImportError: If the file is malformed or the mesh is 2D
+    """
+    node_blocks: List[Tuple[int, np.ndarray]] = []
+    sizes, labels, c0, c1, zones = [], [], [], [], []
+    zone_info: Dict[int, Tuple[str, str]] = {}
+
+    logger.info(f"Reading Fluent mesh {file_path}")
+    with MeshStream(file_path) as stream:
+        while True:
+            stream.skip_whitespace()
+            if stream.at_end():
+                break
+            if stream.read_bytes(1) != b"(":
+                raise MeshImportError(f"Expected a section in {file_path}")
+            token = stream.read_token()
+            try:
+                index = int(token)
+            except ValueError:
+                raise MeshImportError(f"Invalid section index {token!r} in {file_path}")
+            binary = index >= 2000
+            kind = index % 1000
+
+            if kind == 2 and not binary:
+                dimension = int(stream.read_token())
+                if dimension != 3:
+                    raise MeshImportError("Only 3D Fluent meshes are supported")
+                stream.read_until(b")")
+
+            elif kind == 10:
+                stream.read_until(b"(")
+                header = [int(v, 16) for v in stream.read_until(b")").split()]
+                zone_id, first, last = header[:3]
+                n_dim = header[4] if len(header) > 4 else 3
+                if not _has_data(stream):
+                    continue
+                count = (last - first + 1) * n_dim
+                coordinates = _read_block(stream, binary, "<f8" if index >= 3000 else "<f4", count)
+                if len(coordinates) != count:
+                    raise MeshImportError(f"Node zone {zone_id} has {len(coordinates)} values, "
+                                          f"expected {count}")
+                if n_dim != 3:
+                    raise MeshImportError("Only 3D Fluent meshes are supported")
+                node_blocks.append((first - 1, coordinates.reshape(-1, 3)))
+
+            elif kind == 13:
+                stream.read_until(b"(")
+                header = [int(v, 16) for v in stream.read_until(b")").split()]
+                zone_id, first, last = header[:3]
+                bc_type = header[3] if len(header) > 3 else 0
+                face_type = header[4] if len(header) > 4 else 0
+                if not _has_data(stream):
+                    continue
+                n_faces = last - first + 1
+                count = n_faces * (_FACE_TYPE_SIZES[face_type] + 2) \
+                    if face_type in _FACE_TYPE_SIZES else -1
+                data = _read_block(stream, binary, "<i4", count)
+                zone_sizes, zone_labels, zone_c0, zone_c1 = _split_faces(data, face_type)
+                if len(zone_sizes) != n_faces:
+                    raise MeshImportError(f"Face zone {zone_id} has {len(zone_sizes)} faces, "
+                                          f"expected {n_faces}")
+                sizes.append(zone_sizes)
+                labels.append(zone_labels - 1)
+                c0.append(zone_c0 - 1)
+                c1.append(zone_c1 - 1)
+                zones.append(np.full(n_faces, zone_id, dtype=np.int64))
+                zone_info.setdefault(zone_id, (FLUENT_BC_TYPES.get(bc_type, "patch"),
+                                               f"zone{zone_id}"))
+
+            elif kind in (39, 45) and not binary:
+                stream.read_until(b"(")
+                header = stream.read_until(b")").split()
+                if len(header) >= 3:
+                    zone_info[int(header[0])] = (header[1].decode(), header[2].decode())
+                stream.skip_whitespace()
+                if stream.peek() == b"(":
+                    stream.read_bytes(1)
+                    stream.skip_group()
+                stream.read_until(b")")
+
+            elif binary:
+                stream.read_until(_BINARY_END)
+                stream.read_until(b")")
+            else:
+                stream.skip_group()
+
+    if not node_blocks or not sizes:
+        raise MeshImportError(f"No nodes or faces found in {file_path}")
+
+    n_points = max(start + len(block) for start, block in node_blocks)
+    points = np.zeros((n_points, 3))
+    for start, block in node_blocks:
+        points[start:start + len(block)] = block
+
+    sizes = np.concatenate(sizes)
+    offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    zones = np.concatenate(zones)
+    c0 = np.concatenate(c0)
+    c1 = np.concatenate(c1)
+
+    # One patch per face zone holding boundary faces, in order of zone id
+    boundary_zones = np.unique(zones[(c0 < 0) | (c1 < 0)])
+    patch_index = np.full(int(zones.max()) + 1, -1, dtype=np.int64)
+    patch_index[boundary_zones] = np.arange(len(boundary_zones))
+    names = [zone_info[z][1] for z in boundary_zones]
+    types = [FLUENT_PATCH_TYPES.get(zone_info[z][0], "patch") for z in boundary_zones]
+    return faces_to_polymesh(points, offsets, np.concatenate(labels), c0, c1,
+                             patch_index[zones], names, types)
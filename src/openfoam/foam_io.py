@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:12:40 2026
+
+@author: adamp
+"""
+
+"""
+Low-level reading and writing of OpenFOAM list files (polyMesh, fields, sets).
+
+All list bodies are converted to and from NumPy arrays in a single pass, so
+that multi-million entry files never go through a per-entry Python loop.
+Both ``ascii`` and ``binary`` formats are supported, as well as gzip
+compressed files (``writeCompression on``).
+"""
+import os
+import re
+import gzip
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Labels are written as 32-bit integers, scalars as 64-bit floats
+LABEL_DTYPE = np.int32
+SCALAR_DTYPE = np.float64
+
+# Number of list entries formatted per chunk when writing ASCII
+ASCII_CHUNK_SIZE = 500000
+
+_HEADER_RE = re.compile(rb"FoamFile\s*\{(.*?)\}", re.S)
+_ENTRY_RE = re.compile(rb"(\w+)\s+([^;]*);")
+_COUNT_RE = re.compile(rb"(\d+)\s*\(")
+_INT_RE = re.compile(rb"\d+")
+_PAREN_TO_SPACE = bytes.maketrans(b"()", b"  ")
+
+
+class FoamFileError(Exception):
+    """Exception raised for malformed OpenFOAM list files."""
+    pass
+
+
+def foam_header(class_name: str, object_name: str, location: Optional[str] = None,
+                binary: bool = False, note: Optional[str] = None) -> str:
+    """Build the banner and ``FoamFile`` header of an OpenFOAM file.
+
+    Args:
+        class_name: OpenFOAM class, e.g. ``vectorField`` or ``labelList``
+        object_name: Object name written in the header
+        location: Optional location entry, e.g. ``constant/polyMesh``
+        binary: Whether the body is written in binary format
+        note: Optional note entry
+
+    Returns:
+        Header string ending with the separator line
+    """
+    lines = [
+        "/*--------------------------------*- C++ -*----------------------------------*\\",
+        "| =========                 |                                                 |",
+        "| \\\\      /  F ield         | OpenFOAM: The Open Source CFD Toolbox           |",
+        "|  \\\\    /   O peration     | Version:  v2106                                 |",
+        "|   \\\\  /    A nd           | Website:  www.openfoam.com                      |",
+        "|    \\\\/     M anipulation  |                                                 |",
+        "\\*---------------------------------------------------------------------------*/",
+        "FoamFile",
+        "{",
+        "    version     2.0;",
+        f"    format      {'binary' if binary else 'ascii'};",
+    ]
+    if binary:
+        label_bits = np.dtype(LABEL_DTYPE).itemsize * 8
+        scalar_bits = np.dtype(SCALAR_DTYPE).itemsize * 8
+        lines.append(f'    arch        "LSB;label={label_bits};scalar={scalar_bits}";')
+    lines.append(f"    class       {class_name};")
+    if note:
+        lines.append(f'    note        "{note}";')
+    if location:
+        lines.append(f'    location    "{location}";')
+    lines.append(f"    object      {object_name};")
+    lines.append("}")
+    lines.append("// * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * //")
+    return "\n".join(lines) + "\n\n"
+
+
+def foam_footer() -> str:
+    """Return the closing comment line of an OpenFOAM file."""
+    return "\n\n// ************************************************************************* //\n"
+
+
+def resolve_path(file_path: str) -> str:
+    """Return the existing path of a file, allowing for a ``.gz`` variant.
+
+    Args:
+        file_path: Path without or with ``.gz`` suffix
+
+    Returns:
+        Path of the file that exists on disk
+
+    Raises:
+        FileNotFoundError: If neither variant exists
+    """
+    if os.path.exists(file_path):
+        return file_path
+    if os.path.exists(file_path + ".gz"):
+        return file_path + ".gz"
+    raise FileNotFoundError(f"OpenFOAM file not found: {file_path}")
+
+
+def read_foam_file(file_path: str) -> Tuple[Dict[str, str], bytes]:
+    """Read an OpenFOAM file and split it into header entries and body.
+
+    Args:
+        file_path: Path to the file (``.gz`` variants are found automatically)
+
+    Returns:
+        Tuple of (header entries, raw body bytes after the header)
+    """
+    path = resolve_path(file_path)
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        content = f.read()
+
+    header: Dict[str, str] = {}
+    match = _HEADER_RE.search(content)
+    if match:
+        for key, value in _ENTRY_RE.findall(match.group(1)):
+            header[key.decode()] = value.strip().strip(b'"').decode()
+        content = content[match.end():]
+    return header, content
+
+
+def header_is_binary(header: Dict[str, str]) -> bool:
+    """Return True if the file header declares binary format."""
+    return header.get("format", "ascii") == "binary"
+
+
+def header_dtypes(header: Dict[str, str]) -> Tuple[np.dtype, np.dtype]:
+    """Return the (label, scalar) dtypes declared by a binary header's ``arch``.
+
+    Args:
+        header: Parsed header entries
+
+    Returns:
+        Tuple of little-endian label and scalar dtypes
+    """
+    arch = header.get("arch", "")
+    label_match = re.search(r"label=(\d+)", arch)
+    scalar_match = re.search(r"scalar=(\d+)", arch)
+    label_bits = int(label_match.group(1)) if label_match else 32
+    scalar_bits = int(scalar_match.group(1)) if scalar_match else 64
+    return np.dtype(f"<i{label_bits // 8}"), np.dtype(f"<f{scalar_bits // 8}")
+
+
+def _skip_comments(body: bytes, pos: int) -> int:
+    """Advance past whitespace and comments starting at ``pos``."""
+    length = len(body)
+    while pos < length:
+        if body[pos:pos + 1].isspace():
+            pos += 1
+        elif body.startswith(b"//", pos):
+            end = body.find(b"\n", pos)
+            pos = length if end < 0 else end + 1
+        elif body.startswith(b"/*", pos):
+            end = body.find(b"*/", pos)
+            pos = length if end < 0 else end + 2
+        else:
+            break
+    return pos
+
+
+def _closing_paren(body: bytes, start: int, count: int) -> int:
+    """Return the index of the ``count``-th closing parenthesis after ``start``."""
+    raw = np.frombuffer(body, dtype=np.uint8, offset=start)
+    closing = np.flatnonzero(raw == ord(")"))
+    if closing.size < count:
+        raise FoamFileError("Unterminated list in OpenFOAM file")
+    return start + int(closing[count - 1])
+
+
+def _list_size(body: bytes, pos: int) -> Tuple[int, int]:
+    """Parse the leading list size and return (size, position after it)."""
+    pos = _skip_comments(body, pos)
+    match = _INT_RE.match(body, pos)
+    if not match:
+        raise FoamFileError(f"Expected list size at byte {pos}")
+    return int(match.group()), _skip_comments(body, match.end())
+
+
+def parse_list(body: bytes, pos: int, dtype: np.dtype, width: int = 1,
+               binary: bool = False) -> Tuple[np.ndarray, int]:
+    """Parse a ``N(...)`` list of labels, scalars or fixed-width tuples.
+
+    Args:
+        body: File body
+        pos: Position at which the list size starts
+        dtype: Element dtype (on-disk dtype for binary lists)
+        width: Number of components per entry (3 for vectors)
+        binary: Whether the list body is binary
+
+    Returns:
+        Tuple of (array of shape (N,) or (N, width), position after the list)
+    """
+    size, pos = _list_size(body, pos)
+
+    # Uniform compact form: N{value}
+    if body[pos:pos + 1] == b"{":
+        end = body.index(b"}", pos)
+        value = np.fromstring(body[pos + 1:end].translate(_PAREN_TO_SPACE), sep=" ",
+                              dtype=np.dtype(dtype).newbyteorder("="))
+        values = np.tile(value, (size, 1)) if width > 1 else np.full(size, value[0])
+        return values, end + 1
+
+    if body[pos:pos + 1] != b"(":
+        raise FoamFileError(f"Expected '(' at byte {pos}")
+    pos += 1
+
+    if binary:
+        nbytes = size * width * np.dtype(dtype).itemsize
+        values = np.frombuffer(body, dtype=dtype, count=size * width, offset=pos)
+        end = pos + nbytes
+        if body[end:end + 1] != b")":
+            raise FoamFileError("Binary list is not terminated by ')'")
+        values = values.astype(np.dtype(dtype).newbyteorder("="))
+    else:
+        # Fixed-width tuples contribute one closing parenthesis per entry
+        end = _closing_paren(body, pos, size * (width > 1) + 1)
+        if size == 0:
+            values = np.zeros(0, dtype=np.dtype(dtype).newbyteorder("="))
+        else:
+            values = np.fromstring(body[pos:end].translate(_PAREN_TO_SPACE), sep=" ",
+                                   dtype=np.dtype(dtype).newbyteorder("="))
+        if values.size != size * width:
+            raise FoamFileError(f"Expected {size * width} values, found {values.size}")
+
+    if width > 1:
+        values = values.reshape(size, width)
+    return values, end + 1
+
+
+def parse_face_list(body: bytes, pos: int, binary: bool = False,
+                    label_dtype: np.dtype = np.dtype("<i4")) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Parse a ``faceList`` (ASCII) or ``faceCompactList`` (binary).
+
+    Args:
+        body: File body
+        pos: Position at which the list starts
+        binary: Whether the list is binary (and therefore compact)
+        label_dtype: On-disk label dtype for binary lists
+
+    Returns:
+        Tuple of (offsets of shape (nFaces+1,), flat point labels, position after list)
+    """
+    if binary:
+        offsets, pos = parse_list(body, pos, label_dtype, binary=True)
+        points, pos = parse_list(body, pos, label_dtype, binary=True)
+        return offsets.astype(np.int64), points.astype(LABEL_DTYPE), pos
+
+    size, pos = _list_size(body, pos)
+    if body[pos:pos + 1] != b"(":
+        raise FoamFileError(f"Expected '(' at byte {pos}")
+    end = _closing_paren(body, pos + 1, size + 1)
+    content = body[pos + 1:end]
+
+    # Each face is written as n(p0 p1 ...): the integer before '(' is its size
+    sizes = np.array(_COUNT_RE.findall(content), dtype=np.int64)
+    if sizes.size != size:
+        raise FoamFileError(f"Expected {size} faces, found {sizes.size}")
+    stream = np.fromstring(content.translate(_PAREN_TO_SPACE), sep=" ", dtype=np.int64)
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+
+    # Drop the size entries that precede each face's labels
+    keep = np.ones(stream.size, dtype=bool)
+    keep[offsets[:-1] + np.arange(size)] = False
+    points = stream[keep].astype(LABEL_DTYPE)
+    return offsets, points, end + 1
+
+
+def _write_ascii_rows(f, values: np.ndarray, row_format: str) -> None:
+    """Write rows of ``values`` with ``row_format`` in bounded-size chunks."""
+    flat = values.reshape(len(values), int(np.prod(values.shape[1:])))
+    for start in range(0, len(flat), ASCII_CHUNK_SIZE):
+        chunk = flat[start:start + ASCII_CHUNK_SIZE]
+        f.write(((row_format * len(chunk)) % tuple(chunk.ravel().tolist())).encode())
+
+
+def write_list(f, values: np.ndarray, binary: bool = False, scalar_format: str = "%.12g") -> None:
+    """Write a label, scalar or vector list body to an open binary file.
+
+    Args:
+        f: File object opened in binary mode
+        values: Array of shape (N,) or (N, width)
+        binary: Whether to write the body in binary format
+        scalar_format: printf format of one scalar component (ASCII only)
+    """
+    values = np.asarray(values)
+    is_integer = np.issubdtype(values.dtype, np.integer)
+    f.write(f"{len(values)}\n(".encode())
+    if binary:
+        dtype = LABEL_DTYPE if is_integer else SCALAR_DTYPE
+        f.write(np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder("<")).data)
+        f.write(b")")
+        return
+
+    f.write(b"\n")
+    item_format = "%d" if is_integer else scalar_format
+    if values.ndim == 1:
+        _write_ascii_rows(f, values, item_format + "\n")
+    else:
+        width = values.shape[1]
+        _write_ascii_rows(f, values, "(" + " ".join([item_format] * width) + ")\n")
+    f.write(b")")
+
+
+def write_face_list(f, offsets: np.ndarray, points: np.ndarray, binary: bool = False) -> None:
+    """Write a face list, as ``faceCompactList`` in binary or ``faceList`` in ASCII.
+
+    Args:
+        f: File object opened in binary mode
+        offsets: Face offsets of shape (nFaces+1,)
+        points: Flat face point labels
+        binary: Whether to write the compact binary form
+    """
+    if binary:
+        write_list(f, offsets.astype(LABEL_DTYPE), binary=True)
+        f.write(b"\n\n")
+        write_list(f, points.astype(LABEL_DTYPE), binary=True)
+        return
+
+    n_faces = len(offsets) - 1
+    sizes = np.diff(offsets)
+    f.write(f"{n_faces}\n(\n".encode())
+
+    # Faces of equal size are formatted together, then put back in face order
+    for start in range(0, n_faces, ASCII_CHUNK_SIZE):
+        stop = min(start + ASCII_CHUNK_SIZE, n_faces)
+        chunk_sizes = sizes[start:stop]
+        lines = np.empty(stop - start, dtype=object)
+        for size in np.unique(chunk_sizes):
+            rows = np.flatnonzero(chunk_sizes == size) + start
+            labels = points[offsets[rows][:, None] + np.arange(size)]
+            row_format = f"{size}(" + " ".join(["%d"] * size) + ")\n"
+            text = (row_format * len(rows)) % tuple(labels.ravel().tolist())
+            lines[rows - start] = text.splitlines()
+        f.write(("\n".join(lines.tolist()) + "\n").encode())
+    f.write(b")")
+
+
+def open_foam_file(file_path: str, class_name: str, object_name: str,
+                   location: Optional[str] = None, binary: bool = False,
+                   note: Optional[str] = None):
+    """Create a file and write its header, returning the open binary file.
+
+    Args:
+        file_path: Destination path
+        class_name: OpenFOAM class written in the header
+        object_name: Object name written in the header
+        location: Optional location entry
+        binary: Whether the body will be binary
+        note: Optional note entry
+
+    Returns:
+        File object opened for binary writing, positioned after the header
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    f = open(file_path, "wb")
+    f.write(foam_header(class_name, object_name, location, binary, note).encode())
+    return f
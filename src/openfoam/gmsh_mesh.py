@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:16:02 2026
+
+@author: adamp
+"""
+
+"""
+Streaming reader for Gmsh ``.msh`` files (format 2.2 and 4.1, ASCII and binary).
+
+Nodes and elements are read in blocks of lines (ASCII) or fixed-size
+records (binary) and collected as NumPy arrays. Volume elements become
+cells; surface elements carry the physical group that names the patch of
+the matching boundary faces. High-order elements are reduced to their
+corner nodes, which Gmsh always lists first.
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from src.openfoam.mesh_conversion import (MeshImportError, MeshStream, record_starts,
+                                          cells_to_polymesh)
+from src.openfoam.polymesh import PolyMesh
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Number of nodes of every Gmsh element type
+GMSH_ELEMENT_NODES = {
+    1: 2, 2: 3, 3: 4, 4: 4, 5: 8, 6: 6, 7: 5, 8: 3, 9: 6, 10: 9, 11: 10, 12: 27,
+    13: 18, 14: 14, 15: 1, 16: 8, 17: 20, 18: 15, 19: 13, 20: 9, 21: 10, 22: 12,
+    23: 15, 24: 15, 25: 21, 26: 4, 27: 5, 28: 6, 29: 20, 30: 35, 31: 56, 92: 64, 93: 125,
+}
+
+# Cell shape of the volume element types
+GMSH_CELL_SHAPES = {
+    4: "tet", 11: "tet", 29: "tet", 30: "tet", 31: "tet",
+    5: "hex", 12: "hex", 17: "hex", 92: "hex", 93: "hex",
+    6: "prism", 13: "prism", 18: "prism",
+    7: "pyramid", 14: "pyramid", 19: "pyramid",
+}
+
+# Corner count of the surface element types
+GMSH_FACE_SIZES = {2: 3, 9: 3, 20: 3, 21: 3, 22: 3, 23: 3, 24: 3, 25: 3, 3: 4, 10: 4, 16: 4}
+
+_CELL_CORNERS = {"tet": 4, "pyramid": 5, "prism": 6, "hex": 8}
+
+_NODE_COUNT_TABLE = np.zeros(128, dtype=np.int64)
+_NODE_COUNT_TABLE[list(GMSH_ELEMENT_NODES)] = list(GMSH_ELEMENT_NODES.values())
+
+
+def is_gmsh_file(file_path: str) -> bool:
+    """Check whether a ``.msh`` file is a Gmsh (rather than Fluent) mesh."""
+    with open(file_path, "rb") as f:
+        return f.read(256).lstrip().startswith(b"$MeshFormat")
+
+
+class _GmshElements:
+    """Collector of the elements of a Gmsh file, keyed by node tags."""
+
+    def __init__(self) -> None:
+        self.cells: Dict[str, List[np.ndarray]] = {shape: [] for shape in _CELL_CORNERS}
+        self.faces: List[np.ndarray] = []
+        self.face_groups: List[np.ndarray] = []
+
+    def add(self, element_type: int, nodes: np.ndarray, groups: np.ndarray) -> None:
+        """Add elements of one type.
+
+        Args:
+            element_type: Gmsh element type
+            nodes: Node tags, shape (nElements, nNodes)
+            groups: Physical group of every element (0 for none)
+        """
+        if element_type in GMSH_CELL_SHAPES:
+            shape = GMSH_CELL_SHAPES[element_type]
+            self.cells[shape].append(nodes[:, :_CELL_CORNERS[shape]])
+        elif element_type in GMSH_FACE_SIZES:
+            size = GMSH_FACE_SIZES[element_type]
+            faces = np.full((len(nodes), 4), -1, dtype=np.int64)
+            faces[:, :size] = nodes[:, :size]
+            self.faces.append(faces)
+            self.face_groups.append(np.broadcast_to(groups, len(nodes)))
+        elif element_type not in GMSH_ELEMENT_NODES:
+            raise MeshImportError(f"Unsupported Gmsh element type {element_type}")
+
+
+def _read_format(stream: MeshStream) -> Tuple[float, bool, str]:
+    """Read ``$MeshFormat``; return (version, binary, byte order prefix)."""
+    version, file_type, _ = stream.next_line().split()[:3]
+    version = float(version)
+    binary = file_type == b"1"
+    endian = "<"
+    if binary:
+        one = stream.read_bytes(4)
+        endian = "<" if np.frombuffer(one, "<i4")[0] == 1 else ">"
+    stream.read_until(b"$EndMeshFormat")
+    if version < 2 or 4 <= version < 4.1 or version >= 5:
+        raise MeshImportError(f"Unsupported Gmsh format {version}; export as 2.2 or 4.1")
+    return version, binary, endian
+
+
+def _read_physical_names(stream: MeshStream) -> Dict[Tuple[int, int], str]:
+    """Read ``$PhysicalNames`` as {(dimension, tag): name}."""
+    names = {}
+    for _ in range(int(stream.next_line())):
+        dim, tag, name = stream.next_line().split(maxsplit=2)
+        names[(int(dim), int(tag))] = name.strip(b'"').decode()
+    stream.read_until(b"$EndPhysicalNames")
+    return names
+
+
+def _read_nodes_v2(stream: MeshStream, binary: bool, endian: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Read format 2 ``$Nodes``; return (tags, coordinates)."""
+    n_nodes = int(stream.next_line())
+    if binary:
+        record = np.dtype([("tag", endian + "i4"), ("xyz", endian + "f8", 3)])
+        data = np.frombuffer(stream.read_bytes(n_nodes * record.itemsize), dtype=record)
+        tags, coordinates = data["tag"].astype(np.int64), data["xyz"].astype(np.float64)
+    else:
+        tags = np.empty(n_nodes, dtype=np.int64)
+        coordinates = np.empty((n_nodes, 3))
+        filled = 0
+        for block in stream.iter_lines(n_nodes):
+            values = np.fromstring(block, sep=" ").reshape(-1, 4)
+            tags[filled:filled + len(values)] = values[:, 0]
+            coordinates[filled:filled + len(values)] = values[:, 1:]
+            filled += len(values)
+    stream.read_until(b"$EndNodes")
+    return tags, coordinates
+
+
+def _read_elements_v2(stream: MeshStream, binary: bool, endian: str,
+                      elements: _GmshElements) -> None:
+    """Read format 2 ``$Elements``; the first tag of an element is its physical group."""
+    n_elements = int(stream.next_line())
+    if binary:
+        done = 0
+        while done < n_elements:
+            element_type, count, n_tags = stream.read_array(3, endian + "i4")
+            n_nodes = GMSH_ELEMENT_NODES.get(int(element_type))
+            if n_nodes is None:
+                raise MeshImportError(f"Unsupported Gmsh element type {element_type}")
+            data = stream.read_array(count * (1 + n_tags + n_nodes), endian + "i4")
+            data = data.astype(np.int64).reshape(count, -1)
+            groups = data[:, 1] if n_tags else np.zeros(count, dtype=np.int64)
+            elements.add(int(element_type), data[:, 1 + n_tags:], groups)
+            done += count
+    else:
+        for block in stream.iter_lines(n_elements):
+            data = np.fromstring(block, sep=" ", dtype=np.int64)
+            # Record length if a record started at every position
+            element_type = np.zeros(len(data), dtype=np.int64)
+            element_type[:-1] = np.clip(data[1:], 0, len(_NODE_COUNT_TABLE) - 1)
+            n_tags = np.zeros(len(data), dtype=np.int64)
+            n_tags[:-2] = data[2:]
+            starts = record_starts(3 + n_tags + _NODE_COUNT_TABLE[element_type])
+            for value in np.unique(data[starts + 1]):
+                selected = starts[data[starts + 1] == value]
+                n_nodes = GMSH_ELEMENT_NODES.get(int(value))
+                if n_nodes is None:
+                    raise MeshImportError(f"Unsupported Gmsh element type {value}")
+                tag_count = data[selected + 2]
+                groups = np.where(tag_count > 0, data[selected + 3], 0)
+                first_node = selected + 3 + tag_count
+                elements.add(int(value), data[first_node[:, None] + np.arange(n_nodes)], groups)
+    stream.read_until(b"$EndElements")
+
+
+def _read_entities_v4(stream: MeshStream, binary: bool, endian: str) -> Dict[Tuple[int, int], int]:
+    """Read format 4.1 ``$Entities`` as {(dimension, entity tag): physical group}."""
+    groups = {}
+    if binary:
+        counts = stream.read_array(4, endian + "u8")
+        for dim, count in enumerate(counts):
+            for _ in range(int(count)):
+                tag = int(stream.read_array(1, endian + "i4")[0])
+                stream.read_bytes(8 * (3 if dim == 0 else 6))
+                n_physical = int(stream.read_array(1, endian + "u8")[0])
+                physical = stream.read_array(n_physical, endian + "i4")
+                if dim > 0:
+                    n_bounding = int(stream.read_array(1, endian + "u8")[0])
+                    stream.read_bytes(4 * n_bounding)
+                groups[(dim, tag)] = int(physical[0]) if n_physical else 0
+    else:
+        counts = [int(v) for v in stream.next_line().split()]
+        for dim, count in enumerate(counts):
+            for _ in range(count):
+                values = stream.next_line().split()
+                column = 4 if dim == 0 else 7
+                n_physical = int(values[column])
+                groups[(dim, int(values[0]))] = int(values[column + 1]) if n_physical else 0
+    stream.read_until(b"$EndEntities")
+    return groups
+
+
+def _read_nodes_v4(stream: MeshStream, binary: bool, endian: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Read format 4.1 ``$Nodes``; return (tags, coordinates)."""
+    if binary:
+        n_blocks, n_nodes = (int(v) for v in stream.read_array(4, endian + "u8")[:2])
+    else:
+        n_blocks, n_nodes = (int(v) for v in stream.next_line().split()[:2])
+    tags = np.empty(n_nodes, dtype=np.int64)
+    coordinates = np.empty((n_nodes, 3))
+    filled = 0
+    for _ in range(n_blocks):
+        if binary:
+            dim, _, parametric = stream.read_array(3, endian + "i4")
+            count = int(stream.read_array(1, endian + "u8")[0])
+            width = 3 + (dim if parametric else 0)
+            tags[filled:filled + count] = stream.read_array(count, endian + "u8")
+            block = stream.read_array(count * width, endian + "f8").reshape(count, width)
+            coordinates[filled:filled + count] = block[:, :3]
+        else:
+            dim, _, parametric, count = (int(v) for v in stream.next_line().split())
+            start = filled
+            for chunk in stream.iter_lines(count):
+                values = np.fromstring(chunk, sep=" ", dtype=np.int64)
+                tags[start:start + len(values)] = values
+                start += len(values)
+            start = filled
+            for chunk in stream.iter_lines(count):
+                values = np.fromstring(chunk, sep=" ").reshape(-1, 3 + (dim if parametric else 0))
+                coordinates[start:start + len(values)] = values[:, :3]
+                start += len(values)
+        filled += count
+    stream.read_until(b"$EndNodes")
+    return tags, coordinates
+
+
+def _read_elements_v4(stream: MeshStream, binary: bool, endian: str,
+                      entity_groups: Dict[Tuple[int, int], int], elements: _GmshElements) -> None:
+    """Read format 4.1 ``$Elements``; the physical group comes from the entity."""
+    if binary:
+        n_blocks = int(stream.read_array(4, endian + "u8")[0])
+    else:
+        n_blocks = int(stream.next_line().split()[0])
+    for _ in range(n_blocks):
+        if binary:
+            dim, entity, element_type = (int(v) for v in stream.read_array(3, endian + "i4"))
+            count = int(stream.read_array(1, endian + "u8")[0])
+        else:
+            dim, entity, element_type, count = (int(v) for v in stream.next_line().split())
+        n_nodes = GMSH_ELEMENT_NODES.get(element_type)
+        if n_nodes is None:
+            raise MeshImportError(f"Unsupported Gmsh element type {element_type}")
+        if binary:
+            data = stream.read_array(count * (1 + n_nodes), endian + "u8").astype(np.int64)
+        else:
+            chunks = [np.fromstring(chunk, sep=" ", dtype=np.int64)
+                      for chunk in stream.iter_lines(count)]
+            data = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+        data = data.reshape(count, 1 + n_nodes)
+        elements.add(element_type, data[:, 1:], np.int64(entity_groups.get((dim, entity), 0)))
+    stream.read_until(b"$EndElements")
+
+
+def read_gmsh_mesh(file_path: str) -> PolyMesh:
+    """Read a 3D Gmsh mesh file (format 2.2 or 4.1) as a polyMesh.
+
+    Args:
+        file_path: Path to the ``.msh`` file
+
+    Returns:
+        The converted mesh, with one patch per physical surface group
+
+    Raises:
+        MeshImportError: If the file is malformed or uses an unsupported format
+    """
+    version, binary, endian = 2.2, False, "<"
+    physical_names: Dict[Tuple[int, int], str] = {}
+    entity_groups: Dict[Tuple[int, int], int] = {}
+    tags = coordinates = None
+    elements = _GmshElements()
+
+    logger.info(f"Reading Gmsh mesh {file_path}")
+    with MeshStream(file_path) as stream:
+        while True:
+            line = stream.read_line()
+            if line is None:
+                break
+            line = line.strip()
+            if not line.startswith(b"$"):
+                continue
+            section = line[1:].decode(errors="replace")
+            if section == "MeshFormat":
+                version, binary, endian = _read_format(stream)
+            elif section == "PhysicalNames":
+                physical_names = _read_physical_names(stream)
+            elif section == "Entities":
+                entity_groups = _read_entities_v4(stream, binary, endian)
+            elif section == "Nodes":
+                reader = _read_nodes_v4 if version >= 4 else _read_nodes_v2
+                tags, coordinates = reader(stream, binary, endian)
+            elif section == "Elements":
+                if version >= 4:
+                    _read_elements_v4(stream, binary, endian, entity_groups, elements)
+                else:
+                    _read_elements_v2(stream, binary, endian, elements)
+            else:
+                stream.read_until(f"$End{section}".encode())
+
+    if tags is None:
+        raise MeshImportError(f"No nodes found in {file_path}")
+
+    # Node tags may be sparse: map them to point indices
+    index = np.full(int(tags.max()) + 1, -1, dtype=np.int64)
+    index[tags] = np.arange(len(tags))
+    cells = {shape: index[np.concatenate(blocks)] for shape, blocks in elements.cells.items()
+             if blocks}
+
+    faces = face_patches = None
+    names: List[str] = []
+    if elements.faces:
+        faces = np.concatenate(elements.faces)
+        faces = np.where(faces >= 0, index[np.maximum(faces, 0)], -1)
+        groups = np.concatenate(elements.face_groups)
+        tagged = groups > 0
+        group_ids, face_patches = np.unique(groups[tagged], return_inverse=True)
+        faces = faces[tagged]
+        names = [physical_names.get((2, int(g)), f"patch{g}") for g in group_ids]
+    return cells_to_polymesh(coordinates, cells, faces, face_patches, names)
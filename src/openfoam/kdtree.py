@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 05:24:16 2026
+
+@author: adamp
+"""
+
+"""
+KD-tree over point clouds such as cell or face centres.
+
+The tree is built one depth at a time: the points of every node of a depth
+are split together at the midpoint of their node's longest axis, with a
+stable partition computed from cumulative sums, so each depth costs a few
+linear passes over the points. Nodes are stored as flat arrays holding the
+tight bounding box of their points. Nearest-neighbour queries run in
+batches of (query, node) pairs like the triangle hierarchy of ``bvh``, and
+batches are distributed over a thread pool (NumPy releases the GIL in the
+array kernels that dominate a query).
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import numpy as np
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Number of queries traversed together
+QUERY_CHUNK_SIZE = 1 << 15
+
+
+class PointKDTree:
+    """KD-tree for k-nearest-neighbour queries on a point cloud."""
+
+    def __init__(self, points: np.ndarray, leaf_size: int = 16) -> None:
+        """Build the tree.
+
+        Args:
+            points: Points of shape (N, 3)
+            leaf_size: Maximum number of points in a leaf node (coincident
+                points may exceed it)
+        """
+        self.points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 3)
+        self.leaf_size = max(int(leaf_size), 1)
+        self._build()
+
+    @property
+    def n_points(self) -> int:
+        """Number of points in the tree."""
+        return len(self.points)
+
+    @property
+    def n_nodes(self) -> int:
+        """Number of nodes in the tree."""
+        return len(self.node_child)
+
+    def _build(self) -> None:
+        """Build the node arrays breadth-first."""
+        n_points = len(self.points)
+        order = np.arange(n_points, dtype=np.int64)
+        starts = np.zeros(1 if n_points else 0, dtype=np.int64)
+        counts = np.full(len(starts), n_points, dtype=np.int64)
+        lows, highs, children, node_starts, node_counts = [], [], [], [], []
+        axes, splits = [], []
+        n_nodes = len(starts)
+
+        while len(starts):
+            first = np.cumsum(counts) - counts
+            positions = np.repeat(starts - first, counts) + np.arange(counts.sum())
+            ordered = order[positions]
+            coordinates = self.points[ordered]
+            low = np.minimum.reduceat(coordinates, first)
+            high = np.maximum.reduceat(coordinates, first)
+            lows.append(low)
+            highs.append(high)
+            node_starts.append(starts)
+            node_counts.append(counts)
+
+            extent = high - low
+            split = (counts > self.leaf_size) & (extent.max(axis=1) > 0)
+            child = np.full(len(starts), -1, dtype=np.int64)
+            child[split] = n_nodes + 2 * np.arange(np.count_nonzero(split))
+            children.append(child)
+            n_nodes += 2 * np.count_nonzero(split)
+            axis = np.argmax(extent[split], axis=1)
+            middle = 0.5 * (low[split] + high[split])[np.arange(len(axis)), axis]
+            node_axis = np.zeros(len(starts), dtype=np.int64)
+            node_split = np.zeros(len(starts))
+            node_axis[split], node_split[split] = axis, middle
+            axes.append(node_axis)
+            splits.append(node_split)
+            if not split.any():
+                break
+
+            # Stable partition of every split node at the midpoint of its longest axis;
+            # the tight box guarantees that both halves are non-empty
+            members = np.repeat(split, counts)
+            segment = np.repeat(np.cumsum(split) - 1, counts)[members]
+            left = coordinates[members, axis[segment]] <= middle[segment]
+
+            split_counts = counts[split]
+            split_first = np.cumsum(split_counts) - split_counts
+            left_before = np.cumsum(left) - left
+            n_left = np.add.reduceat(left, split_first).astype(np.int64)
+            left_rank = left_before - left_before[split_first][segment]
+            right_rank = np.arange(len(left)) - split_first[segment] - left_rank
+            local = np.where(left, left_rank, n_left[segment] + right_rank)
+            order[starts[split][segment] + local] = ordered[members]
+
+            starts = np.stack([starts[split], starts[split] + n_left], axis=1).ravel()
+            counts = np.stack([n_left, split_counts - n_left], axis=1).ravel()
+
+        self.order = order
+        self.node_min = np.concatenate(lows) if lows else np.zeros((0, 3))
+        self.node_max = np.concatenate(highs) if highs else np.zeros((0, 3))
+        no_labels = np.zeros(0, dtype=np.int64)
+        self.node_child = np.concatenate(children) if children else no_labels
+        self.node_start = np.concatenate(node_starts) if node_starts else no_labels
+        self.node_count = np.concatenate(node_counts) if node_counts else no_labels
+        self.node_axis = np.concatenate(axes) if axes else no_labels
+        self.node_split = np.concatenate(splits) if splits else np.zeros(0)
+        logger.debug(f"Built KD-tree with {self.n_nodes} nodes over {n_points} points")
+
+    def _box_distance2(self, points: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+        """Squared distance from points to node boxes (0 inside)."""
+        gap = np.maximum(np.maximum(self.node_min[nodes] - points,
+                                    points - self.node_max[nodes]), 0)
+        return np.sum(gap ** 2, axis=1)
+
+    def _query_chunk(self, points: np.ndarray, k: int,
+                     max_distance: float) -> Tuple[np.ndarray, np.ndarray]:
+        """k-nearest-neighbour search for one batch of query points."""
+        n = len(points)
+        best_d2 = np.full((n, k), np.inf)
+        best_index = np.full((n, k), -1, dtype=np.int64)
+        bound = np.full(n, max_distance ** 2)
+
+        def visit(queries, nodes):
+            counts = self.node_count[nodes]
+            first = np.cumsum(counts) - counts
+            local = np.arange(counts.sum()) - np.repeat(first, counts)
+            pair_query = np.repeat(queries, counts)
+            pair_point = self.order[np.repeat(self.node_start[nodes], counts) + local]
+            d2 = np.sum((self.points[pair_point] - points[pair_query]) ** 2, axis=1)
+            near = d2 < bound[pair_query]
+            pair_query, pair_point, d2 = pair_query[near], pair_point[near], d2[near]
+            if not len(pair_query):
+                return
+
+            if k == 1:
+                np.minimum.at(bound, pair_query, d2)
+                winner = d2 == bound[pair_query]
+                best_d2[pair_query[winner], 0] = d2[winner]
+                best_index[pair_query[winner], 0] = pair_point[winner]
+                return
+
+            # Merge with the current k best of the touched queries
+            touched = np.unique(pair_query)
+            pair_query = np.concatenate([np.repeat(touched, k), pair_query])
+            pair_point = np.concatenate([best_index[touched].ravel(), pair_point])
+            d2 = np.concatenate([best_d2[touched].ravel(), d2])
+            ranking = np.lexsort((d2, pair_query))
+            pair_query, pair_point, d2 = pair_query[ranking], pair_point[ranking], d2[ranking]
+            group_start = np.r_[0, np.flatnonzero(np.diff(pair_query)) + 1]
+            sizes = np.diff(np.r_[group_start, len(pair_query)])
+            rank = np.arange(len(pair_query)) - np.repeat(group_start, sizes)
+            keep = rank < k
+            best_d2[pair_query[keep], rank[keep]] = d2[keep]
+            best_index[pair_query[keep], rank[keep]] = pair_point[keep]
+            bound[touched] = np.minimum(bound[touched], best_d2[touched, k - 1])
+
+        # Descent along the split planes to the query's node holding at least k
+        # points gives a tight initial bound
+        nodes = np.zeros(n, dtype=np.int64)
+        path = [nodes.copy()]
+        active = np.flatnonzero(self.node_child[nodes] >= 0)
+        while len(active):
+            current = nodes[active]
+            child = self.node_child[current]
+            right = points[active, self.node_axis[current]] > self.node_split[current]
+            step = child + right
+            moved = self.node_count[step] >= k
+            active = active[moved]
+            nodes[active] = step[moved]
+            active = active[self.node_child[nodes[active]] >= 0]
+            path.append(nodes.copy())
+        visit(np.arange(n), nodes)
+        visited_start = self.node_start[nodes]
+        visited_stop = visited_start + self.node_count[nodes]
+
+        # Restart from the deepest node on the descent path whose box holds the
+        # search ball: no point outside its subtree can be closer
+        radius = np.sqrt(bound)[:, None]
+        restart = np.zeros(n, dtype=np.int64)
+        for level in path:
+            inside = np.all((points - radius >= self.node_min[level])
+                            & (points + radius <= self.node_max[level]), axis=1)
+            if not inside.any():
+                break
+            restart[inside] = level[inside]
+
+        queries, nodes = np.arange(n), restart
+        while len(queries):
+            keep = self._box_distance2(points[queries], nodes) < bound[queries]
+            queries, nodes = queries[keep], nodes[keep]
+            leaf = self.node_child[nodes] < 0
+            start = self.node_start[nodes]
+            fresh = leaf & ((start < visited_start[queries]) | (start >= visited_stop[queries]))
+            if fresh.any():
+                visit(queries[fresh], nodes[fresh])
+            child = self.node_child[nodes[~leaf]]
+            queries = np.repeat(queries[~leaf], 2)
+            nodes = np.stack([child, child + 1], axis=1).ravel()
+
+        return np.sqrt(best_d2), best_index
+
+    def query(self, points: np.ndarray, k: int = 1, max_distance: float = np.inf,
+              workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the k nearest tree points of every query point.
+
+        Args:
+            points: Query points, shape (M, 3)
+            k: Number of neighbours
+            max_distance: Search radius; missing neighbours get distance inf
+                and index -1
+            workers: Number of threads; the CPU count if None
+
+        Returns:
+            Distances and indices of shape (M, k), sorted by distance
+        """
+        if k < 1:
+            raise ValueError("Number of neighbours must be at least 1")
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        distances = np.full((len(points), k), np.inf)
+        indices = np.full((len(points), k), -1, dtype=np.int64)
+        if self.n_points == 0 or len(points) == 0:
+            return distances, indices
+
+        chunks = [slice(begin, min(begin + QUERY_CHUNK_SIZE, len(points)))
+                  for begin in range(0, len(points), QUERY_CHUNK_SIZE)]
+
+        def run(chunk):
+            distances[chunk], indices[chunk] = self._query_chunk(points[chunk], k, max_distance)
+
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(chunks) == 1:
+            for chunk in chunks:
+                run(chunk)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(run, chunks))
+        return distances, indices
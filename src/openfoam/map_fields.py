@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 06:12:37 2026
+
+@author: adamp
+"""
+
+"""
+Mapping of volume fields between meshes, replacing ``mapFields``.
+
+A KD-tree is built on the source cell centres and queried with the target
+cell centres once, giving interpolation stencils (nearest cell, or the k
+nearest cells with inverse-distance weights) that are then applied to every
+field as a gather and a weighted sum. Patch values are mapped the same way
+between the face centres of patches with matching names.
+"""
+import os
+import re
+import gzip
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.openfoam.polymesh import PolyMesh
+from src.openfoam.kdtree import PointKDTree
+from src.openfoam.fields import (VolField, FIELD_CLASSES, CONSTRAINT_PATCH_TYPES, BoundaryEntries,
+                                 field_path, parse_boundary, read_field, write_field,
+                                 time_directories)
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Supported interpolation methods
+MAPPING_METHODS = ("nearest", "inverse_distance")
+
+# Stencil size and distance exponent of inverse-distance weighting
+IDW_NEIGHBOURS = 4
+IDW_POWER = 2.0
+
+_CLASS_RE = re.compile(rb"\bclass\s+(\w+)\s*;")
+
+
+def interpolation_stencil(source_points: np.ndarray, target_points: np.ndarray,
+                          method: str = "nearest", neighbours: int = IDW_NEIGHBOURS,
+                          workers: Optional[int] = None,
+                          tree: Optional[PointKDTree] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Compute interpolation stencils from source points to target points.
+
+    Args:
+        source_points: Points carrying the values, shape (N, 3)
+        target_points: Points to interpolate to, shape (M, 3)
+        method: One of ``MAPPING_METHODS``
+        neighbours: Stencil size of inverse-distance weighting
+        workers: Number of query threads; the CPU count if None
+        tree: Prebuilt tree on the source points
+
+    Returns:
+        Source indices and weights, both of shape (M, k); weights sum to 1
+    """
+    if method not in MAPPING_METHODS:
+        raise ValueError(f"Unsupported mapping method: {method}")
+    tree = tree or PointKDTree(source_points)
+    k = 1 if method == "nearest" else max(1, min(int(neighbours), tree.n_points))
+    distances, indices = tree.query(target_points, k, workers=workers)
+    if k == 1:
+        return indices, np.ones(indices.shape)
+
+    # Coincident points take the source value exactly
+    with np.errstate(divide="ignore"):
+        weights = distances ** -IDW_POWER
+    exact = distances[:, 0] == 0
+    weights[exact] = 0
+    weights[exact, 0] = 1
+    weights /= weights.sum(axis=1, keepdims=True)
+    return indices, weights
+
+
+def apply_stencil(values: np.ndarray, indices: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Interpolate values with a stencil from ``interpolation_stencil``."""
+    values = np.asarray(values, dtype=np.float64)
+    if indices.shape[1] == 1:
+        return values[indices[:, 0]]
+    if values.ndim == 1:
+        return np.einsum("ij,ij->i", values[indices], weights)
+    return np.einsum("ijc,ij->ic", values[indices], weights)
+
+
+class MeshMapping:
+    """Interpolation stencils from a source mesh to a target mesh."""
+
+    def __init__(self, source: PolyMesh, target: PolyMesh, method: str = "nearest",
+                 neighbours: int = IDW_NEIGHBOURS, patch_map: Optional[Dict[str, str]] = None,
+                 workers: Optional[int] = None) -> None:
+        """Compute the cell and patch stencils.
+
+        Args:
+            source: Mesh the fields are defined on
+            target: Mesh the fields are mapped to
+            method: One of ``MAPPING_METHODS``
+            neighbours: Stencil size of inverse-distance weighting
+            patch_map: Source patch name of target patches whose names differ
+            workers: Number of query threads; the CPU count if None
+        """
+        self.source = source
+        self.target = target
+        self.method = method
+        self.cell_indices, self.cell_weights = interpolation_stencil(
+            source.cell_centres, target.cell_centres, method, neighbours, workers)
+
+        # Stencils between the face centres of corresponding patches
+        patch_map = patch_map or {}
+        source_patches = {patch.name: patch for patch in source.patches}
+        self.patch_sources: Dict[str, str] = {}
+        self.patch_stencils: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for patch in target.patches:
+            source_patch = source_patches.get(patch_map.get(patch.name, patch.name))
+            if source_patch is None or source_patch.n_faces == 0 or patch.n_faces == 0:
+                continue
+            self.patch_sources[patch.name] = source_patch.name
+            self.patch_stencils[patch.name] = interpolation_stencil(
+                source.face_centres[source_patch.face_slice],
+                target.face_centres[patch.face_slice], method, neighbours, workers)
+        logger.info(f"Mapping {source.n_cells} to {target.n_cells} cells ({method}), "
+                    f"{len(self.patch_stencils)} mapped patches")
+
+    def map_internal(self, values: np.ndarray) -> np.ndarray:
+        """Map cell values of the source mesh to the target cells."""
+        return apply_stencil(values, self.cell_indices, self.cell_weights)
+
+    def map_patch(self, patch: str, values: np.ndarray) -> np.ndarray:
+        """Map face values of the source patch of a target patch."""
+        indices, weights = self.patch_stencils[patch]
+        return apply_stencil(values, indices, weights)
+
+
+def patch_entries(boundary: BoundaryEntries, name: str) -> Optional[Dict]:
+    """Entries of a patch, also matching quoted regular expression keys."""
+    if name in boundary:
+        return boundary[name]
+    for key, entries in boundary.items():
+        if key.startswith('"') and re.fullmatch(key.strip('"'), name):
+            return entries
+    return None
+
+
+def map_field(mapping: MeshMapping, field: VolField,
+              target_field: Optional[VolField] = None) -> VolField:
+    """Map a field to the target mesh of a mapping.
+
+    Target patches with a source patch take the source boundary condition,
+    with nonuniform values mapped face by face. Other patches keep the
+    boundary condition of ``target_field`` (or get ``zeroGradient``).
+
+    Args:
+        mapping: The mesh mapping
+        field: Field on the source mesh
+        target_field: Existing field on the target mesh, if any
+
+    Returns:
+        The mapped field
+    """
+    if len(field.values) != mapping.source.n_cells:
+        raise ValueError(f"Field {field.name} has {len(field.values)} values for "
+                         f"{mapping.source.n_cells} source cells")
+    source_boundary = parse_boundary(field)
+    target_boundary = parse_boundary(target_field) if target_field is not None else {}
+    boundary: BoundaryEntries = {}
+    for patch in mapping.target.patches:
+        entries = None
+        if patch.type in CONSTRAINT_PATCH_TYPES:
+            entries = {"type": patch.type}
+        elif patch.name in mapping.patch_sources:
+            entries = patch_entries(source_boundary, mapping.patch_sources[patch.name])
+            if entries is not None:
+                entries = {key: mapping.map_patch(patch.name, value)
+                           if isinstance(value, np.ndarray) else value
+                           for key, value in entries.items()}
+        if entries is None:
+            entries = patch_entries(target_boundary, patch.name) or {"type": "zeroGradient"}
+        boundary[patch.name] = dict(entries)
+    return VolField(field.name, mapping.map_internal(field.values), field.dimensions, boundary,
+                    field.binary)
+
+
+def list_vol_fields(case_dir: str, time: str) -> List[str]:
+    """Return the names of the volume fields in a time directory."""
+    directory = os.path.join(case_dir, time)
+    names = []
+    for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            continue
+        opener = gzip.open if path.endswith(".gz") else open
+        try:
+            with opener(path, "rb") as f:
+                head = f.read(4096)
+        except OSError:
+            continue
+        match = _CLASS_RE.search(head)
+        if match and match.group(1).decode() in FIELD_CLASSES.values():
+            names.append(name[:-3] if name.endswith(".gz") else name)
+    return names
+
+
+def map_fields(source_case: str, target_case: str, fields: Optional[Sequence[str]] = None,
+               source_time: Optional[str] = None, target_time: str = "0",
+               method: str = "nearest", binary: Optional[bool] = None,
+               workers: Optional[int] = None) -> List[str]:
+    """Map the fields of a source case to a target case, like ``mapFields``.
+
+    Args:
+        source_case: Case directory holding the solution
+        target_case: Case directory with the new mesh
+        fields: Field names; all volume fields of the source time if None
+        source_time: Source time directory; the latest if None
+        target_time: Target time directory
+        method: One of ``MAPPING_METHODS``
+        binary: Whether to write binary; the source format if None
+        workers: Number of query threads; the CPU count if None
+
+    Returns:
+        Paths of the written fields
+    """
+    if source_time is None:
+        times = time_directories(source_case)
+        if not times:
+            raise FileNotFoundError(f"No time directories in {source_case}")
+        source_time = times[-1]
+    names = list(fields) if fields is not None else list_vol_fields(source_case, source_time)
+
+    source = PolyMesh.read(source_case)
+    target = PolyMesh.read(target_case)
+    mapping = MeshMapping(source, target, method, workers=workers)
+    paths = []
+    for name in names:
+        field = read_field(field_path(source_case, name, source_time), source.n_cells)
+        target_path = field_path(target_case, name, target_time)
+        target_field = None
+        if os.path.exists(target_path) or os.path.exists(target_path + ".gz"):
+            target_field = read_field(target_path, target.n_cells)
+        paths.append(write_field(target_case, map_field(mapping, field, target_field),
+                                 target_time, binary))
+    logger.info(f"Mapped {len(paths)} fields from {source_case} ({source_time}) to {target_case}")
+    return paths
@@ -0,0 +1,596 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 22:10:26 2026
+
+@author: adamp
+"""
+
+"""
+Shared pieces of the external mesh importers.
+
+Importers stream their files through a ``MeshStream`` and hand NumPy arrays
+to one of two converters: ``cells_to_polymesh`` for element-based formats
+(Gmsh, VTK), which generates and matches the faces of every cell, and
+``faces_to_polymesh`` for face-based formats (Fluent), which only orients and
+orders the faces. Both produce the upper-triangular face order OpenFOAM
+expects, with the boundary faces grouped by patch.
+"""
+import re
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.openfoam.foam_io import LABEL_DTYPE
+from src.openfoam.polymesh import PolyMesh, Patch, polygon_geometry, GEOMETRY_CHUNK_SIZE
+from src.openfoam.stl import mix64
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Bytes read from disk at a time
+STREAM_BLOCK_SIZE = 1 << 22
+
+# Number of cells whose volume sign decides the face orientation convention
+ORIENTATION_SAMPLE_CELLS = 1000
+
+# Outward faces of the supported cell shapes as local corner indices. Corners
+# follow the Gmsh/VTK order: the base polygon is counter-clockwise when seen
+# from the rest of the cell.
+CELL_SHAPE_FACES = {
+    "tet": [(0, 2, 1), (0, 1, 3), (1, 2, 3), (0, 3, 2)],
+    "pyramid": [(0, 3, 2, 1), (0, 1, 4), (1, 2, 4), (2, 3, 4), (3, 0, 4)],
+    "prism": [(0, 2, 1), (3, 4, 5), (0, 1, 4, 3), (1, 2, 5, 4), (2, 0, 3, 5)],
+    "hex": [(0, 3, 2, 1), (4, 5, 6, 7), (0, 1, 5, 4), (1, 2, 6, 5), (2, 3, 7, 6), (3, 0, 4, 7)],
+}
+
+# Number of corners of every cell shape
+CELL_SHAPE_SIZES = {"tet": 4, "pyramid": 5, "prism": 6, "hex": 8}
+
+# Corners spanning a positive-volume tetrahedron in a correctly ordered cell
+_CORNER_TETS = {"tet": (0, 1, 2, 3), "pyramid": (0, 1, 3, 4), "prism": (0, 1, 2, 3),
+                "hex": (0, 1, 3, 4)}
+
+# Corner permutations turning an inverted cell inside out
+_MIRRORS = {"tet": (0, 2, 1, 3), "pyramid": (0, 3, 2, 1, 4), "prism": (0, 2, 1, 3, 5, 4),
+            "hex": (0, 3, 2, 1, 4, 7, 6, 5)}
+
+_NON_SPACE_RE = re.compile(rb"\S")
+_TOKEN_RE = re.compile(rb"[^\s()]+")
+_GROUP_RE = re.compile(rb'[()"]')
+_QUOTE_RE = re.compile(rb'"')
+
+_HEX_DIGITS = np.full(256, -1, dtype=np.int8)
+_HEX_DIGITS[np.frombuffer(b"0123456789", dtype=np.uint8)] = np.arange(10)
+_HEX_DIGITS[np.frombuffer(b"abcdef", dtype=np.uint8)] = np.arange(10, 16)
+_HEX_DIGITS[np.frombuffer(b"ABCDEF", dtype=np.uint8)] = np.arange(10, 16)
+
+
+class MeshImportError(Exception):
+    """Exception raised for unreadable or unsupported mesh files."""
+    pass
+
+
+class MeshStream:
+    """Buffered binary reader that hands out lines, bytes and delimited blocks.
+
+    Only a block of the file is held in memory at a time, so sections of any
+    size can be consumed chunk by chunk.
+    """
+
+    def __init__(self, file_path: str, block_size: int = STREAM_BLOCK_SIZE) -> None:
+        """Open the file.
+
+        Args:
+            file_path: Path to the mesh file
+            block_size: Number of bytes read from disk at a time
+        """
+        self.file_path = file_path
+        self.block_size = block_size
+        self._file = open(file_path, "rb")
+        self._buffer = b""
+        self._pos = 0
+
+    def __enter__(self) -> "MeshStream":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the underlying file."""
+        self._file.close()
+
+    def _fill(self, n: int) -> bool:
+        """Make at least ``n`` bytes available; False if the file ends first."""
+        while len(self._buffer) - self._pos < n:
+            data = self._file.read(max(self.block_size, n))
+            if not data:
+                return False
+            self._buffer = self._buffer[self._pos:] + data
+            self._pos = 0
+        return True
+
+    def at_end(self) -> bool:
+        """Whether all bytes have been consumed."""
+        return not self._fill(1)
+
+    def peek(self, n: int = 1) -> bytes:
+        """Return the next ``n`` bytes without consuming them."""
+        self._fill(n)
+        return self._buffer[self._pos:self._pos + n]
+
+    def skip_whitespace(self) -> None:
+        """Consume whitespace."""
+        while self._fill(1):
+            match = _NON_SPACE_RE.search(self._buffer, self._pos)
+            if match:
+                self._pos = match.start()
+                return
+            self._pos = len(self._buffer)
+
+    def read_token(self) -> bytes:
+        """Consume and return the next token delimited by whitespace or parentheses."""
+        self.skip_whitespace()
+        self._fill(256)
+        match = _TOKEN_RE.match(self._buffer, self._pos)
+        if match is None:
+            return b""
+        self._pos = match.end()
+        return match.group()
+
+    def skip_group(self, depth: int = 1) -> None:
+        """Consume text up to the parenthesis closing ``depth`` open groups.
+
+        Parentheses inside double-quoted strings are ignored.
+        """
+        in_quote = False
+        while depth > 0:
+            if not self._fill(1):
+                raise MeshImportError(f"Unbalanced parentheses in {self.file_path}")
+            match = (_QUOTE_RE if in_quote else _GROUP_RE).search(self._buffer, self._pos)
+            if match is None:
+                self._pos = len(self._buffer)
+                continue
+            self._pos = match.end()
+            char = match.group()
+            if char == b'"':
+                in_quote = not in_quote
+            elif char == b"(":
+                depth += 1
+            else:
+                depth -= 1
+
+    def read_bytes(self, n: int) -> bytes:
+        """Consume exactly ``n`` bytes.
+
+        Raises:
+            MeshImportError: If the file ends first
+        """
+        if not self._fill(n):
+            raise MeshImportError(f"Unexpected end of file in {self.file_path}")
+        data = self._buffer[self._pos:self._pos + n]
+        self._pos += n
+        return data
+
+    def read_array(self, count: int, dtype: np.dtype) -> np.ndarray:
+        """Consume ``count`` binary values of ``dtype``, returned in native byte order."""
+        dtype = np.dtype(dtype)
+        values = np.frombuffer(self.read_bytes(count * dtype.itemsize), dtype=dtype)
+        return values.astype(dtype.newbyteorder("="))
+
+    def read_line(self) -> Optional[bytes]:
+        """Consume one line and return it without its end of line; None at the end of file."""
+        while True:
+            end = self._buffer.find(b"\n", self._pos)
+            if end >= 0:
+                line = self._buffer[self._pos:end]
+                self._pos = end + 1
+                return line.rstrip(b"\r")
+            if not self._fill(len(self._buffer) - self._pos + 1):
+                if self._pos >= len(self._buffer):
+                    return None
+                line = self._buffer[self._pos:]
+                self._pos = len(self._buffer)
+                return line.rstrip(b"\r")
+
+    def next_line(self) -> bytes:
+        """Return the next non-blank line, stripped.
+
+        Raises:
+            MeshImportError: If the file ends first
+        """
+        while True:
+            line = self.read_line()
+            if line is None:
+                raise MeshImportError(f"Unexpected end of file in {self.file_path}")
+            line = line.strip()
+            if line:
+                return line
+
+    def iter_lines(self, n: int) -> Iterator[bytes]:
+        """Consume ``n`` lines, yielded in blocks of whole lines."""
+        partial = b""
+        while n > 0:
+            if not self._fill(1):
+                if n == 1 and partial:
+                    yield partial
+                    return
+                raise MeshImportError(f"Unexpected end of file in {self.file_path}")
+            data = np.frombuffer(self._buffer, dtype=np.uint8)[self._pos:]
+            newlines = np.flatnonzero(data == 10)
+            if len(newlines) == 0:
+                partial += self._buffer[self._pos:]
+                self._pos = len(self._buffer)
+                continue
+            take = min(n, len(newlines))
+            end = self._pos + int(newlines[take - 1]) + 1
+            yield partial + self._buffer[self._pos:end]
+            partial = b""
+            self._pos = end
+            n -= take
+
+    def read_values(self, count: int, dtype: np.dtype = np.float64) -> np.ndarray:
+        """Consume ``count`` ASCII numbers written with a fixed number per line.
+
+        Raises:
+            MeshImportError: If the lines do not hold exactly ``count`` values
+        """
+        values = np.empty(count, dtype=dtype)
+        filled = 0
+        if count:
+            first = np.fromstring(self.next_line(), sep=" ", dtype=dtype)
+            if len(first) == 0 or len(first) > count:
+                raise MeshImportError(f"Malformed numeric block in {self.file_path}")
+            values[:len(first)] = first
+            filled = len(first)
+            for block in self.iter_lines(-(-(count - filled) // len(first))):
+                chunk = np.fromstring(block, sep=" ", dtype=dtype)
+                if filled + len(chunk) > count:
+                    break
+                values[filled:filled + len(chunk)] = chunk
+                filled += len(chunk)
+        if filled != count:
+            raise MeshImportError(f"Expected {count} values in {self.file_path}")
+        return values
+
+    def iter_until(self, delimiter: bytes) -> Iterator[bytes]:
+        """Consume data up to and including ``delimiter``, yielded in chunks.
+
+        Chunks end on a line break whenever the block contains one, so ASCII
+        records are never split between two chunks.
+        """
+        keep = len(delimiter) - 1
+        while True:
+            end = self._buffer.find(delimiter, self._pos)
+            if end >= 0:
+                if end > self._pos:
+                    yield self._buffer[self._pos:end]
+                self._pos = end + len(delimiter)
+                return
+            available = len(self._buffer) - self._pos
+            if available > self.block_size:
+                cut = self._buffer.rfind(b"\n", self._pos, len(self._buffer) - keep)
+                cut = cut + 1 if cut > self._pos else len(self._buffer) - keep
+                yield self._buffer[self._pos:cut]
+                self._pos = cut
+            available = len(self._buffer) - self._pos
+            self._fill(available + self.block_size)
+            if len(self._buffer) - self._pos == available:
+                raise MeshImportError(f"Missing {delimiter!r} in {self.file_path}")
+
+    def read_until(self, delimiter: bytes) -> bytes:
+        """Consume and return the data before ``delimiter``; the delimiter is consumed too."""
+        return b"".join(self.iter_until(delimiter))
+
+
+def parse_hex_ints(text: bytes) -> np.ndarray:
+    """Parse whitespace-separated hexadecimal integers without a Python loop.
+
+    Args:
+        text: ASCII text holding only hexadecimal numbers and separators
+
+    Returns:
+        Array of int64 values
+    """
+    digits = _HEX_DIGITS[np.frombuffer(text, dtype=np.uint8)]
+    is_digit = digits >= 0
+    if not is_digit.any():
+        return np.zeros(0, dtype=np.int64)
+    edges = np.diff(is_digit.view(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    position = np.flatnonzero(is_digit)
+    token_end = np.repeat(ends, ends - starts)
+    values = digits[position].astype(np.int64) << (4 * (token_end - 1 - position))
+    return np.add.reduceat(values, np.cumsum(ends - starts) - (ends - starts))
+
+
+def record_starts(lengths: np.ndarray) -> np.ndarray:
+    """Find the starts of consecutive variable-length records in a flat array.
+
+    Args:
+        lengths: Length of the record that would start at every position of
+            the flat array (only the values at true record starts matter)
+
+    Returns:
+        Start position of every record
+
+    Raises:
+        MeshImportError: If the records do not exactly fill the array
+    """
+    n = len(lengths)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    if np.any(lengths[:1] <= 0):
+        raise MeshImportError("Invalid record length")
+
+    # Fast path: records of a single length
+    size = int(lengths[0])
+    if n % size == 0 and np.all(lengths[::size] == size):
+        return np.arange(0, n, size, dtype=np.int64)
+
+    # Follow the chain of starts with pointer doubling: after k steps ``starts``
+    # holds the first 2**k records and ``jump`` skips 2**k records at once
+    jump = np.append(np.minimum(np.arange(n) + np.maximum(lengths, 1), n), n)
+    starts = np.zeros(1, dtype=np.int64)
+    while starts[-1] < n:
+        starts = np.concatenate([starts, jump[starts]])
+        jump = jump[jump]
+    starts = starts[starts < n]
+    if starts[-1] + lengths[starts[-1]] != n or np.any(lengths[starts] <= 0):
+        raise MeshImportError("Variable-length records do not match the data size")
+    return starts
+
+
+def take_faces(offsets: np.ndarray, face_points: np.ndarray,
+               order: np.ndarray,
+               reverse: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Reorder compact faces and optionally reverse some of them.
+
+    Args:
+        offsets: Face offsets into ``face_points``
+        face_points: Flat point labels
+        order: New order of the faces
+        reverse: Per new face, whether to reverse its points (the first point is kept)
+
+    Returns:
+        Tuple of (new offsets, new face points)
+    """
+    sizes = np.diff(offsets)[order]
+    new_offsets = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=new_offsets[1:])
+    face = np.repeat(np.arange(len(order)), sizes)
+    local = np.arange(new_offsets[-1]) - new_offsets[face]
+    if reverse is not None:
+        flip = reverse[face]
+        local[flip] = (sizes[face[flip]] - local[flip]) % sizes[face[flip]]
+    return new_offsets, face_points[offsets[order][face] + local]
+
+
+def _build_polymesh(points: np.ndarray, offsets: np.ndarray, face_points: np.ndarray,
+                    owner: np.ndarray, neighbour: np.ndarray, face_patch: np.ndarray,
+                    patch_names: Sequence[str], patch_types: Sequence[str]) -> PolyMesh:
+    """Order oriented faces OpenFOAM-style and assemble the mesh.
+
+    Internal faces (``neighbour >= 0``) are sorted by owner then neighbour,
+    boundary faces by patch then owner. Empty patches and unused points are
+    dropped.
+    """
+    internal = np.flatnonzero(neighbour >= 0)
+    internal = internal[np.lexsort((neighbour[internal], owner[internal]))]
+    boundary = np.flatnonzero(neighbour < 0)
+    boundary = boundary[np.lexsort((owner[boundary], face_patch[boundary]))]
+    order = np.concatenate([internal, boundary])
+    offsets, face_points = take_faces(offsets, face_points, order)
+
+    counts = np.bincount(face_patch[boundary], minlength=len(patch_names))
+    patches = []
+    start = len(internal)
+    for name, patch_type, count in zip(patch_names, patch_types, counts):
+        if count:
+            patches.append(Patch(name, patch_type, count, start))
+            start += count
+
+    used = np.zeros(len(points), dtype=bool)
+    used[face_points] = True
+    renumber = (np.cumsum(used) - 1).astype(LABEL_DTYPE)
+    mesh = PolyMesh(points[used], offsets, renumber[face_points], owner[order],
+                    neighbour[internal], patches)
+    logger.info(f"Converted mesh: {mesh.n_cells} cells, {mesh.n_faces} faces, "
+                f"{len(patches)} patches")
+    return mesh
+
+
+def _sorted_face_keys(rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sort padded face rows by point set and hash them.
+
+    Returns:
+        Tuple of (rows with sorted labels, 64-bit key per row)
+    """
+    rows = np.sort(rows, axis=1)
+    keys = mix64(rows[:, 0].astype(np.uint64))
+    for column in range(1, rows.shape[1]):
+        keys ^= rows[:, column].astype(np.uint64)
+        mix64(keys)
+    return rows, keys
+
+
+def _fix_inverted_cells(points: np.ndarray, shape: str, cells: np.ndarray) -> int:
+    """Reorder the corners of inverted cells in place; return how many were fixed."""
+    a, b, c, d = _CORNER_TETS[shape]
+    mirror = list(_MIRRORS[shape])
+    n_fixed = 0
+    for start in range(0, len(cells), GEOMETRY_CHUNK_SIZE):
+        chunk = cells[start:start + GEOMETRY_CHUNK_SIZE]
+        origin = points[chunk[:, a]]
+        volume = np.einsum("ij,ij->i", np.cross(points[chunk[:, b]] - origin,
+                                                points[chunk[:, c]] - origin),
+                           points[chunk[:, d]] - origin)
+        inverted = volume < 0
+        chunk[inverted] = chunk[inverted][:, mirror]
+        n_fixed += int(np.count_nonzero(inverted))
+    return n_fixed
+
+
+def cells_to_polymesh(points: np.ndarray, cells: Dict[str, np.ndarray],
+                      boundary_faces: Optional[np.ndarray] = None,
+                      boundary_patches: Optional[np.ndarray] = None,
+                      patch_names: Sequence[str] = (), patch_types: Optional[Sequence[str]] = None,
+                      default_patch: str = "defaultFaces") -> PolyMesh:
+    """Convert an element mesh (tets, pyramids, prisms, hexes) to a polyMesh.
+
+    The faces of every cell are generated from the shape templates and
+    matched by a hash of their sorted point labels: faces found twice are
+    internal, faces found once are boundary faces. Boundary faces are
+    assigned to the patch of the matching entry of ``boundary_faces``, or to
+    ``default_patch`` if they have none. Cells are numbered by shape in the
+    order of ``cells``.
+
+    Args:
+        points: Point coordinates, shape (nPoints, 3)
+        cells: Corner labels per shape name (``tet``, ``pyramid``, ``prism``, ``hex``)
+        boundary_faces: Point labels of tagged boundary faces, shape (n, 3) or (n, 4)
+            with -1 padding for triangles
+        boundary_patches: Patch index of every boundary face
+        patch_names: Name of every patch index
+        patch_types: OpenFOAM type of every patch; ``patch`` if None
+        default_patch: Name of the patch collecting untagged boundary faces
+
+    Returns:
+        The converted mesh
+
+    Raises:
+        MeshImportError: If a face is shared by more than two cells
+    """
+    points = np.asarray(points, dtype=np.float64)
+    rows, face_cell = [], []
+    first_cell = 0
+    for shape, connectivity in cells.items():
+        if shape not in CELL_SHAPE_FACES:
+            raise MeshImportError(f"Unsupported cell shape: {shape}")
+        connectivity = np.ascontiguousarray(connectivity, dtype=LABEL_DTYPE)
+        if len(connectivity) == 0:
+            continue
+        n_fixed = _fix_inverted_cells(points, shape, connectivity)
+        if n_fixed:
+            logger.info(f"Reordered {n_fixed} inverted {shape} cells")
+        cell_ids = np.arange(first_cell, first_cell + len(connectivity), dtype=LABEL_DTYPE)
+        for face in CELL_SHAPE_FACES[shape]:
+            block = np.full((len(connectivity), 4), -1, dtype=LABEL_DTYPE)
+            block[:, :len(face)] = connectivity[:, face]
+            rows.append(block)
+            face_cell.append(cell_ids)
+        first_cell += len(connectivity)
+    if not rows:
+        raise MeshImportError("The mesh contains no volume cells")
+    rows = np.concatenate(rows)
+    face_cell = np.concatenate(face_cell)
+
+    # Match faces: equal point sets are adjacent after sorting by key
+    sorted_rows, keys = _sorted_face_keys(rows)
+    order = np.argsort(keys)
+    same = keys[order[1:]] == keys[order[:-1]]
+    if not np.array_equal(sorted_rows[order[1:]][same], sorted_rows[order[:-1]][same]):
+        logger.debug("Face hash collision, matching faces by exact comparison")
+        order = np.lexsort(sorted_rows.T[::-1])
+        same = np.all(sorted_rows[order[1:]] == sorted_rows[order[:-1]], axis=1)
+    if np.any(same[1:] & same[:-1]):
+        raise MeshImportError("A face is shared by more than two cells")
+    first, second = order[:-1][same], order[1:][same]
+    del sorted_rows
+
+    # Internal faces keep the orientation of the lower-numbered cell
+    swap = face_cell[first] > face_cell[second]
+    first[swap], second[swap] = second[swap], first[swap]
+    if np.any(face_cell[first] == face_cell[second]):
+        raise MeshImportError("A cell has two identical faces")
+    is_boundary = np.ones(len(rows), dtype=bool)
+    is_boundary[first] = False
+    is_boundary[second] = False
+    boundary = np.flatnonzero(is_boundary)
+
+    # Assign boundary faces to the patches of the tagged faces
+    patch_names = list(patch_names)
+    patch_types = list(patch_types or ["patch"] * len(patch_names))
+    face_patch = np.full(len(boundary), len(patch_names), dtype=np.int64)
+    if boundary_faces is not None and len(boundary_faces):
+        tagged = np.full((len(boundary_faces), 4), -1, dtype=LABEL_DTYPE)
+        tagged[:, :np.shape(boundary_faces)[1]] = boundary_faces
+        tagged_rows, tagged_keys = _sorted_face_keys(tagged)
+        tagged_order = np.argsort(tagged_keys)
+        free_rows, free_keys = _sorted_face_keys(rows[boundary])
+        index = np.minimum(np.searchsorted(tagged_keys[tagged_order], free_keys),
+                           len(tagged_order) - 1)
+        match = tagged_order[index]
+        found = (tagged_keys[match] == free_keys) & np.all(tagged_rows[match] == free_rows, axis=1)
+        face_patch[found] = np.asarray(boundary_patches)[match[found]]
+    if np.any(face_patch == len(patch_names)):
+        logger.info(f"{np.count_nonzero(face_patch == len(patch_names))} untagged boundary "
+                    f"faces put in patch {default_patch}")
+    patch_names.append(default_patch)
+    patch_types.append("patch")
+
+    faces = np.concatenate([first, boundary])
+    rows = rows[faces]
+    sizes = np.count_nonzero(rows >= 0, axis=1)
+    offsets = np.zeros(len(faces) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    owner = face_cell[faces]
+    neighbour = np.concatenate([face_cell[second], np.full(len(boundary), -1, dtype=LABEL_DTYPE)])
+    all_patches = np.concatenate([np.full(len(first), -1, dtype=np.int64), face_patch])
+    return _build_polymesh(points, offsets, rows[rows >= 0], owner, neighbour, all_patches,
+                           patch_names, patch_types)
+
+
+def faces_to_polymesh(points: np.ndarray, offsets: np.ndarray, face_points: np.ndarray,
+                      cell_a: np.ndarray, cell_b: np.ndarray, face_patch: np.ndarray,
+                      patch_names: Sequence[str], patch_types: Sequence[str]) -> PolyMesh:
+    """Convert a face-based mesh (faces with the cells on either side) to a polyMesh.
+
+    Formats differ in whether face normals point into or out of ``cell_a``,
+    so the convention is detected from the signed volumes of a sample of
+    cells. Every face is then reversed as needed to point out of its owner,
+    the lower-numbered of its cells.
+
+    Args:
+        points: Point coordinates, shape (nPoints, 3)
+        offsets: Face offsets into ``face_points``
+        face_points: Flat point labels
+        cell_a: First cell of every face (-1 for none)
+        cell_b: Second cell of every face (-1 for none)
+        face_patch: Patch index of every boundary face (ignored for internal faces)
+        patch_names: Name of every patch index
+        patch_types: OpenFOAM type of every patch
+
+    Returns:
+        The converted mesh
+    """
+    points = np.asarray(points, dtype=np.float64)
+    cell_a = np.asarray(cell_a, dtype=np.int64)
+    cell_b = np.asarray(cell_b, dtype=np.int64)
+    if np.any((cell_a < 0) & (cell_b < 0)):
+        raise MeshImportError("A face has no cell on either side")
+
+    # The convention holds for the whole file, so a sample of cells decides
+    # it: their signed volumes (divergence theorem) are positive if normals
+    # point out of cell_a
+    sampled_a = (cell_a >= 0) & (cell_a < ORIENTATION_SAMPLE_CELLS)
+    sampled_b = (cell_b >= 0) & (cell_b < ORIENTATION_SAMPLE_CELLS)
+    faces = np.flatnonzero(sampled_a | sampled_b)
+    area, centre = polygon_geometry(points, *take_faces(offsets, face_points, faces))
+    flux = np.einsum("ij,ij->i", area, centre)
+    volume = (np.bincount(cell_a[faces][sampled_a[faces]], flux[sampled_a[faces]],
+                          ORIENTATION_SAMPLE_CELLS)
+              - np.bincount(cell_b[faces][sampled_b[faces]], flux[sampled_b[faces]],
+                            ORIENTATION_SAMPLE_CELLS))
+    flip = np.count_nonzero(volume < 0) > np.count_nonzero(volume > 0)
+    logger.debug(f"Face normals point {'into' if flip else 'out of'} the first cell")
+
+    # Owner is the lower cell; reverse faces whose normal points into it
+    owner = np.where((cell_a >= 0) & ((cell_b < 0) | (cell_a < cell_b)), cell_a, cell_b)
+    neighbour = np.where((cell_a >= 0) & (cell_b >= 0),
+                         np.where(owner == cell_a, cell_b, cell_a), -1)
+    reverse = (owner == cell_a) == flip
+    offsets, face_points = take_faces(offsets, face_points, np.arange(len(owner)), reverse)
+    return _build_polymesh(points, offsets, face_points, owner, neighbour,
+                           np.asarray(face_patch, dtype=np.int64), patch_names, patch_types)
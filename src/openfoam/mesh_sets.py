@@ -0,0 +1,515 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 02:05:44 2026
+
+@author: adamp
+"""
+
+"""
+Cell, face and point sets and zones stored as packed bitmaps.
+
+OpenFOAM stores sets (``constant/polyMesh/sets``) and zones as label lists,
+which cost 4 to 8 bytes per member and need sorting or hashing to combine.
+Here a set over ``size`` elements is one bit per element, so union,
+intersection and difference are single bitwise operations over
+``size / 8`` bytes, and membership tests and counts are vectorized.
+Labels and ranges are set directly in the packed bitmap, and conversions
+back to labels and ranges work chunk by chunk, so sets over 100M-cell
+meshes only expand to a full boolean mask through ``from_mask`` and
+``mask``.
+"""
+import os
+import re
+import gzip
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.openfoam.foam_io import (
+    LABEL_DTYPE, FoamFileError, read_foam_file, resolve_path, header_is_binary, header_dtypes,
+    parse_list, _skip_comments, open_foam_file, write_list, foam_footer
+)
+from src.openfoam.polymesh import PolyMesh
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Element kinds and the OpenFOAM classes of their sets and zones
+SET_CLASSES = {"cell": "cellSet", "face": "faceSet", "point": "pointSet"}
+ZONE_FILES = {"cell": "cellZones", "face": "faceZones", "point": "pointZones"}
+
+# Number of bitmap bytes expanded at a time when converting to labels or ranges
+BITMAP_CHUNK_BYTES = 1 << 20
+
+# Number of labels set or cleared in a bitmap at a time
+LABEL_CHUNK_SIZE = 1 << 20
+
+# Number of set bits of every byte value
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+_SIZE_RE = {kind: re.compile(rf"n{kind.capitalize()}s:\s*(\d+)") for kind in SET_CLASSES}
+_TOKEN_RE = re.compile(rb"[^\s{};()]+")
+
+
+def _bit_masks(labels: np.ndarray) -> np.ndarray:
+    """Byte masks of the bits of labels, in ``np.packbits`` order."""
+    return np.right_shift(np.uint8(0x80), (labels & 7).astype(np.uint8))
+
+
+def _set_labels(bits: np.ndarray, labels: np.ndarray, value: bool = True) -> None:
+    """Set or clear the bits of labels in a packed bitmap, chunk by chunk."""
+    for start in range(0, len(labels), LABEL_CHUNK_SIZE):
+        chunk = labels[start:start + LABEL_CHUNK_SIZE]
+        if value:
+            np.bitwise_or.at(bits, chunk >> 3, _bit_masks(chunk))
+        else:
+            np.bitwise_and.at(bits, chunk >> 3, ~_bit_masks(chunk))
+
+
+def _byte_masks(low: np.ndarray, high: np.ndarray) -> np.ndarray:
+    """Byte masks of the bit positions ``[low, high)`` of a byte, ``0 <= low < high <= 8``."""
+    return ((0xFF >> low) & (0xFF << (8 - high)) & 0xFF).astype(np.uint8)
+
+
+class MeshSet:
+    """A set of cells, faces or points of a mesh, stored as a packed bitmap.
+
+    Bit ``i`` of the set is bit ``7 - i % 8`` of byte ``i // 8``, the
+    ``np.packbits`` order. Padding bits of the last byte are always zero.
+    """
+
+    def __init__(self, name: str, kind: str, size: int, bits: Optional[np.ndarray] = None) -> None:
+        """Initialize the set.
+
+        Args:
+            name: Set name
+            kind: Element kind, ``cell``, ``face`` or ``point``
+            size: Number of elements of that kind in the mesh
+            bits: Packed bitmap of ``ceil(size / 8)`` bytes; empty set if None
+        """
+        if kind not in SET_CLASSES:
+            raise ValueError(f"Unknown set kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.size = int(size)
+        n_bytes = (self.size + 7) // 8
+        if bits is None:
+            bits = np.zeros(n_bytes, dtype=np.uint8)
+        elif len(bits) != n_bytes:
+            raise ValueError(f"Bitmap of {len(bits)} bytes does not match size {self.size}")
+        self.bits = np.ascontiguousarray(bits, dtype=np.uint8)
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_labels(cls, name: str, kind: str, size: int, labels: np.ndarray) -> "MeshSet":
+        """Create a set from element labels (in any order, duplicates allowed)."""
+        mesh_set = cls(name, kind, size)
+        _set_labels(mesh_set.bits, mesh_set._checked(labels))
+        return mesh_set
+
+    @classmethod
+    def from_mask(cls, name: str, kind: str, mask: np.ndarray) -> "MeshSet":
+        """Create a set from a boolean mask over all elements."""
+        mask = np.asarray(mask, dtype=bool)
+        return cls(name, kind, len(mask), np.packbits(mask))
+
+    @classmethod
+    def from_ranges(cls, name: str, kind: str, size: int, starts: np.ndarray,
+                    stops: np.ndarray) -> "MeshSet":
+        """Create a set from half-open label ranges ``[start, stop)`` (may overlap)."""
+        starts = np.asarray(starts, dtype=np.int64)
+        stops = np.asarray(stops, dtype=np.int64)
+        keep = stops > starts
+        order = np.argsort(starts[keep], kind="stable")
+        starts, stops = starts[keep][order], stops[keep][order]
+        if len(starts) == 0:
+            return cls(name, kind, size)
+        if starts[0] < 0 or stops.max() > size:
+            raise ValueError(f"Ranges out of bounds for a {kind} set of size {size}")
+
+        # Merge overlapping ranges into disjoint runs
+        reach = np.maximum.accumulate(stops)
+        first = np.ones(len(starts), dtype=bool)
+        first[1:] = starts[1:] > reach[:-1]
+        run_starts = starts[first]
+        run_stops = reach[np.append(np.flatnonzero(first)[1:] - 1, len(starts) - 1)]
+
+        # Bytes strictly inside a run are full; the end bytes of runs are partial
+        first_byte, last_byte = run_starts >> 3, (run_stops - 1) >> 3
+        inner = last_byte > first_byte + 1
+        delta = np.zeros((size + 7) // 8 + 1, dtype=np.int8)
+        np.add.at(delta, first_byte[inner] + 1, 1)
+        np.add.at(delta, last_byte[inner], -1)
+        bits = np.cumsum(delta[:-1], dtype=np.int8).view(np.uint8)
+        bits *= np.uint8(0xFF)
+        mesh_set = cls(name, kind, size, bits)
+        same = first_byte == last_byte
+        low, high = run_starts & 7, ((run_stops - 1) & 7) + 1
+        np.bitwise_or.at(mesh_set.bits, first_byte,
+                         _byte_masks(low, np.where(same, high, 8)))
+        np.bitwise_or.at(mesh_set.bits, last_byte[~same], _byte_masks(0, high[~same]))
+        return mesh_set
+
+    def _checked(self, labels: np.ndarray) -> np.ndarray:
+        """Labels as int64, raising ValueError if any is out of range."""
+        labels = np.asarray(labels, dtype=np.int64).ravel()
+        if len(labels) and (labels.min() < 0 or labels.max() >= self.size):
+            raise ValueError(f"Labels out of range for a {self.kind} set of size {self.size}")
+        return labels
+
+    def _new(self, bits: np.ndarray, name: Optional[str] = None) -> "MeshSet":
+        """Create a set of the same kind and size from a bitmap."""
+        return MeshSet(name or self.name, self.kind, self.size, bits)
+
+    def copy(self, name: Optional[str] = None) -> "MeshSet":
+        """Return a copy of the set, optionally renamed."""
+        return self._new(self.bits.copy(), name)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        """Number of elements in the set."""
+        return int(_POPCOUNT[self.bits].sum(dtype=np.int64))
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the bitmap."""
+        return self.bits.nbytes
+
+    def contains(self, labels: np.ndarray) -> np.ndarray:
+        """Return whether each label is in the set."""
+        labels = np.asarray(labels, dtype=np.int64)
+        return (self.bits[labels >> 3] >> (7 - (labels & 7)).astype(np.uint8) & 1).astype(bool)
+
+    def _chunks(self):
+        """Yield (first label, boolean mask) over bounded-size pieces of the set."""
+        for start in range(0, len(self.bits), BITMAP_CHUNK_BYTES):
+            first = 8 * start
+            count = min(8 * BITMAP_CHUNK_BYTES, self.size - first)
+            yield first, np.unpackbits(self.bits[start:start + BITMAP_CHUNK_BYTES],
+                                       count=count).view(bool)
+
+    def labels(self) -> np.ndarray:
+        """Return the sorted labels of the set."""
+        pieces = [np.flatnonzero(mask) + first for first, mask in self._chunks()]
+        return np.concatenate(pieces).astype(LABEL_DTYPE) if pieces else np.zeros(0, LABEL_DTYPE)
+
+    def mask(self) -> np.ndarray:
+        """Return the set as a boolean mask over all elements (one byte per element)."""
+        return np.unpackbits(self.bits, count=self.size).view(bool)
+
+    def ranges(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the set as run-length encoded half-open ranges.
+
+        Returns:
+            Tuple of (starts, stops), both sorted
+        """
+        starts, stops = [], []
+        previous = False
+        for first, mask in self._chunks():
+            change = np.flatnonzero(np.diff(mask, prepend=previous)) + first
+            # Changes alternate between run starts and run stops
+            starts.append(change[0 if not previous else 1::2])
+            stops.append(change[1 if not previous else 0::2])
+            if len(mask):
+                previous = bool(mask[-1])
+        starts = np.concatenate(starts) if starts else np.zeros(0, dtype=np.int64)
+        stops = np.concatenate(stops) if stops else np.zeros(0, dtype=np.int64)
+        if previous:
+            stops = np.append(stops, self.size)
+        return starts, stops
+
+    # ------------------------------------------------------------------
+    # Set operations
+    # ------------------------------------------------------------------
+
+    def _check_compatible(self, other: "MeshSet") -> None:
+        """Raise ValueError unless both sets are over the same elements."""
+        if other.kind != self.kind or other.size != self.size:
+            raise ValueError(f"Cannot combine {self.kind} set of size {self.size} with "
+                             f"{other.kind} set of size {other.size}")
+
+    def union(self, other: "MeshSet") -> "MeshSet":
+        """Elements in either set."""
+        self._check_compatible(other)
+        return self._new(self.bits | other.bits)
+
+    def intersection(self, other: "MeshSet") -> "MeshSet":
+        """Elements in both sets."""
+        self._check_compatible(other)
+        return self._new(self.bits & other.bits)
+
+    def difference(self, other: "MeshSet") -> "MeshSet":
+        """Elements in this set but not the other."""
+        self._check_compatible(other)
+        return self._new(self.bits & ~other.bits)
+
+    def symmetric_difference(self, other: "MeshSet") -> "MeshSet":
+        """Elements in exactly one of the sets."""
+        self._check_compatible(other)
+        return self._new(self.bits ^ other.bits)
+
+    def invert(self) -> "MeshSet":
+        """All elements not in the set."""
+        bits = ~self.bits
+        if self.size % 8:
+            bits[-1] &= np.uint8(0xFF << (8 - self.size % 8) & 0xFF)
+        return self._new(bits)
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+    __xor__ = symmetric_difference
+    __invert__ = invert
+
+    def __eq__(self, other: object) -> bool:
+        return (isinstance(other, MeshSet) and other.kind == self.kind
+                and other.size == self.size and np.array_equal(other.bits, self.bits))
+
+    def add(self, labels: np.ndarray) -> None:
+        """Add elements to the set in place."""
+        _set_labels(self.bits, self._checked(labels))
+
+    def remove(self, labels: np.ndarray) -> None:
+        """Remove elements from the set in place."""
+        _set_labels(self.bits, self._checked(labels), value=False)
+
+    def __repr__(self) -> str:
+        return f"MeshSet({self.name!r}, {self.kind!r}, {len(self)}/{self.size})"
+
+
+class MeshZone(MeshSet):
+    """A cell, face or point zone; face zones also carry a flip map."""
+
+    def __init__(self, name: str, kind: str, size: int, bits: Optional[np.ndarray] = None,
+                 flip: Optional[MeshSet] = None) -> None:
+        """Initialize the zone.
+
+        Args:
+            name: Zone name
+            kind: Element kind, ``cell``, ``face`` or ``point``
+            size: Number of elements of that kind in the mesh
+            bits: Packed bitmap of the members
+            flip: Faces of a face zone whose orientation is flipped
+        """
+        super().__init__(name, kind, size, bits)
+        self.flip = flip if flip is not None else MeshSet(name, kind, size)
+
+    @classmethod
+    def from_set(cls, mesh_set: MeshSet, name: Optional[str] = None,
+                 flip: Optional[MeshSet] = None) -> "MeshZone":
+        """Create a zone from a set, e.g. the result of set operations."""
+        return cls(name or mesh_set.name, mesh_set.kind, mesh_set.size, mesh_set.bits.copy(), flip)
+
+    def __repr__(self) -> str:
+        return f"MeshZone({self.name!r}, {self.kind!r}, {len(self)}/{self.size})"
+
+
+def mesh_sizes(case_dir: str, region: Optional[str] = None) -> Dict[str, int]:
+    """Return the cell, face and point counts of a case's mesh.
+
+    Only the header of the owner file is read, so this is cheap even for
+    very large meshes.
+
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+        region: Optional mesh region name
+
+    Returns:
+        Dictionary mapping ``cell``, ``face`` and ``point`` to their counts
+
+    Raises:
+        FoamFileError: If the owner header has no size note
+    """
+    path = resolve_path(os.path.join(PolyMesh.poly_mesh_dir(case_dir, region), "owner"))
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        head = f.read(4096).decode(errors="replace")
+    sizes = {}
+    for kind, pattern in _SIZE_RE.items():
+        match = pattern.search(head)
+        if not match:
+            raise FoamFileError(f"No n{kind.capitalize()}s note in {path}")
+        sizes[kind] = int(match.group(1))
+    return sizes
+
+
+def _sets_dir(case_dir: str, region: Optional[str] = None) -> str:
+    """Return the sets directory of a case."""
+    return os.path.join(PolyMesh.poly_mesh_dir(case_dir, region), "sets")
+
+
+def list_mesh_sets(case_dir: str, region: Optional[str] = None) -> List[str]:
+    """Return the names of the sets stored in a case."""
+    sets_dir = _sets_dir(case_dir, region)
+    if not os.path.isdir(sets_dir):
+        return []
+    return sorted(name[:-3] if name.endswith(".gz") else name for name in os.listdir(sets_dir))
+
+
+def read_mesh_set(case_dir: str, name: str, sizes: Dict[str, int],
+                  region: Optional[str] = None) -> MeshSet:
+    """Read a cellSet, faceSet or pointSet.
+
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+        name: Set name
+        sizes: Element counts of the mesh, see ``mesh_sizes``
+        region: Optional mesh region name
+
+    Returns:
+        The set
+
+    Raises:
+        FoamFileError: If the file is not a set
+    """
+    header, body = read_foam_file(os.path.join(_sets_dir(case_dir, region), name))
+    kinds = {set_class: kind for kind, set_class in SET_CLASSES.items()}
+    kind = kinds.get(header.get("class", ""))
+    if kind is None:
+        raise FoamFileError(f"{name} is not a cell, face or point set")
+    label_dtype, _ = header_dtypes(header)
+    labels, _ = parse_list(body, 0, label_dtype, 1, header_is_binary(header))
+    return MeshSet.from_labels(name, kind, sizes[kind], labels)
+
+
+def write_mesh_set(case_dir: str, mesh_set: MeshSet, binary: bool = False,
+                   region: Optional[str] = None) -> str:
+    """Write a set to ``constant/polyMesh/sets``.
+
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+        mesh_set: The set
+        binary: Whether to write the labels in binary
+        region: Optional mesh region name
+
+    Returns:
+        Path of the written file
+    """
+    sets_dir = _sets_dir(case_dir, region)
+    file_path = os.path.join(sets_dir, mesh_set.name)
+    location = os.path.relpath(sets_dir, case_dir).replace(os.sep, "/")
+    with open_foam_file(file_path, SET_CLASSES[mesh_set.kind], mesh_set.name,
+                        location, binary) as f:
+        write_list(f, mesh_set.labels(), binary)
+        f.write(foam_footer().encode())
+    return file_path
+
+
+def _read_token(body: bytes, pos: int) -> Tuple[bytes, int]:
+    """Read the next word after whitespace and comments."""
+    pos = _skip_comments(body, pos)
+    match = _TOKEN_RE.match(body, pos)
+    if not match:
+        raise FoamFileError(f"Expected a word at byte {pos}")
+    return match.group(), match.end()
+
+
+def read_zones(case_dir: str, kind: str, sizes: Dict[str, int],
+               region: Optional[str] = None) -> List[MeshZone]:
+    """Read the cellZones, faceZones or pointZones of a case.
+
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+        kind: Zone kind, ``cell``, ``face`` or ``point``
+        sizes: Element counts of the mesh, see ``mesh_sizes``
+        region: Optional mesh region name
+
+    Returns:
+        The zones, in file order; empty if the case has no such zone file
+    """
+    file_path = os.path.join(PolyMesh.poly_mesh_dir(case_dir, region), ZONE_FILES[kind])
+    try:
+        header, body = read_foam_file(file_path)
+    except FileNotFoundError:
+        return []
+    binary = header_is_binary(header)
+    label_dtype, _ = header_dtypes(header)
+    labels_key = f"{kind}Labels".encode()
+
+    count, pos = _read_token(body, 0)
+    pos = _skip_comments(body, pos)
+    if body[pos:pos + 1] != b"(":
+        raise FoamFileError(f"Expected '(' in {file_path}")
+    pos += 1
+
+    zones = []
+    for _ in range(int(count)):
+        name, pos = _read_token(body, pos)
+        pos = _skip_comments(body, pos)
+        if body[pos:pos + 1] != b"{":
+            raise FoamFileError(f"Expected '{{' after zone {name.decode()} in {file_path}")
+        pos += 1
+        labels = np.zeros(0, dtype=np.int64)
+        flip = None
+        while True:
+            pos = _skip_comments(body, pos)
+            if body[pos:pos + 1] == b"}":
+                pos += 1
+                break
+            key, pos = _read_token(body, pos)
+            value_start = _skip_comments(body, pos)
+            if body.startswith(b"List<label>", value_start):
+                values, pos = parse_list(body, value_start + 11, label_dtype, 1, binary)
+            elif body.startswith(b"List<bool>", value_start):
+                values, pos = parse_list(body, value_start + 10, np.uint8, 1, binary)
+            else:
+                values = None
+                pos = body.index(b";", value_start)
+            if key == labels_key:
+                labels = values
+            elif key == b"flipMap":
+                flip = values
+            pos = body.index(b";", pos) + 1
+
+        zone = MeshZone.from_set(MeshSet.from_labels(name.decode(), kind, sizes[kind], labels))
+        if flip is not None and len(flip):
+            zone.flip = MeshSet.from_labels(zone.name, kind, sizes[kind], labels[flip != 0])
+        zones.append(zone)
+    return zones
+
+
+def write_zones(case_dir: str, kind: str, zones: List[MeshZone], binary: bool = False,
+                region: Optional[str] = None) -> str:
+    """Write the cellZones, faceZones or pointZones of a case.
+
+    Args:
+        case_dir: Path to the OpenFOAM case directory
+        kind: Zone kind, ``cell``, ``face`` or ``point``
+        zones: The zones, all of that kind
+        binary: Whether to write the label lists in binary
+        region: Optional mesh region name
+
+    Returns:
+        Path of the written file
+    """
+    mesh_dir = PolyMesh.poly_mesh_dir(case_dir, region)
+    file_path = os.path.join(mesh_dir, ZONE_FILES[kind])
+    location = os.path.relpath(mesh_dir, case_dir).replace(os.sep, "/")
+    with open_foam_file(file_path, "regIOobject", ZONE_FILES[kind], location, binary) as f:
+        f.write(f"{len(zones)}\n(\n".encode())
+        for zone in zones:
+            if zone.kind != kind:
+                raise ValueError(f"Zone {zone.name} is a {zone.kind} zone, not a {kind} zone")
+            labels = zone.labels()
+            f.write(f"{zone.name}\n{{\n    type {kind}Zone;\n"
+                    f"    {kind}Labels List<label> ".encode())
+            write_list(f, labels, binary)
+            f.write(b";\n")
+            if kind == "face":
+                flip = zone.flip.contains(labels)
+                f.write(b"    flipMap List<bool> ")
+                if binary:
+                    f.write(f"{len(flip)}\n(".encode() + flip.astype(np.uint8).tobytes() + b")")
+                else:
+                    write_list(f, flip.astype(LABEL_DTYPE), False)
+                f.write(b";\n")
+            f.write(b"}\n")
+        f.write(b")\n")
+        f.write(foam_footer().encode())
+    return file_path
@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 12:14:52 2026
+
+@author: adamp
+"""
+
+"""
+Proper orthogonal decomposition (POD) and dynamic mode decomposition (DMD)
+of field snapshots.
+
+Snapshots are copied once from the time directories into a memory-mapped
+``.npy`` matrix of shape (snapshots, cells x components), so the data can be
+far larger than memory. Both decompositions only need the volume-weighted
+correlation matrix of the snapshots (the method of snapshots), or its
+products with a few vectors (randomized eigendecomposition), which are
+accumulated over column chunks of bounded size as BLAS matrix products.
+Spatial modes are recovered with one more pass and written back as fields;
+they can be streamed to a memory-mapped file when they do not fit in memory.
+"""
+import os
+import json
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.openfoam.fields import (VolField, read_field, write_field, field_path, default_boundary,
+                                 time_directories)
+from src.openfoam.field_statistics import cached_cell_volumes
+from src.openfoam.polymesh import PolyMesh
+from src.utils.cache import ArrayCache
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Supported POD solvers
+POD_METHODS = ("snapshots", "randomized")
+
+# Memory budget of one chunk of snapshot columns in double precision
+CHUNK_BYTES = 1 << 28
+
+# Extra vectors and power iterations of the randomized eigendecomposition
+RANDOMIZED_OVERSAMPLING = 10
+RANDOMIZED_POWER_ITERATIONS = 2
+
+# Relative tolerance on the time step of DMD snapshots
+UNIFORM_STEP_TOLERANCE = 1e-3
+
+# Fraction of the snapshot energy kept by the default DMD rank, and its cap
+DMD_ENERGY_FRACTION = 0.9999
+DMD_MAX_RANK = 50
+
+
+def _sidecar_path(path: str, suffix: str) -> str:
+    """Path of a file stored next to a snapshot matrix."""
+    return os.path.splitext(path)[0] + suffix
+
+
+class SnapshotMatrix:
+    """Snapshots of one field as the rows of a (memory-mapped) matrix."""
+
+    def __init__(self, data: np.ndarray, times: Sequence[str], weights: np.ndarray,
+                 name: str = "U", width: int = 1, dimensions: str = "[0 0 0 0 0 0 0]") -> None:
+        """Wrap a snapshot matrix.
+
+        Args:
+            data: Snapshots of shape (snapshots, cells x components)
+            times: Time of each snapshot
+            weights: Weight of each column, the volume of its cell
+            name: Field name
+            width: Number of components per cell
+            dimensions: Dimension set of the field
+        """
+        if data.shape != (len(times), len(weights)):
+            raise ValueError(f"Snapshot matrix of shape {data.shape} does not match "
+                             f"{len(times)} times and {len(weights)} weights")
+        self.data = data
+        self.times = list(times)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.name = name
+        self.width = width
+        self.dimensions = dimensions
+
+    @property
+    def n_snapshots(self) -> int:
+        """Number of snapshots."""
+        return self.data.shape[0]
+
+    @property
+    def n_dof(self) -> int:
+        """Number of values per snapshot."""
+        return self.data.shape[1]
+
+    @classmethod
+    def build(cls, case_dir: str, name: str, path: str, times: Optional[Sequence[str]] = None,
+              dtype: np.dtype = np.float32, cache: Optional[ArrayCache] = None
+              ) -> "SnapshotMatrix":
+        """Copy the snapshots of a field into a memory-mapped ``.npy`` file.
+
+        Only one snapshot is held in memory at a time. The times, weights and
+        field description are stored next to the matrix for ``open``.
+
+        Args:
+            case_dir: Case directory
+            name: Field name
+            path: Path of the ``.npy`` file
+            times: Time directories; all those holding the field if None
+            dtype: Stored precision
+            cache: Cache of the cell volumes
+
+        Returns:
+            The memory-mapped matrix
+        """
+        if times is None:
+            times = [time for time in time_directories(case_dir)
+                     if os.path.exists(field_path(case_dir, name, time))
+                     or os.path.exists(field_path(case_dir, name, time) + ".gz")]
+        if not times:
+            raise ValueError(f"No snapshots of {name} in {case_dir}")
+        volumes = cached_cell_volumes(case_dir, cache)
+        first = read_field(field_path(case_dir, name, times[0]), len(volumes))
+        width = first.width
+        weights = np.repeat(volumes, width)
+
+        data = np.lib.format.open_memmap(path, mode="w+", dtype=dtype,
+                                         shape=(len(times), len(weights)))
+        for i, time in enumerate(times):
+            field = first if i == 0 else read_field(field_path(case_dir, name, time),
+                                                    len(volumes))
+            data[i] = field.values.ravel()
+        data.flush()
+        np.save(_sidecar_path(path, ".weights.npy"), weights)
+        with open(_sidecar_path(path, ".json"), "w") as f:
+            json.dump({"times": list(times), "name": name, "width": width,
+                       "dimensions": first.dimensions}, f)
+        logger.info(f"Built a {len(times)} x {len(weights)} snapshot matrix of {name} in {path}")
+        return cls(data, times, weights, name, width, first.dimensions)
+
+    @classmethod
+    def open(cls, path: str) -> "SnapshotMatrix":
+        """Open a matrix written by ``build``, memory-mapped."""
+        with open(_sidecar_path(path, ".json")) as f:
+            info = json.load(f)
+        weights = np.load(_sidecar_path(path, ".weights.npy"))
+        return cls(np.load(path, mmap_mode="r"), info["times"], weights, info["name"],
+                   info["width"], info["dimensions"])
+
+    def chunks(self) -> List[slice]:
+        """Column ranges whose double precision copy fits ``CHUNK_BYTES``."""
+        size = max(1, CHUNK_BYTES // (8 * max(self.n_snapshots, 1)))
+        return [slice(start, min(start + size, self.n_dof))
+                for start in range(0, self.n_dof, size)]
+
+    def _block(self, columns: slice, mean: Optional[np.ndarray]) -> np.ndarray:
+        """Columns of the snapshots in double precision, minus the mean."""
+        block = np.array(self.data[:, columns], dtype=np.float64)
+        if mean is not None:
+            block -= mean[columns]
+        return block
+
+    def mean(self) -> np.ndarray:
+        """Mean snapshot."""
+        mean = np.empty(self.n_dof)
+        for columns in self.chunks():
+            mean[columns] = self._block(columns, None).mean(axis=0)
+        return mean
+
+    def correlation(self, mean: Optional[np.ndarray] = None) -> np.ndarray:
+        """Weighted correlation matrix of the snapshots, (snapshots, snapshots)."""
+        correlation = np.zeros((self.n_snapshots, self.n_snapshots))
+        for columns in self.chunks():
+            block = self._block(columns, mean)
+            correlation += (block * self.weights[columns]) @ block.T
+        return correlation
+
+    def correlation_product(self, matrix: np.ndarray,
+                            mean: Optional[np.ndarray] = None) -> np.ndarray:
+        """Product of the correlation matrix with a matrix, without forming it."""
+        product = np.zeros((self.n_snapshots, matrix.shape[1]))
+        for columns in self.chunks():
+            block = self._block(columns, mean)
+            product += block @ (self.weights[columns, None] * (block.T @ matrix))
+        return product
+
+    def energy(self, mean: Optional[np.ndarray] = None) -> float:
+        """Total weighted energy of the snapshots, the trace of the correlation."""
+        total = 0.0
+        for columns in self.chunks():
+            total += float((np.square(self._block(columns, mean)) @ self.weights[columns]).sum())
+        return total
+
+    def combine(self, coefficients: np.ndarray, mean: Optional[np.ndarray] = None,
+                rows: slice = slice(None), path: Optional[str] = None) -> np.ndarray:
+        """Linear combinations of snapshots, ``X[rows].T @ coefficients``, transposed.
+
+        Args:
+            coefficients: Coefficients of shape (snapshots, k)
+            mean: Mean snapshot to subtract, if any
+            rows: Snapshots to combine
+            path: ``.npy`` file to stream the combinations to, chunk by chunk;
+                they are held in memory if None
+
+        Returns:
+            One combination per column of ``coefficients``, (k, cells x components),
+            memory-mapped if ``path`` is given
+        """
+        dtype = np.complex128 if np.iscomplexobj(coefficients) else np.float64
+        shape = (coefficients.shape[1], self.n_dof)
+        if path is None:
+            result = np.empty(shape, dtype=dtype)
+        else:
+            result = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+        for columns in self.chunks():
+            result[:, columns] = coefficients.T @ self._block(columns, mean)[rows]
+        if path is not None:
+            result.flush()
+        return result
+
+
+class PODResult:
+    """Energies, temporal coefficients and spatial modes of a POD."""
+
+    def __init__(self, eigenvalues: np.ndarray, energy: float, coefficients: np.ndarray,
+                 modes: np.ndarray, mean: Optional[np.ndarray]) -> None:
+        self.eigenvalues = eigenvalues
+        self.energy_fraction = eigenvalues / energy if energy > 0 else eigenvalues * 0
+        self.coefficients = coefficients
+        self.modes = modes
+        self.mean = mean
+
+
+class DMDResult:
+    """Eigenvalues, frequencies, amplitudes and modes of a DMD."""
+
+    def __init__(self, eigenvalues: np.ndarray, time_step: float, amplitudes: np.ndarray,
+                 modes: np.ndarray) -> None:
+        self.eigenvalues = eigenvalues
+        with np.errstate(divide="ignore"):
+            continuous = np.log(eigenvalues.astype(np.complex128)) / time_step
+        self.frequencies = continuous.imag / (2 * np.pi)
+        self.growth_rates = continuous.real
+        self.amplitudes = amplitudes
+        self.modes = modes
+
+
+def _symmetric_eigen(matrix: np.ndarray, n_modes: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Largest eigenvalues (non-negative) and eigenvectors of a symmetric matrix."""
+    eigenvalues, vectors = np.linalg.eigh(0.5 * (matrix + matrix.T))
+    order = np.argsort(eigenvalues)[::-1][:n_modes]
+    eigenvalues, vectors = np.maximum(eigenvalues[order], 0), vectors[:, order]
+    keep = eigenvalues > eigenvalues[:1].max(initial=0) * 1e-12
+    return eigenvalues[keep], vectors[:, keep]
+
+
+def pod(matrix: SnapshotMatrix, n_modes: int = 10, method: str = "snapshots",
+        subtract_mean: bool = True, seed: int = 0) -> PODResult:
+    """Proper orthogonal decomposition of a snapshot matrix.
+
+    Modes are orthonormal in the volume-weighted inner product and ordered
+    by energy; ``coefficients[:, i]`` is the time history of mode ``i``.
+
+    Args:
+        matrix: The snapshots
+        n_modes: Number of modes to compute
+        method: ``snapshots`` to eigendecompose the full correlation matrix,
+            or ``randomized`` to approximate the leading modes from a few
+            correlation products, for very many snapshots
+        subtract_mean: Whether to decompose the fluctuations about the mean
+        seed: Seed of the randomized method
+
+    Returns:
+        The decomposition
+    """
+    if method not in POD_METHODS:
+        raise ValueError(f"Unsupported POD method: {method}")
+    n_modes = max(1, min(n_modes, matrix.n_snapshots))
+    mean = matrix.mean() if subtract_mean else None
+    if method == "snapshots":
+        correlation = matrix.correlation(mean)
+        energy = float(np.trace(correlation))
+        eigenvalues, vectors = _symmetric_eigen(correlation, n_modes)
+    else:
+        rng = np.random.default_rng(seed)
+        size = min(n_modes + RANDOMIZED_OVERSAMPLING, matrix.n_snapshots)
+        basis = matrix.correlation_product(rng.standard_normal((matrix.n_snapshots, size)), mean)
+        for _ in range(RANDOMIZED_POWER_ITERATIONS):
+            basis = matrix.correlation_product(np.linalg.qr(basis)[0], mean)
+        basis = np.linalg.qr(basis)[0]
+        reduced = basis.T @ matrix.correlation_product(basis, mean)
+        eigenvalues, vectors = _symmetric_eigen(reduced, n_modes)
+        vectors = basis @ vectors
+        energy = matrix.energy(mean)
+
+    singular = np.sqrt(eigenvalues)
+    modes = matrix.combine(vectors / singular, mean)
+    logger.info(f"POD of {matrix.n_snapshots} snapshots of {matrix.name} ({method}): "
+                f"{len(eigenvalues)} modes with {eigenvalues.sum() / max(energy, 1e-300):.1%} "
+                f"of the energy")
+    return PODResult(eigenvalues, energy, vectors * singular, modes, mean)
+
+
+def dmd(matrix: SnapshotMatrix, rank: Optional[int] = None,
+        time_step: Optional[float] = None, energy_fraction: float = DMD_ENERGY_FRACTION,
+        modes_path: Optional[str] = None) -> DMDResult:
+    """Exact dynamic mode decomposition of equally spaced snapshots.
+
+    The reduced operator is assembled from the snapshot correlation matrix,
+    so the snapshots are read twice: once for the correlation, once for
+    the modes. The modes take ``16 x rank x cells x components`` bytes, so
+    the default rank is bounded and large decompositions should stream them
+    to ``modes_path``.
+
+    Args:
+        matrix: The snapshots
+        rank: Truncation rank of the projection; if None, the fewest modes
+            holding ``energy_fraction`` of the energy, at most ``DMD_MAX_RANK``
+        time_step: Snapshot spacing; taken from the snapshot times if None
+        energy_fraction: Energy kept by the default rank
+        modes_path: ``.npy`` file to write the modes to, memory-mapped;
+            they are held in memory if None
+
+    Returns:
+        The decomposition, with modes projected on the snapshots
+    """
+    if matrix.n_snapshots < 2:
+        raise ValueError("DMD needs at least two snapshots")
+    if time_step is None:
+        steps = np.diff(np.array(matrix.times, dtype=np.float64))
+        time_step = float(steps.mean())
+        if np.abs(steps - time_step).max() > UNIFORM_STEP_TOLERANCE * time_step:
+            raise ValueError("DMD needs equally spaced snapshots")
+
+    correlation = matrix.correlation()
+    if rank is None:
+        eigenvalues = _symmetric_eigen(correlation[:-1, :-1], matrix.n_snapshots - 1)[0]
+        cumulative = np.cumsum(eigenvalues) / max(eigenvalues.sum(), 1e-300)
+        rank = min(int(np.searchsorted(cumulative, energy_fraction)) + 1, DMD_MAX_RANK)
+    eigenvalues, vectors = _symmetric_eigen(correlation[:-1, :-1], rank)
+    singular = np.sqrt(eigenvalues)
+    projection = vectors / singular
+    reduced = projection.T @ correlation[:-1, 1:] @ projection
+    dmd_eigenvalues, reduced_modes = np.linalg.eig(reduced)
+
+    initial = projection.T @ correlation[:-1, 0]
+    amplitudes = np.linalg.lstsq(reduced_modes, initial, rcond=None)[0]
+    order = np.argsort(-np.abs(amplitudes))
+    modes = matrix.combine(projection @ reduced_modes[:, order], rows=slice(0, -1),
+                           path=modes_path)
+    logger.info(f"DMD of {matrix.n_snapshots} snapshots of {matrix.name}: "
+                f"{len(dmd_eigenvalues)} modes")
+    return DMDResult(dmd_eigenvalues[order], time_step, amplitudes[order], modes)
+
+
+def write_modes(case_dir: str, matrix: SnapshotMatrix, modes: np.ndarray, label: str,
+                time: Optional[str] = None, binary: bool = True) -> List[str]:
+    """Write modes as fields ``<field><label><i>``.
+
+    Complex modes are written as two fields with ``Re`` and ``Im`` suffixes.
+
+    Args:
+        case_dir: Case directory
+        matrix: The decomposed snapshots
+        modes: Modes of shape (modes, cells x components)
+        label: Name infix, e.g. ``POD`` or ``DMD``
+        time: Time directory; the last snapshot time if None
+        binary: Whether to write binary
+
+    Returns:
+        Paths of the written fields
+    """
+    time = time or matrix.times[-1]
+    boundary = default_boundary(PolyMesh.read_patches(case_dir))
+    shape = (-1, matrix.width) if matrix.width > 1 else (-1,)
+    paths = []
+    for i, mode in enumerate(modes):
+        parts = [("", mode)] if not np.iscomplexobj(mode) else [("Re", mode.real),
+                                                                ("Im", mode.imag)]
+        for suffix, values in parts:
+            field = VolField(f"{matrix.name}{label}{i}{suffix}", values.reshape(shape),
+                             boundary=boundary, binary=binary)
+            paths.append(write_field(case_dir, field, time, binary))
+    return paths
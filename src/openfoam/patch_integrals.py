@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 15:42:26 2026
+
+@author: adamp
+"""
+
+"""
+Patch integrals of forces, moments, fluxes and area averages, computed from
+the written fields instead of function objects configured before the run.
+
+Face area vectors, centres, normals and wall distances of the selected
+patches are gathered once into contiguous arrays with a segment per patch.
+Boundary values of all times are stacked into (times, faces) arrays, so
+every quantity of every patch at every time is a few batched products
+followed by one segmented sum.
+"""
+import os
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+
+from src.openfoam.fields import read_field, field_path, time_directories, CONSTRAINT_PATCH_TYPES
+from src.openfoam.derived_fields import boundary_face_values, read_viscosity, TURBULENT_VISCOSITY
+from src.openfoam.polymesh import PolyMesh
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Names of the force coefficient reference values
+COEFFICIENT_REFERENCES = ("lift_dir", "drag_dir", "pitch_axis", "mag_u_inf", "l_ref", "a_ref")
+
+_AXES = ("x", "y", "z")
+
+
+class PatchIntegrator:
+    """Geometry of a set of patches for batched surface integrals."""
+
+    def __init__(self, mesh: PolyMesh, patches: Optional[Sequence[str]] = None) -> None:
+        """Gather the face geometry of the patches.
+
+        Args:
+            mesh: The mesh
+            patches: Patch names; all non-constraint patches with faces if None
+        """
+        if patches is None:
+            patches = [patch.name for patch in mesh.patches
+                       if patch.type not in CONSTRAINT_PATCH_TYPES and patch.n_faces]
+        self.mesh = mesh
+        self.patches = list(patches)
+        selected = [mesh.patch(name) for name in self.patches]
+        self.faces = np.concatenate([np.arange(p.start_face, p.start_face + p.n_faces)
+                                     for p in selected]).astype(np.int64) if selected else \
+            np.zeros(0, dtype=np.int64)
+        self.counts = np.array([p.n_faces for p in selected], dtype=np.int64)
+        self.starts = np.cumsum(self.counts) - self.counts
+        self.boundary_index = self.faces - mesh.n_internal_faces
+        self.cells = mesh.owner[self.faces]
+        self.area_vectors = mesh.face_areas[self.faces]
+        self.areas = np.linalg.norm(self.area_vectors, axis=1)
+        self.normals = self.area_vectors / self.areas[:, None]
+        self.centres = mesh.face_centres[self.faces]
+        self.wall_distance = np.einsum("ij,ij->i", self.normals,
+                                       self.centres - mesh.cell_centres[self.cells])
+        self.patch_areas = self.integrate(self.areas)
+
+    def integrate(self, values: np.ndarray, axis: int = -1) -> np.ndarray:
+        """Sum face values over each patch.
+
+        Args:
+            values: Face values, e.g. (times, faces) or (times, faces, 3)
+            axis: Face axis of the values, -2 for vectors
+
+        Returns:
+            Patch sums with the face axis replaced by a patch axis
+        """
+        values = np.asarray(values, dtype=np.float64)
+        axis = axis % values.ndim
+        shape = list(values.shape)
+        shape[axis] = len(self.patches)
+        if len(self.faces) == 0:
+            return np.zeros(shape)
+        # reduceat returns the element at the start of an empty segment
+        sums = np.add.reduceat(values, np.minimum(self.starts, len(self.faces) - 1), axis=axis)
+        empty = (slice(None),) * axis + (self.counts == 0,)
+        sums[empty] = 0
+        return sums
+
+    def area_average(self, values: np.ndarray) -> np.ndarray:
+        """Area-weighted average of scalar face values over each patch, (..., patches)."""
+        return self.integrate(values * self.areas) / self.patch_areas
+
+    def volume_flux(self, velocity: np.ndarray) -> np.ndarray:
+        """Volumetric flux of face velocities out of each patch, (..., patches)."""
+        return self.integrate(np.einsum("...fc,fc->...f", velocity, self.area_vectors))
+
+    def pressure_force(self, pressure: np.ndarray, reference: float = 0.0) -> np.ndarray:
+        """Pressure face forces of face pressures, (..., faces, 3)."""
+        return (pressure - reference)[..., None] * self.area_vectors
+
+    def viscous_force(self, cell_velocity: np.ndarray, face_velocity: np.ndarray,
+                      viscosity: Union[float, np.ndarray]) -> np.ndarray:
+        """Viscous face forces from the tangential velocity gradient at the faces.
+
+        Args:
+            cell_velocity: Velocities of the cells owning the faces, (..., faces, 3)
+            face_velocity: Velocities of the faces, (..., faces, 3)
+            viscosity: Effective kinematic viscosity (scaled by the density for
+                forces), constant or per face, (..., faces)
+
+        Returns:
+            Face forces, (..., faces, 3)
+        """
+        difference = cell_velocity - face_velocity
+        normal = np.einsum("...fc,fc->...f", difference, self.normals)
+        tangential = difference - normal[..., None] * self.normals
+        return np.asarray(viscosity)[..., None] * tangential * \
+            (self.areas / self.wall_distance)[:, None]
+
+    def moment(self, face_forces: np.ndarray, centre: Sequence[float]) -> np.ndarray:
+        """Moments of face forces about a centre, summed per patch, (..., patches, 3)."""
+        return self.integrate(np.cross(self.centres - np.asarray(centre, dtype=np.float64),
+                                       face_forces), axis=-2)
+
+
+def _force_coefficients(force: np.ndarray, moment: np.ndarray, rho: float,
+                        references: Dict[str, object]) -> Dict[str, np.ndarray]:
+    """Lift, drag and pitching moment coefficients of patch forces."""
+    missing = set(COEFFICIENT_REFERENCES) - set(references)
+    if missing:
+        raise ValueError(f"Missing coefficient references: {', '.join(sorted(missing))}")
+    dynamic = 0.5 * rho * float(references["mag_u_inf"]) ** 2 * float(references["a_ref"])
+    unit = {name: np.asarray(references[name], dtype=np.float64)
+            for name in ("lift_dir", "drag_dir", "pitch_axis")}
+    return {"Cl": force @ unit["lift_dir"] / dynamic, "Cd": force @ unit["drag_dir"] / dynamic,
+            "Cm": moment @ unit["pitch_axis"] / (dynamic * float(references["l_ref"]))}
+
+
+def patch_integrals(case_dir: str, times: Optional[Sequence[str]] = None,
+                    patches: Optional[Sequence[str]] = None, pressure: str = "p",
+                    velocity: str = "U", rho: float = 1.0, p_ref: float = 0.0,
+                    viscosity: Optional[float] = None, centre: Sequence[float] = (0, 0, 0),
+                    average_fields: Sequence[str] = (),
+                    coefficients: Optional[Dict[str, object]] = None,
+                    mesh: Optional[PolyMesh] = None) -> Dict[str, np.ndarray]:
+    """Forces, moments, fluxes and area averages of patches at every time.
+
+    Pressure and viscous stresses are scaled by ``rho``, so kinematic
+    pressures of incompressible solvers give forces in newtons with the
+    ``rhoInf`` density, while ``rho=1`` suits compressible pressures.
+    Viscous forces use the effective viscosity ``nu + nut`` when ``nut`` is
+    written at every time.
+
+    Args:
+        case_dir: Case directory
+        times: Time directories; all of them holding the pressure or velocity if None
+        patches: Patch names; all non-constraint patches if None
+        pressure: Pressure field name, skipped if absent
+        velocity: Velocity field name, skipped if absent
+        rho: Density scaling pressures, stresses and mass flows
+        p_ref: Reference pressure subtracted before integration
+        viscosity: Laminar kinematic viscosity; read from the case if None
+        centre: Centre of the moments
+        average_fields: Scalar fields averaged over the patch areas
+        coefficients: Reference values ``COEFFICIENT_REFERENCES`` to add
+            ``Cl``, ``Cd`` and ``Cm`` columns
+        mesh: The mesh of the case, if already read
+
+    Returns:
+        Table with ``time`` and ``patch`` columns and one column per
+        integral and component
+    """
+    mesh = mesh or PolyMesh.read(case_dir)
+    integrator = PatchIntegrator(mesh, patches)
+    if times is None:
+        times = [time for time in time_directories(case_dir)
+                 if any(_exists(case_dir, name, time) for name in (pressure, velocity))]
+    times = list(times)
+
+    def stacked(name: str, cells: bool = False) -> Optional[np.ndarray]:
+        """Face (and owner cell) values of a field at every time."""
+        if not all(_exists(case_dir, name, time) for time in times):
+            return None
+        faces, owners = [], []
+        for time in times:
+            field = read_field(field_path(case_dir, name, time), mesh.n_cells)
+            faces.append(boundary_face_values(mesh, field)[integrator.boundary_index])
+            owners.append(field.values[integrator.cells])
+        return (np.stack(faces), np.stack(owners)) if cells else np.stack(faces)
+
+    n_times, n_patches = len(times), len(integrator.patches)
+    table: Dict[str, np.ndarray] = {
+        "time": np.repeat(np.array(times, dtype=str), n_patches),
+        "patch": np.tile(np.array(integrator.patches, dtype=str), n_times),
+        "area": np.tile(integrator.patch_areas, n_times)}
+
+    def add(name: str, values: np.ndarray) -> None:
+        """Add (times, patches[, 3]) values as columns."""
+        if values.ndim == 3:
+            for k, axis in enumerate(_AXES):
+                table[f"{name}_{axis}"] = values[..., k].ravel()
+        else:
+            table[name] = values.ravel()
+
+    face_pressure = stacked(pressure)
+    velocities = stacked(velocity, cells=True)
+    total_faces = np.zeros((n_times, len(integrator.faces), 3))
+    if face_pressure is not None:
+        pressure_faces = rho * integrator.pressure_force(face_pressure, p_ref)
+        total_faces += pressure_faces
+        add("pressure_force", integrator.integrate(pressure_faces, axis=-2))
+    if velocities is not None:
+        face_velocity, cell_velocity = velocities
+        nu = viscosity if viscosity is not None else read_viscosity(case_dir)
+        turbulent = stacked(TURBULENT_VISCOSITY)
+        if turbulent is not None:
+            nu = nu + turbulent
+        viscous_faces = rho * integrator.viscous_force(cell_velocity, face_velocity, nu)
+        total_faces += viscous_faces
+        add("viscous_force", integrator.integrate(viscous_faces, axis=-2))
+        flux = integrator.volume_flux(face_velocity)
+        add("volume_flux", flux)
+        add("mass_flow", rho * flux)
+
+    force = integrator.integrate(total_faces, axis=-2)
+    moment = integrator.moment(total_faces, centre)
+    add("force", force)
+    add("moment", moment)
+    if coefficients is not None:
+        for name, values in _force_coefficients(force, moment, rho, coefficients).items():
+            add(name, values)
+    for name in average_fields:
+        values = stacked(name)
+        if values is None:
+            raise FileNotFoundError(f"Field {name} is missing at some of the times")
+        add(f"areaAverage({name})", integrator.area_average(values))
+    logger.info(f"Integrated {n_patches} patches at {n_times} times of {case_dir}")
+    return table
+
+
+def _exists(case_dir: str, name: str, time: str) -> bool:
+    """Whether a field file exists in a time directory."""
+    path = field_path(case_dir, name, time)
+    return os.path.exists(path) or os.path.exists(path + ".gz")
@@ -0,0 +1,492 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:48:05 2026
+
+@author: adamp
+"""
+
+"""
+In-memory representation of an OpenFOAM polyMesh.
+
+The mesh is stored as flat NumPy arrays (points, compact face list, owner,
+neighbour) exactly as OpenFOAM stores it on disk, so that reading, writing
+and geometric operations are all vectorized.
+"""
+import os
+import re
+import hashlib
+from typing import Dict, List, Optional, Any, Tuple
+
+import numpy as np
+
+from src.openfoam.foam_io import (
+    LABEL_DTYPE, SCALAR_DTYPE, FoamFileError, read_foam_file, header_is_binary,
+    header_dtypes, parse_list, parse_face_list, open_foam_file, write_list,
+    write_face_list, foam_footer
+)
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_PATCH_RE = re.compile(r"(\S+)\s*\{([^}]*)\}", re.S)
+_PATCH_ENTRY_RE = re.compile(r"(\w+)\s+([^;]*);")
+
+# Number of faces processed at a time when computing face geometry
+GEOMETRY_CHUNK_SIZE = 1 << 19
+
+
+def polygon_geometry(points: np.ndarray, offsets: np.ndarray,
+                     face_points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Compute area vectors and centres of polygons by fan triangulation.
+
+    Each polygon is split into triangles around the average of its points,
+    as OpenFOAM does; the centre is the area-weighted triangle centroid.
+
+    Args:
+        points: Point coordinates
+        offsets: Polygon offsets into ``face_points`` (n+1 entries, may start
+            at a non-zero offset)
+        face_points: Flat point labels
+
+    Returns:
+        Tuple of (area vectors, centres), each of shape (n, 3)
+    """
+    sizes = np.diff(offsets)
+    n = len(sizes)
+    labels = face_points[offsets[0]:offsets[-1]]
+
+    if n and np.all(sizes == sizes[0]):
+        # All polygons have the same number of points: work on a 3D array
+        # of point positions relative to the estimated centre
+        size = int(sizes[0])
+        p = points[labels].reshape(n, size, 3)
+        estimate = p.mean(axis=1)
+        p -= estimate[:, None]
+        p_next = p[:, np.r_[1:size, 0]]
+        tri_area = np.empty_like(p)
+        tri_area[..., 0] = p[..., 1] * p_next[..., 2] - p[..., 2] * p_next[..., 1]
+        tri_area[..., 1] = p[..., 2] * p_next[..., 0] - p[..., 0] * p_next[..., 2]
+        tri_area[..., 2] = p[..., 0] * p_next[..., 1] - p[..., 1] * p_next[..., 0]
+        tri_area *= 0.5
+        tri_mag = np.sqrt(np.einsum("ijk,ijk->ij", tri_area, tri_area))
+        area = tri_area.sum(axis=1)
+        mag_sum = tri_mag.sum(axis=1)
+        p += p_next
+        centre = np.einsum("ij,ijk->ik", tri_mag, p) / 3.0
+        degenerate = mag_sum < 1e-300
+        centre[~degenerate] /= mag_sum[~degenerate, None]
+        centre += estimate
+        return area, centre
+
+    face_of_slot = np.repeat(np.arange(n), sizes)
+    local = offsets - offsets[0]
+    next_slot = np.arange(len(labels)) + 1
+    next_slot[local[1:] - 1] = local[:-1]
+    p = points[labels]
+    p_next = p[next_slot]
+
+    estimate = np.empty((n, 3))
+    for d in range(3):
+        estimate[:, d] = np.bincount(face_of_slot, p[:, d], n)
+    estimate /= sizes[:, None]
+
+    c = estimate[face_of_slot]
+    tri_area = 0.5 * np.cross(p - c, p_next - c)
+    tri_mag = np.linalg.norm(tri_area, axis=1)
+    tri_centre = (p + p_next + c) / 3.0
+    area = np.empty((n, 3))
+    centre = np.empty((n, 3))
+    mag_sum = np.bincount(face_of_slot, tri_mag, n)
+    for d in range(3):
+        area[:, d] = np.bincount(face_of_slot, tri_area[:, d], n)
+        centre[:, d] = np.bincount(face_of_slot, tri_mag * tri_centre[:, d], n)
+
+    degenerate = mag_sum < 1e-300
+    centre[~degenerate] /= mag_sum[~degenerate, None]
+    centre[degenerate] = estimate[degenerate]
+    return area, centre
+
+
+class Patch:
+    """A boundary patch of a polyMesh."""
+
+    def __init__(self, name: str, patch_type: str, n_faces: int, start_face: int,
+                 entries: Optional[Dict[str, str]] = None) -> None:
+        """Initialize the patch.
+
+        Args:
+            name: Patch name
+            patch_type: OpenFOAM patch type, e.g. ``patch`` or ``wall``
+            n_faces: Number of faces in the patch
+            start_face: Index of the first face of the patch
+            entries: Additional entries written to the boundary file
+        """
+        self.name = name
+        self.type = patch_type
+        self.n_faces = int(n_faces)
+        self.start_face = int(start_face)
+        self.entries: Dict[str, str] = dict(entries or {})
+
+    @property
+    def face_slice(self) -> slice:
+        """Slice of the global face arrays covered by this patch."""
+        return slice(self.start_face, self.start_face + self.n_faces)
+
+    def __repr__(self) -> str:
+        return (f"Patch({self.name!r}, {self.type!r}, nFaces={self.n_faces}, "
+                f"startFace={self.start_face})")
+
+
+class PolyMesh:
+    """Class holding the arrays of an OpenFOAM polyMesh.
+
+    Faces are stored in compact form: the point labels of face ``i`` are
+    ``face_points[face_offsets[i]:face_offsets[i + 1]]``.
+    """
+
+    def __init__(self, points: np.ndarray, face_offsets: np.ndarray, face_points: np.ndarray,
+                 owner: np.ndarray, neighbour: np.ndarray, patches: List[Patch],
+                 n_cells: Optional[int] = None) -> None:
+        """Initialize the mesh from its arrays.
+
+        Args:
+            points: Point coordinates, shape (nPoints, 3)
+            face_offsets: Face offsets into ``face_points``, shape (nFaces+1,)
+            face_points: Flat point labels of all faces
+            owner: Owner cell of every face, shape (nFaces,)
+            neighbour: Neighbour cell of every internal face, shape (nInternalFaces,)
+            patches: Boundary patches, ordered by start face
+            n_cells: Number of cells; deduced from ``owner`` if not given
+        """
+        self.points = np.ascontiguousarray(points, dtype=SCALAR_DTYPE)
+        self.face_offsets = np.ascontiguousarray(face_offsets, dtype=np.int64)
+        self.face_points = np.ascontiguousarray(face_points, dtype=LABEL_DTYPE)
+        self.owner = np.ascontiguousarray(owner, dtype=LABEL_DTYPE)
+        self.neighbour = np.ascontiguousarray(neighbour, dtype=LABEL_DTYPE)
+        self.patches = list(patches)
+        if n_cells is None:
+            n_cells = int(self.owner.max()) + 1 if len(self.owner) else 0
+            if len(self.neighbour):
+                n_cells = max(n_cells, int(self.neighbour.max()) + 1)
+        self.n_cells = int(n_cells)
+
+        # Cache for derived geometry
+        self._geometry_cache: Dict[str, np.ndarray] = {}
+
+    @property
+    def n_points(self) -> int:
+        """Number of points."""
+        return len(self.points)
+
+    @property
+    def n_faces(self) -> int:
+        """Total number of faces."""
+        return len(self.face_offsets) - 1
+
+    @property
+    def n_internal_faces(self) -> int:
+        """Number of internal faces."""
+        return len(self.neighbour)
+
+    @property
+    def face_sizes(self) -> np.ndarray:
+        """Number of points of every face."""
+        return np.diff(self.face_offsets)
+
+    def patch(self, name: str) -> Patch:
+        """Return the patch with the given name.
+
+        Raises:
+            KeyError: If no patch has that name
+        """
+        for patch in self.patches:
+            if patch.name == name:
+                return patch
+        raise KeyError(f"Patch not found: {name}")
+
+    def face_point_array(self, faces: Optional[np.ndarray] = None) -> np.ndarray:
+        """Return face point labels as a (n, size) array for equal-sized faces.
+
+        Args:
+            faces: Face indices; all faces if None
+
+        Raises:
+            ValueError: If the selected faces do not all have the same size
+        """
+        faces = np.arange(self.n_faces) if faces is None else np.asarray(faces)
+        sizes = self.face_sizes[faces]
+        if len(faces) and np.any(sizes != sizes[0]):
+            raise ValueError("Selected faces have different numbers of points")
+        size = int(sizes[0]) if len(faces) else 0
+        return self.face_points[self.face_offsets[faces][:, None] + np.arange(size)]
+
+    # ------------------------------------------------------------------
+    # Geometry
+    # ------------------------------------------------------------------
+
+    def _compute_face_geometry(self) -> None:
+        """Compute face area vectors and centres, in bounded-size face chunks."""
+        area = np.empty((self.n_faces, 3))
+        centre = np.empty((self.n_faces, 3))
+        for start in range(0, self.n_faces, GEOMETRY_CHUNK_SIZE):
+            stop = min(start + GEOMETRY_CHUNK_SIZE, self.n_faces)
+            area[start:stop], centre[start:stop] = polygon_geometry(
+                self.points, self.face_offsets[start:stop + 1], self.face_points)
+        self._geometry_cache["face_areas"] = area
+        self._geometry_cache["face_centres"] = centre
+
+    def _compute_cell_geometry(self) -> None:
+        """Compute cell volumes and centres from face pyramids."""
+        cf = self.face_centres
+        sf = self.face_areas
+        n_int = self.n_internal_faces
+        owner = self.owner
+        neighbour = self.neighbour
+
+        # Estimated centre: average of the cell's face centres
+        n_faces_per_cell = (np.bincount(owner, minlength=self.n_cells)
+                            + np.bincount(neighbour, minlength=self.n_cells))
+        estimate = np.empty((self.n_cells, 3))
+        for d in range(3):
+            estimate[:, d] = (np.bincount(owner, cf[:, d], self.n_cells)
+                              + np.bincount(neighbour, cf[:n_int, d], self.n_cells))
+        estimate /= np.maximum(n_faces_per_cell, 1)[:, None]
+
+        own_vol = np.einsum("ij,ij->i", sf, cf - estimate[owner]) / 3.0
+        nei_vol = -np.einsum("ij,ij->i", sf[:n_int], cf[:n_int] - estimate[neighbour]) / 3.0
+        own_centre = 0.75 * cf + 0.25 * estimate[owner]
+        nei_centre = 0.75 * cf[:n_int] + 0.25 * estimate[neighbour]
+
+        volume = (np.bincount(owner, own_vol, self.n_cells)
+                  + np.bincount(neighbour, nei_vol, self.n_cells))
+        centre = np.empty((self.n_cells, 3))
+        for d in range(3):
+            centre[:, d] = (np.bincount(owner, own_vol * own_centre[:, d], self.n_cells)
+                            + np.bincount(neighbour, nei_vol * nei_centre[:, d], self.n_cells))
+        valid = np.abs(volume) > 1e-300
+        centre[valid] /= volume[valid, None]
+        centre[~valid] = estimate[~valid]
+
+        self._geometry_cache["cell_volumes"] = volume
+        self._geometry_cache["cell_centres"] = centre
+
+    @property
+    def face_areas(self) -> np.ndarray:
+        """Face area vectors, pointing out of the owner cell."""
+        if "face_areas" not in self._geometry_cache:
+            self._compute_face_geometry()
+        return self._geometry_cache["face_areas"]
+
+    @property
+    def face_centres(self) -> np.ndarray:
+        """Face centres."""
+        if "face_centres" not in self._geometry_cache:
+            self._compute_face_geometry()
+        return self._geometry_cache["face_centres"]
+
+    @property
+    def cell_volumes(self) -> np.ndarray:
+        """Cell volumes."""
+        if "cell_volumes" not in self._geometry_cache:
+            self._compute_cell_geometry()
+        return self._geometry_cache["cell_volumes"]
+
+    @property
+    def cell_centres(self) -> np.ndarray:
+        """Cell centres."""
+        if "cell_centres" not in self._geometry_cache:
+            self._compute_cell_geometry()
+        return self._geometry_cache["cell_centres"]
+
+    def bounds(self) -> np.ndarray:
+        """Return the bounding box as a (2, 3) array of min and max corners."""
+        return np.array([self.points.min(axis=0), self.points.max(axis=0)])
+
+    def content_hash(self) -> str:
+        """Return a hash of the mesh arrays, used as a key for derived-data caches."""
+        digest = hashlib.sha1()
+        for array in (self.points, self.face_offsets, self.face_points, self.owner, self.neighbour):
+            digest.update(np.ascontiguousarray(array).data)
+        for patch in self.patches:
+            digest.update(f"{patch.name}:{patch.n_faces}:{patch.start_face};".encode())
+        return digest.hexdigest()
+
+    def check_ordering(self) -> bool:
+        """Check OpenFOAM's face ordering rules.
+
+        Internal faces must have ``owner < neighbour`` and be sorted by owner,
+        then neighbour; patches must cover the boundary faces contiguously.
+
+        Returns:
+            True if the mesh satisfies the ordering rules
+        """
+        n_int = self.n_internal_faces
+        own = self.owner[:n_int].astype(np.int64)
+        nei = self.neighbour.astype(np.int64)
+        if np.any(own >= nei):
+            return False
+        key = own * self.n_cells + nei
+        if np.any(np.diff(key) < 0):
+            return False
+        start = n_int
+        for patch in self.patches:
+            if patch.start_face != start:
+                return False
+            start += patch.n_faces
+        return start == self.n_faces
+
+    # ------------------------------------------------------------------
+    # Input/output
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def poly_mesh_dir(case_dir: str, region: Optional[str] = None) -> str:
+        """Return the polyMesh directory of a case (or of a region)."""
+        if region:
+            return os.path.join(case_dir, "constant", region, "polyMesh")
+        return os.path.join(case_dir, "constant", "polyMesh")
+
+    @classmethod
+    def read_patches(cls, case_dir: str, region: Optional[str] = None) -> List[Patch]:
+        """Read only the patches of the polyMesh of a case."""
+        return cls._read_boundary(os.path.join(cls.poly_mesh_dir(case_dir, region), "boundary"))
+
+    @classmethod
+    def read(cls, case_dir: str, region: Optional[str] = None) -> "PolyMesh":
+        """Read the polyMesh of a case.
+
+        Args:
+            case_dir: Path to the OpenFOAM case directory
+            region: Optional mesh region name
+
+        Returns:
+            The loaded mesh
+
+        Raises:
+            FileNotFoundError: If a polyMesh file is missing
+            FoamFileError: If a file is malformed
+        """
+        mesh_dir = cls.poly_mesh_dir(case_dir, region)
+        logger.info(f"Reading polyMesh from {mesh_dir}")
+
+        header, body = read_foam_file(os.path.join(mesh_dir, "points"))
+        label_dtype, scalar_dtype = header_dtypes(header)
+        points, _ = parse_list(body, 0, scalar_dtype, 3, header_is_binary(header))
+
+        header, body = read_foam_file(os.path.join(mesh_dir, "faces"))
+        label_dtype, _ = header_dtypes(header)
+        offsets, face_points, _ = parse_face_list(body, 0, header_is_binary(header), label_dtype)
+
+        header, body = read_foam_file(os.path.join(mesh_dir, "owner"))
+        label_dtype, _ = header_dtypes(header)
+        owner, _ = parse_list(body, 0, label_dtype, 1, header_is_binary(header))
+        n_cells = cls._n_cells_from_note(header.get("note", ""))
+
+        header, body = read_foam_file(os.path.join(mesh_dir, "neighbour"))
+        label_dtype, _ = header_dtypes(header)
+        neighbour, _ = parse_list(body, 0, label_dtype, 1, header_is_binary(header))
+
+        patches = cls._read_boundary(os.path.join(mesh_dir, "boundary"))
+        return cls(points, offsets, face_points, owner, neighbour, patches, n_cells)
+
+    @staticmethod
+    def _n_cells_from_note(note: str) -> Optional[int]:
+        """Extract nCells from the note written in the owner header."""
+        match = re.search(r"nCells:\s*(\d+)", note)
+        return int(match.group(1)) if match else None
+
+    @staticmethod
+    def _read_boundary(file_path: str) -> List[Patch]:
+        """Read the boundary file into a list of patches."""
+        _, body = read_foam_file(file_path)
+        text = re.sub(r"//.*", "", body.decode(errors="replace"))
+        start = text.find("(")
+        if start < 0:
+            raise FoamFileError(f"Malformed boundary file: {file_path}")
+
+        patches = []
+        for name, content in _PATCH_RE.findall(text[start + 1:]):
+            entries = {k: v.strip() for k, v in _PATCH_ENTRY_RE.findall(content)}
+            patches.append(Patch(
+                name,
+                entries.pop("type", "patch"),
+                int(entries.pop("nFaces", 0)),
+                int(entries.pop("startFace", 0)),
+                entries,
+            ))
+        return patches
+
+    def write(self, case_dir: str, binary: bool = True, region: Optional[str] = None) -> str:
+        """Write the mesh to the polyMesh directory of a case.
+
+        Args:
+            case_dir: Path to the OpenFOAM case directory
+            binary: Whether to write binary (True) or ASCII files
+            region: Optional mesh region name
+
+        Returns:
+            Path of the written polyMesh directory
+        """
+        mesh_dir = self.poly_mesh_dir(case_dir, region)
+        location = os.path.relpath(mesh_dir, case_dir).replace(os.sep, "/")
+        os.makedirs(mesh_dir, exist_ok=True)
+        logger.info(f"Writing polyMesh ({self.n_cells} cells) to {mesh_dir}")
+
+        # Stale compressed files would shadow the new ones
+        for name in ("points", "faces", "owner", "neighbour", "boundary"):
+            if os.path.exists(os.path.join(mesh_dir, name + ".gz")):
+                os.remove(os.path.join(mesh_dir, name + ".gz"))
+
+        note = (f"nPoints:{self.n_points}  nCells:{self.n_cells}  "
+                f"nFaces:{self.n_faces}  nInternalFaces:{self.n_internal_faces}")
+
+        with open_foam_file(os.path.join(mesh_dir, "points"), "vectorField", "points",
+                            location, binary) as f:
+            write_list(f, self.points, binary, "%.12g")
+            f.write(foam_footer().encode())
+
+        face_class = "faceCompactList" if binary else "faceList"
+        with open_foam_file(os.path.join(mesh_dir, "faces"), face_class, "faces",
+                            location, binary) as f:
+            write_face_list(f, self.face_offsets, self.face_points, binary)
+            f.write(foam_footer().encode())
+
+        with open_foam_file(os.path.join(mesh_dir, "owner"), "labelList", "owner",
+                            location, binary, note) as f:
+            write_list(f, self.owner, binary)
+            f.write(foam_footer().encode())
+
+        with open_foam_file(os.path.join(mesh_dir, "neighbour"), "labelList", "neighbour",
+                            location, binary, note) as f:
+            write_list(f, self.neighbour, binary)
+            f.write(foam_footer().encode())
+
+        self._write_boundary(os.path.join(mesh_dir, "boundary"), location)
+        return mesh_dir
+
+    def _write_boundary(self, file_path: str, location: str) -> None:
+        """Write the boundary file (always ASCII)."""
+        lines = [f"{len(self.patches)}", "("]
+        for patch in self.patches:
+            lines.append(f"    {patch.name}")
+            lines.append("    {")
+            lines.append(f"        type            {patch.type};")
+            for key, value in patch.entries.items():
+                lines.append(f"        {key:<15} {value};")
+            lines.append(f"        nFaces          {patch.n_faces};")
+            lines.append(f"        startFace       {patch.start_face};")
+            lines.append("    }")
+        lines.append(")")
+        with open_foam_file(file_path, "polyBoundaryMesh", "boundary", location) as f:
+            f.write("\n".join(lines).encode())
+            f.write(foam_footer().encode())
+
+    def summary(self) -> Dict[str, Any]:
+        """Return basic mesh statistics."""
+        return {
+            "points": self.n_points,
+            "faces": self.n_faces,
+            "internal_faces": self.n_internal_faces,
+            "cells": self.n_cells,
+            "patches": {p.name: p.n_faces for p in self.patches},
+        }
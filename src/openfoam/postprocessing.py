@@ -0,0 +1,404 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 08:21:44 2026
+
+@author: adamp
+"""
+
+"""
+Readers for the ``postProcessing/<functionObject>/<time>/<file>`` tables
+written by function objects (forces, probes, solverInfo, fieldMinMax,
+surfaceFieldValue...).
+
+The comment header of each file is parsed into a column schema, with vector
+and tensor entries written in parentheses expanded into one column per
+component. Bodies are parsed into columnar NumPy arrays in one vectorized
+pass. Tables of restarted runs (one time directory per start time) are
+stitched together, later runs replacing the overlapping rows of earlier
+ones. Each file is read from the byte offset reached by the previous read,
+so refreshing while the solver runs appends only the new rows.
+"""
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.openfoam.fields import time_directories
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Component suffixes of expanded vector and tensor columns, by width
+COMPONENT_NAMES = {3: ("x", "y", "z"), 6: ("xx", "xy", "xz", "yy", "yz", "zz"),
+                   9: ("xx", "xy", "xz", "yx", "yy", "yz", "zx", "zy", "zz")}
+
+# Initial number of rows allocated for a series
+INITIAL_CAPACITY = 1024
+
+# Column kinds of a schema
+NUMERIC, TEXT = "f", "O"
+
+_PARENTHESES = bytes.maketrans(b"()", b"  ")
+_HEADER_NAME_RE = re.compile(r"[^\s(]*\([^)]*\)\S*|\S+")
+_PROBE_RE = re.compile(r"^#\s*Probe\s+(\d+)\s*\(([^)]*)\)")
+_ENTRY_RE = re.compile(r"^#\s*([A-Za-z][\w ]*?)\s*:\s*(.*)$")
+_TIME_SUFFIX_RE = re.compile(r"^(.+)_([-+]?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)$")
+
+
+def _is_number(token: str) -> bool:
+    """Whether a token parses as a float."""
+    try:
+        float(token)
+    except ValueError:
+        return False
+    return True
+
+
+def row_layout(line: str) -> List[Tuple[int, bool]]:
+    """Return the width and numeric flag of each top-level entry of a data row.
+
+    Entries in parentheses, possibly nested like the ``((fp) (fv) (fpor))``
+    of older force tables, count as one numeric entry of their total width.
+    """
+    items = []
+    depth = width = 0
+    for token in line.replace("(", " ( ").replace(")", " ) ").split():
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+            if depth == 0:
+                items.append((width, True))
+                width = 0
+        elif depth:
+            width += 1
+        else:
+            items.append((1, _is_number(token)))
+    return items
+
+
+def _expand_name(name: str, width: int) -> List[str]:
+    """Column names of an entry of a given width."""
+    if width == 1:
+        return [name]
+    base, _, inner = name.partition("(")
+    parts = inner.rstrip(")").split()
+    if len(parts) > 1 and width % len(parts) == 0 and width // len(parts) in COMPONENT_NAMES:
+        components = COMPONENT_NAMES[width // len(parts)]
+        return [f"{base}_{part}_{c}" for part in parts for c in components]
+    components = COMPONENT_NAMES.get(width, [str(i) for i in range(width)])
+    return [f"{name}_{c}" for c in components]
+
+
+class ColumnSchema:
+    """Column names and kinds of a postProcessing table, parsed from its header."""
+
+    def __init__(self, header: Sequence[str], first_row: str) -> None:
+        """Parse the comment header of a table.
+
+        Args:
+            header: Comment lines preceding the data
+            first_row: First data row, giving the width of each entry
+        """
+        self.title = header[0].lstrip("#").strip() if header else ""
+        self.metadata: Dict[str, str] = {}
+        probes = {}
+        names: List[str] = []
+        for line in header:
+            match = _PROBE_RE.match(line)
+            if match:
+                probes[int(match.group(1))] = [float(v) for v in match.group(2).split()]
+                continue
+            match = _ENTRY_RE.match(line)
+            if match:
+                self.metadata[match.group(1)] = match.group(2).strip()
+                continue
+            tokens = _HEADER_NAME_RE.findall(line.lstrip("#"))
+            if tokens and tokens[0] == "Time":
+                names = tokens
+        self.probes = (np.array([probes[i] for i in sorted(probes)]) if probes
+                       else np.zeros((0, 3)))
+
+        # Headers may also name every component of parenthesised entries,
+        # and entries of probe tables are named by probe index
+        layout = row_layout(first_row)
+        if len(names) != len(layout) and len(names) == sum(w for w, _ in layout):
+            layout = [(1, numeric) for width, numeric in layout for _ in range(width)]
+        if probes and len(names) != len(layout):
+            names = ["Time"] + [f"probe{i}" for i in sorted(probes)]
+        if len(names) != len(layout):
+            names = ["Time"] + [f"column{i}" for i in range(1, len(layout))]
+
+        self.layout = layout
+        self.columns: List[str] = []
+        self.kinds: List[str] = []
+        for name, (width, numeric) in zip(names, layout):
+            self.columns.extend(_expand_name(name, width))
+            self.kinds.extend([NUMERIC if numeric else TEXT] * width)
+
+    @property
+    def width(self) -> int:
+        """Number of values per row."""
+        return len(self.columns)
+
+    def parse(self, block: bytes) -> Dict[str, np.ndarray]:
+        """Parse complete data rows into one array per column.
+
+        Rows whose number of values does not match the schema, such as a
+        line cut short by a crashed run, are dropped.
+        """
+        if b"#" in block:
+            block = b"\n".join(line for line in block.splitlines()
+                               if not line.lstrip().startswith(b"#"))
+        block = block.translate(_PARENTHESES)
+        if not block.strip():
+            return {name: np.zeros(0) for name in self.columns}
+
+        table = None
+        if TEXT not in self.kinds:
+            values = np.fromstring(block, sep=" ")
+            n_lines = block.count(b"\n") + (not block.endswith(b"\n"))
+            if values.size == n_lines * self.width:
+                table = values.reshape(-1, self.width)
+        if table is None:
+            tokens = block.split()
+            if len(tokens) % self.width:
+                tokens = [token for line in block.splitlines() for token in line.split()
+                          if len(line.split()) == self.width]
+            table = np.array(tokens, dtype=object).reshape(-1, self.width)
+
+        columns = {}
+        for i, (name, kind) in enumerate(zip(self.columns, self.kinds)):
+            column = table[:, i]
+            if kind == NUMERIC and column.dtype == object:
+                column = column.astype(bytes).astype(np.float64)
+            elif kind == TEXT:
+                column = column.astype(bytes).astype(str).astype(object)
+            columns[name] = np.ascontiguousarray(column)
+        return columns
+
+
+class DatSeries:
+    """Columnar time series of one postProcessing table, over all restarts."""
+
+    def __init__(self, function_object: str, name: str) -> None:
+        """Create an empty series.
+
+        Args:
+            function_object: Name of the function object directory
+            name: File name of the table, without any time suffix
+        """
+        self.function_object = function_object
+        self.name = name
+        self.schema: Optional[ColumnSchema] = None
+        self.paths: List[str] = []
+        self.n_rows = 0
+        self._buffers: Dict[str, np.ndarray] = {}
+
+    @property
+    def columns(self) -> List[str]:
+        """Column names, time first."""
+        return list(self._buffers)
+
+    @property
+    def time(self) -> np.ndarray:
+        """Time of each row."""
+        return self["Time"] if "Time" in self._buffers else np.zeros(0)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        """Values of a column; a view valid until the next append."""
+        return self._buffers[column][:self.n_rows]
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._buffers
+
+    def data(self) -> Dict[str, np.ndarray]:
+        """All columns by name."""
+        return {name: self[name] for name in self._buffers}
+
+    def truncate(self, time: float) -> None:
+        """Drop the rows at and after a time, superseded by a restart."""
+        if self.n_rows:
+            self.n_rows = int(np.searchsorted(self.time, time, side="left"))
+
+    def append(self, columns: Dict[str, np.ndarray], schema: ColumnSchema) -> int:
+        """Append rows, growing the buffers geometrically.
+
+        Columns missing on either side are filled with NaN (numeric) or
+        None (text), so restarts adding or removing entries line up.
+
+        Returns:
+            Number of rows appended
+        """
+        n_new = len(next(iter(columns.values()))) if columns else 0
+        if self.schema is None:
+            self.schema = schema
+        if n_new == 0:
+            return 0
+        size = self.n_rows + n_new
+        capacity = len(next(iter(self._buffers.values()))) if self._buffers else 0
+        if size > capacity:
+            capacity = max(INITIAL_CAPACITY, 2 * capacity, size)
+            for name, buffer in self._buffers.items():
+                grown = np.empty(capacity, dtype=buffer.dtype)
+                grown[:self.n_rows] = buffer[:self.n_rows]
+                self._buffers[name] = grown
+        for name, values in columns.items():
+            if name not in self._buffers:
+                buffer = np.empty(capacity, dtype=values.dtype)
+                buffer[:self.n_rows] = np.nan if values.dtype != object else None
+                self._buffers[name] = buffer
+            self._buffers[name][self.n_rows:size] = values
+        for name, buffer in self._buffers.items():
+            if name not in columns:
+                buffer[self.n_rows:size] = np.nan if buffer.dtype != object else None
+        self.n_rows = size
+        return n_new
+
+
+class _TableFile:
+    """Read position and schema of one table file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.offset = 0
+        self.header: List[str] = []
+        self.schema: Optional[ColumnSchema] = None
+
+    def read(self) -> Optional[Dict[str, np.ndarray]]:
+        """Parse the complete rows written since the previous read.
+
+        Returns:
+            Columns of the new rows, or None until the first data row exists
+        """
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return None
+        if size < self.offset:
+            logger.warning(f"{self.path} was truncated, reading it again")
+            self.offset, self.header, self.schema = 0, [], None
+        if size == self.offset:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+
+        # A partly written last line is left for the next read
+        end = chunk.rfind(b"\n") + 1
+        if end == 0:
+            return None
+        chunk = chunk[:end]
+        self.offset += end
+
+        if self.schema is None:
+            start = 0
+            while start < len(chunk):
+                stop = chunk.index(b"\n", start) + 1
+                line = chunk[start:stop].decode("utf-8", "replace").strip()
+                if line and not line.startswith("#"):
+                    self.schema = ColumnSchema(self.header, line)
+                    break
+                if line:
+                    self.header.append(line)
+                start = stop
+            if self.schema is None:
+                return None
+            chunk = chunk[start:]
+        return self.schema.parse(chunk)
+
+
+def _split_time_suffix(name: str) -> Tuple[str, float]:
+    """Split a ``force_0.5.dat`` style restart suffix from a file name."""
+    stem, ext = os.path.splitext(name)
+    if ext != ".dat":
+        stem, ext = name, ""
+    match = _TIME_SUFFIX_RE.match(stem)
+    if match:
+        return match.group(1) + ext, float(match.group(2))
+    return name, -np.inf
+
+
+class PostProcessingReader:
+    """Incremental reader of all tables in a ``postProcessing`` directory."""
+
+    def __init__(self, post_dir: str) -> None:
+        """Create a reader; nothing is read until ``refresh``.
+
+        Args:
+            post_dir: The ``postProcessing`` directory of a case
+        """
+        self.post_dir = post_dir
+        self.series: Dict[Tuple[str, str], DatSeries] = {}
+        self._files: Dict[str, _TableFile] = {}
+
+    def function_objects(self) -> List[str]:
+        """Names of the function objects read so far."""
+        return sorted({function_object for function_object, _ in self.series})
+
+    def tables(self, function_object: str) -> Dict[str, DatSeries]:
+        """Series of a function object by table name."""
+        return {name: series for (fo, name), series in sorted(self.series.items())
+                if fo == function_object}
+
+    def sources(self) -> Dict[Tuple[str, str], List[str]]:
+        """Table files of each series on disk, in restart order."""
+        found: Dict[Tuple[str, str], List[Tuple[float, float, str]]] = {}
+        if not os.path.isdir(self.post_dir):
+            return {}
+        for function_object in sorted(os.listdir(self.post_dir)):
+            fo_dir = os.path.join(self.post_dir, function_object)
+            for time in time_directories(fo_dir):
+                time_dir = os.path.join(fo_dir, time)
+                for name in sorted(os.listdir(time_dir)):
+                    path = os.path.join(time_dir, name)
+                    if not os.path.isfile(path):
+                        continue
+                    base, suffix = _split_time_suffix(name)
+                    found.setdefault((function_object, base), []).append(
+                        (float(time), suffix, path))
+        return {key: [path for _, _, path in sorted(files)] for key, files in found.items()}
+
+    def refresh(self) -> Dict[Tuple[str, str], int]:
+        """Read the rows written since the last refresh.
+
+        New restart files truncate their series to the first time they
+        hold before their rows are appended.
+
+        Returns:
+            Number of rows read for each series that changed
+        """
+        new_rows: Dict[Tuple[str, str], int] = {}
+        for key, paths in self.sources().items():
+            series = self.series.setdefault(key, DatSeries(*key))
+            for path in paths:
+                if path not in self._files:
+                    self._files[path] = _TableFile(path)
+                    series.paths.append(path)
+                table = self._files[path]
+                columns = table.read()
+                if not columns or not len(columns["Time"]):
+                    continue
+                # Rows of a later restart supersede the overlapping rows
+                series.truncate(columns["Time"][0])
+                count = series.append(columns, table.schema)
+                new_rows[key] = new_rows.get(key, 0) + count
+        if new_rows:
+            logger.info(f"Read {sum(new_rows.values())} new rows from "
+                        f"{len(new_rows)} tables in {self.post_dir}")
+        return new_rows
+
+
+def load_postprocessing(post_dir: str) -> Dict[Tuple[str, str], DatSeries]:
+    """Read all tables of a ``postProcessing`` directory.
+
+    Args:
+        post_dir: The ``postProcessing`` directory of a case
+
+    Returns:
+        Series by (function object, table name)
+    """
+    reader = PostProcessingReader(post_dir)
+    reader.refresh()
+    return reader.series
@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 07:18:45 2026
+
+@author: adamp
+"""
+
+"""
+Point probes: locating cells and sampling fields at arbitrary points.
+
+Cells are located by testing the cells with the nearest centres (from a
+KD-tree) against the planes of their faces; probes in none of them, as in
+skewed or strongly graded cells, walk from the nearest cell across the face
+they are furthest outside of. The sampling stencil of every
+probe is then folded into sparse (probe, cell, weight) triplets, either the
+containing cell alone or a ``cellPoint`` interpolation: the probe is placed
+in one of the tetrahedra spanned by the cell centre, a face centre and a
+face edge, with point values interpolated from the surrounding cells by
+inverse distance. Sampling a field at any number of times is then a gather
+and a weighted sum per time, without locating the probes again.
+"""
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.openfoam.polymesh import PolyMesh
+from src.openfoam.kdtree import PointKDTree
+from src.openfoam.fields import field_path, read_field, time_directories
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Supported probe interpolation schemes
+INTERPOLATION_SCHEMES = ("cell", "cellPoint")
+
+# Number of cells with the nearest centres tested for containing a probe
+LOCATE_CANDIDATES = 8
+
+# Distance outside the face planes still counted inside, relative to cell size
+INSIDE_TOLERANCE = 1e-8
+
+# Faces crossed walking from the nearest cell before a probe is considered outside
+LOCATE_WALK_STEPS = 64
+
+
+def cell_faces(mesh: PolyMesh) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the faces of every cell in compressed form.
+
+    Returns:
+        Offsets of shape (nCells+1,), face labels, and the orientation of each
+        face (+1 if the area vector points out of the cell, -1 otherwise)
+    """
+    n_internal = mesh.n_internal_faces
+    cells = np.concatenate([mesh.owner, mesh.neighbour])
+    faces = np.concatenate([np.arange(mesh.n_faces), np.arange(n_internal)])
+    signs = np.concatenate([np.ones(mesh.n_faces), -np.ones(n_internal)])
+    order = np.argsort(cells, kind="stable")
+    offsets = np.zeros(mesh.n_cells + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cells, minlength=mesh.n_cells), out=offsets[1:])
+    return offsets, faces[order], signs[order]
+
+
+def expand(offsets: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Expand rows of a compressed structure into (row position, entry index) pairs."""
+    counts = offsets[rows + 1] - offsets[rows]
+    first = np.cumsum(counts) - counts
+    position = np.repeat(np.arange(len(rows)), counts)
+    entries = np.repeat(offsets[rows], counts) + np.arange(counts.sum()) - np.repeat(first, counts)
+    return position, entries
+
+
+def unique_keys(keys: np.ndarray) -> np.ndarray:
+    """Sorted distinct values of an integer array.
+
+    Sorting and dropping repeats is several times faster than ``np.unique``
+    on the tens of millions of keys of large meshes.
+    """
+    keys = np.sort(keys)
+    return keys[np.r_[True, keys[1:] != keys[:-1]]] if len(keys) else keys
+
+
+class CellLocator:
+    """Finds the cells containing points; reusable for many probe sets."""
+
+    def __init__(self, mesh: PolyMesh, tree: Optional[PointKDTree] = None) -> None:
+        """Build the search structures.
+
+        Args:
+            mesh: The mesh
+            tree: Prebuilt KD-tree on the cell centres
+        """
+        self.mesh = mesh
+        self.tree = tree or PointKDTree(mesh.cell_centres)
+        self.face_offsets, self.faces, self.face_signs = cell_faces(mesh)
+        self.cell_size = np.cbrt(np.abs(mesh.cell_volumes))
+
+    def _face_distances(self, points: np.ndarray, cells: np.ndarray
+                        ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Signed distances of points outside the face planes of their cells.
+
+        Returns:
+            Point position and face entry of every (point, face) pair, sorted
+            by point, and the distance of the point outside the face plane
+        """
+        mesh = self.mesh
+        pair, entries = expand(self.face_offsets, cells)
+        faces = self.faces[entries]
+        normals = mesh.face_areas[faces] * self.face_signs[entries, None]
+        offset = np.einsum("ij,ij->i", points[pair] - mesh.face_centres[faces], normals)
+        return pair, entries, offset / np.maximum(np.linalg.norm(normals, axis=1), 1e-300)
+
+    def contains(self, points: np.ndarray, cells: np.ndarray) -> np.ndarray:
+        """Test whether each point lies inside the paired cell (face-plane test).
+
+        Args:
+            points: Points of shape (n, 3)
+            cells: Cell of each point, shape (n,)
+
+        Returns:
+            Boolean mask of the points inside their cell
+        """
+        if not len(cells):
+            return np.zeros(0, dtype=bool)
+        _, _, distance = self._face_distances(points, cells)
+        counts = self.face_offsets[cells + 1] - self.face_offsets[cells]
+        outside = np.maximum.reduceat(distance, np.cumsum(counts) - counts)
+        return outside <= INSIDE_TOLERANCE * self.cell_size[cells]
+
+    def walk(self, points: np.ndarray, cells: np.ndarray) -> np.ndarray:
+        """Walk from starting cells to the cells containing points.
+
+        Each step crosses the face the point is furthest outside of.
+
+        Args:
+            points: Points of shape (n, 3)
+            cells: Starting cell of each point, shape (n,)
+
+        Returns:
+            Cells containing the points, -1 where a walk leaves the mesh or
+            does not arrive within ``LOCATE_WALK_STEPS`` faces
+        """
+        mesh = self.mesh
+        cells = np.array(cells, dtype=np.int64)
+        pending = np.flatnonzero(cells >= 0)
+        for _ in range(LOCATE_WALK_STEPS):
+            if not len(pending):
+                return cells
+            current = cells[pending]
+            pair, entries, distance = self._face_distances(points[pending], current)
+            counts = self.face_offsets[current + 1] - self.face_offsets[current]
+            starts = np.cumsum(counts) - counts
+            furthest = np.maximum.reduceat(distance, starts)
+            outside = furthest > INSIDE_TOLERANCE * self.cell_size[current]
+
+            # Cross the first face of each cell at the largest distance; pairs are sorted
+            at_max = np.flatnonzero(distance == furthest[pair])
+            first = at_max[np.r_[True, pair[at_max][1:] != pair[at_max][:-1]]]
+            crossed = entries[first][outside]
+            faces = self.faces[crossed]
+            across = np.where(self.face_signs[crossed] > 0, -1, mesh.owner[faces])
+            internal = (self.face_signs[crossed] > 0) & (faces < mesh.n_internal_faces)
+            across[internal] = mesh.neighbour[faces[internal]]
+            cells[pending[outside]] = across
+            pending = pending[outside]
+            pending = pending[cells[pending] >= 0]
+        cells[pending] = -1
+        return cells
+
+    def locate(self, points: np.ndarray, candidates: int = LOCATE_CANDIDATES) -> np.ndarray:
+        """Find the cell containing every point.
+
+        Points in none of the candidate cells walk from the nearest one.
+
+        Args:
+            points: Points of shape (n, 3)
+            candidates: Number of cells with the nearest centres tested per point
+
+        Returns:
+            Cell labels, -1 for points outside the mesh
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        k = max(1, min(candidates, self.mesh.n_cells))
+        _, nearest = self.tree.query(points, k)
+        cells = np.full(len(points), -1, dtype=np.int64)
+        for column in range(k):
+            pending = np.flatnonzero(cells < 0)
+            candidate = nearest[pending, column]
+            valid = candidate >= 0
+            pending, candidate = pending[valid], candidate[valid]
+            if not len(pending):
+                break
+            inside = self.contains(points[pending], candidate)
+            cells[pending[inside]] = candidate[inside]
+        pending = np.flatnonzero((cells < 0) & (nearest[:, 0] >= 0))
+        if len(pending):
+            cells[pending] = self.walk(points[pending], nearest[pending, 0])
+        return cells
+
+
+def point_weights(mesh: PolyMesh, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray,
+                                                              np.ndarray]:
+    """Inverse-distance weights of the cells around mesh points.
+
+    Only the faces using the requested points are visited, so the cost is
+    one pass over the face point labels.
+
+    Args:
+        mesh: The mesh
+        points: Mesh point labels
+
+    Returns:
+        Position in ``points``, cell label and weight of every (point, cell)
+        pair; the weights of each point sum to 1
+    """
+    points = np.asarray(points, dtype=np.int64)
+    slot = np.full(mesh.n_points, -1, dtype=np.int64)
+    slot[points] = np.arange(len(points))
+    used = slot[mesh.face_points] >= 0
+    face = np.repeat(np.arange(mesh.n_faces), mesh.face_sizes)[used]
+    position = slot[mesh.face_points[used]]
+
+    internal = face < mesh.n_internal_faces
+    position = np.concatenate([position, position[internal]])
+    cell = np.concatenate([mesh.owner[face], mesh.neighbour[face[internal]]]).astype(np.int64)
+    key = unique_keys(position * mesh.n_cells + cell)
+    position, cell = key // mesh.n_cells, key % mesh.n_cells
+
+    distance = np.linalg.norm(mesh.cell_centres[cell] - mesh.points[points[position]], axis=1)
+    weight = 1.0 / np.maximum(distance, 1e-300)
+    total = np.bincount(position, weight, len(points))
+    return position, cell, weight / total[position]
+
+
+def _tet_coordinates(x: np.ndarray, a: np.ndarray, b: np.ndarray, c: np.ndarray,
+                     d: np.ndarray) -> np.ndarray:
+    """Barycentric coordinates of points x in tetrahedra (a, b, c, d), shape (n, 4)."""
+    ab, ac, ad, ax = b - a, c - a, d - a, x - a
+    volume = np.einsum("ij,ij->i", ab, np.cross(ac, ad))
+    safe = np.where(np.abs(volume) > 1e-300, volume, np.inf)
+    lb = np.einsum("ij,ij->i", ax, np.cross(ac, ad)) / safe
+    lc = np.einsum("ij,ij->i", ab, np.cross(ax, ad)) / safe
+    ld = np.einsum("ij,ij->i", ab, np.cross(ac, ax)) / safe
+    coordinates = np.stack([1 - lb - lc - ld, lb, lc, ld], axis=1)
+    coordinates[np.isinf(safe)] = -np.inf
+    return coordinates
+
+
+class Probes:
+    """A set of probe points with precomputed sampling stencils."""
+
+    def __init__(self, locator: CellLocator, points: np.ndarray,
+                 interpolation: str = "cell") -> None:
+        """Locate the probes and build their stencils.
+
+        Args:
+            locator: Cell locator of the mesh
+            points: Probe locations, shape (n, 3)
+            interpolation: One of ``INTERPOLATION_SCHEMES``
+        """
+        if interpolation not in INTERPOLATION_SCHEMES:
+            raise ValueError(f"Unsupported probe interpolation: {interpolation}")
+        self.locator = locator
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self.interpolation = interpolation
+        self.cells = locator.locate(self.points)
+        found = np.flatnonzero(self.cells >= 0)
+        if len(found) < len(self.points):
+            logger.warning(f"{len(self.points) - len(found)} of {len(self.points)} probes "
+                           f"are outside the mesh")
+        if interpolation == "cell":
+            probe, cell, weight = found, self.cells[found], np.ones(len(found))
+        else:
+            probe, cell, weight = self._cell_point_stencil(found)
+
+        # Sort the triplets by probe so that sampling is a single reduceat
+        order = np.lexsort((cell, probe))
+        self.stencil_probe = probe[order]
+        self.stencil_cell = cell[order]
+        self.stencil_weight = weight[order]
+
+    @property
+    def found(self) -> np.ndarray:
+        """Mask of the probes inside the mesh."""
+        return self.cells >= 0
+
+    def _cell_point_stencil(self, probes: np.ndarray) -> Tuple[np.ndarray, np.ndarray,
+                                                               np.ndarray]:
+        """Stencil triplets of the cellPoint interpolation of located probes."""
+        mesh = self.locator.mesh
+        if not len(probes):
+            return probes, probes.copy(), np.zeros(0)
+        cells = self.cells[probes]
+        x = self.points[probes]
+
+        # Every (probe, face, edge) of the probe's cell spans a tetrahedron
+        pair, entries = expand(self.locator.face_offsets, cells)
+        faces = self.locator.faces[entries]
+        sizes = mesh.face_sizes[faces]
+        tet_pair = np.repeat(np.arange(len(pair)), sizes)
+        first = np.repeat(mesh.face_offsets[faces], sizes)
+        local = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        p0 = mesh.face_points[first + local]
+        p1 = mesh.face_points[first + (local + 1) % np.repeat(sizes, sizes)]
+        tet_probe = pair[tet_pair]
+        coordinates = _tet_coordinates(x[tet_probe], mesh.cell_centres[cells[tet_probe]],
+                                       mesh.face_centres[faces[tet_pair]], mesh.points[p0],
+                                       mesh.points[p1])
+
+        # Keep the tetrahedron the probe is most inside of
+        score = coordinates.min(axis=1)
+        ranking = np.lexsort((-score, tet_probe))
+        best = ranking[np.r_[True, np.diff(tet_probe[ranking]) != 0]]
+        lam = coordinates[best]
+        best_face = faces[tet_pair[best]]
+        best_size = sizes[tet_pair[best]]
+
+        # Vertex weights: cell centre, face points (face centre), and the edge points
+        n = len(probes)
+        face_pos, face_entries = expand(mesh.face_offsets, best_face)
+        vertex_probe = np.concatenate([np.arange(n), np.arange(n), face_pos])
+        vertex_point = np.concatenate([p0[best], p1[best], mesh.face_points[face_entries]])
+        vertex_weight = np.concatenate([lam[:, 2], lam[:, 3],
+                                        lam[face_pos, 1] / best_size[face_pos]])
+
+        # Point values interpolated from the cells around each point
+        points, point_slot = np.unique(vertex_point, return_inverse=True)
+        around, around_cell, around_weight = point_weights(mesh, points)
+        offsets = np.zeros(len(points) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(around, minlength=len(points)), out=offsets[1:])
+        vertex, entries = expand(offsets, point_slot)
+
+        probe = np.concatenate([probes, probes[vertex_probe[vertex]]])
+        cell = np.concatenate([cells, around_cell[entries]])
+        weight = np.concatenate([lam[:, 0], vertex_weight[vertex] * around_weight[entries]])
+        key, inverse = np.unique(probe * mesh.n_cells + cell, return_inverse=True)
+        return key // mesh.n_cells, key % mesh.n_cells, np.bincount(inverse, weight)
+
+    def sample_series(self, series: np.ndarray) -> np.ndarray:
+        """Sample cell values of several times at the probes in one pass.
+
+        Args:
+            series: Cell values of shape (nTimes, nCells[, nComponents])
+
+        Returns:
+            Probe values of shape (nTimes, nProbes[, nComponents]); NaN for
+            probes outside the mesh
+        """
+        series = np.asarray(series, dtype=np.float64)
+        if series.shape[1] != self.locator.mesh.n_cells:
+            raise ValueError(f"Expected {self.locator.mesh.n_cells} cell values, "
+                             f"got {series.shape[1]}")
+        result = np.full((len(series), len(self.points)) + series.shape[2:], np.nan)
+        if len(self.stencil_probe):
+            weights = self.stencil_weight.reshape((1, -1) + (1,) * (series.ndim - 2))
+            starts = np.r_[0, np.flatnonzero(np.diff(self.stencil_probe)) + 1]
+            result[:, self.stencil_probe[starts]] = np.add.reduceat(
+                series[:, self.stencil_cell] * weights, starts, axis=1)
+        return result
+
+    def sample(self, values: np.ndarray) -> np.ndarray:
+        """Sample cell values of shape (nCells[, nComponents]) at the probes."""
+        return self.sample_series(np.asarray(values)[None])[0]
+
+    def sample_case(self, case_dir: str, name: str,
+                    times: Optional[Sequence[str]] = None) -> Tuple[List[str], np.ndarray]:
+        """Sample a field at every time of a case.
+
+        Only the stencil cells are kept from each time, so memory does not
+        grow with the number of times beyond the probe values.
+
+        Args:
+            case_dir: Path to the OpenFOAM case directory
+            name: Field name
+            times: Time directories; all that hold the field if None
+
+        Returns:
+            Sampled times and probe values of shape (nTimes, nProbes[, nComponents])
+        """
+        if times is None:
+            times = [time for time in time_directories(case_dir)
+                     if os.path.exists(field_path(case_dir, name, time))
+                     or os.path.exists(field_path(case_dir, name, time) + ".gz")]
+        n_cells = self.locator.mesh.n_cells
+        samples = [self.sample(read_field(field_path(case_dir, name, time), n_cells).values)
+                   for time in times]
+        if not samples:
+            return [], np.zeros((0, len(self.points)))
+        return list(times), np.stack(samples)
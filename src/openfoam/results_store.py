@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 09:34:08 2026
+
+@author: adamp
+"""
+
+"""
+Columnar store of processed case results, for fast reloading and export.
+
+Fields of the time directories and the tables of ``postProcessing`` are
+converted once into a directory of ``.npy`` files, one per field and time
+and one per table column, described by a JSON manifest. Numeric data can be
+stored as float32 to halve its size, and arrays are memory-mapped when
+opened, so reopening a case touches only the data actually displayed. The
+manifest records the size and modification time of every source file, so
+rebuilding the store converts only what changed since the last build.
+"""
+import os
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.openfoam.fields import read_field, field_path, time_directories
+from src.openfoam.foam_io import resolve_path
+from src.openfoam.map_fields import list_vol_fields
+from src.openfoam.polymesh import PolyMesh
+from src.openfoam.postprocessing import PostProcessingReader
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Store directory created in a case by default
+STORE_DIR_NAME = ".results"
+
+# Manifest file name and format version
+MANIFEST_NAME = "manifest.json"
+STORE_VERSION = 1
+
+# Source stamp: file size and modification time in nanoseconds
+Stamp = List[int]
+
+
+def default_store_path(case_dir: str) -> str:
+    """Return the default results store directory of a case."""
+    return os.path.join(case_dir, STORE_DIR_NAME)
+
+
+def source_stamp(path: str) -> Stamp:
+    """Return the size and modification time of a source file."""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _source_stamps(case_dir: str, paths: Sequence[str]) -> Dict[str, Stamp]:
+    """Return the stamps of the source files of a table by case-relative path."""
+    return {os.path.relpath(p, case_dir): source_stamp(p) for p in paths}
+
+
+def _storage_array(values: np.ndarray, float32: bool) -> np.ndarray:
+    """Convert values to their stored dtype."""
+    values = np.asarray(values)
+    if values.dtype == object:
+        return np.array(["" if v is None else str(v) for v in values])
+    if float32 and values.dtype == np.float64:
+        return values.astype(np.float32)
+    return values
+
+
+def _save_array(path: str, values: np.ndarray) -> None:
+    """Write a ``.npy`` file through a temporary file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp.npy"
+    np.save(tmp_path, values)
+    os.replace(tmp_path, path)
+
+
+class ResultsStore:
+    """Directory of ``.npy`` arrays described by a JSON manifest."""
+
+    def __init__(self, path: str) -> None:
+        """Open a store, creating an empty manifest if none exists.
+
+        Args:
+            path: Store directory
+        """
+        self.path = path
+        self.manifest: Dict[str, Any] = {"version": STORE_VERSION, "fields": {}, "series": {}}
+        manifest_path = os.path.join(path, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get("version") == STORE_VERSION:
+                self.manifest = manifest
+            else:
+                logger.warning(f"Ignoring results store {path} of version "
+                               f"{manifest.get('version')}")
+
+    def save(self) -> None:
+        """Write the manifest."""
+        os.makedirs(self.path, exist_ok=True)
+        manifest_path = os.path.join(self.path, MANIFEST_NAME)
+        with open(manifest_path + ".tmp", "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    def _load(self, relative_path: str, mmap: bool) -> np.ndarray:
+        """Load a stored array, memory-mapped unless ``mmap`` is False."""
+        return np.load(os.path.join(self.path, relative_path), mmap_mode="r" if mmap else None,
+                       allow_pickle=False)
+
+    # Fields
+
+    def fields(self) -> List[str]:
+        """Names of the stored fields."""
+        return sorted(self.manifest["fields"])
+
+    def times(self, name: str) -> List[str]:
+        """Stored times of a field, in time order."""
+        entries = self.manifest["fields"].get(name, {})
+        return sorted(entries, key=float)
+
+    def field(self, name: str, time: str, mmap: bool = True) -> np.ndarray:
+        """Internal values of a field at a time.
+
+        Raises:
+            KeyError: If the field is not stored at that time
+        """
+        return self._load(self.manifest["fields"][name][time]["file"], mmap)
+
+    def field_is_current(self, name: str, time: str, stamp: Stamp) -> bool:
+        """Whether a stored field was converted from a source with this stamp."""
+        entry = self.manifest["fields"].get(name, {}).get(time)
+        return entry is not None and entry["source"] == stamp
+
+    def put_field(self, name: str, time: str, values: np.ndarray, stamp: Stamp,
+                  float32: bool = False) -> None:
+        """Store the internal values of a field at a time."""
+        values = _storage_array(values, float32)
+        relative_path = os.path.join("fields", name, f"{time}.npy")
+        _save_array(os.path.join(self.path, relative_path), values)
+        self.manifest["fields"].setdefault(name, {})[time] = {
+            "file": relative_path, "shape": list(values.shape), "dtype": values.dtype.str,
+            "source": stamp}
+
+    # Function object tables
+
+    def series_names(self) -> List[Tuple[str, str]]:
+        """(function object, table) pairs of the stored tables."""
+        return sorted(tuple(key.split("/", 1)) for key in self.manifest["series"])
+
+    def series(self, function_object: str, table: str, mmap: bool = True
+               ) -> Dict[str, np.ndarray]:
+        """Columns of a stored table by name.
+
+        Raises:
+            KeyError: If the table is not stored
+        """
+        entry = self.manifest["series"][f"{function_object}/{table}"]
+        return {column["name"]: self._load(column["file"], mmap) for column in entry["columns"]}
+
+    def series_is_current(self, function_object: str, table: str,
+                          stamps: Dict[str, Stamp]) -> bool:
+        """Whether a stored table was converted from sources with these stamps."""
+        entry = self.manifest["series"].get(f"{function_object}/{table}")
+        return entry is not None and entry["sources"] == stamps
+
+    def put_series(self, function_object: str, table: str, columns: Dict[str, np.ndarray],
+                   stamps: Dict[str, Stamp], float32: bool = False) -> None:
+        """Store the columns of a table; the time column is kept in double precision."""
+        entries = []
+        directory = os.path.join("series", function_object, table)
+        for i, (name, values) in enumerate(columns.items()):
+            values = _storage_array(values, float32 and name != "Time")
+            relative_path = os.path.join(directory, f"c{i}.npy")
+            _save_array(os.path.join(self.path, relative_path), values)
+            entries.append({"name": name, "file": relative_path, "dtype": values.dtype.str})
+        n_rows = len(next(iter(columns.values()))) if columns else 0
+        self.manifest["series"][f"{function_object}/{table}"] = {
+            "columns": entries, "n_rows": n_rows, "sources": stamps}
+
+    def export(self, path: str, float32: bool = False) -> "ResultsStore":
+        """Copy the store to another directory.
+
+        Source stamps are kept, so the copy can be updated incrementally
+        from the case like the original.
+
+        Args:
+            path: Directory of the copy
+            float32: Whether to convert double precision data to single precision
+
+        Returns:
+            The copy
+        """
+        exported = ResultsStore(path)
+        for name in self.fields():
+            for time in self.times(name):
+                exported.put_field(name, time, self.field(name, time),
+                                   self.manifest["fields"][name][time]["source"], float32)
+        for function_object, table in self.series_names():
+            entry = self.manifest["series"][f"{function_object}/{table}"]
+            exported.put_series(function_object, table, self.series(function_object, table),
+                                entry["sources"], float32)
+        exported.save()
+        logger.info(f"Exported the results store {self.path} to {path}")
+        return exported
+
+
+def build_results_store(case_dir: str, path: Optional[str] = None,
+                        fields: Optional[Sequence[str]] = None, float32: bool = False,
+                        n_cells: Optional[int] = None) -> ResultsStore:
+    """Convert the fields and postProcessing tables of a case into a store.
+
+    Entries whose source files are unchanged since the previous build are
+    kept as they are.
+
+    Args:
+        case_dir: Case directory
+        path: Store directory; ``default_store_path`` if None
+        fields: Field names to store; all volume fields of each time if None
+        float32: Whether to store numeric data in single precision
+        n_cells: Number of cells, read from the mesh if a uniform field needs it
+
+    Returns:
+        The updated store
+    """
+    store = ResultsStore(path or default_store_path(case_dir))
+    converted = 0
+    for time in time_directories(case_dir):
+        names = list(fields) if fields is not None else list_vol_fields(case_dir, time)
+        for name in names:
+            try:
+                file_path = resolve_path(field_path(case_dir, name, time))
+            except FileNotFoundError:
+                continue
+            stamp = source_stamp(file_path)
+            if store.field_is_current(name, time, stamp):
+                continue
+            try:
+                field = read_field(file_path, n_cells)
+            except ValueError:
+                n_cells = PolyMesh.read(case_dir).n_cells
+                field = read_field(file_path, n_cells)
+            store.put_field(name, time, field.values, stamp, float32)
+            converted += 1
+
+    reader = PostProcessingReader(os.path.join(case_dir, "postProcessing"))
+    for (function_object, table), paths in reader.sources().items():
+        stamps = _source_stamps(case_dir, paths)
+        if store.series_is_current(function_object, table, stamps):
+            continue
+        if not reader.series:
+            reader.refresh()
+        series = reader.series[function_object, table]
+        store.put_series(function_object, table, series.data(), stamps, float32)
+        converted += 1
+    store.save()
+    logger.info(f"Converted {converted} entries into the results store {store.path}")
+    return store
+
+
+def stored_series(case_dir: str, path: Optional[str] = None
+                  ) -> Optional[Dict[Tuple[str, str], Dict[str, np.ndarray]]]:
+    """Return the postProcessing tables of a case from its store, if it is current.
+
+    Only the source files are listed and stamped, so a current store is
+    opened without parsing any table.
+
+    Args:
+        case_dir: Case directory
+        path: Store directory; ``default_store_path`` if None
+
+    Returns:
+        Memory-mapped columns by (function object, table), or None if the
+        store is missing a table or any source changed since it was built
+    """
+    path = path or default_store_path(case_dir)
+    if not os.path.exists(os.path.join(path, MANIFEST_NAME)):
+        return None
+    store = ResultsStore(path)
+    sources = PostProcessingReader(os.path.join(case_dir, "postProcessing")).sources()
+    if not sources or len(sources) != len(store.manifest["series"]):
+        return None
+    tables = {}
+    for (function_object, table), paths in sources.items():
+        if not store.series_is_current(function_object, table, _source_stamps(case_dir, paths)):
+            return None
+        tables[function_object, table] = store.series(function_object, table)
+    return tables
@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 17:32:06 2026
+
+@author: adamp
+"""
+
+"""
+Fast prediction of snappyHexMesh cell counts.
+
+The castellation phase of snappyHexMesh is replayed on a sparse octree built
+over the background block mesh. Cells are stored per level as sorted integer
+keys; the STL is represented by sample points spread over every triangle at
+half the finest cell size, so the cells cut by the surface at any level are
+found by binning the samples. Each level applies the surface levels (with the
+max level where the surface curves more than ``resolve_feature_angle``), the
+gap levels, the refinement regions, distance refinement around the surface
+(queried through a SurfaceBVH) and the ``nCellsBetweenLevels`` buffer,
+then cells on the far side of the surface from ``locationInMesh`` are
+removed. Layer cells are added on top from the predicted surface faces.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.openfoam.stl import TriSurface
+from src.openfoam.bvh import SurfaceBVH, points_inside_surface
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Typical peak memory of a serial snappyHexMesh run per final cell
+SNAPPY_BYTES_PER_CELL = 1500
+
+# Maximum number of samples or point/triangle pairs processed at once
+SAMPLE_CHUNK_SIZE = 1 << 21
+
+LevelSpec = Union[int, Tuple[int, int]]
+
+
+class RefinementRegion:
+    """Geometric refinement region (``refinementRegions`` entry)."""
+
+    SHAPES = ("box", "sphere", "cylinder")
+
+    def __init__(self, shape: str, level: int, mode: str = "inside", **geometry) -> None:
+        """Initialize the region.
+
+        Args:
+            shape: ``box`` (min, max), ``sphere`` (centre, radius) or
+                ``cylinder`` (point1, point2, radius)
+            level: Refinement level inside (or outside) the region
+            mode: ``inside`` or ``outside``
+            **geometry: Shape parameters named as in snappyHexMeshDict
+        """
+        if shape not in self.SHAPES:
+            raise ValueError(f"Unsupported refinement region shape: {shape}")
+        if mode not in ("inside", "outside"):
+            raise ValueError(f"Unsupported refinement region mode: {mode}")
+        self.shape = shape
+        self.level = int(level)
+        self.mode = mode
+        self.geometry = {name: np.asarray(value, dtype=np.float64)
+                         for name, value in geometry.items()}
+
+    def contains(self, points: np.ndarray) -> np.ndarray:
+        """Return a mask of the points selected by the region."""
+        g = self.geometry
+        if self.shape == "box":
+            inside = np.all((points >= g["min"]) & (points <= g["max"]), axis=1)
+        elif self.shape == "sphere":
+            inside = np.sum((points - g["centre"]) ** 2, axis=1) <= g["radius"] ** 2
+        else:
+            axis = g["point2"] - g["point1"]
+            length2 = np.dot(axis, axis)
+            t = (points - g["point1"]) @ axis / length2
+            radial = points - g["point1"] - t[:, None] * axis
+            inside = (t >= 0) & (t <= 1) & (np.sum(radial ** 2, axis=1) <= g["radius"] ** 2)
+        return inside if self.mode == "inside" else ~inside
+
+
+class SnappyEstimate:
+    """Predicted size of a snappyHexMesh mesh."""
+
+    def __init__(self, cells_per_level: List[int], n_removed: int,
+                 n_surface_faces: int, n_layers: int) -> None:
+        """Initialize the estimate.
+
+        Args:
+            cells_per_level: Kept castellated cells at each refinement level
+            n_removed: Cells removed on the far side of the surface
+            n_surface_faces: Predicted number of faces on the STL patches
+            n_layers: Number of prism layers added on the STL patches
+        """
+        self.cells_per_level = cells_per_level
+        self.n_removed = n_removed
+        self.n_surface_faces = n_surface_faces
+        self.n_layer_cells = n_surface_faces * n_layers
+
+    @property
+    def n_castellated_cells(self) -> int:
+        """Cells after castellation and snapping."""
+        return int(sum(self.cells_per_level))
+
+    @property
+    def n_cells(self) -> int:
+        """Cells of the final mesh including layers."""
+        return self.n_castellated_cells + self.n_layer_cells
+
+    @property
+    def n_faces(self) -> int:
+        """Approximate face count of the final hex-dominant mesh."""
+        return 3 * self.n_cells + self.n_surface_faces
+
+    @property
+    def memory_bytes(self) -> int:
+        """Approximate peak memory of a serial snappyHexMesh run."""
+        return self.n_cells * SNAPPY_BYTES_PER_CELL
+
+    def summary(self) -> Dict[str, object]:
+        """Return the estimate as a dictionary."""
+        return {
+            "cells": self.n_cells,
+            "castellated_cells": self.n_castellated_cells,
+            "layer_cells": self.n_layer_cells,
+            "removed_cells": self.n_removed,
+            "surface_faces": self.n_surface_faces,
+            "faces": self.n_faces,
+            "memory_gb": self.memory_bytes / 1024 ** 3,
+            "cells_per_level": list(self.cells_per_level),
+        }
+
+
+def sample_surface(surface: TriSurface, spacing: np.ndarray,
+                   triangles: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Spread sample points over triangles at a given spacing.
+
+    Every triangle is parametrised from the vertex opposite its shortest edge,
+    so slivers get a single row of samples along their length.
+
+    Args:
+        surface: Triangle surface
+        spacing: Maximum sample spacing of every triangle, shape (nTriangles,)
+        triangles: Triangles to sample; all if None
+
+    Returns:
+        Sample points and the triangle of every sample
+    """
+    if triangles is None:
+        triangles = np.arange(surface.n_triangles)
+    vertices = surface.triangle_vertices()[triangles]
+    spacing = spacing[triangles]
+
+    # Rotate every triangle so that edge b-c is the shortest one
+    lengths = np.linalg.norm(vertices[:, [2, 0, 1]] - vertices[:, [1, 2, 0]], axis=2)
+    apex = np.argmin(lengths, axis=1)
+    rotation = (apex[:, None] + np.arange(3)) % 3
+    vertices = np.take_along_axis(vertices, rotation[:, :, None], axis=1)
+    lengths = np.take_along_axis(lengths, rotation, axis=1)
+
+    n_s = np.ceil(np.maximum(lengths[:, 1], lengths[:, 2]) / spacing)
+    n_s = np.maximum(n_s, 1).astype(np.int64)
+    n_t = np.maximum(np.ceil(lengths[:, 0] / spacing), 1).astype(np.int64)
+    n_samples = (n_s + 1) * (n_t + 1)
+
+    points = []
+    owners = []
+    bounds = np.searchsorted(np.cumsum(n_samples),
+                             np.arange(SAMPLE_CHUNK_SIZE, n_samples.sum(), SAMPLE_CHUNK_SIZE))
+    for chunk in np.split(np.arange(len(triangles)), np.unique(bounds)):
+        if len(chunk) == 0:
+            continue
+        counts = n_samples[chunk]
+        tri = np.repeat(chunk, counts)
+        first = np.cumsum(counts) - counts
+        local = np.arange(counts.sum()) - np.repeat(first, counts)
+        s = (local // (n_t[tri] + 1)) / n_s[tri]
+        t = (local % (n_t[tri] + 1)) / n_t[tri]
+        a, b, c = vertices[tri, 0], vertices[tri, 1], vertices[tri, 2]
+        points.append(a + s[:, None] * ((b - a) + t[:, None] * (c - b)))
+        owners.append(triangles[tri])
+    if not points:
+        return np.empty((0, 3)), np.empty(0, dtype=np.int64)
+    return np.concatenate(points), np.concatenate(owners)
+
+
+class SnappyCellEstimator:
+    """Replays snappyHexMesh castellation on a sparse octree."""
+
+    def __init__(self, surface: TriSurface, background_min: Sequence[float],
+                 background_max: Sequence[float], background_cells: Sequence[int],
+                 surface_levels: Union[LevelSpec, Dict[str, LevelSpec]] = (2, 2),
+                 regions: Optional[List[RefinementRegion]] = None,
+                 gap_level: Optional[Tuple[int, int, int]] = None,
+                 distance_levels: Optional[Sequence[Tuple[float, int]]] = None,
+                 n_cells_between_levels: int = 3,
+                 resolve_feature_angle: float = 30.0,
+                 location_in_mesh: Optional[Sequence[float]] = None,
+                 n_layers: int = 0) -> None:
+        """Initialize the estimator.
+
+        Args:
+            surface: STL geometry
+            background_min: Lower corner of the background block mesh
+            background_max: Upper corner of the background block mesh
+            background_cells: Background cells along x, y and z
+            surface_levels: (min, max) refinement level of the surface, or a
+                mapping of STL solid name to levels
+            regions: Refinement regions
+            gap_level: (nGapCells, minLevel, maxLevel) of gap refinement
+            distance_levels: (distance, level) pairs of a distance-mode
+                refinement region around the surface
+            n_cells_between_levels: Buffer layers between refinement levels
+            resolve_feature_angle: Curvature angle triggering the max level
+            location_in_mesh: Point in the kept part of the mesh; the region
+                outside the surface is kept if None
+            n_layers: Prism layers added on the surface
+        """
+        self.surface = surface
+        self.origin = np.asarray(background_min, dtype=np.float64)
+        self.base_dims = np.asarray(background_cells, dtype=np.int64)
+        extent = np.asarray(background_max, dtype=np.float64) - self.origin
+        self.base_size = extent / self.base_dims
+        self.regions = regions or []
+        self.gap_level = gap_level
+        self.distance_levels = sorted(distance_levels or [], key=lambda item: item[0])
+        self.n_buffer = int(n_cells_between_levels)
+        self.resolve_cos = np.cos(np.radians(resolve_feature_angle) / 2.0)
+        self.location_in_mesh = location_in_mesh
+        self.n_layers = int(n_layers)
+
+        # Per-triangle (min, max) surface level
+        if isinstance(surface_levels, dict):
+            table = np.zeros((len(surface.region_names), 2), dtype=np.int64)
+            for index, name in enumerate(surface.region_names):
+                table[index] = np.broadcast_to(surface_levels.get(name, 0), 2)
+            self.triangle_levels = table[surface.regions]
+        else:
+            self.triangle_levels = np.tile(np.broadcast_to(surface_levels, 2),
+                                           (surface.n_triangles, 1))
+
+        self.max_level = int(max([self.triangle_levels.max(initial=0)]
+                                 + [region.level for region in self.regions]
+                                 + ([gap_level[2]] if gap_level else [])
+                                 + [level for _, level in self.distance_levels]))
+        self._bvh = None
+
+    @property
+    def bvh(self) -> SurfaceBVH:
+        """Bounding volume hierarchy over the surface, built on first use."""
+        if self._bvh is None:
+            self._bvh = SurfaceBVH(self.surface)
+        return self._bvh
+
+    # Key encoding at a given level
+
+    def _dims(self, level: int) -> np.ndarray:
+        return self.base_dims << level
+
+    def _encode(self, ijk: np.ndarray, level: int) -> np.ndarray:
+        dims = self._dims(level)
+        return (ijk[:, 0] * dims[1] + ijk[:, 1]) * dims[2] + ijk[:, 2]
+
+    def _decode(self, keys: np.ndarray, level: int) -> np.ndarray:
+        dims = self._dims(level)
+        ijk = np.empty((len(keys), 3), dtype=np.int64)
+        ijk[:, 0], rest = np.divmod(keys, dims[1] * dims[2])
+        ijk[:, 1], ijk[:, 2] = np.divmod(rest, dims[2])
+        return ijk
+
+    def _point_keys(self, points: np.ndarray, level: int, scale: int = 1) -> np.ndarray:
+        size = self.base_size / (1 << level) * scale
+        dims = -(-self._dims(level) // scale)
+        ijk = np.clip(np.floor((points - self.origin) / size).astype(np.int64), 0, dims - 1)
+        return (ijk[:, 0] * dims[1] + ijk[:, 1]) * dims[2] + ijk[:, 2]
+
+    def _centres(self, keys: np.ndarray, level: int) -> np.ndarray:
+        return self.origin + (self._decode(keys, level) + 0.5) * (self.base_size / (1 << level))
+
+    @staticmethod
+    def _member(keys: np.ndarray, sorted_keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the membership mask and positions of keys in a sorted array."""
+        position = np.clip(np.searchsorted(sorted_keys, keys), 0, max(len(sorted_keys) - 1, 0))
+        found = sorted_keys[position] == keys if len(sorted_keys) else np.zeros(len(keys), bool)
+        return found, position
+
+    def _dilate(self, mask: np.ndarray, keys: np.ndarray, level: int) -> np.ndarray:
+        """Grow a cell mask by face neighbours within the existing cells."""
+        dims = self._dims(level)
+        for _ in range(self.n_buffer):
+            front = self._decode(keys[mask], level)
+            grown = mask.copy()
+            for axis in range(3):
+                for step in (-1, 1):
+                    shifted = front.copy()
+                    shifted[:, axis] += step
+                    valid = (shifted[:, axis] >= 0) & (shifted[:, axis] < dims[axis])
+                    found, position = self._member(self._encode(shifted[valid], level), keys)
+                    grown[position[found]] = True
+            if np.array_equal(grown, mask):
+                break
+            mask = grown
+        return mask
+
+    def _surface_samples(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Sample the surface inside the background mesh."""
+        finest = np.minimum(self.triangle_levels[:, 1], self.max_level)
+        if self.gap_level:
+            finest = np.maximum(finest, self.gap_level[2])
+        spacing = self.base_size.min() / (2.0 ** (finest + 1))
+        points, triangles = sample_surface(self.surface, spacing)
+        upper = self.origin + self.base_size * self.base_dims
+        keep = np.all((points >= self.origin) & (points <= upper), axis=1)
+        normals = self.surface.triangle_normals()[triangles[keep]]
+        return points[keep], triangles[keep], normals
+
+    @staticmethod
+    def _coherence(inverse: np.ndarray, normals: np.ndarray, n_groups: int) -> np.ndarray:
+        """Return |mean normal| of each group of samples (1 for a flat surface)."""
+        weight = np.any(normals != 0, axis=1).astype(np.float64)
+        count = np.maximum(np.bincount(inverse, weight, minlength=n_groups), 1)
+        total = np.stack([np.bincount(inverse, normals[:, i], minlength=n_groups)
+                          for i in range(3)], axis=1)
+        return np.linalg.norm(total, axis=1) / count
+
+    def estimate(self) -> SnappyEstimate:
+        """Run the castellation replay.
+
+        Returns:
+            Predicted cell counts and memory
+        """
+        closed = bool(np.all(self.surface.edges()[2] == 2))
+        if not closed:
+            logger.warning("Surface is not closed; cell removal is not predicted")
+        keep_inside = False
+        if closed and self.location_in_mesh is not None:
+            keep_inside = bool(points_inside_surface(
+                self.surface, np.asarray(self.location_in_mesh, dtype=np.float64)[None])[0])
+
+        points, triangles, normals = self._surface_samples()
+        levels = self.triangle_levels[triangles]
+
+        keys = np.arange(int(np.prod(self.base_dims)), dtype=np.int64)
+        inside = (points_inside_surface(self.surface, self._centres(keys, 0)) if closed
+                  else np.zeros(len(keys), dtype=bool))
+        cells_per_level = []
+        n_removed = 0
+        n_surface_faces = 0
+
+        for level in range(self.max_level + 1):
+            # Surface cells that exist at this level
+            sample_keys = self._point_keys(points, level)
+            found, position = self._member(sample_keys, keys)
+            cut_cells, inverse = np.unique(position[found], return_inverse=True)
+            cut = np.zeros(len(keys), dtype=bool)
+            cut[cut_cells] = True
+
+            refine = np.zeros(len(keys), dtype=bool)
+            if len(cut_cells):
+                coherence = self._coherence(inverse, normals[found], len(cut_cells))
+                curved = coherence < self.resolve_cos
+                required = np.zeros(len(cut_cells), dtype=np.int64)
+                np.maximum.at(required, inverse, levels[found, 0])
+                required_max = np.zeros(len(cut_cells), dtype=np.int64)
+                np.maximum.at(required_max, inverse, levels[found, 1])
+                required[curved] = required_max[curved]
+                refine[cut_cells[required > level]] = True
+
+                if self.gap_level and self.gap_level[1] <= level < self.gap_level[2]:
+                    gap_keys = self._point_keys(points[found], level, self.gap_level[0])
+                    gap_bins, gap_inverse = np.unique(gap_keys, return_inverse=True)
+                    opposed = self._coherence(gap_inverse, normals[found], len(gap_bins)) < 0.5
+                    refine[position[found][opposed[gap_inverse]]] = True
+
+            if self.regions:
+                centres = self._centres(keys, level)
+                for region in self.regions:
+                    if region.level > level:
+                        refine |= region.contains(centres)
+
+            if any(distance_level > level for _, distance_level in self.distance_levels):
+                # Only cells within the largest distance that still refines matter
+                reach = max(d for d, distance_level in self.distance_levels
+                            if distance_level > level)
+                distance = self.bvh.nearest(self._centres(keys, level), reach)[0]
+                for limit, distance_level in self.distance_levels:
+                    if distance_level > level:
+                        refine |= distance < limit
+
+            if level < self.max_level:
+                refine = self._dilate(refine, keys, level)
+            else:
+                refine[:] = False
+
+            # Leaves at this level, minus the cells on the far side of the surface
+            leaves = ~refine
+            kept = leaves & (inside == keep_inside) if closed else leaves
+            cells_per_level.append(int(np.count_nonzero(kept)))
+            n_removed += int(np.count_nonzero(leaves)) - cells_per_level[-1]
+            n_surface_faces += int(np.count_nonzero(kept & cut))
+
+            if not refine.any():
+                break
+
+            # Children of the refined cells; only children of cut cells need a new inside test
+            parents = np.flatnonzero(refine)
+            ijk = self._decode(keys[parents], level) * 2
+            offsets = np.array([[i, j, k] for i in (0, 1) for j in (0, 1) for k in (0, 1)])
+            children = (ijk[:, None, :] + offsets).reshape(-1, 3)
+            child_keys = self._encode(children, level + 1)
+            child_inside = np.repeat(inside[parents], 8)
+            if closed:
+                retest = np.repeat(cut[parents], 8)
+                child_inside[retest] = points_inside_surface(
+                    self.surface, self._centres(child_keys[retest], level + 1))
+            order = np.argsort(child_keys)
+            keys, inside = child_keys[order], child_inside[order]
+
+        estimate = SnappyEstimate(cells_per_level, n_removed, n_surface_faces, self.n_layers)
+        logger.info(f"Predicted snappyHexMesh size: {estimate.summary()}")
+        return estimate
+
+
+def estimate_snappy_cells(surface: TriSurface, background_min: Sequence[float],
+                          background_max: Sequence[float], background_cells: Sequence[int],
+                          **kwargs) -> SnappyEstimate:
+    """Predict the size of a snappyHexMesh mesh.
+
+    Args:
+        surface: STL geometry
+        background_min: Lower corner of the background block mesh
+        background_max: Upper corner of the background block mesh
+        background_cells: Background cells along x, y and z
+        **kwargs: Refinement settings passed to SnappyCellEstimator
+
+    Returns:
+        Predicted cell counts and memory
+    """
+    return SnappyCellEstimator(surface, background_min, background_max,
+                               background_cells, **kwargs).estimate()
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 13:26:03 2026
+
+@author: adamp
+"""
+
+"""
+Spectral analysis of probe and force histories.
+
+Series written with a variable ``deltaT`` are resampled onto a uniform grid
+with one interpolation stencil shared by all channels. Welch power spectral
+densities of all channels are then computed together: segments are strided
+views of the resampled data, windowed and transformed in batches so memory
+stays bounded for series of millions of samples. Dominant frequencies are
+the highest spectral peaks, refined by parabolic interpolation. Spectra of
+postProcessing tables are cached on the size and modification time of
+their source files.
+"""
+import os
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.openfoam.postprocessing import DatSeries, NUMERIC
+from src.utils.cache import ArrayCache
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Supported segment windows
+WINDOWS = ("hann", "hamming", "boxcar")
+
+# Default number of samples per Welch segment, and fraction of overlap
+DEFAULT_SEGMENT_LENGTH = 4096
+DEFAULT_OVERLAP = 0.5
+
+# Number of segments transformed at once
+SEGMENT_BATCH = 64
+
+# Number of dominant frequencies reported per channel
+DEFAULT_PEAKS = 3
+
+
+def window_function(name: str, length: int) -> np.ndarray:
+    """Periodic window of a given length, as used for spectral estimation."""
+    if name not in WINDOWS:
+        raise ValueError(f"Unsupported window: {name}")
+    phase = 2 * np.pi * np.arange(length) / length
+    if name == "hann":
+        return 0.5 - 0.5 * np.cos(phase)
+    if name == "hamming":
+        return 0.54 - 0.46 * np.cos(phase)
+    return np.ones(length)
+
+
+def resample_uniform(time: np.ndarray, values: np.ndarray,
+                     time_step: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Linearly resample series onto a uniform time grid.
+
+    Repeated times, as left by restarts, keep their last sample.
+
+    Args:
+        time: Sample times, shape (N,)
+        values: Samples, shape (N,) or (N, channels)
+        time_step: Grid spacing; the median sample spacing if None
+
+    Returns:
+        Uniform times and resampled values
+    """
+    time = np.asarray(time, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    reversed_unique = np.unique(time[::-1], return_index=True)[1]
+    keep = len(time) - 1 - reversed_unique
+    time, values = time[keep], values[keep]
+    if len(time) < 2:
+        raise ValueError("At least two distinct sample times are needed")
+    if time_step is None:
+        time_step = float(np.median(np.diff(time)))
+    grid = time[0] + time_step * np.arange(int(np.floor((time[-1] - time[0]) / time_step
+                                                         + 1e-9)) + 1)
+
+    # One stencil for every channel
+    index = np.clip(np.searchsorted(time, grid, side="right") - 1, 0, len(time) - 2)
+    fraction = (grid - time[index]) / (time[index + 1] - time[index])
+    if values.ndim > 1:
+        fraction = fraction[:, None]
+    return grid, values[index] * (1 - fraction) + values[index + 1] * fraction
+
+
+def welch_psd(values: np.ndarray, sample_rate: float,
+              segment_length: int = DEFAULT_SEGMENT_LENGTH, overlap: float = DEFAULT_OVERLAP,
+              window: str = "hann", detrend: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """One-sided Welch power spectral density of uniformly sampled channels.
+
+    Args:
+        values: Samples, shape (N,) or (N, channels)
+        sample_rate: Samples per unit time
+        segment_length: Samples per segment; shortened to the series length
+        overlap: Overlapping fraction of consecutive segments
+        window: One of ``WINDOWS``
+        detrend: Whether to remove the mean of each segment
+
+    Returns:
+        Frequencies (F,) and densities (F,) or (F, channels)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    channels = values.reshape(len(values), -1).T
+    length = max(2, min(int(segment_length), channels.shape[1]))
+    step = max(1, int(round(length * (1 - overlap))))
+    taper = window_function(window, length)
+    segments = np.lib.stride_tricks.sliding_window_view(channels, length, axis=1)[:, ::step]
+
+    total = np.zeros((channels.shape[0], length // 2 + 1))
+    for start in range(0, segments.shape[1], SEGMENT_BATCH):
+        batch = segments[:, start:start + SEGMENT_BATCH]
+        if detrend:
+            batch = batch - batch.mean(axis=2, keepdims=True)
+        spectrum = np.fft.rfft(batch * taper, axis=2)
+        total += np.square(np.abs(spectrum)).sum(axis=1)
+
+    psd = total / (segments.shape[1] * sample_rate * np.square(taper).sum())
+    # Fold the negative frequencies onto the positive ones
+    psd[:, 1:length // 2 + (length % 2)] *= 2
+    frequencies = np.fft.rfftfreq(length, 1.0 / sample_rate)
+    return frequencies, psd.T if values.ndim > 1 else psd[0]
+
+
+def dominant_frequencies(frequencies: np.ndarray, psd: np.ndarray, n_peaks: int = DEFAULT_PEAKS,
+                         min_frequency: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Frequencies and densities of the highest spectral peaks of each channel.
+
+    Peaks are local maxima above ``min_frequency``, located between bins by
+    fitting a parabola to the logarithm of the density.
+
+    Returns:
+        Peak frequencies and densities, (n_peaks, channels), NaN where a
+        channel has fewer peaks
+    """
+    psd = psd.reshape(len(frequencies), -1)
+    peaks = np.full((n_peaks, psd.shape[1]), np.nan)
+    powers = np.full((n_peaks, psd.shape[1]), np.nan)
+    if len(frequencies) < 3:
+        return peaks, powers
+    log_psd = np.log(np.maximum(psd, np.finfo(float).tiny))
+    centre = log_psd[1:-1]
+    is_peak = (centre > log_psd[:-2]) & (centre >= log_psd[2:]) & \
+        (frequencies[1:-1, None] >= min_frequency)
+    df = frequencies[1] - frequencies[0]
+    for channel in range(psd.shape[1]):
+        bins = np.flatnonzero(is_peak[:, channel]) + 1
+        bins = bins[np.argsort(psd[bins, channel])[::-1][:n_peaks]]
+        below, at, above = (log_psd[bins - 1, channel], log_psd[bins, channel],
+                            log_psd[bins + 1, channel])
+        curvature = below - 2 * at + above
+        shift = np.where(curvature < 0, 0.5 * (below - above) / np.where(curvature < 0,
+                                                                       curvature, 1), 0)
+        peaks[:len(bins), channel] = frequencies[bins] + shift * df
+        powers[:len(bins), channel] = np.exp(at - 0.25 * (below - above) * shift)
+    return peaks, powers
+
+
+def strouhal_number(frequency: np.ndarray, length: float, velocity: float) -> np.ndarray:
+    """Strouhal number of a shedding frequency, ``f L / U``."""
+    return np.asarray(frequency) * length / velocity
+
+
+class SpectralResult:
+    """Welch spectra and dominant frequencies of the channels of a series."""
+
+    def __init__(self, columns: Sequence[str], frequencies: np.ndarray, psd: np.ndarray,
+                 peaks: np.ndarray, peak_powers: np.ndarray, sample_rate: float) -> None:
+        self.columns = list(columns)
+        self.frequencies = frequencies
+        self.psd = psd
+        self.peaks = peaks
+        self.peak_powers = peak_powers
+        self.sample_rate = sample_rate
+
+    def channel(self, column: str) -> np.ndarray:
+        """Density of one channel."""
+        return self.psd[:, self.columns.index(column)]
+
+
+def series_spectra(series: DatSeries, columns: Optional[Sequence[str]] = None,
+                   start_time: Optional[float] = None, time_step: Optional[float] = None,
+                   segment_length: int = DEFAULT_SEGMENT_LENGTH,
+                   overlap: float = DEFAULT_OVERLAP, window: str = "hann",
+                   n_peaks: int = DEFAULT_PEAKS, min_frequency: float = 0.0,
+                   cache: Optional[ArrayCache] = None) -> SpectralResult:
+    """Spectra of the channels of a postProcessing table, cached on its files.
+
+    Args:
+        series: Table read by ``PostProcessingReader``
+        columns: Channels to analyse; all numeric columns but time if None
+        start_time: Samples before this time (initial transient) are ignored
+        time_step: Resampling step; the median sample spacing if None
+        segment_length: Samples per Welch segment
+        overlap: Overlapping fraction of consecutive segments
+        window: One of ``WINDOWS``
+        n_peaks: Number of dominant frequencies per channel
+        min_frequency: Lowest frequency considered for peaks
+        cache: Spectra cache; the default ``spectra`` cache if None
+
+    Returns:
+        The spectra, with one channel per column
+    """
+    if columns is None:
+        kinds = dict(zip(series.schema.columns, series.schema.kinds)) if series.schema else {}
+        columns = [c for c in series.columns if c != "Time" and kinds.get(c, NUMERIC) == NUMERIC]
+    columns = list(columns)
+    stamps = []
+    for path in series.paths:
+        stat = os.stat(path)
+        stamps.append((os.path.abspath(path), stat.st_size, stat.st_mtime_ns))
+    cache = cache or ArrayCache("spectra")
+    key = ArrayCache.make_key(stamps, series.n_rows, columns, start_time, time_step,
+                              segment_length, overlap, window, n_peaks, min_frequency)
+    cached = cache.load(key)
+    if cached is not None:
+        return SpectralResult(columns, cached["frequencies"], cached["psd"], cached["peaks"],
+                              cached["peak_powers"], float(cached["sample_rate"]))
+
+    time = series.time
+    keep = time >= start_time if start_time is not None else slice(None)
+    values = np.stack([np.asarray(series[c], dtype=np.float64) for c in columns], axis=1)
+    grid, resampled = resample_uniform(time[keep], values[keep], time_step)
+    sample_rate = 1.0 / (grid[1] - grid[0])
+    frequencies, psd = welch_psd(resampled, sample_rate, segment_length, overlap, window)
+    peaks, powers = dominant_frequencies(frequencies, psd, n_peaks, min_frequency)
+    cache.save(key, {"frequencies": frequencies, "psd": psd, "peaks": peaks,
+                     "peak_powers": powers, "sample_rate": np.array(sample_rate)})
+    logger.info(f"Computed spectra of {len(columns)} channels of {series.function_object}/"
+                f"{series.name} from {len(grid)} samples")
+    return SpectralResult(columns, frequencies, psd, peaks, powers, sample_rate)
@@ -0,0 +1,415 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:05:12 2026
+
+@author: adamp
+"""
+
+"""
+Reader for binary and ASCII STL geometry with surface statistics.
+
+Binary files are mapped straight onto a structured dtype with
+``np.frombuffer``; ASCII files are parsed by stripping the STL keywords and
+converting the remaining numbers in one ``np.fromstring`` call per solid.
+Duplicate vertices are merged through a hash of their coordinate bits.
+"""
+import os
+import re
+import hashlib
+from typing import Dict, List, Optional, Tuple, Any
+
+import numpy as np
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Record layout of one binary STL facet
+BINARY_FACET_DTYPE = np.dtype([
+    ("normal", "<f4", (3,)),
+    ("vertices", "<f4", (3, 3)),
+    ("attribute", "<u2"),
+])
+
+# Start of an ASCII solid, capturing its name
+SOLID_RE = re.compile(rb"^[ \t]*solid[ \t]*([^\r\n]*)$", re.M | re.I)
+
+# Blanks out keyword letters and line breaks, keeping digits, signs, dots
+# and the exponent letters; keywords then leave only isolated "e" tokens
+_KEYWORD_LETTERS = (bytes(c for c in range(256) if chr(c).isalpha() and chr(c) not in "eE")
+                    + b"\r\n\t")
+_ASCII_BLANKING = bytes.maketrans(_KEYWORD_LETTERS, b" " * len(_KEYWORD_LETTERS))
+
+# Odd multipliers combining the coordinate bits of a row into one hash key
+_HASH_MULTIPLIERS = (np.uint64(0x9E3779B97F4A7C15), np.uint64(0xC2B2AE3D27D4EB4F),
+                     np.uint64(0x165667B19E3779F9))
+
+
+class STLParseError(Exception):
+    """Exception raised for unreadable STL files."""
+    pass
+
+
+def mix64(keys: np.ndarray) -> np.ndarray:
+    """Apply the splitmix64 finalizer to an array of 64-bit keys in place."""
+    with np.errstate(over="ignore"):
+        keys ^= keys >> np.uint64(30)
+        keys *= np.uint64(0xBF58476D1CE4E5B9)
+        keys ^= keys >> np.uint64(27)
+        keys *= np.uint64(0x94D049BB133111EB)
+        keys ^= keys >> np.uint64(31)
+    return keys
+
+
+def _group_keys(keys: np.ndarray, rows: np.ndarray,
+                key_bits: int = 64) -> Tuple[np.ndarray, np.ndarray]:
+    """Group rows by 64-bit keys with a single value sort.
+
+    Each key is packed with the row index into one 64-bit word, so a plain
+    (SIMD) sort of the words both groups equal keys and yields the
+    permutation, which is several times faster than ``argsort``. Keys of
+    ``key_bits`` bits that fit beside the index are exact; otherwise only
+    their high bits are kept and rows sharing a truncated key but
+    differing exactly are split again.
+
+    Args:
+        keys: Key of every row, uint64
+        rows: Exact identity of the rows, shape (n, k)
+        key_bits: Number of significant key bits
+
+    Returns:
+        Tuple of (index of the first occurrence of each group, group of every row)
+    """
+    n = len(keys)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    bits = np.uint64(max(1, (n - 1).bit_length()))
+    exact = key_bits + int(bits) <= 64
+    packed = keys << bits if exact else (keys >> bits) << bits
+    packed |= np.arange(n, dtype=np.uint64)
+    packed.sort()
+    order = (packed & ((np.uint64(1) << bits) - np.uint64(1))).astype(np.int64)
+    packed >>= bits
+    is_new = np.empty(n, dtype=bool)
+    is_new[0] = True
+    np.not_equal(packed[1:], packed[:-1], out=is_new[1:])
+    del packed
+    group = np.cumsum(is_new) - 1
+    first = order[is_new]
+    inverse = np.empty(n, dtype=np.int64)
+    inverse[order] = group
+
+    if exact:
+        return first, inverse
+
+    # Truncated hash collisions: split the affected groups exactly
+    unequal = rows.take(first[inverse], axis=0) != rows
+    differs = np.logical_or.reduce(unequal, axis=1) if rows.shape[1] > 1 else unequal[:, 0]
+    if differs.any():
+        logger.debug("Hash collision while grouping rows, using exact comparison")
+        members = np.flatnonzero(np.isin(inverse, inverse[differs]))
+        row_view = np.ascontiguousarray(rows[members]).view(
+            np.dtype((np.void, rows.dtype.itemsize * rows.shape[1]))).ravel()
+        _, local_first, local = np.unique(row_view, return_index=True, return_inverse=True)
+        local = local.ravel()
+        # The sub-group holding a group's first row keeps the group label
+        keeps = members[local_first] == first[inverse[members[local_first]]]
+        labels = np.where(keeps, inverse[members[local_first]],
+                          len(first) + np.cumsum(~keeps) - 1)
+        inverse[members] = labels[local]
+        first = np.concatenate([first, members[local_first[~keeps]]])
+    return first, inverse
+
+
+def unique_rows(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Find unique rows of a float array through a hash of their bit patterns.
+
+    Hashing reduces the row comparison to a single sort of 64-bit words,
+    which is much faster than ``np.unique(axis=0)``. Hash collisions are
+    detected and resolved with an exact comparison. Single precision rows
+    (binary STL vertices) are compared in single precision.
+
+    Args:
+        values: Array of shape (n, k), k <= 3
+
+    Returns:
+        Tuple of (index of the first occurrence of each unique row,
+        inverse mapping every row to its unique row)
+    """
+    # Adding 0.0 turns -0.0 into 0.0 so both hash alike
+    dtype = np.float32 if values.dtype == np.float32 else np.float64
+    values = np.ascontiguousarray(values + dtype(0.0), dtype=dtype)
+    bits = values.view(np.uint32 if dtype == np.float32 else np.uint64)
+    bits = bits.reshape(len(values), -1)
+    with np.errstate(over="ignore"):
+        keys = bits[:, 0] * _HASH_MULTIPLIERS[0]
+        for column in range(1, bits.shape[1]):
+            keys += bits[:, column] * _HASH_MULTIPLIERS[column]
+    return _group_keys(mix64(keys), bits)
+
+
+class TriSurface:
+    """Triangulated surface stored as merged points and triangle labels."""
+
+    def __init__(self, points: np.ndarray, triangles: np.ndarray,
+                 regions: Optional[np.ndarray] = None,
+                 region_names: Optional[List[str]] = None,
+                 source_hash: Optional[str] = None) -> None:
+        """Initialize the surface.
+
+        Args:
+            points: Point coordinates, shape (nPoints, 3)
+            triangles: Point labels of every triangle, shape (nTriangles, 3)
+            regions: Region (solid) index of every triangle
+            region_names: Name of every region
+            source_hash: Hash of the file the surface was read from
+        """
+        self.points = np.ascontiguousarray(points, dtype=np.float64)
+        self.triangles = np.ascontiguousarray(triangles, dtype=np.int32)
+        if regions is None:
+            regions = np.zeros(len(self.triangles), dtype=np.int32)
+        self.regions = np.ascontiguousarray(regions, dtype=np.int32)
+        self.region_names = list(region_names or ["surface"])
+        self.source_hash = source_hash
+
+        # Cache for derived quantities
+        self._cache: Dict[str, Any] = {}
+
+    @classmethod
+    def from_triangle_vertices(cls, vertices: np.ndarray, regions: Optional[np.ndarray] = None,
+                               region_names: Optional[List[str]] = None,
+                               source_hash: Optional[str] = None) -> "TriSurface":
+        """Create a surface from unmerged triangle vertices, merging duplicates.
+
+        Args:
+            vertices: Triangle vertex coordinates, shape (nTriangles, 3, 3)
+            regions: Region index of every triangle
+            region_names: Name of every region
+            source_hash: Hash of the source file
+        """
+        flat = vertices.reshape(-1, 3)
+        first, inverse = unique_rows(flat)
+        surface = cls(flat[first], inverse.reshape(-1, 3), regions, region_names, source_hash)
+        # Welding is exact, so the unmerged vertices are the triangle vertices
+        surface._cache["vertices"] = vertices.reshape(-1, 3, 3)
+        return surface
+
+    @property
+    def n_points(self) -> int:
+        """Number of merged points."""
+        return len(self.points)
+
+    @property
+    def n_triangles(self) -> int:
+        """Number of triangles."""
+        return len(self.triangles)
+
+    def triangle_vertices(self) -> np.ndarray:
+        """Return the vertex coordinates of every triangle, shape (n, 3, 3)."""
+        if "vertices" not in self._cache:
+            return self.points[self.triangles]
+        if self._cache["vertices"].dtype != np.float64:
+            self._cache["vertices"] = self._cache["vertices"].astype(np.float64)
+        return self._cache["vertices"]
+
+    def triangle_area_vectors(self) -> np.ndarray:
+        """Return the area-weighted normals of all triangles."""
+        if "area_vectors" not in self._cache:
+            v = self.triangle_vertices()
+            self._cache["area_vectors"] = 0.5 * np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0])
+        return self._cache["area_vectors"]
+
+    def triangle_areas(self) -> np.ndarray:
+        """Return the area of every triangle."""
+        return np.linalg.norm(self.triangle_area_vectors(), axis=1)
+
+    def triangle_normals(self) -> np.ndarray:
+        """Return the unit normal of every triangle (zero for degenerate ones)."""
+        area_vectors = self.triangle_area_vectors()
+        mag = np.linalg.norm(area_vectors, axis=1)
+        normals = np.zeros_like(area_vectors)
+        valid = mag > 0
+        normals[valid] = area_vectors[valid] / mag[valid, None]
+        return normals
+
+    def bounds(self) -> np.ndarray:
+        """Return the bounding box as a (2, 3) array of min and max corners."""
+        return np.array([self.points.min(axis=0), self.points.max(axis=0)])
+
+    def edges(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the unique edges and their triangle connectivity.
+
+        Edges are identified by a 64-bit key built from their sorted end
+        points, so the whole edge list is computed with a single value sort.
+
+        Returns:
+            Tuple of (edges of shape (nEdges, 2), edge index of each triangle
+            side of shape (nTriangles, 3), number of triangles per edge)
+        """
+        if "edges" not in self._cache:
+            low, high, keys = self._side_keys()
+            key_bits = 2 * max(1, self.n_points.bit_length())
+            first, side_edge = _group_keys(keys, np.column_stack([low, high]), key_bits)
+            counts = np.bincount(side_edge, minlength=len(first))
+            edges = np.column_stack([low[first], high[first]])
+            self._cache["edges"] = (edges, side_edge.reshape(-1, 3), counts)
+        return self._cache["edges"]
+
+    def _side_keys(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Sorted end points of every triangle side and their exact 64-bit edge key."""
+        start = self.triangles.astype(np.int64)
+        end = start[:, [1, 2, 0]]
+        low = np.minimum(start, end).ravel()
+        high = np.maximum(start, end).ravel()
+        return low, high, (low * self.n_points + high).astype(np.uint64)
+
+    def edge_counts(self) -> np.ndarray:
+        """Return the number of triangles of every edge.
+
+        Without the edge connectivity only the keys need sorting, which is
+        all the surface statistics require.
+        """
+        if "edges" in self._cache:
+            return self._cache["edges"][2]
+        keys = np.sort(self._side_keys()[2])
+        if not len(keys):
+            return np.zeros(0, dtype=np.int64)
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        return np.diff(np.r_[starts, len(keys)])
+
+    def statistics(self) -> Dict[str, Any]:
+        """Return surface statistics.
+
+        Returns:
+            Dictionary with triangle and point counts, bounding box, area,
+            open and non-manifold edge counts and per-region triangle counts
+        """
+        counts = self.edge_counts()
+        region_counts = np.bincount(self.regions, minlength=len(self.region_names))
+        bounds = self.bounds() if self.n_points else np.zeros((2, 3))
+        return {
+            "triangles": self.n_triangles,
+            "points": self.n_points,
+            "bounds": bounds,
+            "size": bounds[1] - bounds[0],
+            "area": float(self.triangle_areas().sum()),
+            "edges": len(counts),
+            "open_edges": int(np.count_nonzero(counts == 1)),
+            "non_manifold_edges": int(np.count_nonzero(counts > 2)),
+            "closed": bool(np.all(counts == 2)),
+            "regions": {name: int(n) for name, n in zip(self.region_names, region_counts)},
+        }
+
+
+def is_binary_stl(content: bytes) -> bool:
+    """Return True if ``content`` is a binary STL.
+
+    The size check is authoritative: many binary exporters start the header
+    with ``solid`` as well.
+    """
+    if len(content) < 84:
+        return False
+    n_facets = int(np.frombuffer(content, dtype="<u4", count=1, offset=80)[0])
+    if len(content) == 84 + 50 * n_facets:
+        return True
+    return not content.lstrip()[:5].lower() == b"solid"
+
+
+def parse_binary_stl(content: bytes) -> Tuple[np.ndarray, str]:
+    """Parse binary STL content.
+
+    Args:
+        content: File content
+
+    Returns:
+        Tuple of (single precision triangle vertices of shape (n, 3, 3),
+        solid name from header)
+    """
+    n_facets = int(np.frombuffer(content, dtype="<u4", count=1, offset=80)[0])
+    if len(content) < 84 + 50 * n_facets:
+        raise STLParseError(f"Binary STL truncated: expected {n_facets} facets")
+    facets = np.frombuffer(content, dtype=BINARY_FACET_DTYPE, count=n_facets, offset=84)
+    header = content[:80].split(b"\0")[0].decode(errors="replace").strip()
+    name = header[5:].strip() if header.lower().startswith("solid") else ""
+    return facets["vertices"], name.split()[0] if name else ""
+
+
+def parse_ascii_solid(body: bytes) -> np.ndarray:
+    """Parse the facets of one ASCII solid.
+
+    Args:
+        body: Text between the ``solid`` and ``endsolid`` lines
+
+    Returns:
+        Triangle vertices of shape (n, 3, 3)
+    """
+    body = b" " + body.translate(_ASCII_BLANKING)
+    body = body.replace(b" e ", b"   ").replace(b" E ", b"   ")
+    values = np.fromstring(body, sep=" ")
+    if values.size % 12:
+        raise STLParseError("Malformed ASCII STL facet data")
+    # Every facet holds a normal followed by three vertices
+    return values.reshape(-1, 4, 3)[:, 1:]
+
+
+def parse_ascii_stl(content: bytes) -> Tuple[List[np.ndarray], List[str]]:
+    """Parse ASCII STL content with one or more solids.
+
+    Args:
+        content: File content
+
+    Returns:
+        Tuple of (triangle vertices per solid, solid names)
+    """
+    solids, names = [], []
+    starts = list(SOLID_RE.finditer(content))
+    if not starts:
+        raise STLParseError("No 'solid' found in ASCII STL")
+
+    for i, match in enumerate(starts):
+        stop = starts[i + 1].start() if i + 1 < len(starts) else len(content)
+        end = content.rfind(b"endsolid", match.end(), stop)
+        if end < 0:
+            end = content.rfind(b"ENDSOLID", match.end(), stop)
+        body = content[match.end():end if end >= 0 else stop]
+        solids.append(parse_ascii_solid(body))
+        names.append(match.group(1).decode(errors="replace").strip())
+    return solids, names
+
+
+def read_stl(file_path: str) -> TriSurface:
+    """Read a binary or ASCII STL file into a merged triangle surface.
+
+    Each ASCII solid becomes a region; unnamed solids are named after the
+    file.
+
+    Args:
+        file_path: Path to the STL file
+
+    Returns:
+        The loaded surface
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        STLParseError: If the file cannot be parsed
+    """
+    with open(file_path, "rb") as f:
+        content = f.read()
+    source_hash = hashlib.sha1(content).hexdigest()
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+
+    if is_binary_stl(content):
+        vertices, name = parse_binary_stl(content)
+        solids, names = [vertices], [name or stem]
+    else:
+        solids, names = parse_ascii_stl(content)
+        names = [name or (stem if len(names) == 1 else f"{stem}_{i}")
+                 for i, name in enumerate(names)]
+
+    regions = np.repeat(np.arange(len(solids), dtype=np.int32), [len(s) for s in solids])
+    # A single solid is welded in place, without copying the file buffer
+    vertices = solids[0] if len(solids) == 1 else np.concatenate(solids) if solids else \
+        np.zeros((0, 3, 3))
+    surface = TriSurface.from_triangle_vertices(vertices, regions, names, source_hash)
+    logger.info(f"Read {surface.n_triangles} triangles in {len(names)} solid(s) from {file_path}")
+    return surface
@@ -0,0 +1,471 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 17:26:40 2026
+
+@author: adamp
+"""
+
+"""
+Streamlines of cell velocity fields, traced by cell walking.
+
+Seeds are located once; afterwards every particle knows its cell and each
+Runge-Kutta stage finds the cell of its new position by walking across
+the face it is furthest outside of, which is a face or two for steps of a
+fraction of the cell size. The velocity inside a cell is interpolated by
+inverse squared distance from the cell's points, whose values come from a
+cell-to-point interpolation. All active particles advance together in
+vectorized steps, and seed chunks are spread over worker processes. The
+walking geometry (cell faces, outward normals, cell points) and the
+cell-to-point stencil are cached on the mesh content.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.openfoam.cut_surfaces import PointInterpolation
+from src.openfoam.fields import field_path, read_field
+from src.openfoam.polymesh import PolyMesh
+from src.openfoam.probes import CellLocator, cell_faces, expand, unique_keys
+from src.openfoam.vtk_io import write_vtk_polydata
+from src.utils.cache import ArrayCache
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Integration directions along the velocity
+DIRECTIONS = ("forward", "backward", "both")
+
+# Default maximum number of steps per direction, and step length relative to the cell size
+DEFAULT_MAX_STEPS = 2000
+DEFAULT_STEP_FRACTION = 0.25
+
+# Faces crossed by a particle within one walk before it is considered lost
+MAX_WALK_STEPS = 64
+
+# Distance outside the face planes still counted inside, relative to cell size
+INSIDE_TOLERANCE = 1e-9
+
+# Speed below which a particle is considered stalled
+MIN_SPEED = 1e-12
+
+# Number of seeds traced per worker task
+SEED_CHUNK_SIZE = 1024
+
+
+class CellWalkGeometry:
+    """Cell faces, outward normals and cell points for walking particles."""
+
+    def __init__(self, mesh: PolyMesh, cache: Optional[ArrayCache] = None) -> None:
+        """Build or load the walking geometry of a mesh.
+
+        Args:
+            mesh: The mesh
+            cache: Geometry cache; the default ``cell_walk`` cache if None
+        """
+        cache = cache or ArrayCache("cell_walk")
+        key = ArrayCache.make_key(mesh.content_hash())
+        cached = cache.load(key)
+        if cached is None:
+            cached = self._build(mesh)
+            cache.save(key, cached)
+        self.face_offsets = cached["face_offsets"]
+        self.faces = cached["faces"]
+        self.normals = cached["normals"]
+        self.across = cached["across"]
+        self.point_offsets = cached["point_offsets"]
+        self.cell_points = cached["cell_points"]
+        self.planes = cached["planes"]
+        self.cell_size = cached["cell_size"]
+        self.points = mesh.points
+
+    @staticmethod
+    def _build(mesh: PolyMesh) -> Dict[str, np.ndarray]:
+        """Compute the walking geometry."""
+        offsets, faces, signs = cell_faces(mesh)
+        areas = mesh.face_areas[faces] * signs[:, None]
+        owner_side = signs > 0
+        across = np.where(owner_side, -1, mesh.owner[faces])
+        internal = owner_side & (faces < mesh.n_internal_faces)
+        across[internal] = mesh.neighbour[faces[internal]]
+
+        normals = areas / np.linalg.norm(areas, axis=1)[:, None]
+
+        # Unique points of every cell, from the points of its faces
+        cell = np.repeat(np.arange(mesh.n_cells), np.diff(offsets))
+        position, entries = expand(mesh.face_offsets, faces)
+        key = unique_keys(cell[position] * mesh.n_points + mesh.face_points[entries])
+        point_offsets = np.zeros(mesh.n_cells + 1, dtype=np.int64)
+        np.cumsum(np.bincount(key // mesh.n_points, minlength=mesh.n_cells),
+                  out=point_offsets[1:])
+        return {"face_offsets": offsets, "faces": faces, "normals": normals,
+                "planes": np.einsum("ij,ij->i", normals, mesh.face_centres[faces]),
+                "across": across.astype(np.int64), "point_offsets": point_offsets,
+                "cell_points": key % mesh.n_points,
+                "cell_size": np.cbrt(np.abs(mesh.cell_volumes))}
+
+    def walk(self, cells: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """Walk from known cells to the cells containing new positions.
+
+        Args:
+            cells: Current cell of every particle
+            positions: New positions, (n, 3)
+
+        Returns:
+            Cells containing the positions, -1 where a particle left the
+            mesh or did not arrive within ``MAX_WALK_STEPS`` faces
+        """
+        cells = np.array(cells, dtype=np.int64)
+        pending = np.flatnonzero(cells >= 0)
+        for _ in range(MAX_WALK_STEPS):
+            if not len(pending):
+                return cells
+            current = cells[pending]
+            pair, entries = expand(self.face_offsets, current)
+            distance = np.einsum("ij,ij->i", positions[pending[pair]], self.normals[entries])
+            distance -= self.planes[entries]
+            counts = self.face_offsets[current + 1] - self.face_offsets[current]
+            starts = np.cumsum(counts) - counts
+            furthest = np.maximum.reduceat(distance, starts)
+            outside = furthest > INSIDE_TOLERANCE * self.cell_size[current]
+
+            # Cross the first face of each cell at the largest distance; pairs are sorted
+            at_max = np.flatnonzero(distance == furthest[pair])
+            first = at_max[np.r_[True, pair[at_max][1:] != pair[at_max][:-1]]]
+            cells[pending[outside]] = self.across[entries[first]][outside]
+            pending = pending[outside]
+            pending = pending[cells[pending] >= 0]
+        cells[pending] = -1
+        return cells
+
+    def exit(self, cells: np.ndarray, starts: np.ndarray,
+             ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Where straight segments from points in known cells leave the mesh.
+
+        Each segment is followed through the faces it crosses until it
+        reaches a boundary face or its end.
+
+        Args:
+            cells: Cell of every segment start
+            starts: Segment starts, (n, 3)
+            ends: Segment ends, (n, 3)
+
+        Returns:
+            Fraction of every segment at the boundary (1 if it stays inside)
+            and the cell it leaves through, -1 where the walk did not arrive
+            within ``MAX_WALK_STEPS`` faces
+        """
+        cells = np.array(cells, dtype=np.int64)
+        fraction = np.ones(len(cells))
+        direction = ends - starts
+        pending = np.flatnonzero(cells >= 0)
+        for _ in range(MAX_WALK_STEPS):
+            if not len(pending):
+                return fraction, cells
+            current = cells[pending]
+            pair, entries = expand(self.face_offsets, current)
+            normals = self.normals[entries]
+            rate = np.einsum("ij,ij->i", normals, direction[pending[pair]])
+            distance = self.planes[entries] - np.einsum("ij,ij->i", normals,
+                                                        starts[pending[pair]])
+            # Only faces the segment moves out through bound it
+            reach = np.where(rate > 0, distance / np.where(rate > 0, rate, 1.0), np.inf)
+            counts = self.face_offsets[current + 1] - self.face_offsets[current]
+            nearest = np.minimum.reduceat(reach, np.cumsum(counts) - counts)
+            at_min = np.flatnonzero(reach == nearest[pair])
+            first = at_min[np.r_[True, pair[at_min][1:] != pair[at_min][:-1]]]
+            across = self.across[entries[first]]
+
+            # Segments ending in this cell stay inside; boundary faces stop the walk
+            ended = nearest >= 1.0
+            leaving = ~ended & (across < 0)
+            fraction[pending[leaving]] = np.maximum(nearest[leaving], 0.0)
+            moving = ~ended & ~leaving
+            cells[pending[moving]] = across[moving]
+            pending = pending[moving]
+        cells[pending] = -1
+        return fraction, cells
+
+    def interpolate(self, point_values: np.ndarray, cells: np.ndarray,
+                    positions: np.ndarray) -> np.ndarray:
+        """Inverse squared distance interpolation from the points of each cell.
+
+        Args:
+            point_values: Values at the mesh points, (nPoints, k)
+            cells: Cell of every position
+            positions: Positions, (n, 3)
+
+        Returns:
+            Interpolated values, (n, k)
+        """
+        if not len(cells):
+            return np.zeros((0, point_values.shape[1]))
+        first = self.point_offsets[cells]
+        counts = self.point_offsets[cells + 1] - first
+        starts = np.cumsum(counts) - counts
+        pair = np.repeat(np.arange(len(cells)), counts)
+        points = self.cell_points[np.repeat(first - starts, counts) + np.arange(len(pair))]
+        difference = positions[pair] - self.points[points]
+        weight = 1.0 / np.maximum(np.einsum("ij,ij->i", difference, difference), 1e-300)
+        total = np.add.reduceat(weight, starts)
+        return np.add.reduceat(point_values[points] * weight[:, None], starts) / total[:, None]
+
+
+class Streamlines:
+    """Polylines of traced streamlines, one per seed."""
+
+    def __init__(self, seeds: np.ndarray, offsets: np.ndarray, points: np.ndarray,
+                 velocity: np.ndarray, time: np.ndarray) -> None:
+        """Initialize the streamlines.
+
+        Args:
+            seeds: Seed points, (nSeeds, 3)
+            offsets: Start of each line in the point arrays, (nSeeds+1,)
+            points: Points of all lines, (nPoints, 3)
+            velocity: Velocity at the points, (nPoints, 3)
+            time: Integration time of the points from their seed
+        """
+        self.seeds = seeds
+        self.offsets = offsets
+        self.points = points
+        self.velocity = velocity
+        self.time = time
+
+    @property
+    def n_lines(self) -> int:
+        """Number of streamlines."""
+        return len(self.offsets) - 1
+
+    def line(self, index: int) -> np.ndarray:
+        """Points of one streamline."""
+        return self.points[self.offsets[index]:self.offsets[index + 1]]
+
+    def lengths(self) -> np.ndarray:
+        """Arc length of every streamline."""
+        steps = np.linalg.norm(np.diff(self.points, axis=0), axis=1)
+        line = np.repeat(np.arange(self.n_lines), np.diff(self.offsets))
+        same = line[1:] == line[:-1]
+        return np.bincount(line[1:][same], steps[same], minlength=self.n_lines)
+
+    def write_vtk(self, file_path: str, title: str = "Project_Flow") -> None:
+        """Write the streamlines as VTK polydata lines with their velocity and time."""
+        starts = np.arange(len(self.points) - 1)
+        line = np.repeat(np.arange(self.n_lines), np.diff(self.offsets))
+        starts = starts[line[1:] == line[:-1]]
+        write_vtk_polydata(file_path, self.points, lines=np.stack([starts, starts + 1], axis=1),
+                           point_data={"U": self.velocity, "time": self.time}, title=title)
+
+
+_GEOMETRY: Optional[CellWalkGeometry] = None
+_POINT_VELOCITY: Optional[np.ndarray] = None
+
+
+def _init_worker(geometry: CellWalkGeometry, point_velocity: np.ndarray) -> None:
+    """Share the walking geometry and point velocities with a worker process."""
+    global _GEOMETRY, _POINT_VELOCITY
+    _GEOMETRY, _POINT_VELOCITY = geometry, point_velocity
+
+
+def _trace(positions: np.ndarray, cells: np.ndarray, signs: np.ndarray, max_steps: int,
+           step_fraction: float, max_length: Optional[float]) -> Tuple[np.ndarray, ...]:
+    """Advance particles with RK4 steps until they stall, leave the mesh or stop.
+
+    A step that ends outside the mesh is cut where its chord crosses the
+    boundary, so lines reach walls and outlets.
+
+    Returns:
+        Particle, position, velocity and time of every traced point
+    """
+    geometry = _GEOMETRY
+
+    def velocity(idx: np.ndarray, x: np.ndarray, c: np.ndarray) -> np.ndarray:
+        """Directed velocity of particles ``idx`` at positions in cells."""
+        return geometry.interpolate(_POINT_VELOCITY, c, x) * signs[idx, None]
+
+    x = np.array(positions, dtype=np.float64)
+    c = np.array(cells, dtype=np.int64)
+    n = len(x)
+    t = np.zeros(n)
+    length = np.zeros(n)
+    active = np.flatnonzero(c >= 0)
+    u = velocity(active, x[active], c[active])
+    trace = [(active, x[active], u, t[active])]
+    for _ in range(max_steps):
+        speed = np.linalg.norm(u, axis=1)
+        moving = speed > MIN_SPEED
+        active, u, speed = active[moving], u[moving], speed[moving]
+        if not len(active):
+            break
+        x0, c0 = x[active], c[active]
+        h = step_fraction * geometry.cell_size[c0] / speed
+
+        # Each stage walks from the cell of the step start; stages outside
+        # the mesh take the velocity extrapolated from that cell
+        k = [u]
+        for scale in (0.5, 0.5, 1.0):
+            xs = x0 + (scale * h)[:, None] * k[-1]
+            cs = geometry.walk(c0, xs)
+            k.append(velocity(active, xs, np.where(cs >= 0, cs, c0)))
+        x1 = x0 + (h / 6)[:, None] * (k[0] + 2 * k[1] + 2 * k[2] + k[3])
+        c1 = geometry.walk(c0, x1)
+        valid = c1 >= 0
+
+        # Steps leaving the mesh end on the boundary
+        leaving = np.flatnonzero(~valid)
+        fraction, last = geometry.exit(c0[leaving], x0[leaving], x1[leaving])
+        exited = last >= 0
+        leaving, fraction, last = leaving[exited], fraction[exited], last[exited]
+        if len(leaving):
+            xe = x0[leaving] + fraction[:, None] * (x1[leaving] - x0[leaving])
+            te = t[active[leaving]] + fraction * h[leaving]
+            trace.append((active[leaving], xe, velocity(active[leaving], xe, last), te))
+        active, x0, x1, c1, h = active[valid], x0[valid], x1[valid], c1[valid], h[valid]
+
+        x[active], c[active] = x1, c1
+        t[active] += h
+        length[active] += np.linalg.norm(x1 - x0, axis=1)
+        u = velocity(active, x1, c1)
+        trace.append((active, x1, u, t[active]))
+        if max_length is not None:
+            keep = length[active] < max_length
+            active, u = active[keep], u[keep]
+
+    particle, points, velocities, times = (np.concatenate(parts) for parts in zip(*trace))
+    return particle, points, velocities * signs[particle, None], times
+
+
+class StreamlineTracer:
+    """Traces streamlines of a cell velocity field from many seeds at once."""
+
+    def __init__(self, mesh: PolyMesh, velocity: np.ndarray,
+                 cache: Optional[ArrayCache] = None) -> None:
+        """Prepare the walking geometry and the point velocities.
+
+        Args:
+            mesh: The mesh
+            velocity: Cell velocities, (nCells, 3)
+            cache: Walking geometry and point stencil cache; the default
+                ``cell_walk`` cache if None
+        """
+        velocity = np.asarray(velocity, dtype=np.float64)
+        if velocity.shape != (mesh.n_cells, 3):
+            raise ValueError(f"Expected ({mesh.n_cells}, 3) cell velocities, "
+                             f"got {velocity.shape}")
+        self.mesh = mesh
+        cache = cache or ArrayCache("cell_walk")
+        self.geometry = CellWalkGeometry(mesh, cache)
+        self.point_velocity = PointInterpolation(mesh, cache)(velocity)
+        self._locator: Optional[CellLocator] = None
+
+    def trace(self, seeds: np.ndarray, direction: str = "forward",
+              max_steps: int = DEFAULT_MAX_STEPS, step_fraction: float = DEFAULT_STEP_FRACTION,
+              max_length: Optional[float] = None, workers: Optional[int] = None) -> Streamlines:
+        """Trace the streamlines through seed points.
+
+        Args:
+            seeds: Seed points, (nSeeds, 3); seeds outside the mesh give empty lines
+            direction: One of ``DIRECTIONS``
+            max_steps: Maximum number of steps per direction
+            step_fraction: Step length relative to the size of the current cell
+            max_length: Maximum arc length per direction
+            workers: Number of worker processes; the CPU count if None, none if 1
+
+        Returns:
+            One streamline per seed, ordered along the velocity
+        """
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Unsupported direction: {direction}")
+        seeds = np.asarray(seeds, dtype=np.float64).reshape(-1, 3)
+        if not len(seeds):
+            return Streamlines(seeds, np.zeros(1, dtype=np.int64), np.zeros((0, 3)),
+                               np.zeros((0, 3)), np.zeros(0))
+        self._locator = self._locator or CellLocator(self.mesh)
+        cells = self._locator.locate(seeds)
+        if np.any(cells < 0):
+            logger.warning(f"{np.count_nonzero(cells < 0)} of {len(seeds)} seeds are "
+                           f"outside the mesh")
+
+        signs = {"forward": [1.0], "backward": [-1.0], "both": [-1.0, 1.0]}[direction]
+        positions = np.concatenate([seeds] * len(signs))
+        particle_cells = np.concatenate([cells] * len(signs))
+        particle_signs = np.repeat(signs, len(seeds))
+        chunks = [slice(start, start + SEED_CHUNK_SIZE)
+                  for start in range(0, len(positions), SEED_CHUNK_SIZE)]
+        arguments = [(positions[chunk], particle_cells[chunk], particle_signs[chunk], max_steps,
+                      step_fraction, max_length) for chunk in chunks]
+
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(chunks) <= 1:
+            _init_worker(self.geometry, self.point_velocity)
+            results = [_trace(*args) for args in arguments]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                     initializer=_init_worker,
+                                     initargs=(self.geometry, self.point_velocity)) as pool:
+                futures = [pool.submit(_trace, *args) for args in arguments]
+                results = [future.result() for future in futures]
+
+        particle = np.concatenate([part[0] + chunk.start
+                                   for part, chunk in zip(results, chunks)])
+        points, velocity, time = (np.concatenate([part[k] for part in results])
+                                  for k in (1, 2, 3))
+        streamlines = self._assemble(seeds, particle, points, velocity, time,
+                                     particle_signs[particle] < 0 if particle.size else
+                                     np.zeros(0, dtype=bool))
+        logger.info(f"Traced {len(seeds)} streamlines with {len(streamlines.points)} points")
+        return streamlines
+
+    @staticmethod
+    def _assemble(seeds: np.ndarray, particle: np.ndarray, points: np.ndarray,
+                  velocity: np.ndarray, time: np.ndarray, backward: np.ndarray) -> Streamlines:
+        """Order traced points along each seed's line, backward part first."""
+        seed = particle % len(seeds) if len(seeds) else particle
+        # Backward points run towards the seed; the seed itself is kept once
+        keep = ~(backward & (time == 0) & np.isin(seed, seed[~backward & (time == 0)]))
+        seed, points, velocity, backward = seed[keep], points[keep], velocity[keep], backward[keep]
+        time = np.where(backward, -time[keep], time[keep])
+        order = np.lexsort((time, seed))
+        offsets = np.zeros(len(seeds) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(seed, minlength=len(seeds)), out=offsets[1:])
+        return Streamlines(seeds, offsets, points[order], velocity[order], time[order])
+
+
+def line_seeds(start: Sequence[float], end: Sequence[float], n: int) -> np.ndarray:
+    """Seed points evenly spaced on a segment, ends included."""
+    fraction = np.linspace(0.0, 1.0, n)[:, None]
+    start = np.asarray(start, dtype=np.float64)
+    return start + fraction * (np.asarray(end, dtype=np.float64) - start)
+
+
+def streamlines(case_dir: str, time: str, seeds: np.ndarray, velocity: str = "U",
+                direction: str = "forward", max_steps: int = DEFAULT_MAX_STEPS,
+                step_fraction: float = DEFAULT_STEP_FRACTION, max_length: Optional[float] = None,
+                workers: Optional[int] = None, mesh: Optional[PolyMesh] = None,
+                cache: Optional[ArrayCache] = None) -> Streamlines:
+    """Trace streamlines of the velocity field of a case at one time.
+
+    Args:
+        case_dir: Case directory
+        time: Time directory
+        seeds: Seed points, (nSeeds, 3)
+        velocity: Velocity field name
+        direction: One of ``DIRECTIONS``
+        max_steps: Maximum number of steps per direction
+        step_fraction: Step length relative to the size of the current cell
+        max_length: Maximum arc length per direction
+        workers: Number of worker processes; the CPU count if None, none if 1
+        mesh: The mesh of the case, if already read
+        cache: Walking geometry and point stencil cache; the default
+            ``cell_walk`` cache if None
+
+    Returns:
+        One streamline per seed
+    """
+    mesh = mesh or PolyMesh.read(case_dir)
+    path = field_path(case_dir, velocity, time)
+    if not os.path.exists(path) and os.path.exists(path + ".gz"):
+        path += ".gz"
+    values = read_field(path, mesh.n_cells).values
+    tracer = StreamlineTracer(mesh, values, cache)
+    return tracer.trace(seeds, direction, max_steps, step_fraction, max_length, workers)
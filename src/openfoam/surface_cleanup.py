@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 20:02:38 2026
+
+@author: adamp
+"""
+
+"""
+STL cleaning, scaling and merging for geometry import.
+
+Files are streamed in chunks of facets. Every chunk is scaled and welded on
+its own (points snapped to a tolerance grid and merged by hash), so only the
+merged points and the triangle labels are kept in memory, never the raw
+facet vertices of a whole file. The merged surface is then cleaned of
+degenerate and duplicate triangles and its triangles are oriented
+consistently by a breadth-first walk over the face adjacency.
+"""
+import os
+import hashlib
+from typing import Any, Dict, Iterator, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.openfoam.stl import (TriSurface, STLParseError, BINARY_FACET_DTYPE, SOLID_RE,
+                              parse_ascii_solid, unique_rows)
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Length of one unit in meters
+LENGTH_UNITS = {
+    "m": 1.0,
+    "dm": 0.1,
+    "cm": 0.01,
+    "mm": 0.001,
+    "um": 1e-6,
+    "in": 0.0254,
+    "ft": 0.3048,
+}
+
+# Facets read per chunk while streaming
+STREAM_CHUNK_SIZE = 1 << 20
+
+# Approximate size of one ASCII facet in bytes, used to size read blocks
+_ASCII_FACET_BYTES = 256
+
+
+def _is_binary_file(f, size: int) -> bool:
+    """Check if an open STL file is binary without reading all of it."""
+    head = f.read(84)
+    f.seek(0)
+    if len(head) < 84:
+        return False
+    n_facets = int(np.frombuffer(head, dtype="<u4", count=1, offset=80)[0])
+    if size == 84 + 50 * n_facets:
+        return True
+    return not head.lstrip()[:5].lower() == b"solid"
+
+
+def iter_stl_chunks(file_path: str, chunk_size: int = STREAM_CHUNK_SIZE,
+                    digest=None) -> Iterator[Tuple[np.ndarray, int, str]]:
+    """Stream the facets of a binary or ASCII STL file.
+
+    Args:
+        file_path: Path to the STL file
+        chunk_size: Approximate number of facets per chunk
+        digest: Optional hashlib object updated with the raw file content
+
+    Yields:
+        Tuples of (triangle vertices of shape (n, 3, 3), solid index, solid name)
+
+    Raises:
+        STLParseError: If the file cannot be parsed
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, "rb") as f:
+        if _is_binary_file(f, size):
+            header = f.read(84)
+            if digest is not None:
+                digest.update(header)
+            n_facets = int(np.frombuffer(header, dtype="<u4", count=1, offset=80)[0])
+            name = header[:80].split(b"\0")[0].decode(errors="replace").strip()
+            is_solid = name.lower().startswith("solid") and name[5:].strip()
+            name = name[5:].strip().split()[0] if is_solid else ""
+            remaining = n_facets
+            while remaining > 0:
+                block = f.read(50 * min(chunk_size, remaining))
+                if digest is not None:
+                    digest.update(block)
+                if len(block) < 50:
+                    raise STLParseError(f"Binary STL truncated: expected {n_facets} facets")
+                facets = np.frombuffer(block, dtype=BINARY_FACET_DTYPE, count=len(block) // 50)
+                remaining -= len(facets)
+                yield facets["vertices"].astype(np.float64), 0, name
+            return
+
+        solid, name = -1, ""
+        pending = b""
+        while True:
+            block = f.read(chunk_size * _ASCII_FACET_BYTES)
+            if digest is not None:
+                digest.update(block)
+            data = pending + block
+            if block:
+                cut = max(data.rfind(b"endfacet"), data.rfind(b"ENDFACET"))
+                if cut < 0:
+                    pending = data
+                    continue
+                cut += len(b"endfacet")
+                part, pending = data[:cut], data[cut:]
+            else:
+                part, pending = data, b""
+
+            # Split the part at solid headers; endsolid lines end each segment
+            position = 0
+            segments = []
+            for match in SOLID_RE.finditer(part):
+                segments.append((part[position:match.start()], solid, name))
+                solid += 1
+                name = match.group(1).decode(errors="replace").strip()
+                position = match.end()
+            segments.append((part[position:], solid, name))
+
+            for body, segment_solid, segment_name in segments:
+                end = max(body.rfind(b"endsolid"), body.rfind(b"ENDSOLID"))
+                if end >= 0:
+                    body = body[:end]
+                if not body.strip():
+                    continue
+                if segment_solid < 0:
+                    raise STLParseError("No 'solid' found in ASCII STL")
+                vertices = parse_ascii_solid(body)
+                if len(vertices):
+                    yield vertices, segment_solid, segment_name
+            if not block:
+                break
+
+
+def _compact(surface: TriSurface, keep: np.ndarray) -> TriSurface:
+    """Return the surface with the selected triangles and only their points."""
+    triangles = surface.triangles[keep]
+    used, inverse = np.unique(triangles, return_inverse=True)
+    return TriSurface(surface.points[used], inverse.reshape(-1, 3), surface.regions[keep],
+                      surface.region_names, surface.source_hash)
+
+
+def remove_degenerate_triangles(surface: TriSurface,
+                                area_tolerance: float = 0.0) -> Tuple[TriSurface, int]:
+    """Remove triangles with repeated points or (near) zero area.
+
+    Args:
+        surface: Input surface
+        area_tolerance: Triangles with an area at or below this are removed
+
+    Returns:
+        The cleaned surface and the number of removed triangles
+    """
+    t = surface.triangles
+    collapsed = (t[:, 0] == t[:, 1]) | (t[:, 1] == t[:, 2]) | (t[:, 2] == t[:, 0])
+    keep = ~collapsed & (surface.triangle_areas() > area_tolerance)
+    n_removed = int(len(keep) - np.count_nonzero(keep))
+    return (_compact(surface, keep) if n_removed else surface), n_removed
+
+
+def remove_duplicate_triangles(surface: TriSurface) -> Tuple[TriSurface, int]:
+    """Keep a single triangle of every group using the same three points.
+
+    Duplicates are detected regardless of vertex order or orientation.
+
+    Args:
+        surface: Input surface
+
+    Returns:
+        The cleaned surface and the number of removed triangles
+    """
+    first, _ = unique_rows(np.sort(surface.triangles, axis=1).astype(np.float64))
+    keep = np.zeros(surface.n_triangles, dtype=bool)
+    keep[first] = True
+    n_removed = int(surface.n_triangles - len(first))
+    return (_compact(surface, keep) if n_removed else surface), n_removed
+
+
+def orient_surface(surface: TriSurface) -> Tuple[TriSurface, int]:
+    """Orient the triangles of every connected patch consistently.
+
+    Neighbouring triangles are consistent when they traverse their shared
+    edge in opposite directions. A breadth-first walk over manifold edges
+    propagates the orientation of a seed triangle through each connected
+    component; closed components are then turned outward (positive volume)
+    and open ones keep the orientation of the majority of their area.
+
+    Args:
+        surface: Input surface
+
+    Returns:
+        The oriented surface and the number of flipped triangles
+    """
+    n_triangles = surface.n_triangles
+    if n_triangles == 0:
+        return surface, 0
+    edges, side_edge, counts = surface.edges()
+    t = surface.triangles
+
+    # Direction of every triangle side relative to its sorted edge
+    forward = t < np.roll(t, -1, axis=1)
+    sides = side_edge.ravel()
+    order = np.argsort(sides, kind="stable")
+    start = np.zeros(len(counts), dtype=np.int64)
+    np.cumsum(counts[:-1], out=start[1:])
+    manifold = np.flatnonzero(counts == 2)
+    side_a, side_b = order[start[manifold]], order[start[manifold] + 1]
+    face_a, face_b = side_a // 3, side_b // 3
+    # Same traversal direction means one of the two triangles must flip
+    mismatch = forward.ravel()[side_a] == forward.ravel()[side_b]
+
+    # Symmetric adjacency in CSR form
+    source = np.concatenate([face_a, face_b])
+    target = np.concatenate([face_b, face_a])
+    parity = np.concatenate([mismatch, mismatch])
+    order = np.argsort(source, kind="stable")
+    target, parity = target[order], parity[order]
+    offsets = np.searchsorted(source[order], np.arange(n_triangles + 1))
+
+    flip = np.zeros(n_triangles, dtype=bool)
+    component = np.full(n_triangles, -1, dtype=np.int64)
+    claim = np.zeros(n_triangles, dtype=np.int64)
+    n_components = 0
+    for seed in range(n_triangles):
+        if component[seed] >= 0:
+            continue
+        component[seed] = n_components
+        frontier = np.array([seed])
+        while len(frontier):
+            counts_f = offsets[frontier + 1] - offsets[frontier]
+            first = np.repeat(offsets[frontier], counts_f)
+            local = np.arange(counts_f.sum()) - np.repeat(np.cumsum(counts_f) - counts_f, counts_f)
+            links = first + local
+            parents = np.repeat(frontier, counts_f)
+            new = component[target[links]] < 0
+            links, parents = links[new], parents[new]
+            neighbours = target[links]
+            # Keep one link per newly reached triangle without sorting
+            claim[neighbours] = np.arange(len(neighbours))
+            winner = claim[neighbours] == np.arange(len(neighbours))
+            neighbours = neighbours[winner]
+            component[neighbours] = n_components
+            flip[neighbours] = flip[parents[winner]] ^ parity[links[winner]]
+            frontier = neighbours
+        n_components += 1
+
+    # Choose the orientation of every component
+    vertices = surface.triangle_vertices()
+    signed = np.where(flip, -1.0, 1.0)
+    volume = np.bincount(component, signed * np.einsum("ij,ij->i", vertices[:, 0],
+                                                       np.cross(vertices[:, 1], vertices[:, 2])),
+                         minlength=n_components)
+    open_sides = np.zeros(n_triangles, dtype=bool)
+    open_sides[np.flatnonzero(counts[sides] != 2) // 3] = True
+    is_open = np.bincount(component, open_sides, minlength=n_components) > 0
+    areas = surface.triangle_areas()
+    flipped_area = np.bincount(component, areas * flip, minlength=n_components)
+    total_area = np.bincount(component, areas, minlength=n_components)
+    invert = np.where(is_open, flipped_area > 0.5 * total_area, volume < 0)
+    flip ^= invert[component]
+
+    n_flipped = int(np.count_nonzero(flip))
+    if not n_flipped:
+        return surface, 0
+    triangles = t.copy()
+    triangles[flip] = triangles[flip][:, [0, 2, 1]]
+    logger.debug(f"Oriented {n_components} surface component(s), flipped {n_flipped} triangles")
+    return TriSurface(surface.points, triangles, surface.regions, surface.region_names,
+                      surface.source_hash), n_flipped
+
+
+def merge_surfaces(surfaces: Sequence[TriSurface], weld_tolerance: float = 0.0) -> TriSurface:
+    """Merge surfaces into one, keeping every region as a named region.
+
+    Args:
+        surfaces: Surfaces to merge
+        weld_tolerance: Points closer than about this distance are merged;
+            0 merges only identical points
+
+    Returns:
+        The merged surface
+    """
+    names: List[str] = []
+    regions, vertices = [], []
+    for surface in surfaces:
+        mapping = np.arange(len(surface.region_names)) + len(names)
+        names.extend(surface.region_names)
+        regions.append(mapping[surface.regions])
+        vertices.append(surface.triangle_vertices())
+    flat = np.concatenate(vertices).reshape(-1, 3) if vertices else np.zeros((0, 3))
+    first, inverse = unique_rows(_weld_keys(flat, weld_tolerance))
+    return TriSurface(flat[first], inverse.reshape(-1, 3),
+                      np.concatenate(regions) if regions else None, names or None)
+
+
+def _weld_keys(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Return the rows used to decide which points are merged."""
+    return np.round(points / tolerance) if tolerance > 0 else points
+
+
+def load_surface(file_paths: Union[str, Sequence[str]], scale_factor: float = 1.0,
+                 units: str = "m", weld_tolerance: float = 0.0, clean: bool = True,
+                 orient: bool = True,
+                 chunk_size: int = STREAM_CHUNK_SIZE) -> Tuple[TriSurface, Dict[str, Any]]:
+    """Read, scale, weld and clean one or more STL files into one surface.
+
+    Every solid becomes a region named after its file; files with several
+    solids get ``<file>_<solid>`` regions.
+
+    Args:
+        file_paths: STL file or files to merge
+        scale_factor: Extra scale applied after the unit conversion
+        units: Length unit of the files (see ``LENGTH_UNITS``)
+        weld_tolerance: Point welding tolerance in meters; 0 merges only
+            identical points
+        clean: Remove degenerate and duplicate triangles
+        orient: Orient the triangles consistently
+        chunk_size: Facets read per chunk
+
+    Returns:
+        The surface and a report of the processing steps
+
+    Raises:
+        ValueError: If the unit is unknown
+        STLParseError: If a file cannot be parsed
+    """
+    if isinstance(file_paths, str):
+        file_paths = [file_paths]
+    if units not in LENGTH_UNITS:
+        raise ValueError(f"Unknown length unit: {units}")
+    factor = LENGTH_UNITS[units] * scale_factor
+
+    digest = hashlib.sha1()
+    keys, points, triangles, regions = [], [], [], []
+    region_names: List[str] = []
+    n_points = 0
+    n_facets = 0
+    for path in file_paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        solids: Dict[int, int] = {}
+        solid_names: List[str] = []
+        for vertices, solid, name in iter_stl_chunks(path, chunk_size, digest):
+            if solid not in solids:
+                solids[solid] = len(region_names) + len(solid_names)
+                solid_names.append(name or str(solid))
+            flat = vertices.reshape(-1, 3) * factor
+            rows = _weld_keys(flat, weld_tolerance)
+            first, inverse = unique_rows(rows)
+            keys.append(rows[first])
+            points.append(flat[first])
+            triangles.append((inverse.reshape(-1, 3) + n_points).astype(np.int32))
+            regions.append(np.full(len(vertices), solids[solid], dtype=np.int32))
+            n_points += len(first)
+            n_facets += len(vertices)
+        if len(solid_names) == 1:
+            region_names.append(stem)
+        else:
+            region_names.extend(f"{stem}_{name}" for name in solid_names)
+
+    digest.update(repr((factor, weld_tolerance, clean, orient)).encode())
+    if keys:
+        first, inverse = unique_rows(np.concatenate(keys))
+        surface = TriSurface(np.concatenate(points)[first], inverse[np.concatenate(triangles)],
+                             np.concatenate(regions), region_names, digest.hexdigest())
+    else:
+        surface = TriSurface(np.zeros((0, 3)), np.zeros((0, 3)), None, region_names or None,
+                             digest.hexdigest())
+
+    report: Dict[str, Any] = {
+        "facets": n_facets,
+        "points": surface.n_points,
+        "welded_points": 3 * n_facets - surface.n_points,
+        "degenerate_triangles": 0,
+        "duplicate_triangles": 0,
+        "flipped_triangles": 0,
+    }
+    if clean:
+        surface, report["degenerate_triangles"] = remove_degenerate_triangles(
+            surface, 0.5 * weld_tolerance ** 2)
+        surface, report["duplicate_triangles"] = remove_duplicate_triangles(surface)
+    if orient:
+        surface, report["flipped_triangles"] = orient_surface(surface)
+    report["triangles"] = surface.n_triangles
+    report["points"] = surface.n_points
+
+    logger.info(f"Loaded {len(file_paths)} STL file(s): {report}")
+    return surface, report
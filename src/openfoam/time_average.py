@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 11:20:37 2026
+
+@author: adamp
+"""
+
+"""
+Offline time-averaging of fields, like a ``fieldAverage`` function object
+enabled after the run.
+
+The time directories of a window are streamed through a weighted Welford
+update, so only one snapshot is held in memory besides the running mean and
+``prime2Mean`` (the variance, or the symmetric covariance tensor of vector
+fields). Fields are spread over a process pool, each worker streaming one
+field and writing its ``<field>Mean``, ``<field>Prime2Mean`` and optionally
+``<field>RMS`` fields to the output time directory.
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.openfoam.fields import (VolField, read_field, write_field, field_path, default_boundary,
+                                 time_directories)
+from src.openfoam.mesh_sets import mesh_sizes
+from src.openfoam.polymesh import Patch, PolyMesh
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Snapshot weightings: by the time interval each snapshot ends, or equal
+AVERAGE_WEIGHTINGS = ("time", "uniform")
+
+# Components (i, j) of the symmetric prime2Mean tensor of vector fields
+SYMM_TENSOR_COMPONENTS = ((0, 0), (0, 1), (0, 2), (1, 1), (1, 2), (2, 2))
+
+_DIMENSIONS_RE = re.compile(r"^\[([^\]]*)\]$")
+
+
+def snapshot_weights(times: Sequence[str], weighting: str = "time") -> np.ndarray:
+    """Averaging weight of each snapshot.
+
+    With ``time`` weighting each snapshot stands for the interval since the
+    previous one, and the first for the interval to the next, so equally
+    spaced snapshots get equal weights.
+    """
+    if weighting not in AVERAGE_WEIGHTINGS:
+        raise ValueError(f"Unsupported averaging weighting: {weighting}")
+    if weighting == "uniform" or len(times) < 2:
+        return np.ones(len(times))
+    intervals = np.diff(np.array(times, dtype=np.float64))
+    return np.concatenate([intervals[:1], intervals])
+
+
+def squared_dimensions(dimensions: str) -> str:
+    """Dimension set of the square of a quantity."""
+    match = _DIMENSIONS_RE.match(dimensions.strip())
+    if not match:
+        return dimensions
+    return "[" + " ".join(f"{2 * float(v):g}" for v in match.group(1).split()) + "]"
+
+
+class RunningAverage:
+    """Streaming weighted mean and prime2Mean of cell values."""
+
+    def __init__(self) -> None:
+        self.weight = 0.0
+        self.mean: Optional[np.ndarray] = None
+        self.m2: Optional[np.ndarray] = None
+
+    def update(self, values: np.ndarray, weight: float = 1.0) -> None:
+        """Add a snapshot with its weight."""
+        values = np.asarray(values, dtype=np.float64)
+        if self.mean is None:
+            self.mean = np.zeros_like(values)
+            width = 1 if values.ndim == 1 else len(SYMM_TENSOR_COMPONENTS)
+            self.m2 = np.zeros(len(values)) if values.ndim == 1 else \
+                np.zeros((len(values), width))
+        if weight <= 0:
+            return
+        self.weight += weight
+        delta = values - self.mean
+        self.mean += delta * (weight / self.weight)
+        after = values - self.mean
+        if values.ndim == 1:
+            self.m2 += weight * delta * after
+        elif values.shape[1] == 3:
+            i, j = np.array(SYMM_TENSOR_COMPONENTS).T
+            self.m2 += weight * delta[:, i] * after[:, j]
+
+    @property
+    def prime2_mean(self) -> np.ndarray:
+        """Weighted variance, or covariance tensor of vectors."""
+        return self.m2 / self.weight if self.weight > 0 else self.m2
+
+    @property
+    def rms(self) -> np.ndarray:
+        """Root mean square fluctuation, per component for vectors."""
+        prime2 = self.prime2_mean
+        diagonal = prime2 if prime2.ndim == 1 else prime2[:, [0, 3, 5]]
+        return np.sqrt(np.maximum(diagonal, 0))
+
+
+def _average_field(case_dir: str, name: str, times: Sequence[str], weights: np.ndarray,
+                   n_cells: int, patches: Sequence[Patch], output_time: str,
+                   prime2_mean: bool, rms: bool, binary: Optional[bool]) -> List[str]:
+    """Stream one field through its snapshots and write the averaged fields."""
+    average = RunningAverage()
+    field = None
+    for time, weight in zip(times, weights):
+        field = read_field(field_path(case_dir, name, time), n_cells)
+        average.update(field.values, weight)
+        field.values = None
+    binary = field.binary if binary is None else binary
+    boundary = default_boundary(patches)
+
+    outputs = [VolField(f"{name}Mean", average.mean, field.dimensions, boundary, binary)]
+    # Tensor fields only get their mean, as in fieldAverage
+    if average.mean.ndim == 1 or average.mean.shape[1] == 3:
+        if prime2_mean:
+            outputs.append(VolField(f"{name}Prime2Mean", average.prime2_mean,
+                                    squared_dimensions(field.dimensions), boundary, binary))
+        if rms:
+            outputs.append(VolField(f"{name}RMS", average.rms, field.dimensions, boundary, binary))
+    return [write_field(case_dir, output, output_time, binary) for output in outputs]
+
+
+def time_average(case_dir: str, fields: Sequence[str], start: Optional[float] = None,
+                 end: Optional[float] = None, output_time: Optional[str] = None,
+                 weighting: str = "time", prime2_mean: bool = True, rms: bool = False,
+                 binary: Optional[bool] = None, workers: Optional[int] = None) -> List[str]:
+    """Average fields over the time directories of a window.
+
+    Args:
+        case_dir: Case directory
+        fields: Names of the fields to average
+        start: First time of the window; the first time directory if None
+        end: Last time of the window; the latest time directory if None
+        output_time: Time directory the results are written to; the last
+            time of the window if None
+        weighting: One of ``AVERAGE_WEIGHTINGS``
+        prime2_mean: Whether to write ``<field>Prime2Mean`` fields
+        rms: Whether to write ``<field>RMS`` fields
+        binary: Whether to write binary; the format of the last snapshot if None
+        workers: Number of worker processes; the CPU count if None, none if 1
+
+    Returns:
+        Paths of the written fields
+    """
+    times = [time for time in time_directories(case_dir)
+             if (start is None or float(time) >= start) and (end is None or float(time) <= end)]
+    if not times:
+        raise ValueError(f"No time directories in the averaging window of {case_dir}")
+    weights = snapshot_weights(times, weighting)
+    output_time = output_time or times[-1]
+    n_cells = mesh_sizes(case_dir)["cell"]
+    patches = PolyMesh.read_patches(case_dir)
+
+    for name in fields:
+        missing = [time for time in times if not os.path.exists(field_path(case_dir, name, time))
+                   and not os.path.exists(field_path(case_dir, name, time) + ".gz")]
+        if missing:
+            raise FileNotFoundError(f"Field {name} is missing at times {', '.join(missing)}")
+
+    arguments: List[Tuple] = [(case_dir, name, times, weights, n_cells, patches, output_time,
+                               prime2_mean, rms, binary) for name in fields]
+    workers = workers or os.cpu_count() or 1
+    paths = []
+    if workers == 1 or len(arguments) <= 1:
+        for args in arguments:
+            paths.extend(_average_field(*args))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(arguments))) as pool:
+            for result in [pool.submit(_average_field, *args) for args in arguments]:
+                paths.extend(result.result())
+    logger.info(f"Averaged {len(fields)} fields over {len(times)} times "
+                f"({times[0]} to {times[-1]}) into {output_time}")
+    return paths
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 21:20:44 2026
+
+@author: adamp
+"""
+
+"""
+Legacy VTK file I/O.
+
+Surfaces are written in binary legacy format (big-endian, float32 points)
+so they open directly in ParaView without any VTK Python dependency.
+Unstructured grids (legacy format, versions up to 5.1) are streamed in and
+converted to a polyMesh.
+"""
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.openfoam.mesh_conversion import (MeshImportError, MeshStream, record_starts,
+                                          cells_to_polymesh)
+from src.openfoam.polymesh import PolyMesh
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Cell shape and corner order of the supported VTK volume cell types
+# (quadratic cells list their corners first)
+VTK_CELL_SHAPES = {
+    10: ("tet", [0, 1, 2, 3]),
+    11: ("hex", [0, 1, 3, 2, 4, 5, 7, 6]),
+    12: ("hex", list(range(8))),
+    13: ("prism", list(range(6))),
+    14: ("pyramid", list(range(5))),
+    24: ("tet", [0, 1, 2, 3]),
+    25: ("hex", list(range(8))),
+    26: ("prism", list(range(6))),
+    27: ("pyramid", list(range(5))),
+}
+
+# Corner order of the supported VTK surface cell types
+VTK_FACE_CORNERS = {5: [0, 1, 2], 8: [0, 1, 3, 2], 9: [0, 1, 2, 3], 22: [0, 1, 2], 23: [0, 1, 2, 3]}
+
+# Number of points of every cell type that may appear next to volume cells
+VTK_CELL_SIZES = {1: 1, 3: 2, 5: 3, 8: 4, 9: 4, 10: 4, 11: 8, 12: 8, 13: 6, 14: 5, 21: 3,
+                  22: 6, 23: 8, 24: 10, 25: 20, 26: 15, 27: 13}
+
+# Big-endian on-disk dtypes of the VTK data type names
+_VTK_DTYPES = {
+    "float": ">f4", "double": ">f8", "int": ">i4", "unsigned_int": ">u4", "long": ">i8",
+    "unsigned_long": ">u8", "vtktypeint32": ">i4", "vtktypeint64": ">i8",
+}
+
+# Name of the patch holding the surface cells of a grid
+VTK_BOUNDARY_PATCH = "boundary"
+
+
+def _write_cell_array(f, keyword: str, connectivity: np.ndarray) -> None:
+    """Write equal-sized cells (polygons or lines) as a VTK cell array."""
+    n_cells, size = connectivity.shape
+    f.write(f"{keyword} {n_cells} {n_cells * (size + 1)}\n".encode())
+    cells = np.empty((n_cells, size + 1), dtype=">i4")
+    cells[:, 0] = size
+    cells[:, 1:] = connectivity
+    f.write(cells.tobytes())
+    f.write(b"\n")
+
+
+def _write_attributes(f, data: Dict[str, np.ndarray]) -> None:
+    """Write scalar and vector attribute arrays."""
+    for name, values in data.items():
+        values = np.asarray(values)
+        safe_name = name.replace(" ", "_")
+        if values.ndim == 2 and values.shape[1] == 3:
+            f.write(f"VECTORS {safe_name} float\n".encode())
+        else:
+            f.write(f"SCALARS {safe_name} float 1\nLOOKUP_TABLE default\n".encode())
+        f.write(np.ascontiguousarray(values, dtype=">f4").tobytes())
+        f.write(b"\n")
+
+
+def write_vtk_polydata(file_path: str, points: np.ndarray, polygons: Optional[np.ndarray] = None,
+                       lines: Optional[np.ndarray] = None,
+                       cell_data: Optional[Dict[str, np.ndarray]] = None,
+                       point_data: Optional[Dict[str, np.ndarray]] = None,
+                       title: str = "Project_Flow") -> None:
+    """Write points with polygons and/or lines as a binary legacy VTK file.
+
+    Args:
+        file_path: Destination ``.vtk`` path
+        points: Point coordinates, shape (nPoints, 3)
+        polygons: Point labels of equal-sized polygons, shape (nPolygons, k)
+        lines: Point labels of line segments, shape (nLines, 2)
+        cell_data: Arrays with one value (or vector) per cell, lines first
+            (VTK cell order)
+        point_data: Arrays with one value (or vector) per point
+        title: Title line of the file
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    points = np.asarray(points)
+    with open(file_path, "wb") as f:
+        f.write(f"# vtk DataFile Version 3.0\n{title}\nBINARY\nDATASET POLYDATA\n".encode())
+        f.write(f"POINTS {len(points)} float\n".encode())
+        f.write(np.ascontiguousarray(points, dtype=">f4").tobytes())
+        f.write(b"\n")
+
+        n_cells = 0
+        if lines is not None and len(lines):
+            _write_cell_array(f, "LINES", np.asarray(lines))
+            n_cells += len(lines)
+        if polygons is not None and len(polygons):
+            _write_cell_array(f, "POLYGONS", np.asarray(polygons))
+            n_cells += len(polygons)
+
+        if cell_data:
+            f.write(f"CELL_DATA {n_cells}\n".encode())
+            _write_attributes(f, cell_data)
+        if point_data:
+            f.write(f"POINT_DATA {len(points)}\n".encode())
+            _write_attributes(f, point_data)
+    logger.debug(f"Wrote VTK polydata with {len(points)} points to {file_path}")
+
+
+def _read_vtk_array(stream: MeshStream, binary: bool, count: int, type_name: str) -> np.ndarray:
+    """Read ``count`` values of a legacy VTK data array."""
+    dtype = _VTK_DTYPES.get(type_name.lower())
+    if dtype is None:
+        raise MeshImportError(f"Unsupported VTK data type {type_name}")
+    if binary:
+        values = stream.read_array(count, dtype)
+    else:
+        values = stream.read_values(count, np.float64 if dtype[1] == "f" else np.int64)
+    return values
+
+
+def read_vtk_mesh(file_path: str) -> PolyMesh:
+    """Read a legacy VTK unstructured grid (ASCII or binary) as a polyMesh.
+
+    Tetrahedra, hexahedra (and voxels), wedges and pyramids, linear or
+    quadratic, become cells. Surface cells are collected in the
+    ``boundary`` patch; the remaining boundary faces go to ``defaultFaces``.
+
+    Args:
+        file_path: Path to the ``.vtk`` file
+
+    Returns:
+        The converted mesh
+
+    Raises:
+        MeshImportError: If the file is not a legacy unstructured grid or
+            contains unsupported cells
+    """
+    points = types = None
+    logger.info(f"Reading VTK mesh {file_path}")
+    with MeshStream(file_path) as stream:
+        header = stream.next_line()
+        if not header.startswith(b"# vtk DataFile Version"):
+            raise MeshImportError(f"{file_path} is not a legacy VTK file")
+        version = float(header.split()[-1])
+        stream.read_line()
+        binary = stream.next_line().upper() == b"BINARY"
+        dataset = stream.next_line().split()
+        if len(dataset) < 2 or dataset[1].upper() != b"UNSTRUCTURED_GRID":
+            raise MeshImportError(f"{file_path} is not an unstructured grid")
+
+        while points is None or types is None:
+            line = stream.read_line()
+            if line is None:
+                break
+            words = line.decode(errors="replace").split()
+            if not words:
+                continue
+            keyword = words[0].upper()
+            if keyword == "POINTS":
+                count = int(words[1])
+                points = _read_vtk_array(stream, binary, 3 * count, words[2]).reshape(count, 3)
+            elif keyword == "CELLS" and version >= 5:
+                n_offsets, n_connectivity = int(words[1]), int(words[2])
+                offset_type = stream.next_line().decode().split()[1]
+                offsets = _read_vtk_array(stream, binary, n_offsets, offset_type).astype(np.int64)
+                connectivity_type = stream.next_line().decode().split()[1]
+                cell_data = _read_vtk_array(stream, binary, n_connectivity,
+                                            connectivity_type).astype(np.int64)
+                starts, sizes = offsets[:-1], np.diff(offsets)
+            elif keyword == "CELLS":
+                count, size = int(words[1]), int(words[2])
+                if binary:
+                    cell_data = stream.read_array(size, ">i4").astype(np.int64)
+                else:
+                    cell_data = np.concatenate([np.fromstring(block, sep=" ", dtype=np.int64)
+                                                for block in stream.iter_lines(count)])
+                starts = record_starts(cell_data + 1)
+                sizes = cell_data[starts]
+                starts = starts + 1
+                if len(starts) != count:
+                    raise MeshImportError(f"Expected {count} cells in {file_path}")
+            elif keyword == "CELL_TYPES":
+                types = _read_vtk_array(stream, binary, int(words[1]), "int")
+            elif keyword == "METADATA":
+                while stream.read_line() not in (None, b""):
+                    pass
+            elif keyword in ("CELL_DATA", "POINT_DATA", "FIELD"):
+                break
+    if points is None or types is None:
+        raise MeshImportError(f"No points or cells found in {file_path}")
+
+    cells: Dict[str, List[np.ndarray]] = {}
+    faces = []
+    for cell_type in np.unique(types):
+        selected = np.flatnonzero(types == cell_type)
+        expected = VTK_CELL_SIZES.get(int(cell_type))
+        if expected is None or np.any(sizes[selected] != expected):
+            raise MeshImportError(f"Unsupported VTK cell type {cell_type}")
+        if cell_type in VTK_CELL_SHAPES:
+            shape, corners = VTK_CELL_SHAPES[int(cell_type)]
+            cells.setdefault(shape, []).append(cell_data[starts[selected][:, None] + corners])
+        elif cell_type in VTK_FACE_CORNERS:
+            corners = VTK_FACE_CORNERS[int(cell_type)]
+            block = np.full((len(selected), 4), -1, dtype=np.int64)
+            block[:, :len(corners)] = cell_data[starts[selected][:, None] + corners]
+            faces.append(block)
+
+    cells = {shape: np.concatenate(blocks) for shape, blocks in cells.items()}
+    if not faces:
+        return cells_to_polymesh(points, cells)
+    faces = np.concatenate(faces)
+    return cells_to_polymesh(points, cells, faces, np.zeros(len(faces), dtype=np.int64),
+                             [VTK_BOUNDARY_PATCH])
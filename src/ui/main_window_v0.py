@@ -23,6 +23,8 @@ from core.plugin import PluginManager
 from ui.welcome import WelcomeWidget
 from modules.mesh import MeshWidget
 from modules.physics.physics_widget import PhysicsWidget
+from src.openfoam.postprocessing import PostProcessingReader
+from src.openfoam.results_store import build_results_store, stored_series
 
 # Import placeholders for future modules
 # These will be implemented in separate files
@@ -1059,17 +1061,86 @@ class MainWindow(QMainWindow):
                 self.status_bar.showMessage("No postprocessing data found")
     
     def load_postprocessing_data(self, results_dir):
-        """Load postprocessing data from the specified directory."""
-        # Placeholder for actual data loading logic
-        # This would typically involve reading OpenFOAM result files
-        self.console.log(f"Loading postprocessing data from {results_dir}")
-        # Implementation should populate the results tree and prepare data for visualization
+        """Load postprocessing data from the specified directory.
+
+        Tables come from the results store of the case when it is current,
+        without parsing any file. Otherwise the reader is kept between
+        calls, so refreshing while the solver runs only reads the rows
+        written since the previous load.
+        """
+        try:
+            stored = stored_series(os.path.dirname(os.path.abspath(results_dir)))
+        except Exception as e:
+            self.console.log_error(f"Ignoring the results store: {str(e)}")
+            stored = None
+        if stored is not None:
+            self.postprocessing_tables = stored
+            self.show_postprocessing_tables({
+                key: (len(columns["Time"]) if "Time" in columns else 0, len(columns))
+                for key, columns in stored.items()})
+            self.console.log(f"Loaded {len(stored)} tables from the results store of "
+                             f"{results_dir}")
+            return
+
+        reader = getattr(self, 'postprocessing_reader', None)
+        if reader is None or reader.post_dir != results_dir:
+            reader = self.postprocessing_reader = PostProcessingReader(results_dir)
+        try:
+            new_rows = reader.refresh()
+        except Exception as e:
+            self.console.log_error(f"Failed to read postprocessing data: {str(e)}")
+            return
+
+        self.postprocessing_tables = {key: series.data() for key, series in reader.series.items()}
+        self.show_postprocessing_tables({key: (series.n_rows, len(series.columns))
+                                         for key, series in reader.series.items()})
+        self.console.log(f"Loaded {sum(new_rows.values())} new rows from {len(new_rows)} "
+                         f"tables in {results_dir}")
+    
+    def show_postprocessing_tables(self, tables):
+        """List function objects and their tables given (rows, columns) per table."""
+        model = QStandardItemModel()
+        for function_object in sorted({fo for fo, _ in tables}):
+            object_item = QStandardItem(function_object)
+            object_item.setEditable(False)
+            for (fo, name), (n_rows, n_columns) in sorted(tables.items()):
+                if fo != function_object:
+                    continue
+                item = QStandardItem(f"{name} ({n_rows} rows, {n_columns} columns)")
+                item.setData((function_object, name), Qt.UserRole)
+                item.setEditable(False)
+                object_item.appendRow(item)
+            model.appendRow(object_item)
+        self.results_tree.setModel(model)
+        self.results_tree.expandAll()
     
     def export_postprocessing_data(self):
-        """Export the current postprocessing data to a file."""
-        # Placeholder for export functionality
-        self.console.log("Exporting postprocessing data")
-        # Implementation should provide file dialog and export options
+        """Export the fields and postprocessing tables of the case to a results store."""
+        case_dir = self.get_current_case_directory()
+        if not case_dir:
+            self.status_bar.showMessage("No simulation case available for export")
+            return
+        store_dir = QFileDialog.getExistingDirectory(self, "Export Results Store", case_dir)
+        if not store_dir:
+            return
+        float32 = QMessageBox.question(
+            self,
+            "Export Precision",
+            "Store values in single precision to halve the size of the export?",
+            QMessageBox.Yes | QMessageBox.No
+        ) == QMessageBox.Yes
+
+        try:
+            # The case store is brought up to date incrementally, then copied
+            store = build_results_store(case_dir)
+            if os.path.abspath(store_dir) != os.path.abspath(store.path):
+                store = store.export(store_dir, float32)
+            self.console.log(f"Exported {len(store.fields())} fields and "
+                             f"{len(store.series_names())} tables to {store_dir}")
+            self.status_bar.showMessage("Postprocessing data exported")
+        except Exception as e:
+            QMessageBox.critical(self, "Export Error", f"Error exporting results: {str(e)}")
+            self.console.log_error(f"Failed to export postprocessing data: {str(e)}")
     
     def open_paraview(self):
         """
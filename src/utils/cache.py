@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:02:44 2026
+
+@author: adamp
+"""
+
+"""
+On-disk cache for derived NumPy arrays.
+
+Results that are expensive to recompute (feature edges, surface LODs, mesh
+operators...) are stored as ``.npz`` files keyed by a hash of their inputs,
+under ``~/.project_flow/cache`` next to the application logs.
+"""
+import os
+import json
+import hashlib
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Environment variable overriding the default cache location
+CACHE_DIR_ENV = "PROJECT_FLOW_CACHE_DIR"
+
+_METADATA_KEY = "__metadata__"
+
+
+def default_cache_dir() -> str:
+    """Return the root directory of the application cache."""
+    return os.environ.get(CACHE_DIR_ENV, os.path.expanduser("~/.project_flow/cache"))
+
+
+class ArrayCache:
+    """Cache of named array bundles stored as ``.npz`` files."""
+
+    def __init__(self, namespace: str, cache_dir: Optional[str] = None) -> None:
+        """Initialize the cache.
+
+        Args:
+            namespace: Sub-directory separating unrelated cached data
+            cache_dir: Root cache directory; the default location if None
+        """
+        self.namespace = namespace
+        self.cache_dir = os.path.join(cache_dir or default_cache_dir(), namespace)
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Build a cache key from hashes and parameters.
+
+        Args:
+            *parts: Values identifying the cached result (converted with repr)
+
+        Returns:
+            Hex digest usable as a file name
+        """
+        digest = hashlib.sha1()
+        for part in parts:
+            digest.update(repr(part).encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        """Return the file path of a cache entry."""
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def __contains__(self, key: str) -> bool:
+        """Check if an entry exists."""
+        return os.path.exists(self._path(key))
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """Load a cache entry.
+
+        Args:
+            key: Entry key
+
+        Returns:
+            Dictionary of arrays (plus ``metadata`` if stored), or None if the
+            entry does not exist or cannot be read
+        """
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                result: Dict[str, Any] = {name: data[name] for name in data.files
+                                          if name != _METADATA_KEY}
+                if _METADATA_KEY in data.files:
+                    result["metadata"] = json.loads(str(data[_METADATA_KEY]))
+            return result
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {path}: {e}")
+            return None
+
+    def save(self, key: str, arrays: Dict[str, np.ndarray],
+             metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Store a cache entry.
+
+        Args:
+            key: Entry key
+            arrays: Named arrays to store
+            metadata: Optional JSON-serialisable metadata
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        payload = dict(arrays)
+        if metadata is not None:
+            payload[_METADATA_KEY] = np.array(json.dumps(metadata))
+
+        # Write to a temporary file first so readers never see partial entries
+        tmp_path = self._path(key) + ".tmp.npz"
+        try:
+            np.savez(tmp_path, **payload)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.warning(f"Could not write cache entry {key}: {e}")
+
+    def clear(self) -> None:
+        """Remove all entries of this namespace."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npz"):
+                os.remove(os.path.join(self.cache_dir, name))
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:20:41 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for the native block mesh generator and polyMesh I/O.
+"""
+import numpy as np
+import pytest
+from src.openfoam.block_mesh import BlockMesh, BlockAxis, BlockMeshError, graded_spacing
+from src.openfoam.polymesh import PolyMesh
+
+
+def face_area_sums(mesh):
+    """Return the sum of outward face area vectors of every cell."""
+    sums = np.zeros((mesh.n_cells, 3))
+    np.add.at(sums, mesh.owner, mesh.face_areas)
+    np.add.at(sums, mesh.neighbour, -mesh.face_areas[:mesh.n_internal_faces])
+    return sums
+
+
+class TestBlockMesh:
+    """Test the BlockMesh generator."""
+
+    def test_graded_spacing(self):
+        """Test that grading is the ratio of last to first cell size."""
+        nodes = graded_spacing(10, 4.0)
+        sizes = np.diff(nodes)
+        assert nodes[0] == 0.0 and nodes[-1] == pytest.approx(1.0)
+        assert sizes[-1] / sizes[0] == pytest.approx(4.0)
+
+    def test_box_counts_and_ordering(self):
+        """Test cell, face and patch counts of a graded box."""
+        mesh = BlockMesh.box((0, 0, 0), (1, 2, 3), (3, 4, 5), (2.0, 1.0, 0.5)).build()
+
+        assert mesh.n_cells == 60
+        assert mesh.n_internal_faces == 2 * 20 + 3 * 15 + 4 * 12
+        assert mesh.summary()["patches"]["xMin"] == 20
+        assert mesh.check_ordering()
+        assert mesh.cell_volumes.sum() == pytest.approx(6.0)
+        assert np.all(mesh.cell_volumes > 0)
+        assert np.abs(face_area_sums(mesh)).max() < 1e-12
+
+    def test_removed_block_creates_wall_patch(self):
+        """Test an L-shaped domain built from three of four blocks."""
+        active = np.ones((1, 2, 2), dtype=bool)
+        active[0, 1, 1] = False
+        block_mesh = BlockMesh(
+            BlockAxis([0, 1, 2], [2, 3], [1, 2]),
+            BlockAxis([0, 1, 2], [2, 2]),
+            BlockAxis([0, 1], [1]),
+            patch_names={"zMin": "frontAndBack", "zMax": "frontAndBack"},
+            patch_types={"frontAndBack": "empty"},
+            active_blocks=active,
+        )
+        mesh = block_mesh.build()
+
+        assert mesh.n_cells == block_mesh.n_cells() == 14
+        assert mesh.cell_volumes.sum() == pytest.approx(3.0)
+        assert mesh.patch("walls").type == "wall"
+        assert mesh.patch("walls").n_faces == 5
+        assert mesh.patch("frontAndBack").n_faces == 28
+        assert mesh.check_ordering()
+        assert np.abs(face_area_sums(mesh)).max() < 1e-12
+
+    def test_invalid_block_definition(self):
+        """Test that inconsistent axes are rejected."""
+        with pytest.raises(BlockMeshError):
+            BlockAxis([0, 1, 2], [4])
+
+    @pytest.mark.parametrize("binary", [True, False])
+    def test_write_and_read_back(self, tmp_path, binary):
+        """Test polyMesh round trip and blockMeshDict output."""
+        block_mesh = BlockMesh.box((0, 0, 0), (1, 1, 1), (4, 3, 2))
+        mesh = block_mesh.write(str(tmp_path), binary=binary)
+
+        loaded = PolyMesh.read(str(tmp_path))
+        assert loaded.n_cells == mesh.n_cells
+        assert np.allclose(loaded.points, mesh.points)
+        assert np.array_equal(loaded.face_points, mesh.face_points)
+        assert np.array_equal(loaded.owner, mesh.owner)
+        assert np.array_equal(loaded.neighbour, mesh.neighbour)
+        assert [p.name for p in loaded.patches] == [p.name for p in mesh.patches]
+
+        block_mesh_dict = (tmp_path / "system" / "blockMeshDict").read_text()
+        assert "hex (0 1 3 2 4 5 7 6) (4 3 2) simpleGrading (1 1 1)" in block_mesh_dict
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 21:52:37 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for boundary surface extraction and LOD decimation.
+"""
+import numpy as np
+from src.openfoam.block_mesh import BlockMesh
+from src.openfoam.boundary_surface import (triangulate_faces, extract_boundary_surface,
+                                           cluster_vertices, BoundaryLOD)
+from src.openfoam.vtk_io import write_vtk_polydata
+from src.utils.cache import ArrayCache
+
+
+def box_mesh(n=8):
+    """Unit cube mesh with n cells per direction."""
+    return BlockMesh.box((0, 0, 0), (1, 1, 1), (n, n, n)).build()
+
+
+class TestBoundarySurface:
+    """Test boundary extraction and the LOD hierarchy."""
+
+    def test_triangulate_faces(self):
+        """Test fan triangulation of a quad and a pentagon."""
+        offsets = np.array([0, 4, 9])
+        labels = np.array([0, 1, 2, 3, 4, 5, 6, 7, 8])
+        triangles, face = triangulate_faces(offsets, labels)
+        assert triangles.tolist() == [[0, 1, 2], [0, 2, 3], [4, 5, 6], [4, 6, 7], [4, 7, 8]]
+        assert face.tolist() == [0, 0, 1, 1, 1]
+
+    def test_extract_boundary(self):
+        """Test that only boundary faces are triangulated, grouped by patch."""
+        mesh = box_mesh(4)
+        surface = extract_boundary_surface(mesh)
+        n_boundary = mesh.n_faces - mesh.n_internal_faces
+        assert surface.n_triangles == 2 * n_boundary
+        assert surface.n_points == 6 * 4 * 4 + 2
+        assert surface.region_names == [p.name for p in mesh.patches]
+        for index, patch in enumerate(mesh.patches):
+            assert np.count_nonzero(surface.regions == index) == 2 * patch.n_faces
+        assert np.isclose(surface.triangle_areas().sum(), 6.0)
+
+        single = extract_boundary_surface(mesh, [mesh.patches[0].name])
+        assert single.n_triangles == 2 * mesh.patches[0].n_faces
+
+    def test_cluster_vertices(self):
+        """Test that clustering reduces triangles and keeps the bounding box shape."""
+        surface = extract_boundary_surface(box_mesh(16))
+        coarse = cluster_vertices(surface, 4)
+        assert 0 < coarse.n_triangles < surface.n_triangles / 4
+        assert np.allclose(coarse.bounds(), surface.bounds(), atol=0.2)
+        assert set(np.unique(coarse.regions)) == set(np.unique(surface.regions))
+
+    def test_lod_cache_and_budget(self, tmp_path):
+        """Test that LOD levels coarsen and round-trip through the cache."""
+        mesh = box_mesh(16)
+        cache = ArrayCache("boundary_lod", str(tmp_path / "cache"))
+        lod = BoundaryLOD.build(mesh, resolutions=(8, 4), cache=cache)
+        sizes = [level.n_triangles for level in lod.levels]
+        assert sizes[0] == 2 * (mesh.n_faces - mesh.n_internal_faces)
+        assert sizes == sorted(sizes, reverse=True) and sizes[2] < sizes[1]
+        assert lod.level_for_budget(sizes[1]) is lod.levels[1]
+        assert lod.level_for_budget(1) is lod.levels[-1]
+
+        cached = BoundaryLOD.build(mesh, resolutions=(8, 4), cache=cache)
+        assert [level.n_triangles for level in cached.levels] == sizes
+        assert cached.levels[1].region_names == lod.levels[1].region_names
+
+    def test_write_vtk_polydata(self, tmp_path):
+        """Test the legacy VTK header and payload size."""
+        surface = extract_boundary_surface(box_mesh(2))
+        path = tmp_path / "VTK" / "boundary.vtk"
+        write_vtk_polydata(str(path), surface.points, surface.triangles,
+                           cell_data={"patch": surface.regions})
+        content = path.read_bytes()
+        assert content.startswith(b"# vtk DataFile Version 3.0")
+        assert f"POINTS {surface.n_points} float".encode() in content
+        assert f"POLYGONS {surface.n_triangles} {4 * surface.n_triangles}".encode() in content
+        assert f"CELL_DATA {surface.n_triangles}".encode() in content
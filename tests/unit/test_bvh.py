@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:24:13 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for the surface bounding volume hierarchy.
+"""
+import numpy as np
+import pytest
+from src.openfoam.stl import TriSurface
+from src.openfoam.bvh import (SurfaceBVH, closest_points_on_triangles, points_inside_surface,
+                              validate_location_in_mesh)
+from tests.unit.test_stl import CUBE_POINTS, CUBE_TRIANGLES
+
+
+def box_distance(points, lower, upper):
+    """Distance from points to the surface of an axis-aligned box."""
+    outside = np.linalg.norm(np.maximum(np.maximum(lower - points, points - upper), 0), axis=1)
+    inside = np.minimum(points - lower, upper - points).min(axis=1)
+    return np.where(outside > 0, outside, inside)
+
+
+@pytest.fixture
+def cube_bvh():
+    """BVH over a finely triangulated unit cube."""
+    # Split every cube triangle into four, twice, so the tree has several levels
+    vertices = CUBE_POINTS[CUBE_TRIANGLES]
+    for _ in range(2):
+        a, b, c = vertices[:, 0], vertices[:, 1], vertices[:, 2]
+        ab, bc, ca = (a + b) / 2, (b + c) / 2, (c + a) / 2
+        vertices = np.concatenate([np.stack(t, axis=1) for t in
+                                   ((a, ab, ca), (ab, b, bc), (ca, bc, c), (ab, bc, ca))])
+    return SurfaceBVH(TriSurface.from_triangle_vertices(vertices), leaf_size=4)
+
+
+class TestSurfaceBVH:
+    """Test BVH queries against analytic results."""
+
+    def test_tree_covers_all_triangles(self, cube_bvh):
+        """Test that the leaves partition the triangles."""
+        leaves = cube_bvh.node_child < 0
+        assert cube_bvh.node_count[leaves].sum() == 12 * 16
+        assert np.array_equal(np.sort(cube_bvh.order), np.arange(12 * 16))
+
+    def test_closest_point_regions(self):
+        """Test the closest point in the face, edge and vertex regions."""
+        a = np.array([[0.0, 0.0, 0.0]] * 3)
+        b = np.array([[1.0, 0.0, 0.0]] * 3)
+        c = np.array([[0.0, 1.0, 0.0]] * 3)
+        points = np.array([[0.2, 0.2, 1.0], [2.0, -1.0, 0.0], [1.0, 1.0, 0.0]])
+        closest = closest_points_on_triangles(points, a, b, c)
+        assert np.allclose(closest, [[0.2, 0.2, 0.0], [1.0, 0.0, 0.0], [0.5, 0.5, 0.0]])
+
+    def test_nearest(self, cube_bvh):
+        """Test nearest distances inside and outside the cube."""
+        points = np.random.default_rng(2).uniform(-0.5, 1.5, (400, 3))
+        distance, triangle, nearest = cube_bvh.nearest(points)
+        assert np.allclose(distance, box_distance(points, 0.0, 1.0))
+        assert np.all(triangle >= 0)
+        assert np.allclose(np.linalg.norm(nearest - points, axis=1), distance)
+
+        capped, capped_triangle, _ = cube_bvh.nearest(points, max_distance=0.1)
+        far = distance >= 0.1
+        assert np.all(np.isinf(capped[far])) and np.all(capped_triangle[far] == -1)
+        assert np.allclose(capped[~far], distance[~far])
+
+    @pytest.mark.parametrize("n_points", [1, 6000])
+    def test_nearest_stack_traversal(self, cube_bvh, monkeypatch, n_points):
+        """Test nearest queries popping one and many nodes per step with growing stacks."""
+        monkeypatch.setattr("src.openfoam.bvh.NEAREST_STACK_SIZE", 2)
+        points = np.random.default_rng(4).uniform(-0.5, 1.5, (n_points, 3))
+        distance, triangle, _ = cube_bvh.nearest(points)
+        assert np.allclose(distance, box_distance(points, 0.0, 1.0))
+        assert np.all(triangle >= 0)
+
+    def test_inside_and_ray_cast(self, cube_bvh):
+        """Test parity inside tests and first hits of rays."""
+        points = np.random.default_rng(3).uniform(-0.5, 1.5, (400, 3))
+        expected = np.all((points > 0) & (points < 1), axis=1)
+        assert np.array_equal(cube_bvh.inside(points), expected)
+        inner = TriSurface(CUBE_POINTS * 0.5 + 0.25, CUBE_TRIANGLES)
+        inner_expected = np.all((points > 0.25) & (points < 0.75), axis=1)
+        assert np.array_equal(points_inside_surface(inner, points), inner_expected)
+        assert not points_inside_surface(inner, np.zeros((0, 3))).any()
+
+        origins = np.array([[0.5, 0.5, 0.5], [-1.0, 0.3, 0.3], [-1.0, 2.0, 2.0]])
+        t, triangle = cube_bvh.ray_cast(origins, (1.0, 0.0, 0.0))
+        assert t[:2] == pytest.approx([0.5, 1.0])
+        assert np.isinf(t[2]) and triangle[2] == -1
+
+    def test_validate_location_in_mesh(self, cube_bvh):
+        """Test locationInMesh checks."""
+        surface = cube_bvh.surface
+        valid, inside, _ = validate_location_in_mesh(surface, (0.5, 0.5, 0.5), bvh=cube_bvh)
+        assert valid and inside
+        valid, inside, problems = validate_location_in_mesh(
+            surface, (1.01, 0.5, 0.5), (-1, -1, -1), (2, 2, 2), min_distance=0.05, bvh=cube_bvh)
+        assert not valid and not inside and len(problems) == 1
+        valid, _, problems = validate_location_in_mesh(surface, (3, 0, 0), (-1, -1, -1), (2, 2, 2))
+        assert not valid and "outside the background mesh" in problems[0]
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 03:41:05 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for topoSet-style cell selection.
+"""
+import numpy as np
+import pytest
+from src.openfoam.block_mesh import BlockMesh
+from src.openfoam.stl import TriSurface
+from src.openfoam.cell_selection import CellSource, CellSelector, write_selections
+from src.openfoam.mesh_sets import (MeshSet, MeshZone, mesh_sizes, read_mesh_set, read_zones,
+                                    write_zones)
+from src.utils.cache import ArrayCache
+from tests.unit.test_stl import CUBE_POINTS, CUBE_TRIANGLES
+
+
+@pytest.fixture
+def mesh():
+    """Unit box of 20 cells per direction."""
+    return BlockMesh.box((0, 0, 0), (1, 1, 1), (20, 20, 20)).build()
+
+
+@pytest.fixture
+def selector(mesh, tmp_path):
+    """Selector with a cache in the test directory."""
+    return CellSelector(mesh, ArrayCache("cell_selection", str(tmp_path / "cache")), bins=8)
+
+
+class TestCellSelection:
+    """Test sources against brute-force masks, topoSet actions and writing."""
+
+    def test_shape_sources(self, mesh, selector):
+        """Test that indexed shape sources match a direct evaluation on all cells."""
+        centres = mesh.cell_centres
+        sources = [CellSource("box", min=(0.1, 0.2, 0.3), max=(0.4, 0.5, 0.35)),
+                   CellSource("sphere", centre=(0.5, 0.5, 0.5), radius=0.3, inner_radius=0.1),
+                   CellSource("cylinder", point1=(0.2, 0.2, 0.1), point2=(0.3, 0.4, 0.6),
+                              radius=0.15)]
+        for source in sources:
+            expected = source.mask(centres)
+            assert 0 < expected.sum() < mesh.n_cells
+            assert np.array_equal(selector.select(source).mask(), expected)
+
+        x, y, z = (centres - 0.5).T
+        sphere = selector.select(sources[1])
+        radius2 = x ** 2 + y ** 2 + z ** 2
+        assert np.array_equal(sphere.mask(), (radius2 <= 0.09) & (radius2 >= 0.01))
+        with pytest.raises(ValueError):
+            CellSource("box", min=(0, 0, 0))
+        with pytest.raises(ValueError):
+            CellSource("cone")
+
+    def test_surface_and_field_sources(self, mesh, selector):
+        """Test closed surface inside/outside and field range sources."""
+        cube = TriSurface(CUBE_POINTS * 0.5 + 0.25, CUBE_TRIANGLES)
+        inside = selector.select(CellSource("surface", surface=cube))
+        outside = selector.select(CellSource("surface", surface=cube, outside=True))
+        assert len(inside) == 10 ** 3
+        assert outside == ~inside
+
+        velocity = np.zeros((mesh.n_cells, 3))
+        velocity[:, 0] = mesh.cell_centres[:, 0]
+        fast = selector.select(CellSource("field", values=velocity, min=0.5))
+        assert np.array_equal(fast.mask(), mesh.cell_centres[:, 0] >= 0.5)
+
+    def test_actions_and_cache(self, mesh, tmp_path):
+        """Test topoSet actions, and that a second selector loads the cached index."""
+        cache = ArrayCache("cell_selection", str(tmp_path / "cache"))
+        selector = CellSelector(mesh, cache, bins=8)
+        lower = CellSource("box", min=(0, 0, 0), max=(1, 1, 0.5))
+        left = CellSource("box", min=(0, 0, 0), max=(0.5, 1, 1))
+        sets = selector.run_actions([("a", "new", lower), ("a", "subtract", left),
+                                     ("b", "new", left), ("b", "invert", None),
+                                     ("c", "add", lower), ("c", "delete", None)])
+        assert sorted(sets) == ["a", "b"]
+        assert len(sets["a"]) == 2000 and len(sets["b"]) == 4000
+        with pytest.raises(ValueError):
+            selector.run_actions([("a", "clear", None)])
+
+        cached = CellSelector(mesh, cache, bins=8)
+        assert np.array_equal(cached.order, selector.order)
+        assert cached.select(left) == ~sets["b"]
+
+    def test_write_selections(self, mesh, tmp_path):
+        """Test writing sets and replacing a zone while keeping the others."""
+        mesh.write(str(tmp_path))
+        write_zones(str(tmp_path), "cell", [MeshZone.from_set(MeshSet.from_ranges(
+            "porous", "cell", mesh.n_cells, [0], [10])), MeshZone("heater", "cell", mesh.n_cells)])
+        selector = CellSelector(mesh, ArrayCache("cell_selection", str(tmp_path / "cache")))
+        heater = selector.select(CellSource("sphere", centre=(0.5, 0.5, 0.5), radius=0.2),
+                                 "heater")
+        write_selections(str(tmp_path), {"heater": heater}, zones=["heater"], binary=True)
+
+        sizes = mesh_sizes(str(tmp_path))
+        assert read_mesh_set(str(tmp_path), "heater", sizes) == heater
+        zones = read_zones(str(tmp_path), "cell", sizes)
+        assert [zone.name for zone in zones] == ["porous", "heater"]
+        assert zones[1] == heater and len(zones[0]) == 10
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 16:51:08 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for cutting planes and isosurfaces.
+"""
+import numpy as np
+import pytest
+from src.openfoam import cut_surfaces
+from src.openfoam.block_mesh import BlockMesh
+from src.openfoam.cut_surfaces import (SurfaceExtractor, PointInterpolation, cell_to_point,
+                                       plane_cut, isosurface, cut_surface)
+from src.openfoam.fields import VolField, write_field
+from src.utils.cache import ArrayCache
+
+
+@pytest.fixture
+def mesh():
+    """Graded box of 1 x 2 x 1."""
+    return BlockMesh.box((0, 0, 0), (1, 2, 1), (7, 9, 6), grading=(2.0, 1.0, 0.5)).build()
+
+
+class TestCutSurfaces:
+    """Test cut areas, orientation, sampling and the cached extraction."""
+
+    def test_plane(self, mesh):
+        """Test cuts along and across the mesh planes with small chunks."""
+        surface = plane_cut(mesh, (0.3, 0.77, 0.4), (0, 2, 0), chunk_size=50)
+        np.testing.assert_allclose(surface.area, 1.0)
+        np.testing.assert_allclose(surface.area_vectors().sum(axis=0), [0, 1, 0], atol=1e-12)
+        assert np.all(surface.area_vectors()[:, 1] > 0)
+        assert len(np.unique(surface.cells)) == 7 * 6
+        np.testing.assert_allclose(surface.points[:, 1], 0.77)
+
+        oblique = plane_cut(mesh, (0.5, 1.0, 0.5), (1, 1, 1))
+        area_vector = oblique.area_vectors().sum(axis=0)
+        np.testing.assert_allclose(area_vector / np.linalg.norm(area_vector),
+                                   np.ones(3) / np.sqrt(3))
+        assert plane_cut(mesh, (0, 5, 0), (0, 1, 0)).n_triangles == 0
+        with pytest.raises(ValueError):
+            plane_cut(mesh, (0, 0, 0), (0, 0, 0))
+
+    def test_isosurface(self, tmp_path, monkeypatch):
+        """Test the area and outward orientation of a sphere and interpolated samples."""
+        mesh = BlockMesh.box((0, 0, 0), (1, 1, 1), (30, 30, 30)).build()
+        cache = ArrayCache("point_stencil", str(tmp_path / "cache"))
+        radius = np.linalg.norm(mesh.cell_centres - 0.5, axis=1)
+        sphere = isosurface(mesh, radius, 0.3, cache=cache)
+        np.testing.assert_allclose(sphere.area, 4 * np.pi * 0.3 ** 2, rtol=0.02)
+        outward = np.einsum("ij,ij->i", sphere.area_vectors(),
+                            sphere.points[sphere.triangles[:, 0]] - 0.5)
+        assert np.all(outward > 0)
+
+        # Linear fields are interpolated exactly away from the boundary
+        linear = mesh.cell_centres @ [1.0, -2.0, 3.0]
+        point_values = cell_to_point(mesh, linear, chunk_size=1000, cache=cache)
+        interior = np.all((mesh.points > 0.05) & (mesh.points < 0.95), axis=1)
+        np.testing.assert_allclose(point_values[interior], mesh.points[interior] @ [1, -2, 3],
+                                   atol=1e-12)
+        np.testing.assert_allclose(sphere.sample(linear), sphere.points @ [1, -2, 3], atol=1e-9)
+        vector = sphere.sample(np.stack([linear, 2 * linear], axis=1))
+        assert vector.shape == (sphere.n_points, 2)
+        assert cut_surface(mesh, point_values, 100.0).n_points == 0
+
+        # The stencil is loaded from the cache, also with other chunks
+        monkeypatch.setattr(cut_surfaces, "point_weights", None)
+        cached = PointInterpolation(mesh, cache, chunk_size=777)
+        np.testing.assert_array_equal(cached(linear), point_values)
+        vector = cached(np.stack([linear, -linear], axis=1))
+        np.testing.assert_array_equal(vector[:, 1], -point_values)
+
+    def test_extractor(self, mesh, tmp_path, monkeypatch):
+        """Test sampled fields, the cache and the VTK export of a case."""
+        case_dir = str(tmp_path / "case")
+        mesh.write(case_dir)
+        write_field(case_dir, VolField("p", mesh.cell_centres[:, 0], "[0 2 -2 0 0 0 0]"), "1")
+        write_field(case_dir, VolField("U", np.tile([1.0, 0, 0], (mesh.n_cells, 1)),
+                                       "[0 1 -1 0 0 0 0]"), "1")
+        extractor = SurfaceExtractor(case_dir, cache=ArrayCache("cut", str(tmp_path / "cache")))
+        surface = extractor.plane("1", (0.5, 1.0, 0.5), (0, 0, 1), ["p", "U"])
+        assert surface.cell_data["p"].shape == (surface.n_triangles,)
+        np.testing.assert_allclose(surface.point_data["U"], np.tile([1, 0, 0],
+                                                                    (surface.n_points, 1)))
+        iso = extractor.isosurface("1", "p", 0.4, ["U"])
+        np.testing.assert_allclose(iso.area, 2.0, rtol=1e-6)
+
+        monkeypatch.setattr(cut_surfaces, "plane_cut", None)
+        cached = extractor.plane("1", (0.5, 1.0, 0.5), (0, 0, 1), ["p", "U"])
+        np.testing.assert_array_equal(cached.triangles, surface.triangles)
+        np.testing.assert_array_equal(cached.point_data["p"], surface.point_data["p"])
+
+        path = str(tmp_path / "cut.vtk")
+        cached.write_vtk(path)
+        with open(path, "rb") as f:
+            content = f.read()
+        assert b"POLYGONS %d" % surface.n_triangles in content
+        assert b"VECTORS U float" in content
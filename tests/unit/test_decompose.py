@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 01:36:12 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for the decomposition planner.
+"""
+import numpy as np
+import pytest
+from src.openfoam.block_mesh import BlockMesh, BlockAxis
+from src.openfoam.decompose import (recursive_coordinate_bisection, multilevel_partition,
+                                    evaluate_decomposition, decompose_mesh, plan_decompositions,
+                                    write_manual_decomposition)
+from src.openfoam.dictionary import OpenFOAMDict
+from src.openfoam.foam_io import read_foam_file, header_is_binary, parse_list
+
+
+def l_shaped_mesh():
+    """L-shaped domain of three 16 by 16 cell blocks, 2 cells thick."""
+    active = np.ones((1, 2, 2), dtype=bool)
+    active[0, 1, 1] = False
+    return BlockMesh(BlockAxis([0, 1, 2], [16, 16]), BlockAxis([0, 1, 2], [16, 16]),
+                     BlockAxis([0, 0.1], [2]), active_blocks=active).build()
+
+
+class TestDecompose:
+    """Test partitioners, plan statistics and the manual decomposition file."""
+
+    def test_rcb_balance(self):
+        """Test that bisection balances any part count, with and without weights."""
+        points = np.random.default_rng(0).random((1001, 3)) * [4, 2, 1]
+        for n_parts in (1, 3, 5, 8):
+            counts = np.bincount(recursive_coordinate_bisection(points, n_parts))
+            assert len(counts) == n_parts and counts.max() - counts.min() <= 1
+
+        weights = np.where(points[:, 0] < 2, 3.0, 1.0)
+        part = recursive_coordinate_bisection(points, 4, weights)
+        loads = np.bincount(part, weights)
+        assert loads.max() / loads.mean() < 1.01
+        with pytest.raises(ValueError):
+            recursive_coordinate_bisection(points, 0)
+
+    def test_evaluate_slabs(self):
+        """Test statistics of a known slab decomposition."""
+        mesh = BlockMesh.box((0, 0, 0), (4, 1, 1), (8, 2, 2)).build()
+        slab = (mesh.cell_centres[:, 0] // 1).astype(int)
+        plan = evaluate_decomposition(mesh, slab, 4)
+        assert plan.cells_per_processor.tolist() == [8, 8, 8, 8]
+        assert plan.imbalance == 0.0
+        assert plan.shared_faces == 3 * 4
+        assert plan.processor_neighbours.tolist() == [1, 2, 2, 1]
+        assert plan.summary()["max_neighbours"] == 2
+
+    def test_multilevel_partition(self):
+        """Test balance and cut of the graph partitioner on an L-shaped domain."""
+        mesh = l_shaped_mesh()
+        for n_parts in (2, 3, 6):
+            part = multilevel_partition(mesh, n_parts, imbalance=0.05)
+            plan = evaluate_decomposition(mesh, part, n_parts)
+            assert plan.cells_per_processor.min() > 0
+            assert plan.imbalance <= 0.05 + 1e-9
+            rcb = decompose_mesh(mesh, n_parts, "rcb")
+            assert plan.shared_faces <= rcb.shared_faces
+        assert not np.any(multilevel_partition(mesh, 1))
+
+    def test_multilevel_structured(self):
+        """Test that the graph partition of a box cuts no more faces than bisection."""
+        mesh = BlockMesh.box((0, 0, 0), (1, 1, 1), (16, 14, 12)).build()
+        for n_parts in (2, 5, 8):
+            plan = decompose_mesh(mesh, n_parts, "multilevel")
+            rcb = decompose_mesh(mesh, n_parts, "rcb")
+            assert plan.imbalance <= 0.03 + 1e-9
+            assert plan.shared_faces <= rcb.shared_faces
+
+    def test_plan_and_write(self, tmp_path):
+        """Test planning several counts and writing the chosen one."""
+        mesh = BlockMesh.box((0, 0, 0), (2, 1, 1), (10, 5, 5)).build()
+        plans = plan_decompositions(mesh, [2, 4], "rcb")
+        assert [plan.n_subdomains for plan in plans] == [2, 4]
+        assert plans[0].shared_faces == 25
+        with pytest.raises(ValueError):
+            decompose_mesh(mesh, 2, "scotch")
+
+        path = write_manual_decomposition(str(tmp_path), plans[1])
+        header, body = read_foam_file(path)
+        labels, _ = parse_list(body, 0, np.int32, 1, header_is_binary(header))
+        assert np.array_equal(labels, plans[1].cell_processor)
+
+        decompose_dict = OpenFOAMDict()
+        decompose_dict.read(str(tmp_path / "system" / "decomposeParDict"))
+        assert decompose_dict["numberOfSubdomains"] == "4"
+        assert decompose_dict["method"] == "manual"
+
+        # Other settings of an existing dictionary are kept
+        dict_path = tmp_path / "system" / "decomposeParDict"
+        dict_path.write_text('numberOfSubdomains 2;\nmethod scotch; // default\n'
+                             'distributed no;\nroots ( "/data" );\n')
+        write_manual_decomposition(str(tmp_path), plans[1])
+        content = dict_path.read_text()
+        assert 'numberOfSubdomains 4;\nmethod manual; // default\n' in content
+        assert 'distributed no;\nroots ( "/data" );' in content
+        assert 'manualCoeffs\n{\n    dataFile "cellDecomposition";\n}' in content
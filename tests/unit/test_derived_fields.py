@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 15:07:44 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for the Gauss gradient operator and derived fields.
+"""
+import os
+import numpy as np
+import pytest
+from src.openfoam.block_mesh import BlockMesh
+from src.openfoam.fields import VolField, field_path, parse_boundary, read_field, write_field
+from src.openfoam.derived_fields import (GaussGradient, boundary_face_values, vorticity,
+                                         q_criterion, wall_shear_stress, y_plus, derived_fields)
+from src.utils.cache import ArrayCache
+
+# Velocity gradient of the linear test field, gradient[i, j] = dU_j/dx_i
+GRADIENT = np.array([[0.0, 2.0, 1.0], [1.0, 0.0, 0.0], [0.0, -3.0, 0.5]])
+
+
+def linear_velocity(points):
+    """Linear velocity field with gradient ``GRADIENT``."""
+    return points @ GRADIENT
+
+
+@pytest.fixture
+def mesh():
+    """Graded box with its yMin patch as a wall."""
+    mesh = BlockMesh.box((0, 0, 0), (1, 2, 1), (6, 8, 5), grading=(2.0, 1.0, 0.5)).build()
+    mesh.patches[2].type = "wall"
+    return mesh
+
+
+class TestDerivedFields:
+    """Test exact gradients of linear fields and the derived quantities."""
+
+    def test_gradient(self, mesh, tmp_path):
+        """Test scalar and vector gradients, and the cached operator."""
+        cache = ArrayCache("gauss_gradient", str(tmp_path))
+        operator = GaussGradient(mesh, cache)
+        assert len(operator.offsets) == mesh.n_cells + 1
+        boundary_centres = mesh.face_centres[mesh.n_internal_faces:]
+
+        scalar = mesh.cell_centres @ [1.0, -2.0, 3.0]
+        gradient = operator(scalar, boundary_centres @ [1.0, -2.0, 3.0])
+        np.testing.assert_allclose(gradient, np.tile([1, -2, 3], (mesh.n_cells, 1)), atol=1e-10)
+
+        cached = GaussGradient(mesh, cache)
+        gradient = cached(linear_velocity(mesh.cell_centres), linear_velocity(boundary_centres))
+        np.testing.assert_allclose(gradient, np.broadcast_to(GRADIENT, gradient.shape), atol=1e-10)
+
+        # Zero-gradient extrapolation is only exact away from the boundary
+        interior = operator(scalar)
+        assert not np.allclose(interior, [1, -2, 3])
+        with pytest.raises(ValueError):
+            operator(np.zeros(3))
+
+    def test_quantities(self, mesh):
+        """Test vorticity, Q and the wall shear stress of a shear flow."""
+        gradient = np.broadcast_to(GRADIENT, (2, 3, 3))
+        np.testing.assert_allclose(vorticity(gradient)[0], [3, -1, 1])
+        strain = 0.5 * (GRADIENT + GRADIENT.T)
+        rotation = 0.5 * (GRADIENT - GRADIENT.T)
+        np.testing.assert_allclose(q_criterion(gradient)[0],
+                                   0.5 * (np.sum(rotation ** 2) - np.sum(strain ** 2)))
+
+        shear = np.stack([mesh.cell_centres[:, 1], 0 * mesh.cell_centres[:, 0],
+                          0 * mesh.cell_centres[:, 0]], axis=1)
+        stress = wall_shear_stress(mesh, shear, 1e-3)["yMin"]
+        np.testing.assert_allclose(stress, np.tile([-1e-3, 0, 0], (len(stress), 1)), atol=1e-12)
+        plus = y_plus(mesh, shear, 1e-3, ["yMin"])["yMin"]
+        np.testing.assert_allclose(plus, 0.125 * np.sqrt(1e-3) / 1e-3)
+
+    def test_case(self, mesh, tmp_path):
+        """Test writing the derived fields of a case with boundary values."""
+        case_dir = str(tmp_path / "case")
+        mesh.write(case_dir)
+        os.makedirs(os.path.join(case_dir, "constant"), exist_ok=True)
+        with open(os.path.join(case_dir, "constant", "transportProperties"), "w") as f:
+            f.write("transportModel Newtonian;\nnu [0 2 -1 0 0 0 0] 1e-05;\n")
+
+        boundary = {patch.name: {"type": "fixedValue",
+                                 "value": linear_velocity(mesh.face_centres[patch.face_slice])}
+                    for patch in mesh.patches}
+        boundary["yMin"] = {"type": "noSlip"}
+        velocity = linear_velocity(mesh.cell_centres)
+        write_field(case_dir, VolField("U", velocity, "[0 1 -1 0 0 0 0]", boundary), "1",
+                    binary=True)
+        field = read_field(field_path(case_dir, "U", "1"))
+        values = boundary_face_values(mesh, field)
+        wall = mesh.patches[2]
+        start = wall.start_face - mesh.n_internal_faces
+        assert np.all(values[start:start + wall.n_faces] == 0)
+
+        paths = derived_fields(case_dir, "1", cache=ArrayCache("gauss_gradient",
+                                                                str(tmp_path / "cache")))
+        assert [os.path.basename(path) for path in paths] == [
+            "grad(U)", "vorticity", "Q", "wallShearStress", "yPlus"]
+        vortex = read_field(field_path(case_dir, "vorticity", "1")).values
+        far = mesh.cell_centres[:, 1] > 0.5
+        np.testing.assert_allclose(vortex[far], np.tile([3, -1, 1], (far.sum(), 1)), atol=1e-9)
+        stress = parse_boundary(read_field(field_path(case_dir, "wallShearStress", "1"),
+                                             mesh.n_cells))
+        assert stress["yMin"]["type"] == "calculated"
+        assert stress["yMin"]["value"].shape == (wall.n_faces, 3)
+
+        # The wall-function viscosity raises the stress, not the wall units
+        laminar = read_field(field_path(case_dir, "yPlus", "1"), mesh.n_cells)
+        nut = {patch.name: {"type": "calculated", "value": "uniform 0"} for patch in mesh.patches}
+        nut["yMin"] = {"type": "nutkWallFunction", "value": "uniform 3e-05"}
+        write_field(case_dir, VolField("nut", np.zeros(mesh.n_cells), "[0 2 -1 0 0 0 0]", nut),
+                    "1")
+        derived_fields(case_dir, "1", ["wallShearStress", "yPlus"],
+                       cache=ArrayCache("gauss_gradient", str(tmp_path / "cache")))
+        turbulent = parse_boundary(read_field(field_path(case_dir, "wallShearStress", "1"),
+                                              mesh.n_cells))
+        np.testing.assert_allclose(turbulent["yMin"]["value"], 4 * stress["yMin"]["value"])
+        plus = parse_boundary(read_field(field_path(case_dir, "yPlus", "1"), mesh.n_cells))
+        np.testing.assert_allclose(plus["yMin"]["value"],
+                                   2 * parse_boundary(laminar)["yMin"]["value"])
+        with pytest.raises(ValueError):
+            derived_fields(case_dir, "1", ["lambda2"])
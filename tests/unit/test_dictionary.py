@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:02:37 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for editing the text of OpenFOAM dictionaries.
+"""
+import pytest
+from src.openfoam.dictionary import (DictParseError, get_dict_entry, set_dict_entry,
+                                     merge_dict_file)
+
+# Dictionary with lists, comments, directives and inline blocks
+CONTENT = '''#include "common"
+method scotch; /* ; */
+coeffs
+{
+    n (2 2 1); // comment; with semicolons
+    order "xyz";
+    inner {}
+}
+'''
+
+
+class TestDictionaryText:
+    """Test reading and setting entries without rewriting the rest of the file."""
+
+    def test_get(self):
+        """Test values of top-level and nested entries."""
+        assert get_dict_entry(CONTENT, ["method"]) == "scotch"
+        assert get_dict_entry(CONTENT, ["coeffs", "n"]) == "(2 2 1)"
+        assert get_dict_entry(CONTENT, ["coeffs", "order"]) == '"xyz"'
+        assert get_dict_entry(CONTENT, ["coeffs", "missing"]) is None
+        assert get_dict_entry(CONTENT, ["method", "n"]) is None
+
+    def test_set(self):
+        """Test replacing entries and creating missing sub-dictionaries."""
+        content = set_dict_entry(CONTENT, ["method"], "manual")
+        assert content == CONTENT.replace("scotch", "manual")
+        content = set_dict_entry(content, ["coeffs", "n"], "(4 1 1)")
+        assert "    n (4 1 1); // comment; with semicolons\n" in content
+
+        content = set_dict_entry(content, ["coeffs", "inner", "deep", "x"], "1")
+        assert "    inner {\n        deep\n        {\n            x 1;\n        }\n    }" \
+            in content
+        content = set_dict_entry(content, ["manualCoeffs", "dataFile"], '"cells"')
+        assert content.endswith('manualCoeffs\n{\n    dataFile "cells";\n}\n')
+        assert get_dict_entry(content, ["coeffs", "inner", "deep", "x"]) == "1"
+        with pytest.raises(DictParseError):
+            set_dict_entry(content, ["method", "x"], "1")
+
+    def test_merge_file(self, tmp_path):
+        """Test that the header is kept and new files are created."""
+        path = tmp_path / "system" / "decomposeParDict"
+        merge_dict_file(str(path), {"numberOfSubdomains": "2"})
+        merge_dict_file(str(path), {"numberOfSubdomains": "4", "coeffs/n": "(4 1 1)"})
+        content = path.read_text()
+        assert "object      decomposeParDict;" in content
+        assert content.count("numberOfSubdomains") == 1
+        assert "coeffs\n{\n    n (4 1 1);\n}" in content
+        assert content.rstrip().endswith("//")
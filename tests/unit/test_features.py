@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 17:05:52 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for surface feature edge extraction.
+"""
+import numpy as np
+import pytest
+from src.openfoam.stl import TriSurface
+from src.openfoam.features import (extract_feature_edges, write_surface_features,
+                                   snappy_feature_entry, merge_snappy_features, OPEN_EDGE)
+from src.openfoam.dictionary import get_dict_entry
+from src.openfoam.foam_io import read_foam_file, parse_list
+from src.utils.cache import ArrayCache
+from tests.unit.test_stl import CUBE_POINTS, CUBE_TRIANGLES
+
+
+class TestFeatureEdges:
+    """Test feature edge extraction."""
+
+    def test_cube_edges(self):
+        """Test that only the 12 cube edges are features at 150 degrees."""
+        surface = TriSurface(CUBE_POINTS, CUBE_TRIANGLES)
+        features = extract_feature_edges(surface, 150.0)
+
+        assert features.n_edges == 12
+        assert features.counts()["feature"] == 12
+        assert features.total_length() == pytest.approx(12.0)
+        assert extract_feature_edges(surface, 0.0).n_edges == 0
+        assert extract_feature_edges(surface, 180.0).n_edges == 18
+
+    def test_open_surface(self):
+        """Test that the rim of an open box is reported as open edges."""
+        surface = TriSurface(CUBE_POINTS, CUBE_TRIANGLES[[0, 1, 4, 5, 6, 7, 8, 9, 10, 11]])
+        features = extract_feature_edges(surface, 150.0)
+        counts = features.counts()
+
+        assert counts["open"] == 4
+        assert counts["feature"] == 8
+        assert np.all(features.edge_types[features.edge_types == OPEN_EDGE] == OPEN_EDGE)
+        assert extract_feature_edges(surface, 150.0, open_edges=False).n_edges == 8
+
+    def test_write_emesh_and_cache(self, tmp_path):
+        """Test .eMesh output and reuse of the cached result."""
+        cache = ArrayCache("features", str(tmp_path / "cache"))
+        surface = TriSurface(CUBE_POINTS, CUBE_TRIANGLES, source_hash="cube")
+        features = write_surface_features(surface, str(tmp_path), "cube", cache=cache)
+
+        header, body = read_foam_file(str(tmp_path / "constant" / "triSurface" / "cube.eMesh"))
+        assert header["class"] == "featureEdgeMesh"
+        points, end = parse_list(body, 0, np.float64, 3)
+        edges, _ = parse_list(body, end, np.int32, 2)
+        assert np.allclose(points, features.points)
+        assert np.array_equal(edges, features.edges)
+
+        key = ArrayCache.make_key("cube", 150.0, True, True, False)
+        assert key in cache
+        cached = extract_feature_edges(surface, 150.0, cache=cache)
+        assert np.array_equal(cached.edges, features.edges)
+        assert 'file "cube.eMesh";' in snappy_feature_entry("cube.eMesh", 3)
+
+    def test_merge_snappy_features(self, tmp_path):
+        """Test that feature files are merged into an existing snappyHexMeshDict."""
+        system = tmp_path / "system"
+        system.mkdir()
+        (system / "snappyHexMeshDict").write_text(
+            'castellatedMesh true;\ngeometry\n{\n    "a.stl" { type triSurfaceMesh; }\n}\n'
+            'castellatedMeshControls\n{\n    maxLocalCells 1000; // cells; per processor\n'
+            '    features\n    (\n        { file "a.eMesh"; level 1; }\n'
+            '        { level 1; file "cube.eMesh"; }\n'
+            '        { file "b.eMesh"; levels ((0.1 2)); }\n    );\n}\n')
+        path = merge_snappy_features(str(tmp_path), {"cube.eMesh": 3})
+        with open(path) as f:
+            content = f.read()
+        assert 'geometry\n{\n    "a.stl" { type triSurfaceMesh; }\n}' in content
+        assert "maxLocalCells 1000; // cells; per processor" in content
+        features = get_dict_entry(content, ["castellatedMeshControls", "features"])
+        assert features.count("file") == 3 and features.count("cube.eMesh") == 1
+        assert "level 3;" in features and "levels ((0.1 2));" in features
+        assert 'file "a.eMesh";\n            level 1;' in features
+
+        merge_snappy_features(str(tmp_path / "new"), {"cube.eMesh": 2})
+        with open(tmp_path / "new" / "system" / "snappyHexMeshDict") as f:
+            assert 'file "cube.eMesh"' in get_dict_entry(f.read(), ["castellatedMeshControls",
+                                                                    "features"])
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 10:58:40 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for field statistics over time directories.
+"""
+import numpy as np
+from src.openfoam.block_mesh import BlockMesh
+from src.openfoam.fields import VolField, write_field
+from src.openfoam.field_statistics import (RunningStats, weighted_percentiles, field_statistics,
+                                           cached_cell_volumes, ALL_TIMES, WHOLE_MESH)
+from src.utils.cache import ArrayCache
+
+
+class TestFieldStatistics:
+    """Test streaming merges, weighted percentiles and the per-time table."""
+
+    def test_running_stats(self):
+        """Test that merged chunks match statistics of all values."""
+        rng = np.random.default_rng(0)
+        values, weights = rng.normal(3, 2, 1000), rng.random(1000)
+        stats = RunningStats()
+        for start in range(0, 1000, 97):
+            stats.update(values[start:start + 97], weights[start:start + 97])
+        merged = RunningStats().merge(stats).merge(RunningStats())
+        weighted_mean = np.average(values, weights=weights)
+        np.testing.assert_allclose(
+            merged.row(), [1000, weights.sum(), values.min(), values.max(), values.mean(),
+                           values.std(), weighted_mean,
+                           np.sqrt(np.average((values - weighted_mean) ** 2, weights=weights))])
+
+        equal = weighted_percentiles(values, np.ones(1000), [50])
+        np.testing.assert_allclose(equal, np.median(values))
+        skewed = weighted_percentiles(np.array([0.0, 1.0]), np.array([3.0, 1.0]), [50])
+        assert skewed[0] < 0.5
+
+    def test_case_statistics(self, tmp_path):
+        """Test per-time, per-region and overall rows in a process pool."""
+        mesh = BlockMesh.box((0, 0, 0), (1, 1, 1), (6, 6, 6)).build()
+        case_dir = str(tmp_path / "case")
+        mesh.write(case_dir)
+        x = mesh.cell_centres[:, 0]
+        for time in ("1", "2", "3"):
+            write_field(case_dir, VolField("T", x * float(time)), time)
+            write_field(case_dir, VolField("U", mesh.cell_centres * float(time)), time,
+                        binary=True)
+        cache = ArrayCache("cell_volumes", str(tmp_path / "cache"))
+        np.testing.assert_allclose(cached_cell_volumes(case_dir, cache), mesh.cell_volumes)
+
+        left = np.flatnonzero(x < 0.5)
+        table = field_statistics(case_dir, regions={"left": left}, workers=2, overall=True,
+                                 cache=cache)
+        assert len(table["time"]) == 3 * 2 * 2 + 2 * 2
+        row = np.flatnonzero((table["time"] == "2") & (table["field"] == "T")
+                             & (table["region"] == "left"))[0]
+        assert table["count"][row] == len(left)
+        np.testing.assert_allclose(table["max"][row], 2 * x[left].max())
+        np.testing.assert_allclose(table["weighted_mean"][row], 2 * x[left].mean())
+        np.testing.assert_allclose(table["volume"][row], 0.5)
+        np.testing.assert_allclose(table["p50"][row], 2 * np.median(x[left]))
+
+        row = np.flatnonzero((table["time"] == "3") & (table["field"] == "U")
+                             & (table["region"] == WHOLE_MESH))[0]
+        np.testing.assert_allclose(table["max"][row],
+                                   3 * np.linalg.norm(mesh.cell_centres, axis=1).max())
+
+        row = np.flatnonzero((table["time"] == ALL_TIMES) & (table["field"] == "T")
+                             & (table["region"] == WHOLE_MESH))[0]
+        every = np.concatenate([x, 2 * x, 3 * x])
+        np.testing.assert_allclose(table["std"][row], every.std())
+        assert np.isnan(table["p50"][row])
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 04:52:10 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for volume field reading and writing.
+"""
+import numpy as np
+import pytest
+from src.openfoam.block_mesh import BlockMesh
+from src.openfoam.fields import VolField, field_path, parse_boundary, read_field, write_field
+
+BOUNDARY = b"""boundaryField
+{
+    inlet
+    {
+        type            fixedValue;
+        value           nonuniform List<scalar> 2(1 2);
+    }
+    frontAndBack
+    {
+        type            empty;
+    }
+}"""
+
+
+class TestFields:
+    """Test field files in both formats and verbatim boundary conditions."""
+
+    @pytest.mark.parametrize("binary", [False, True])
+    def test_round_trip(self, tmp_path, binary):
+        """Test that scalar and vector fields round-trip (exactly in binary)."""
+        rng = np.random.default_rng(0)
+        alpha = VolField("alpha.water", rng.random(50),
+                         boundary={"walls": {"type": "zeroGradient"}})
+        velocity = VolField("U", rng.random((50, 3)), "[0 1 -1 0 0 0 0]")
+        for field in (alpha, velocity):
+            path = write_field(str(tmp_path), field, binary=binary)
+            read = read_field(path)
+            assert read.name == field.name and read.class_name == field.class_name
+            assert read.dimensions == field.dimensions and read.binary == binary
+            np.testing.assert_allclose(read.values, field.values, rtol=0 if binary else 1e-11)
+        assert b"zeroGradient" in read_field(field_path(str(tmp_path), "alpha.water")).boundary
+
+    def test_uniform_and_verbatim_boundary(self, tmp_path):
+        """Test uniform fields, and that a read boundaryField is written back unchanged."""
+        mesh = BlockMesh.box((0, 0, 0), (1, 1, 1), (2, 2, 2)).build()
+        field = VolField.uniform("U", mesh.n_cells, (1, 0, 0), mesh.patches)
+        path = write_field(str(tmp_path), field)
+        with open(path, "rb") as f:
+            assert b"internalField   uniform (1 0 0);" in f.read()
+        with pytest.raises(ValueError):
+            read_field(path)
+        assert read_field(path, 8).values.shape == (8, 3)
+
+        field = VolField("T", np.arange(8.0), boundary=BOUNDARY)
+        write_field(str(tmp_path), field)
+        read = read_field(field_path(str(tmp_path), "T"))
+        assert read.boundary == BOUNDARY
+        read.values[:] = 3
+        write_field(str(tmp_path), read)
+        assert read_field(field_path(str(tmp_path), "T"), 8).boundary == BOUNDARY
+        with pytest.raises(ValueError):
+            write_field(str(tmp_path), read, binary=True)
+
+    @pytest.mark.parametrize("binary", [False, True])
+    def test_parse_boundary(self, tmp_path, binary):
+        """Test boundary entries with sub-dictionaries, directives and nonuniform lists."""
+        boundary = {
+            "inlet": {"type": "fixedValue", "value": np.array([[1.0, 2, 3], [4, 5, 6]])},
+            "outlet": {"type": "inletOutlet", "inletValue": "uniform (0 0 0)",
+                       "#include": '"outletDict"'},
+            '"(top|bottom)"': {"type": "codedFixedValue", "code": "#{ x = 1; #}"}}
+        write_field(str(tmp_path), VolField("U", np.zeros((4, 3)), boundary=boundary),
+                    binary=binary)
+        parsed = parse_boundary(read_field(field_path(str(tmp_path), "U"), 4))
+        assert list(parsed) == ["inlet", "outlet", '"(top|bottom)"']
+        assert np.array_equal(parsed["inlet"]["value"], boundary["inlet"]["value"])
+        assert parsed["outlet"] == boundary["outlet"]
+        assert parsed['"(top|bottom)"']["code"] == "#{ x = 1; #}"
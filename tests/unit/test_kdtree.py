@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 06:40:02 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for the KD-tree.
+"""
+import numpy as np
+import pytest
+from src.openfoam import kdtree
+from src.openfoam.kdtree import PointKDTree
+
+
+def brute_force(points, queries, k):
+    """Sorted k nearest distances by exhaustive search."""
+    distances = np.linalg.norm(queries[:, None] - points[None], axis=2)
+    return np.sort(distances, axis=1)[:, :k]
+
+
+class TestKDTree:
+    """Test nearest-neighbour queries against exhaustive search."""
+
+    @pytest.mark.parametrize("k", [1, 3, 8])
+    def test_query(self, k, monkeypatch):
+        """Test clustered and coincident points, in several chunks and threads."""
+        monkeypatch.setattr(kdtree, "QUERY_CHUNK_SIZE", 128)
+        rng = np.random.default_rng(0)
+        points = rng.random((2000, 3))
+        points[:800] *= 0.01
+        points[800:850] = 0.5
+        queries = np.concatenate([rng.random((500, 3)) * 1.2 - 0.1, points[:20]])
+        tree = PointKDTree(points, leaf_size=4)
+
+        distances, indices = tree.query(queries, k, workers=2)
+        np.testing.assert_allclose(distances, brute_force(points, queries, k))
+        np.testing.assert_allclose(np.linalg.norm(points[indices] - queries[:, None], axis=2),
+                                   distances)
+        assert all(len(set(row)) == k for row in indices)
+
+    def test_radius_and_empty(self):
+        """Test the search radius and queries on an empty tree."""
+        rng = np.random.default_rng(1)
+        points, queries = rng.random((300, 3)), rng.random((50, 3))
+        distances, indices = PointKDTree(points).query(queries, 2, max_distance=0.05)
+        expected = brute_force(points, queries, 2)
+        missing = expected >= 0.05
+        assert np.array_equal(np.isinf(distances), missing)
+        assert np.all(indices[missing] == -1)
+        np.testing.assert_allclose(distances[~missing], expected[~missing])
+
+        distances, indices = PointKDTree(np.zeros((0, 3))).query(queries, 1)
+        assert np.all(np.isinf(distances)) and np.all(indices == -1)
+        with pytest.raises(ValueError):
+            PointKDTree(points).query(queries, 0)
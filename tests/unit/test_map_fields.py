@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 06:51:26 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for field mapping between meshes.
+"""
+import numpy as np
+import pytest
+from src.openfoam.block_mesh import BlockMesh
+from src.openfoam.fields import VolField, field_path, parse_boundary, read_field, write_field
+from src.openfoam.map_fields import (interpolation_stencil, MeshMapping, map_field, map_fields,
+                                     list_vol_fields)
+
+
+def linear(points):
+    """Linear test function of position."""
+    return 1 + 2 * points[:, 0] - points[:, 1] + 0.5 * points[:, 2]
+
+
+class TestMapFields:
+    """Test stencils, mapped values and boundary conditions."""
+
+    def test_stencils(self):
+        """Test nearest and inverse-distance stencils."""
+        rng = np.random.default_rng(0)
+        source, target = rng.random((500, 3)), rng.random((100, 3))
+        indices, weights = interpolation_stencil(source, target)
+        assert indices.shape == (100, 1) and np.all(weights == 1)
+        nearest = np.argmin(np.linalg.norm(target[:, None] - source[None], axis=2), axis=1)
+        assert np.array_equal(indices[:, 0], nearest)
+
+        indices, weights = interpolation_stencil(source, np.vstack([target, source[:5]]),
+                                                 "inverse_distance", 4)
+        np.testing.assert_allclose(weights.sum(axis=1), 1)
+        assert np.all(weights[-5:, 0] == 1) and np.array_equal(indices[-5:, 0], np.arange(5))
+        with pytest.raises(ValueError):
+            interpolation_stencil(source, target, "cubic")
+
+    def test_refined_mesh(self):
+        """Test mapping a linear field and patch values to a refined mesh."""
+        coarse = BlockMesh.box((0, 0, 0), (1, 1, 1), (8, 8, 8)).build()
+        fine = BlockMesh.box((0, 0, 0), (1, 1, 1), (16, 16, 16)).build()
+        inlet = coarse.patches[0]
+        source = VolField("T", linear(coarse.cell_centres), "[0 0 0 1 0 0 0]", {
+            inlet.name: {"type": "fixedValue",
+                         "value": linear(coarse.face_centres[inlet.face_slice])},
+            '".*"': {"type": "zeroGradient"}})
+
+        mapping = MeshMapping(coarse, fine, "inverse_distance")
+        mapped = map_field(mapping, source)
+        exact = linear(fine.cell_centres)
+        assert np.abs(mapped.values - exact).max() < 0.15
+        nearest = map_field(MeshMapping(coarse, fine), source)
+        assert np.abs(nearest.values - exact).mean() > np.abs(mapped.values - exact).mean()
+
+        value = mapped.boundary[inlet.name]["value"]
+        assert len(value) == fine.patches[0].n_faces
+        assert mapped.boundary[fine.patches[1].name] == {"type": "zeroGradient"}
+        with pytest.raises(ValueError):
+            map_field(mapping, VolField("T", np.zeros(3)))
+
+    def test_map_cases(self, tmp_path):
+        """Test mapping the latest time of a case into another case."""
+        source_case, target_case = tmp_path / "coarse", tmp_path / "fine"
+        coarse = BlockMesh.box((0, 0, 0), (1, 1, 1), (6, 6, 6)).build()
+        fine = BlockMesh.box((0, 0, 0), (1, 1, 1), (9, 9, 9)).build()
+        coarse.write(str(source_case))
+        fine.write(str(target_case), binary=True)
+        inlet = coarse.patches[0].name
+        for time, offset in (("0", 0.0), ("0.5", 1.0)):
+            write_field(str(source_case), VolField(
+                "U", np.tile([offset, 0, 0], (coarse.n_cells, 1)) + coarse.cell_centres,
+                "[0 1 -1 0 0 0 0]",
+                {inlet: {"type": "fixedValue",
+                         "value": coarse.face_centres[coarse.patches[0].face_slice]}}),
+                time, binary=True)
+        write_field(str(target_case), VolField.uniform("U", fine.n_cells, (0, 0, 0),
+                                                       fine.patches, "[0 1 -1 0 0 0 0]"))
+        assert list_vol_fields(str(source_case), "0.5") == ["U"]
+
+        paths = map_fields(str(source_case), str(target_case))
+        assert paths == [field_path(str(target_case), "U", "0")]
+        velocity = read_field(paths[0])
+        assert velocity.binary and velocity.values.shape == (fine.n_cells, 3)
+        assert np.abs(velocity.values[:, 0] - 1 - fine.cell_centres[:, 0]).max() < 0.1
+        boundary = parse_boundary(velocity)
+        assert boundary[inlet]["type"] == "fixedValue"
+        assert boundary[inlet]["value"].shape == (fine.patches[0].n_faces, 3)
+        assert boundary[fine.patches[1].name] == {"type": "zeroGradient"}
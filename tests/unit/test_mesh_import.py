@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:58:12 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for the Fluent, Gmsh and VTK mesh importers.
+"""
+import struct
+
+import numpy as np
+import pytest
+from src.openfoam.block_mesh import BlockMesh
+from src.openfoam.mesh_conversion import (MeshImportError, CELL_SHAPE_FACES, parse_hex_ints,
+                                          record_starts, cells_to_polymesh)
+from src.openfoam.fluent_mesh import read_fluent_mesh
+from src.openfoam.gmsh_mesh import read_gmsh_mesh, is_gmsh_file
+from src.openfoam.vtk_io import read_vtk_mesh
+
+N = 3
+
+
+def lattice(n=N):
+    """Unit cube split into n**3 hexes, with the quads of the x = 0 side."""
+    grid = np.linspace(0.0, 1.0, n + 1)
+    z, y, x = np.meshgrid(grid, grid, grid, indexing="ij")
+    points = np.stack([x.ravel(), y.ravel(), z.ravel()], axis=1)
+
+    def pid(i, j, k):
+        return i + (n + 1) * (j + (n + 1) * k)
+
+    i, j, k = (a.ravel() for a in np.meshgrid(np.arange(n), np.arange(n), np.arange(n),
+                                                indexing="ij"))
+    hexes = np.stack([pid(i, j, k), pid(i + 1, j, k), pid(i + 1, j + 1, k), pid(i, j + 1, k),
+                      pid(i, j, k + 1), pid(i + 1, j, k + 1), pid(i + 1, j + 1, k + 1),
+                      pid(i, j + 1, k + 1)], axis=1)
+    j, k = (a.ravel() for a in np.meshgrid(np.arange(n), np.arange(n), indexing="ij"))
+    inlet = np.stack([pid(0, j, k), pid(0, j + 1, k), pid(0, j + 1, k + 1), pid(0, j, k + 1)],
+                     axis=1)
+    return points, hexes, inlet
+
+
+def check_box(mesh, n_cells=N ** 3):
+    """Check a converted unit cube mesh."""
+    assert mesh.n_cells == n_cells
+    assert mesh.check_ordering()
+    assert np.all(mesh.cell_volumes > 0)
+    assert np.isclose(mesh.cell_volumes.sum(), 1.0)
+    boundary = mesh.face_areas[mesh.n_internal_faces:]
+    assert np.allclose(boundary.sum(axis=0), 0.0)
+    assert np.isclose(np.linalg.norm(boundary, axis=1).sum(), 6.0)
+
+
+def write_gmsh2(path, binary=False):
+    """Write the lattice as a Gmsh 2.2 file with a physical 'inlet' surface."""
+    points, hexes, inlet = lattice()
+    with open(path, "wb") as f:
+        f.write(b"$MeshFormat\n2.2 %d 8\n" % int(binary))
+        if binary:
+            f.write(struct.pack("<i", 1) + b"\n")
+        f.write(b"$EndMeshFormat\n$PhysicalNames\n2\n2 7 \"inlet\"\n3 8 \"fluid\"\n"
+                b"$EndPhysicalNames\n")
+        f.write(b"$Nodes\n%d\n" % len(points))
+        tags = np.arange(1, len(points) + 1) * 2
+        if binary:
+            record = np.dtype([("tag", "<i4"), ("xyz", "<f8", 3)])
+            data = np.zeros(len(points), dtype=record)
+            data["tag"], data["xyz"] = tags, points
+            f.write(data.tobytes() + b"\n")
+        else:
+            for tag, p in zip(tags, points):
+                f.write(b"%d %.17g %.17g %.17g\n" % (tag, *p))
+        f.write(b"$EndNodes\n$Elements\n%d\n" % (len(hexes) + len(inlet)))
+        if binary:
+            f.write(struct.pack("<3i", 3, len(inlet), 2))
+            f.write(np.column_stack([np.arange(len(inlet)), np.full(len(inlet), 7),
+                                     np.ones(len(inlet)), tags[inlet]]).astype("<i4").tobytes())
+            f.write(struct.pack("<3i", 5, len(hexes), 2))
+            f.write(np.column_stack([np.arange(len(hexes)), np.full(len(hexes), 8),
+                                     np.ones(len(hexes)), tags[hexes]]).astype("<i4").tobytes())
+            f.write(b"\n")
+        else:
+            for e, quad in enumerate(inlet):
+                f.write(b"%d 3 2 7 1 %s\n" % (e + 1, b" ".join(b"%d" % t for t in tags[quad])))
+            for e, cell in enumerate(hexes):
+                f.write(b"%d 5 3 8 1 0 %s\n" % (e + 1, b" ".join(b"%d" % t for t in tags[cell])))
+        f.write(b"$EndElements\n")
+
+
+def write_gmsh4(path, binary=False):
+    """Write the lattice as a Gmsh 4.1 file; surface entity 1 is the 'inlet' group."""
+    points, hexes, inlet = lattice()
+    tags = np.arange(1, len(points) + 1)
+    with open(path, "wb") as f:
+        f.write(b"$MeshFormat\n4.1 %d 8\n" % int(binary))
+        if binary:
+            f.write(struct.pack("<i", 1) + b"\n")
+        f.write(b"$EndMeshFormat\n$PhysicalNames\n1\n2 5 \"inlet\"\n$EndPhysicalNames\n")
+        f.write(b"$Entities\n")
+        if binary:
+            f.write(struct.pack("<4Q", 0, 0, 2, 1))
+            f.write(struct.pack("<i6dQiQ", 1, 0, 0, 0, 0, 1, 1, 1, 5, 0))
+            f.write(struct.pack("<i6dQQ", 2, 1, 0, 0, 1, 1, 1, 0, 0))
+            f.write(struct.pack("<i6dQQ", 1, 0, 0, 0, 1, 1, 1, 0, 0))
+        else:
+            f.write(b"0 0 2 1\n1 0 0 0 0 1 1 1 5 0\n2 1 0 0 1 1 1 0 0\n1 0 0 0 1 1 1 0 0\n")
+        f.write(b"$EndEntities\n$Nodes\n")
+        if binary:
+            f.write(struct.pack("<4Q", 1, len(points), 1, len(points)))
+            f.write(struct.pack("<3iQ", 3, 1, 0, len(points)))
+            f.write(tags.astype("<u8").tobytes() + points.astype("<f8").tobytes())
+        else:
+            f.write(b"1 %d 1 %d\n3 1 0 %d\n" % (len(points), len(points), len(points)))
+            f.write(b"".join(b"%d\n" % t for t in tags))
+            f.write(b"".join(b"%.17g %.17g %.17g\n" % tuple(p) for p in points))
+        f.write(b"$EndNodes\n$Elements\n")
+        blocks = [(2, 1, 3, inlet), (2, 2, 3, inlet[:0]), (3, 1, 5, hexes)]
+        if binary:
+            f.write(struct.pack("<4Q", len(blocks), len(hexes) + len(inlet), 1,
+                                len(hexes) + len(inlet)))
+        else:
+            f.write(b"%d %d 1 %d\n" % (len(blocks), len(hexes) + len(inlet),
+                                       len(hexes) + len(inlet)))
+        for dim, entity, element_type, nodes in blocks:
+            data = np.column_stack([np.arange(1, len(nodes) + 1), tags[nodes]])
+            if binary:
+                f.write(struct.pack("<3iQ", dim, entity, element_type, len(nodes)))
+                f.write(data.astype("<u8").tobytes())
+            else:
+                f.write(b"%d %d %d %d\n" % (dim, entity, element_type, len(nodes)))
+                f.write(b"".join(b" ".join(b"%d" % v for v in row) + b"\n" for row in data))
+        f.write(b"$EndElements\n")
+
+
+def tetrahedra(hexes):
+    """Split hexes into 6 tets each, inverting every other tet."""
+    split = np.array([[0, 1, 2, 6], [0, 2, 3, 6], [0, 3, 7, 6], [0, 7, 4, 6], [0, 4, 5, 6],
+                      [0, 5, 1, 6]])
+    tets = hexes[:, split].reshape(-1, 4)
+    tets[::2] = tets[::2][:, [0, 2, 1, 3]]
+    return tets
+
+
+def write_vtk(path, binary=False, version="3.0"):
+    """Write the lattice split into tets (plus the inlet quads) as a legacy VTK grid."""
+    points, hexes, inlet = lattice()
+    tets = tetrahedra(hexes)
+    inlet = np.concatenate([inlet[:, [0, 1, 2]], inlet[:, [0, 2, 3]]])
+    types = np.concatenate([np.full(len(tets), 10), np.full(len(inlet), 5)])
+    with open(path, "wb") as f:
+        f.write(b"# vtk DataFile Version %s\ntest\n%s\nDATASET UNSTRUCTURED_GRID\n"
+                % (version.encode(), b"BINARY" if binary else b"ASCII"))
+        f.write(b"POINTS %d double\n" % len(points))
+        if binary:
+            f.write(points.astype(">f8").tobytes() + b"\n")
+        else:
+            f.write(b"".join(b"%.17g %.17g %.17g %.17g %.17g %.17g\n" % tuple(row)
+                             for row in points[:len(points) // 2 * 2].reshape(-1, 6)))
+            if len(points) % 2:
+                f.write(b"%.17g %.17g %.17g\n" % tuple(points[-1]))
+        n_cells = len(tets) + len(inlet)
+        if version.startswith("5"):
+            offsets = np.concatenate([[0], np.cumsum(np.r_[np.full(len(tets), 4),
+                                                            np.full(len(inlet), 3)])])
+            connectivity = np.concatenate([tets.ravel(), inlet.ravel()])
+            f.write(b"CELLS %d %d\n" % (len(offsets), len(connectivity)))
+            for name, values in (("OFFSETS", offsets), ("CONNECTIVITY", connectivity)):
+                f.write(b"%s vtktypeint64\n" % name.encode())
+                if binary:
+                    f.write(values.astype(">i8").tobytes() + b"\n")
+                else:
+                    f.write(b"".join(b" ".join(b"%d" % v for v in values[i:i + 8]) + b"\n"
+                                     for i in range(0, len(values), 8)))
+        else:
+            records = [np.column_stack([np.full(len(c), c.shape[1]), c]) for c in (tets, inlet)]
+            f.write(b"CELLS %d %d\n" % (n_cells, sum(r.size for r in records)))
+            if binary:
+                f.write(b"".join(r.astype(">i4").tobytes() for r in records) + b"\n")
+            else:
+                f.write(b"".join(b" ".join(b"%d" % v for v in row) + b"\n"
+                                 for r in records for row in r))
+        f.write(b"CELL_TYPES %d\n" % n_cells)
+        if binary:
+            f.write(types.astype(">i4").tobytes() + b"\n")
+        else:
+            f.write(b"".join(b"%d\n" % t for t in types))
+        f.write(b"CELL_DATA %d\n" % n_cells)
+
+
+def write_fluent(path, binary=False):
+    """Write a block mesh as a Fluent file with normals pointing into c0."""
+    mesh = BlockMesh.box((0, 0, 0), (1, 1, 1), (N, N, N)).build()
+    n_int = mesh.n_internal_faces
+    faces = mesh.face_point_array()
+    c0 = mesh.owner + 1
+    c1 = np.concatenate([mesh.neighbour + 1, np.zeros(mesh.n_faces - n_int, dtype=int)])
+    # Reverse every face so that the normals point into c0
+    faces = faces[:, ::-1] + 1
+    records = np.column_stack([faces, c0, c1])
+
+    def hex_rows(rows, prefix):
+        return b"".join(prefix + b" ".join(b"%x" % v for v in row) + b"\n" for row in rows)
+
+    with open(path, "wb") as f:
+        f.write(b'(0 "Test (mesh) file")\n(2 3)\n')
+        f.write(b"(10 (0 1 %x 0 3))\n" % mesh.n_points)
+        if binary:
+            f.write(b"(3010 (1 1 %x 1 3)(" % mesh.n_points)
+            f.write(mesh.points.astype("<f8").tobytes() + b")End of Binary Section 3010)\n")
+        else:
+            f.write(b"(10 (1 1 %x 1 3)(\n" % mesh.n_points)
+            f.write(b"".join(b"%.17g %.17g %.17g\n" % tuple(p) for p in mesh.points) + b"))\n")
+        f.write(b"(12 (0 1 %x 0))\n(12 (2 1 %x 1 4))\n" % (mesh.n_cells, mesh.n_cells))
+        f.write(b"(13 (0 1 %x 0))\n" % mesh.n_faces)
+        # Internal faces as a fixed quad zone, boundary patches as mixed zones
+        if binary:
+            f.write(b"(3013 (3 1 %x 2 4)(" % n_int)
+            f.write(records[:n_int].astype("<i4").tobytes() + b")End of Binary Section 3013)\n")
+        else:
+            f.write(b"(13 (3 1 %x 2 4)(\n" % n_int + hex_rows(records[:n_int], b"") + b"))\n")
+        for zone, patch in enumerate(mesh.patches, start=10):
+            rows = records[patch.face_slice]
+            bc = 3 if zone == 10 else 5
+            header = (zone, patch.start_face + 1, patch.start_face + patch.n_faces, bc)
+            f.write(b"(13 (%x %x %x %x 0)(\n" % header + hex_rows(rows, b"4 ") + b"))\n")
+            f.write(b"(45 (%d %s %s)())\n" % (zone, b"wall" if bc == 3 else b"pressure-outlet",
+                                             patch.name.encode()))
+    return mesh
+
+
+class TestMeshImport:
+    """Test the streaming mesh importers."""
+
+    def test_parse_hex_ints(self):
+        """Test the vectorized hexadecimal parser."""
+        assert parse_hex_ints(b"4 1a ff\n 0 10 7FFFFFFF\n").tolist() == \
+            [4, 26, 255, 0, 16, 0x7FFFFFFF]
+        assert len(parse_hex_ints(b" \n")) == 0
+
+    def test_record_starts(self):
+        """Test walking count-prefixed records."""
+        data = np.array([3, 7, 8, 9, 1, 5, 2, 6, 6])
+        assert record_starts(data + 1).tolist() == [0, 4, 6]
+        assert record_starts(np.array([2, 0, 2, 0])).tolist() == [0, 2]
+        with pytest.raises(MeshImportError):
+            record_starts(np.array([3, 1, 1]) + 1)
+
+    def test_cells_to_polymesh_mixed(self):
+        """Test face matching across hexes, prisms, pyramids and tets."""
+        points, hexes, inlet = lattice()
+        # Layers of hexes, prisms and pyramids along x (hexes are ordered by x first)
+        layer = N * N
+        prisms = np.concatenate([hexes[layer:2 * layer][:, [0, 1, 2, 4, 5, 6]],
+                                 hexes[layer:2 * layer][:, [0, 2, 3, 4, 6, 7]]])
+        last = hexes[2 * layer:]
+        apex = np.arange(len(points), len(points) + len(last))
+        pyramids = np.concatenate([np.column_stack([last[:, face[::-1]], apex])
+                                   for face in CELL_SHAPE_FACES["hex"]])
+        points = np.vstack([points, points[last].mean(axis=1)])
+        mesh = cells_to_polymesh(points, {"hex": hexes[:layer].copy(), "prism": prisms,
+                                          "pyramid": pyramids},
+                                 inlet, np.zeros(len(inlet), dtype=int), ["inlet"], ["wall"])
+        check_box(mesh, layer + len(prisms) + len(pyramids))
+        assert [(p.name, p.type, p.n_faces) for p in mesh.patches][0] == ("inlet", "wall", N * N)
+
+        with pytest.raises(MeshImportError):
+            cells_to_polymesh(points, {"hex": np.concatenate([hexes, hexes[:1]])})
+
+    @pytest.mark.parametrize("binary", [False, True])
+    def test_gmsh2(self, tmp_path, binary):
+        """Test Gmsh 2.2 ASCII and binary files with sparse node tags."""
+        path = tmp_path / "box.msh"
+        write_gmsh2(path, binary)
+        assert is_gmsh_file(str(path))
+        mesh = read_gmsh_mesh(str(path))
+        check_box(mesh)
+        assert [(p.name, p.n_faces) for p in mesh.patches] == [("inlet", N * N),
+                                                                ("defaultFaces", 5 * N * N)]
+
+    @pytest.mark.parametrize("binary", [False, True])
+    def test_gmsh4(self, tmp_path, binary):
+        """Test Gmsh 4.1 ASCII and binary files with entity physical groups."""
+        path = tmp_path / "box.msh"
+        write_gmsh4(path, binary)
+        mesh = read_gmsh_mesh(str(path))
+        check_box(mesh)
+        assert [(p.name, p.n_faces) for p in mesh.patches] == [("inlet", N * N),
+                                                                ("defaultFaces", 5 * N * N)]
+
+    @pytest.mark.parametrize("binary,version", [(False, "3.0"), (True, "3.0"),
+                                                (False, "5.1"), (True, "5.1")])
+    def test_vtk(self, tmp_path, binary, version):
+        """Test legacy VTK grids of tets with inverted cells and surface quads."""
+        path = tmp_path / "box.vtk"
+        write_vtk(path, binary, version)
+        mesh = read_vtk_mesh(str(path))
+        check_box(mesh, 6 * N ** 3)
+        assert [(p.name, p.n_faces) for p in mesh.patches] == [("boundary", 2 * N * N),
+                                                                ("defaultFaces", 10 * N * N)]
+
+    @pytest.mark.parametrize("binary", [False, True])
+    def test_fluent(self, tmp_path, binary):
+        """Test Fluent files with mixed zones and reversed face orientation."""
+        path = tmp_path / "box.msh"
+        reference = write_fluent(path, binary)
+        assert not is_gmsh_file(str(path))
+        mesh = read_fluent_mesh(str(path))
+        check_box(mesh)
+        assert [(p.name, p.type, p.n_faces) for p in mesh.patches] == \
+            [(p.name, "wall" if i == 0 else "patch", p.n_faces)
+             for i, p in enumerate(reference.patches)]
+        assert np.array_equal(mesh.owner, reference.owner)
+        assert np.array_equal(mesh.neighbour, reference.neighbour)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 02:48:19 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for bitmap sets and zones.
+"""
+import numpy as np
+import pytest
+from src.openfoam.block_mesh import BlockMesh
+from src.openfoam import mesh_sets
+from src.openfoam.mesh_sets import (MeshSet, MeshZone, mesh_sizes, list_mesh_sets, read_mesh_set,
+                                    write_mesh_set, read_zones, write_zones)
+
+
+def random_set(name, size, fraction, seed):
+    """Set holding a random fraction of the elements, with its mask."""
+    mask = np.random.default_rng(seed).random(size) < fraction
+    return MeshSet.from_mask(name, "cell", mask), mask
+
+
+class TestMeshSets:
+    """Test bitmap construction, conversions, set operations and file I/O."""
+
+    def test_construction_and_queries(self):
+        """Test labels, masks and ranges round trips."""
+        labels = np.array([12, 3, 4, 5, 3, 20])
+        cells = MeshSet.from_labels("c", "cell", 21, labels)
+        assert len(cells) == 5 and cells.nbytes == 3
+        assert cells.labels().tolist() == [3, 4, 5, 12, 20]
+        assert cells.contains([2, 3, 20]).tolist() == [False, True, True]
+        starts, stops = cells.ranges()
+        assert starts.tolist() == [3, 12, 20] and stops.tolist() == [6, 13, 21]
+        assert MeshSet.from_ranges("c", "cell", 21, [12, 3, 4, 20], [13, 5, 6, 21]) == cells
+        assert len(MeshSet.from_ranges("c", "cell", 21, [], [])) == 0
+        with pytest.raises(ValueError):
+            MeshSet.from_labels("c", "cell", 21, [21])
+
+    def test_chunked_conversions(self, monkeypatch):
+        """Test conversions when the bitmap is expanded in several chunks."""
+        monkeypatch.setattr(mesh_sets, "BITMAP_CHUNK_BYTES", 4)
+        cells, mask = random_set("c", 1003, 0.5, 0)
+        assert np.array_equal(cells.labels(), np.flatnonzero(mask))
+        starts, stops = cells.ranges()
+        assert np.array_equal(MeshSet.from_ranges("c", "cell", 1003, starts, stops).mask(), mask)
+        assert stops[-1] <= 1003 and np.all(starts < stops)
+
+    def test_packed_construction(self, monkeypatch):
+        """Test labels and overlapping ranges set bit by bit against boolean masks."""
+        monkeypatch.setattr(mesh_sets, "LABEL_CHUNK_SIZE", 7)
+        rng = np.random.default_rng(3)
+        starts = rng.integers(0, 1003, 40)
+        stops = np.minimum(starts + rng.integers(0, 30, 40), 1003)
+        stops[:3] = [1003, 0, starts[2] + 1]
+        mask = np.zeros(1003, dtype=bool)
+        for start, stop in zip(starts, stops):
+            mask[start:stop] = True
+        assert np.array_equal(MeshSet.from_ranges("c", "cell", 1003, starts, stops).mask(), mask)
+
+        labels = rng.integers(0, 1003, 200)
+        cells = MeshSet.from_labels("c", "cell", 1003, labels)
+        assert np.array_equal(cells.labels(), np.unique(labels))
+        cells.remove(labels[:50])
+        assert not cells.contains(labels[:50]).any() and cells.contains(labels[50:]).any()
+        assert cells.bits[-1] & 0x1F == 0
+        with pytest.raises(ValueError):
+            cells.add([-1])
+
+    def test_set_operations(self):
+        """Test the topoSet-style operations against boolean masks."""
+        a, mask_a = random_set("a", 1001, 0.3, 1)
+        b, mask_b = random_set("b", 1001, 0.6, 2)
+        assert np.array_equal((a | b).mask(), mask_a | mask_b)
+        assert np.array_equal((a & b).mask(), mask_a & mask_b)
+        assert np.array_equal((a - b).mask(), mask_a & ~mask_b)
+        assert np.array_equal((a ^ b).mask(), mask_a ^ mask_b)
+        assert np.array_equal((~a).mask(), ~mask_a)
+        assert len(~a) == 1001 - len(a)
+
+        c = a.copy("c")
+        c.add([0, 1000])
+        c.remove(np.flatnonzero(mask_b))
+        assert c.contains([0, 1000]).tolist() == [not mask_b[0], not mask_b[1000]]
+        assert c.name == "c" and a.name == "a"
+        with pytest.raises(ValueError):
+            a | MeshSet("f", "face", 1001)
+
+    def test_set_files(self, tmp_path):
+        """Test that sets round-trip through ASCII and binary set files."""
+        mesh = BlockMesh.box((0, 0, 0), (1, 1, 1), (4, 4, 4)).build()
+        mesh.write(str(tmp_path))
+        sizes = mesh_sizes(str(tmp_path))
+        assert sizes == {"cell": 64, "face": mesh.n_faces, "point": mesh.n_points}
+
+        cells = MeshSet.from_mask("lower", "cell", mesh.cell_centres[:, 2] < 0.5)
+        faces = MeshSet.from_labels("inlet", "face", mesh.n_faces, np.arange(144, 160))
+        write_mesh_set(str(tmp_path), cells)
+        write_mesh_set(str(tmp_path), faces, binary=True)
+        assert list_mesh_sets(str(tmp_path)) == ["inlet", "lower"]
+        assert read_mesh_set(str(tmp_path), "lower", sizes) == cells
+        assert read_mesh_set(str(tmp_path), "inlet", sizes) == faces
+
+    @pytest.mark.parametrize("binary", [False, True])
+    def test_zone_files(self, tmp_path, binary):
+        """Test that cell and face zones round-trip, including flip maps."""
+        sizes = {"cell": 100, "face": 300, "point": 150}
+        porous = MeshZone.from_set(MeshSet.from_ranges("porous", "cell", 100, [10], [30]))
+        fan = MeshZone.from_set(MeshSet.from_labels("fan", "face", 300, [5, 7, 9, 11]),
+                                flip=MeshSet.from_labels("fan", "face", 300, [7, 11]))
+        baffle = MeshZone("baffle", "face", 300)
+        write_zones(str(tmp_path), "cell", [porous], binary)
+        write_zones(str(tmp_path), "face", [fan, baffle], binary)
+
+        cell_zones = read_zones(str(tmp_path), "cell", sizes)
+        face_zones = read_zones(str(tmp_path), "face", sizes)
+        assert [zone.name for zone in face_zones] == ["fan", "baffle"]
+        assert cell_zones[0] == porous and face_zones[0] == fan
+        assert face_zones[0].flip.labels().tolist() == [7, 11]
+        assert len(face_zones[1]) == 0
+        assert read_zones(str(tmp_path), "point", sizes) == []
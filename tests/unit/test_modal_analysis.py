@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 12:52:19 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for POD and DMD of snapshot series.
+"""
+import gzip
+import os
+import shutil
+import numpy as np
+import pytest
+from src.openfoam import modal_analysis
+from src.openfoam.block_mesh import BlockMesh
+from src.openfoam.fields import VolField, field_path, read_field, write_field
+from src.openfoam.modal_analysis import SnapshotMatrix, pod, dmd, write_modes
+from src.utils.cache import ArrayCache
+
+FREQUENCY = 0.75
+TIME_STEP = 0.1
+
+
+@pytest.fixture
+def snapshots(tmp_path, monkeypatch):
+    """Snapshot matrix of a velocity field rotating between two patterns."""
+    monkeypatch.setattr(modal_analysis, "CHUNK_BYTES", 8 * 40 * 100)
+    mesh = BlockMesh.box((0, 0, 0), (1, 1, 1), (5, 5, 5)).build()
+    case_dir = str(tmp_path / "case")
+    mesh.write(case_dir)
+    x, y = mesh.cell_centres[:, 0], mesh.cell_centres[:, 1]
+    first = np.stack([np.sin(np.pi * x), 0 * x, 0 * x], axis=1)
+    second = np.stack([0 * x, np.cos(np.pi * y), 0 * x], axis=1)
+    for i in range(40):
+        phase = 2 * np.pi * FREQUENCY * i * TIME_STEP
+        values = 1 + np.cos(phase) * first + 0.5 * np.sin(phase) * second
+        write_field(case_dir, VolField("U", values), f"{i * TIME_STEP:g}", binary=True)
+    matrix = SnapshotMatrix.build(case_dir, "U", str(tmp_path / "U.npy"), dtype=np.float64,
+                                  cache=ArrayCache("cell_volumes", str(tmp_path / "cache")))
+    return case_dir, matrix, (first, second)
+
+
+class TestModalAnalysis:
+    """Test the snapshot matrix, POD solvers and DMD frequencies."""
+
+    def test_pod(self, snapshots, tmp_path):
+        """Test mode energies and shapes, with both solvers."""
+        case_dir, matrix, (first, second) = snapshots
+        assert len(matrix.chunks()) == 4
+        reopened = SnapshotMatrix.open(str(tmp_path / "U.npy"))
+        assert isinstance(reopened.data, np.memmap) and reopened.width == 3
+
+        result = pod(reopened, 4)
+        assert len(result.eigenvalues) == 2
+        np.testing.assert_allclose(result.energy_fraction.sum(), 1)
+        assert result.eigenvalues[0] > 3 * result.eigenvalues[1]
+        gram = (result.modes * matrix.weights) @ result.modes.T
+        np.testing.assert_allclose(gram, np.eye(2), atol=1e-10)
+        shape = result.modes[0].reshape(-1, 3)
+        np.testing.assert_allclose(np.abs(shape / np.linalg.norm(shape)),
+                                   np.abs(first / np.linalg.norm(first)), atol=1e-10)
+
+        randomized = pod(reopened, 2, "randomized")
+        np.testing.assert_allclose(randomized.eigenvalues, result.eigenvalues)
+        np.testing.assert_allclose(np.abs(randomized.coefficients), np.abs(result.coefficients),
+                                   atol=1e-8)
+        with pytest.raises(ValueError):
+            pod(reopened, 2, "qr")
+
+        paths = write_modes(case_dir, matrix, result.modes, "POD")
+        mode = read_field(field_path(case_dir, "UPOD1", matrix.times[-1]))
+        assert len(paths) == 2 and mode.values.shape == (125, 3)
+
+    def test_compressed(self, snapshots, tmp_path):
+        """Test that compressed snapshots are found and read."""
+        case_dir, matrix, _ = snapshots
+        path = field_path(case_dir, "U", matrix.times[1])
+        with open(path, "rb") as source, gzip.open(path + ".gz", "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.remove(path)
+        rebuilt = SnapshotMatrix.build(case_dir, "U", str(tmp_path / "gz.npy"), dtype=np.float64)
+        assert rebuilt.times == matrix.times
+        np.testing.assert_array_equal(rebuilt.data, matrix.data)
+
+    def test_dmd(self, snapshots, tmp_path, monkeypatch):
+        """Test the oscillation frequency and mean mode of a rotating pattern."""
+        case_dir, matrix, _ = snapshots
+        result = dmd(matrix)
+        assert len(result.eigenvalues) == 3
+        np.testing.assert_allclose(np.abs(result.eigenvalues), 1, atol=1e-8)
+        np.testing.assert_allclose(np.sort(np.abs(result.frequencies)),
+                                   [0, FREQUENCY, FREQUENCY], atol=1e-8)
+        np.testing.assert_allclose(result.growth_rates, 0, atol=1e-7)
+
+        paths = write_modes(case_dir, matrix, result.modes[:1], "DMD", "0")
+        assert paths[0].endswith("UDMD0Re") and paths[1].endswith("UDMD0Im")
+
+        # The mean holds most of the energy
+        assert len(dmd(matrix, energy_fraction=0.5).eigenvalues) == 1
+        streamed = dmd(matrix, modes_path=str(tmp_path / "modes.npy"))
+        assert isinstance(streamed.modes, np.memmap)
+        np.testing.assert_allclose(np.asarray(streamed.modes), result.modes, atol=1e-10)
+        with pytest.raises(ValueError):
+            dmd(SnapshotMatrix(matrix.data[[0, 1, 3]], ["0", "1", "3"], matrix.weights))
+        monkeypatch.setattr(modal_analysis, "DMD_MAX_RANK", 2)
+        assert len(dmd(matrix).eigenvalues) == 2
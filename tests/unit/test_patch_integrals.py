@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 15:58:12 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for the batched patch integrals.
+"""
+import numpy as np
+import pytest
+from src.openfoam.block_mesh import BlockMesh
+from src.openfoam.fields import VolField, write_field
+from src.openfoam.patch_integrals import PatchIntegrator, patch_integrals
+
+# Kinematic viscosity of the test case
+NU = 1e-3
+
+
+@pytest.fixture
+def mesh():
+    """Graded box of 1 x 2 x 1 with its yMin patch as a wall."""
+    mesh = BlockMesh.box((0, 0, 0), (1, 2, 1), (5, 8, 4), grading=(2.0, 1.0, 1.0)).build()
+    mesh.patches[2].type = "wall"
+    return mesh
+
+
+def write_case(mesh, case_dir, times):
+    """Pressure ``p = t x`` and shear velocity ``U = (t y, 0, 0)`` at each time."""
+    mesh.write(case_dir)
+    for t in times:
+        scale = float(t)
+        pressure = {patch.name: {"type": "fixedValue",
+                                 "value": scale * mesh.face_centres[patch.face_slice][:, 0]}
+                    for patch in mesh.patches}
+        velocity = {}
+        for patch in mesh.patches:
+            centres = mesh.face_centres[patch.face_slice]
+            values = np.zeros_like(centres)
+            values[:, 0] = scale * centres[:, 1]
+            velocity[patch.name] = {"type": "fixedValue", "value": values}
+        velocity["yMin"] = {"type": "noSlip"}
+        cell_velocity = np.zeros_like(mesh.cell_centres)
+        cell_velocity[:, 0] = scale * mesh.cell_centres[:, 1]
+        write_field(case_dir, VolField("p", scale * mesh.cell_centres[:, 0], "[0 2 -2 0 0 0 0]",
+                                       pressure), t)
+        write_field(case_dir, VolField("U", cell_velocity, "[0 1 -1 0 0 0 0]", velocity), t,
+                    binary=True)
+
+
+class TestPatchIntegrals:
+    """Test integrals of linear fields against their exact values."""
+
+    def test_integrator(self, mesh):
+        """Test patch areas, sums of empty patches and area averages."""
+        integrator = PatchIntegrator(mesh, ["xMax", "yMin", "zMax"])
+        np.testing.assert_allclose(integrator.patch_areas, [2, 1, 2])
+        np.testing.assert_allclose(integrator.wall_distance[integrator.counts[0]],
+                                   mesh.cell_centres[0, 1])
+
+        values = np.stack([integrator.centres[:, 1], 2 * integrator.centres[:, 1]])
+        np.testing.assert_allclose(integrator.area_average(values), [[1, 0, 1], [2, 0, 2]])
+        np.testing.assert_allclose(integrator.integrate(np.ones((4, len(integrator.faces), 3)),
+                                                        axis=-2)[0, :, 2], [32, 20, 40])
+
+        mesh.patches[0].n_faces = 0
+        empty = PatchIntegrator(mesh, ["xMin", "xMax"])
+        np.testing.assert_allclose(empty.integrate(empty.areas), [0, 2])
+
+    def test_case(self, mesh, tmp_path):
+        """Test forces, moments, fluxes and coefficients at every time."""
+        case_dir = str(tmp_path / "case")
+        write_case(mesh, case_dir, ["1", "2"])
+        table = patch_integrals(case_dir, rho=2.0, viscosity=NU, average_fields=["p"],
+                                coefficients={"lift_dir": (0, 1, 0), "drag_dir": (1, 0, 0),
+                                              "pitch_axis": (0, 0, 1), "mag_u_inf": 1.0,
+                                              "l_ref": 1.0, "a_ref": 0.5})
+        assert list(table["time"]) == ["1"] * 6 + ["2"] * 6
+        assert list(table["patch"][:6]) == ["xMin", "xMax", "yMin", "yMax", "zMin", "zMax"]
+        row = {name: i for i, name in enumerate(table["patch"][:6])}
+
+        # The pressure force over the closed boundary is rho * integral of grad p
+        for t, offset in ((1, 0), (2, 6)):
+            rows = slice(offset, offset + 6)
+            np.testing.assert_allclose(table["pressure_force_x"][rows].sum(), 2.0 * t * 2)
+            np.testing.assert_allclose(table["pressure_force_y"][rows].sum(), 0, atol=1e-12)
+            x_max = offset + row["xMax"]
+            np.testing.assert_allclose(table["pressure_force_x"][x_max], 2.0 * t * 2)
+            np.testing.assert_allclose(table["moment_z"][x_max], -2.0 * t * 2)
+            np.testing.assert_allclose(table["moment_y"][x_max], 2.0 * t * 1)
+            np.testing.assert_allclose(table["areaAverage(p)"][x_max], t)
+
+            wall = offset + row["yMin"]
+            np.testing.assert_allclose(table["viscous_force_x"][wall], 2.0 * NU * t)
+            np.testing.assert_allclose(table["volume_flux"][x_max], 2.0 * t)
+            np.testing.assert_allclose(table["mass_flow"][offset + row["xMin"]], -4.0 * t)
+            np.testing.assert_allclose(table["Cd"][x_max], table["force_x"][x_max] / 0.5)
+            np.testing.assert_allclose(table["Cm"][x_max], table["moment_z"][x_max] / 0.5)
+
+        # The turbulent viscosity of the wall adds to the laminar one
+        nut = {patch.name: {"type": "calculated", "value": "uniform 0"} for patch in mesh.patches}
+        nut["yMin"] = {"type": "nutkWallFunction", "value": f"uniform {NU}"}
+        for t in ("1", "2"):
+            write_field(case_dir, VolField("nut", np.zeros(mesh.n_cells), "[0 2 -1 0 0 0 0]",
+                                           nut), t)
+        turbulent = patch_integrals(case_dir, viscosity=NU)
+        np.testing.assert_allclose(turbulent["viscous_force_x"][[row["yMin"], 6 + row["yMin"]]],
+                                   [2 * NU, 4 * NU])
+
+        with pytest.raises(ValueError):
+            patch_integrals(case_dir, viscosity=NU, coefficients={"a_ref": 1.0})
+        with pytest.raises(FileNotFoundError):
+            patch_integrals(case_dir, viscosity=NU, average_fields=["T"])
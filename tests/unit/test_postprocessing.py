@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 08:58:12 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for the postProcessing table readers.
+"""
+import os
+import numpy as np
+import pytest
+from src.openfoam.postprocessing import (ColumnSchema, PostProcessingReader, load_postprocessing,
+                                         row_layout)
+
+FORCE_HEADER = ("# Force\n# CofR                : (0 0 0)\n#\n"
+                "# Time          \ttotal_x\ttotal_y\ttotal_z\tpressure_x\tpressure_y\tpressure_z\n")
+
+PROBES = """# Probe 0 (0.1 0.2 0.3)
+# Probe 1 (0.4 0.5 0.6)
+#       Probe             0             1
+#        Time
+0.1   (1 2 3)   (4 5 6)
+0.2   (1.5 2.5 3.5)   (4.5 5.5 6.5)
+"""
+
+SOLVER_INFO = """# Solver information
+# Time          \tU_solver        \tUx_initial\tUx_final\tUx_iters\tp_solver\tp_initial\tp_converged
+1\tsmoothSolver\t1e-2\t1e-6\t3\tGAMG\t0.5\tfalse
+2\tsmoothSolver\t5e-3\t1e-7\t2\tGAMG\t0.1\ttrue
+"""
+
+MIN_MAX = """# Field minima and maxima
+# Time  \tfield\tmin\tlocation(min)\tprocessor\tmax\tlocation(max)\tprocessor
+0.5\tp\t-1\t(0 0 0)\t0\t2\t(1 1 1)\t0
+"""
+
+
+def force_rows(times, scale=1.0):
+    """Force table rows with values proportional to time."""
+    return "".join(f"{t}\t" + "\t".join(str(scale * t * k) for k in range(1, 7)) + "\n"
+                   for t in times)
+
+
+def write(path, text, mode="w"):
+    """Write text to a file, creating its directory."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, mode) as f:
+        f.write(text)
+
+
+@pytest.fixture
+def post_dir(tmp_path):
+    """postProcessing directory of a run restarted at time 3."""
+    root = tmp_path / "postProcessing"
+    write(str(root / "forces" / "0" / "force.dat"), FORCE_HEADER + force_rows(range(1, 6)))
+    write(str(root / "forces" / "3" / "force.dat"), FORCE_HEADER + force_rows(range(3, 7), 2.0))
+    write(str(root / "probes" / "0" / "U"), PROBES)
+    write(str(root / "solverInfo" / "0" / "solverInfo.dat"), SOLVER_INFO)
+    write(str(root / "fieldMinMax" / "0" / "fieldMinMax.dat"), MIN_MAX)
+    return str(root)
+
+
+class TestPostProcessing:
+    """Test schemas, restart stitching and tailing."""
+
+    def test_schema(self):
+        """Test column expansion of vectors, nested groups and probes."""
+        assert row_layout("1 ((1 2 3) (4 5 6) (7 8 9)) text (1 2 3)") == [
+            (1, True), (9, True), (1, False), (3, True)]
+        schema = ColumnSchema(["# Time forces(pressure viscous porous)"],
+                              "0.1 ((1 2 3) (4 5 6) (7 8 9))")
+        assert schema.columns[1:4] == ["forces_pressure_x", "forces_pressure_y",
+                                       "forces_pressure_z"]
+        assert schema.columns[-1] == "forces_porous_z"
+
+        lines = PROBES.splitlines()
+        schema = ColumnSchema(lines[:4], lines[4])
+        assert schema.columns == ["Time", "probe0_x", "probe0_y", "probe0_z",
+                                  "probe1_x", "probe1_y", "probe1_z"]
+        np.testing.assert_allclose(schema.probes, [[0.1, 0.2, 0.3], [0.4, 0.5, 0.6]])
+        columns = schema.parse("\n".join(lines[4:]).encode() + b"\n0.3 (1 2")
+        np.testing.assert_allclose(columns["probe1_y"], [5, 5.5])
+
+    def test_load(self, post_dir):
+        """Test stitched restarts, text columns and header entries."""
+        series = load_postprocessing(post_dir)
+        assert sorted(series) == [("fieldMinMax", "fieldMinMax.dat"), ("forces", "force.dat"),
+                                  ("probes", "U"), ("solverInfo", "solverInfo.dat")]
+
+        force = series["forces", "force.dat"]
+        np.testing.assert_allclose(force.time, [1, 2, 3, 4, 5, 6])
+        np.testing.assert_allclose(force["total_y"], [2, 4, 12, 16, 20, 24])
+        assert force.schema.metadata["CofR"] == "(0 0 0)"
+
+        info = series["solverInfo", "solverInfo.dat"]
+        assert list(info["p_converged"]) == ["false", "true"]
+        np.testing.assert_allclose(info["Ux_iters"], [3, 2])
+        minmax = series["fieldMinMax", "fieldMinMax.dat"]
+        assert minmax.columns[3:6] == ["location(min)_x", "location(min)_y", "location(min)_z"]
+        np.testing.assert_allclose(minmax["location(max)_z"], [1])
+
+    def test_tail(self, post_dir):
+        """Test that refreshes append only complete new rows."""
+        reader = PostProcessingReader(post_dir)
+        assert sum(reader.refresh().values()) == 5 + 4 + 2 + 2 + 1
+        assert reader.refresh() == {}
+
+        path = os.path.join(post_dir, "forces", "3", "force.dat")
+        write(path, force_rows([7], 2.0) + "8\t1\t2", "a")
+        assert reader.refresh() == {("forces", "force.dat"): 1}
+        write(path, "\t3\t4\t5\t6\n", "a")
+        assert reader.refresh() == {("forces", "force.dat"): 1}
+        force = reader.series["forces", "force.dat"]
+        np.testing.assert_allclose(force.time, [1, 2, 3, 4, 5, 6, 7, 8])
+        np.testing.assert_allclose(force["pressure_z"][-2:], [84, 6])
+
+        # A second restart replaces the rows from its start time on
+        write(os.path.join(post_dir, "forces", "6", "force.dat"),
+              FORCE_HEADER + force_rows([6, 7], 3.0))
+        assert reader.refresh() == {("forces", "force.dat"): 2}
+        np.testing.assert_allclose(force.time, [1, 2, 3, 4, 5, 6, 7])
+        np.testing.assert_allclose(force["total_x"][-2:], [18, 21])
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 07:46:31 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for point probes.
+"""
+import numpy as np
+import pytest
+from src.openfoam.block_mesh import BlockMesh
+from src.openfoam.fields import VolField, write_field
+from src.openfoam.probes import CellLocator, Probes
+
+
+def linear(points):
+    """Linear test function of position."""
+    return 1 + 2 * points[:, 0] - points[:, 1] + 3 * points[:, 2]
+
+
+@pytest.fixture
+def mesh():
+    """Box of 10 by 20 by 10 unit-tenth cells."""
+    return BlockMesh.box((0, 0, 0), (1, 2, 1), (10, 20, 10)).build()
+
+
+@pytest.fixture
+def probe_points():
+    """Random points in the box, and one outside."""
+    points = np.random.default_rng(0).random((300, 3)) * [1, 2, 1]
+    return np.vstack([points, [[2.0, 0.5, 0.5]]])
+
+
+class TestProbes:
+    """Test cell location, interpolation and sampling over times."""
+
+    def test_locate(self, mesh, probe_points):
+        """Test that probes are found in the cell whose box holds them."""
+        locator = CellLocator(mesh)
+        cells = locator.locate(probe_points)
+        assert cells[-1] == -1
+        expected = (np.floor(probe_points[:-1] * 10) + 0.5) / 10
+        np.testing.assert_allclose(mesh.cell_centres[cells[:-1]], expected)
+        assert locator.contains(probe_points[:2], cells[:2]).all()
+        assert not locator.contains(probe_points[:1], (cells[:1] + 1) % mesh.n_cells).any()
+
+    def test_locate_graded(self):
+        """Test that probes whose nearest centre is another cell are found by walking."""
+        mesh = BlockMesh.box((0, 0, 0), (1, 1, 1), (10, 10, 10), grading=(20.0, 1, 1)).build()
+        locator = CellLocator(mesh)
+        points = np.random.default_rng(1).random((500, 3))
+        cells = locator.locate(points, candidates=1)
+        _, nearest = locator.tree.query(points, 1)
+        assert np.any(nearest[:, 0] != cells)
+        assert np.all(cells >= 0) and locator.contains(points, cells).all()
+        np.testing.assert_array_equal(locator.walk(points[:1] + 2, cells[:1]), [-1])
+
+    def test_all_outside(self, mesh):
+        """Test that probes all outside the mesh sample as NaN."""
+        locator = CellLocator(mesh)
+        for interpolation in ("cell", "cellPoint"):
+            probes = Probes(locator, [[2.0, 0.5, 0.5], [-1.0, 0.0, 0.0]], interpolation)
+            assert not probes.found.any()
+            assert np.isnan(probes.sample(mesh.cell_centres)).all()
+
+    def test_interpolation(self, mesh, probe_points):
+        """Test cell values, and that cellPoint is exact for linear fields inside."""
+        locator = CellLocator(mesh)
+        values = linear(mesh.cell_centres)
+        exact = linear(probe_points)
+
+        cell = Probes(locator, probe_points).sample(values)
+        assert np.isnan(cell[-1])
+        np.testing.assert_allclose(cell[:-1], values[locator.locate(probe_points[:-1])])
+
+        interpolated = Probes(locator, probe_points, "cellPoint").sample(values)
+        inside = np.all((probe_points > 0.1) & (probe_points < [0.9, 1.9, 0.9]), axis=1)
+        np.testing.assert_allclose(interpolated[inside], exact[inside])
+        assert np.abs(interpolated - exact)[:-1].max() < np.abs(cell - exact)[:-1].max()
+        with pytest.raises(ValueError):
+            Probes(locator, probe_points, "cubic")
+
+    def test_sample_times(self, mesh, probe_points, tmp_path):
+        """Test vectors, stacked times and sampling the time directories of a case."""
+        probes = Probes(CellLocator(mesh), probe_points, "cellPoint")
+        velocity = np.stack([linear(mesh.cell_centres)] * 3, axis=1) * [1, 2, 3]
+        series = probes.sample_series(np.stack([velocity, 2 * velocity]))
+        assert series.shape == (2, len(probe_points), 3)
+        np.testing.assert_allclose(series[1], 2 * probes.sample(velocity))
+
+        for time, scale in (("0", 0.0), ("1", 1.0), ("2", 2.0)):
+            write_field(str(tmp_path), VolField("U", scale * velocity), time, binary=True)
+        times, values = probes.sample_case(str(tmp_path), "U")
+        assert times == ["0", "1", "2"]
+        np.testing.assert_allclose(values[2], series[1])
+        with pytest.raises(ValueError):
+            probes.sample_series(np.zeros((1, 5)))
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:58:14 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for reverse Cuthill-McKee renumbering.
+"""
+import gzip
+import os
+import numpy as np
+import pytest
+from src.openfoam.block_mesh import BlockMesh
+from src.openfoam.fields import VolField, field_path, parse_boundary, read_field, write_field
+from src.openfoam.foam_io import open_foam_file
+from src.openfoam.mesh_sets import (MeshSet, MeshZone, read_mesh_set, read_zones,
+                                    write_mesh_set, write_zones)
+from src.openfoam.polymesh import PolyMesh
+from src.openfoam.renumber import (cell_adjacency, matrix_bandwidth, matrix_profile,
+                                   rcm_ordering, renumber_case, renumber_cells, renumber_mesh)
+
+
+def scrambled_box(n=(12, 6, 4), seed=0):
+    """Box mesh with randomly permuted cell labels."""
+    mesh = BlockMesh.box((0, 0, 0), (3, 1.5, 1), n).build()
+    order = np.random.default_rng(seed).permutation(mesh.n_cells)
+    return mesh, renumber_cells(mesh, order), order
+
+
+class TestRenumber:
+    """Test the cell graph, the RCM ordering and the mesh permutation."""
+
+    def test_cell_adjacency(self):
+        """Test that the CSR graph lists every face neighbour once per side."""
+        mesh = BlockMesh.box((0, 0, 0), (1, 1, 1), (3, 2, 1)).build()
+        offsets, adjacency = cell_adjacency(mesh)
+        assert offsets[-1] == 2 * mesh.n_internal_faces
+        assert np.diff(offsets).tolist() == [2, 3, 2, 2, 3, 2]
+        assert adjacency[offsets[1]:offsets[2]].tolist() == [0, 2, 4]
+
+    def test_renumber_cells_keeps_geometry(self):
+        """Test that a permutation keeps ordering rules, orientation and geometry."""
+        mesh, scrambled, order = scrambled_box()
+        assert scrambled.check_ordering()
+        assert np.allclose(scrambled.cell_volumes, mesh.cell_volumes[order])
+        assert np.allclose(scrambled.cell_centres, mesh.cell_centres[order])
+        assert np.isclose(np.linalg.norm(scrambled.face_areas, axis=1).sum(),
+                          np.linalg.norm(mesh.face_areas, axis=1).sum())
+        for patch in scrambled.patches:
+            owners = scrambled.owner[patch.face_slice]
+            assert np.all(np.diff(owners) >= 0)
+            original = mesh.patch(patch.name)
+            assert np.allclose(scrambled.face_areas[patch.face_slice].sum(axis=0),
+                               mesh.face_areas[original.face_slice].sum(axis=0))
+
+    def test_rcm_reduces_bandwidth(self):
+        """Test that RCM recovers a narrow band from a random numbering."""
+        mesh, scrambled, _ = scrambled_box()
+        order = rcm_ordering(scrambled)
+        assert sorted(order.tolist()) == list(range(scrambled.n_cells))
+
+        renumbered, report = renumber_mesh(scrambled)
+        assert report.bandwidth_before == matrix_bandwidth(scrambled)
+        assert report.bandwidth_after == matrix_bandwidth(renumbered)
+        assert report.profile_after == matrix_profile(renumbered)
+        assert report.bandwidth_after <= 2 * 6 * 4
+        assert report.profile_after < report.profile_before / 4
+        assert renumbered.check_ordering()
+        assert np.all(renumbered.cell_volumes > 0)
+
+    def test_disconnected_regions(self, tmp_path):
+        """Test that every region is ordered and the mesh round-trips to disk."""
+        a = BlockMesh.box((0, 0, 0), (1, 1, 1), (3, 3, 3)).build()
+        b = BlockMesh.box((2, 0, 0), (3, 1, 1), (2, 2, 2)).build()
+        n_int = a.n_internal_faces + b.n_internal_faces
+        faces = np.concatenate([np.arange(a.n_internal_faces),
+                                a.n_faces + np.arange(b.n_internal_faces),
+                                np.arange(a.n_internal_faces, a.n_faces),
+                                a.n_faces + np.arange(b.n_internal_faces, b.n_faces)])
+        sizes = np.concatenate([a.face_sizes, b.face_sizes])[faces]
+        offsets = np.concatenate([[0], np.cumsum(sizes)])
+        labels = np.concatenate([a.face_point_array(), b.face_point_array() + a.n_points])[faces]
+        owner = np.concatenate([a.owner, b.owner + a.n_cells])[faces]
+        neighbour = np.concatenate([a.neighbour, b.neighbour + a.n_cells])
+        patches = [type(a.patches[0])("walls", "wall", len(faces) - n_int, n_int)]
+        merged = PolyMesh(np.vstack([a.points, b.points]), offsets, labels.ravel(), owner,
+                          neighbour, patches)
+
+        order = rcm_ordering(merged)
+        assert sorted(order.tolist()) == list(range(merged.n_cells))
+        renumbered = renumber_cells(merged, order)
+        assert renumbered.check_ordering()
+        renumbered.write(str(tmp_path), binary=True)
+        loaded = PolyMesh.read(str(tmp_path))
+        assert np.array_equal(loaded.owner, renumbered.owner)
+        assert np.isclose(loaded.cell_volumes.sum(), 1.0 + 1.0)
+
+    def test_renumber_case(self, tmp_path):
+        """Test that fields, zones and sets follow their cells and faces."""
+        _, scrambled, _ = scrambled_box()
+        case_dir = str(tmp_path)
+        scrambled.write(case_dir)
+        sizes = {"cell": scrambled.n_cells, "face": scrambled.n_faces,
+                 "point": scrambled.n_points}
+        centres, face_centres = scrambled.cell_centres, scrambled.face_centres
+        patch = scrambled.patch("xMin")
+        write_field(case_dir, VolField("T", centres[:, 0], boundary={
+            "xMin": {"type": "fixedValue", "value": face_centres[patch.face_slice][:, 1]},
+            ".*": {"type": "zeroGradient"}}), "0")
+        write_field(case_dir, VolField("U", centres, binary=True), "1")
+        with open(field_path(case_dir, "U", "1"), "rb") as f, \
+                gzip.open(field_path(case_dir, "U.gz", "1"), "wb") as g:
+            g.write(f.read())
+        os.remove(field_path(case_dir, "U", "1"))
+        write_field(case_dir, VolField("p", np.ones(scrambled.n_cells)), "1")
+
+        high = np.flatnonzero(centres[:, 0] > 2.0)
+        internal = np.arange(scrambled.n_internal_faces)
+        faces = internal[face_centres[internal, 2] > 0.5][:20]
+        write_zones(case_dir, "cell", [MeshZone.from_set(
+            MeshSet.from_labels("high", "cell", sizes["cell"], high))])
+        write_zones(case_dir, "face", [MeshZone.from_set(
+            MeshSet.from_labels("cut", "face", sizes["face"], faces),
+            flip=MeshSet.from_labels("cut", "face", sizes["face"], faces[::2]))])
+        write_mesh_set(case_dir, MeshSet.from_labels("high", "cell", sizes["cell"], high))
+
+        mesh, report = renumber_case(case_dir)
+        assert report.improved
+        loaded = PolyMesh.read(case_dir)
+        assert np.array_equal(loaded.owner, mesh.owner)
+        temperature = read_field(field_path(case_dir, "T", "0"))
+        np.testing.assert_allclose(temperature.values, loaded.cell_centres[:, 0])
+        value = parse_boundary(temperature)["xMin"]["value"]
+        np.testing.assert_allclose(value,
+                                   loaded.face_centres[loaded.patch("xMin").face_slice][:, 1])
+        velocity = read_field(field_path(case_dir, "U", "1"))
+        assert velocity.binary and not os.path.exists(field_path(case_dir, "U.gz", "1"))
+        np.testing.assert_allclose(velocity.values, loaded.cell_centres)
+
+        cells = read_zones(case_dir, "cell", sizes)[0].labels()
+        assert np.array_equal(cells, np.flatnonzero(loaded.cell_centres[:, 0] > 2.0))
+        assert np.array_equal(read_mesh_set(case_dir, "high", sizes).labels(), cells)
+        zone = read_zones(case_dir, "face", sizes)[0]
+        moved = zone.labels()
+        np.testing.assert_allclose(np.sort(loaded.face_centres[moved], axis=0),
+                                   np.sort(face_centres[faces], axis=0))
+        # The zone keeps the orientation of its faces, whichever way they now point
+        old_normal = scrambled.face_areas[faces]
+        old_normal[::2] *= -1
+        new_normal = loaded.face_areas[moved] * np.where(zone.flip.contains(moved), -1, 1)[:, None]
+        order_old = np.lexsort(face_centres[faces].T)
+        order_new = np.lexsort(loaded.face_centres[moved].T)
+        np.testing.assert_allclose(new_normal[order_new], old_normal[order_old])
+
+        with open_foam_file(field_path(case_dir, "phi", "0"), "surfaceScalarField", "phi",
+                            "0", False) as f:
+            f.write(b"internalField uniform 0;\n")
+        scrambled.write(case_dir)
+        with pytest.raises(ValueError):
+            renumber_case(case_dir)
+        assert np.array_equal(PolyMesh.read(case_dir).owner, scrambled.owner)
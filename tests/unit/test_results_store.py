@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 10:02:51 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for the columnar results store.
+"""
+import gzip
+import os
+import numpy as np
+from src.openfoam import results_store
+from src.openfoam.block_mesh import BlockMesh
+from src.openfoam.fields import VolField, read_field, write_field
+from src.openfoam.results_store import (ResultsStore, build_results_store, default_store_path,
+                                        stored_series)
+
+
+def write_case(case_dir, mesh):
+    """Case with two times of p and U, a uniform initial U and a force table."""
+    mesh.write(case_dir)
+    write_field(case_dir, VolField.uniform("U", mesh.n_cells, (1, 0, 0), mesh.patches), "0")
+    for time in ("0.5", "1"):
+        write_field(case_dir, VolField("p", mesh.cell_centres[:, 0] * float(time)), time)
+        write_field(case_dir, VolField("U", mesh.cell_centres * float(time)), time, binary=True)
+    forces = os.path.join(case_dir, "postProcessing", "forces", "0")
+    os.makedirs(forces)
+    with open(os.path.join(forces, "force.dat"), "w") as f:
+        f.write("# Force\n# Time\ttotal_x\ttotal_y\ttotal_z\n")
+        f.write("".join(f"{t}\t({t} {2 * t} {3 * t})\n" for t in range(1, 11)))
+
+
+class TestResultsStore:
+    """Test conversion, memory-mapped reads and incremental rebuilds."""
+
+    def test_build(self, tmp_path):
+        """Test that fields and tables are stored and memory-mapped."""
+        mesh = BlockMesh.box((0, 0, 0), (1, 1, 1), (4, 4, 4)).build()
+        case_dir = str(tmp_path)
+        write_case(case_dir, mesh)
+        store = build_results_store(case_dir)
+        assert store.path == default_store_path(case_dir)
+        assert store.fields() == ["U", "p"] and store.times("U") == ["0", "0.5", "1"]
+        assert store.times("p") == ["0.5", "1"]
+
+        reopened = ResultsStore(store.path)
+        velocity = reopened.field("U", "1")
+        assert isinstance(velocity, np.memmap)
+        np.testing.assert_array_equal(velocity, mesh.cell_centres)
+        np.testing.assert_array_equal(reopened.field("U", "0"), np.tile([1, 0, 0], (64, 1)))
+
+        assert reopened.series_names() == [("forces", "force.dat")]
+        force = reopened.series("forces", "force.dat")
+        assert list(force) == ["Time", "total_x", "total_y", "total_z"]
+        np.testing.assert_array_equal(force["total_z"], 3 * np.arange(1, 11))
+
+    def test_float32_and_rebuild(self, tmp_path, monkeypatch):
+        """Test single precision, and that only changed sources are converted again."""
+        mesh = BlockMesh.box((0, 0, 0), (1, 1, 1), (3, 3, 3)).build()
+        case_dir = str(tmp_path / "case")
+        write_case(case_dir, mesh)
+        path = str(tmp_path / "export")
+        store = build_results_store(case_dir, path, fields=["p"], float32=True)
+        assert store.fields() == ["p"]
+        assert store.field("p", "1").dtype == np.float32
+        force = store.series("forces", "force.dat")
+        assert force["Time"].dtype == np.float64 and force["total_x"].dtype == np.float32
+
+        reads = []
+        monkeypatch.setattr(results_store, "read_field",
+                            lambda *args: reads.append(args[0]) or read_field(*args))
+        write_field(case_dir, VolField("p", np.arange(mesh.n_cells) * 7.0), "1")
+        os.utime(os.path.join(case_dir, "1", "p"), ns=(0, 1))
+        store = build_results_store(case_dir, path, fields=["p"], float32=True)
+        assert reads == [os.path.join(case_dir, "1", "p")]
+        np.testing.assert_array_equal(store.field("p", "1"), np.arange(mesh.n_cells) * 7)
+
+    def test_compressed_reload_and_export(self, tmp_path):
+        """Test compressed fields, loading tables from a current store and exporting it."""
+        mesh = BlockMesh.box((0, 0, 0), (1, 1, 1), (3, 3, 3)).build()
+        case_dir = str(tmp_path / "case")
+        write_case(case_dir, mesh)
+        p_path = os.path.join(case_dir, "1", "p")
+        with open(p_path, "rb") as f, gzip.open(p_path + ".gz", "wb") as g:
+            g.write(f.read())
+        os.remove(p_path)
+        assert stored_series(case_dir) is None
+
+        store = build_results_store(case_dir)
+        assert store.times("p") == ["0.5", "1"]
+        assert store.manifest["fields"]["p"]["1"]["source"] == \
+            results_store.source_stamp(p_path + ".gz")
+        tables = stored_series(case_dir)
+        assert list(tables) == [("forces", "force.dat")]
+        np.testing.assert_array_equal(tables["forces", "force.dat"]["total_y"],
+                                      2 * np.arange(1, 11))
+
+        exported = store.export(str(tmp_path / "export"), float32=True)
+        assert exported.fields() == store.fields()
+        assert exported.field("p", "1").dtype == np.float32
+        np.testing.assert_allclose(exported.field("U", "1"), mesh.cell_centres, rtol=1e-6)
+        assert ResultsStore(exported.path).series_names() == [("forces", "force.dat")]
+
+        with open(os.path.join(case_dir, "postProcessing", "forces", "0", "force.dat"),
+                  "a") as f:
+            f.write("11\t(11 22 33)\n")
+        assert stored_series(case_dir) is None
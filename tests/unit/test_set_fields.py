@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 05:03:44 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for the native setFields equivalent.
+"""
+import numpy as np
+import pytest
+from src.openfoam.block_mesh import BlockMesh
+from src.openfoam.cell_selection import CellSource, CellSelector
+from src.openfoam.fields import VolField, field_path, read_field, write_field
+from src.openfoam.set_fields import initialise_fields, set_fields
+from src.utils.cache import ArrayCache
+
+
+@pytest.fixture
+def mesh():
+    """Unit box of 10 cells per direction."""
+    return BlockMesh.box((0, 0, 0), (1, 1, 1), (10, 10, 10)).build()
+
+
+@pytest.fixture
+def selector(mesh, tmp_path):
+    """Selector with a cache in the test directory."""
+    return CellSelector(mesh, ArrayCache("cell_selection", str(tmp_path / "cache")))
+
+
+class TestSetFields:
+    """Test region assignment order and the written fields."""
+
+    def test_initialise_fields(self, mesh, selector):
+        """Test defaults, overriding regions and vector values."""
+        lower = CellSource("box", min=(0, 0, 0), max=(1, 1, 0.5))
+        drop = CellSource("sphere", centre=(0.5, 0.5, 0.75), radius=0.2)
+        fields = initialise_fields(mesh, {"alpha.water": 0, "U": (0, 0, 0)},
+                                   [(lower, {"alpha.water": 1}),
+                                    (drop, {"alpha.water": 1, "U": (0, 0, -1)})],
+                                   selector=selector)
+        z = mesh.cell_centres[:, 2]
+        in_drop = drop.mask(mesh.cell_centres)
+        assert np.array_equal(fields["alpha.water"] == 1, (z < 0.5) | in_drop)
+        assert fields["U"].shape == (mesh.n_cells, 3)
+        assert np.array_equal(fields["U"][:, 2] == -1, in_drop)
+        with pytest.raises(ValueError):
+            initialise_fields(mesh, {}, [(lower, {"T": 300})], selector=selector)
+
+    def test_set_fields(self, mesh, selector, tmp_path):
+        """Test that existing fields keep their boundary and missing ones are created."""
+        mesh.write(str(tmp_path))
+        temperature = VolField("T", np.full(mesh.n_cells, 300.0), "[0 0 0 1 0 0 0]",
+                               {"walls": {"type": "fixedValue", "value": "uniform 350"}})
+        write_field(str(tmp_path), temperature, binary=True)
+
+        hot = CellSource("box", min=(0, 0, 0), max=(0.3, 1, 1))
+        paths = set_fields(str(tmp_path), mesh, {"alpha.water": 0},
+                           [(hot, {"alpha.water": 1, "T": 400})], selector=selector)
+        assert len(paths) == 2
+
+        alpha = read_field(field_path(str(tmp_path), "alpha.water"))
+        assert not alpha.binary and alpha.values.sum() == 300
+        assert b"zeroGradient" in alpha.boundary
+        temperature = read_field(field_path(str(tmp_path), "T"))
+        assert temperature.binary and temperature.dimensions == "[0 0 0 1 0 0 0]"
+        assert b"uniform 350" in temperature.boundary
+        assert np.array_equal(temperature.values == 400, alpha.values == 1)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 18:10:37 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for the snappyHexMesh cell count predictor.
+"""
+import numpy as np
+import pytest
+from src.openfoam.stl import TriSurface
+from src.openfoam.snappy_estimate import estimate_snappy_cells, sample_surface, RefinementRegion
+from tests.unit.test_stl import CUBE_POINTS, CUBE_TRIANGLES
+
+
+@pytest.fixture
+def inner_cube():
+    """Cube of half the size of the unit background box, centred in it."""
+    return TriSurface(CUBE_POINTS * 0.5 + 0.25, CUBE_TRIANGLES)
+
+
+class TestSnappyEstimate:
+    """Test the castellation replay."""
+
+    def test_sample_surface_spacing(self, inner_cube):
+        """Test that samples cover every triangle at the requested spacing."""
+        points, triangles = sample_surface(inner_cube, np.full(12, 0.05))
+        assert np.array_equal(np.unique(triangles), np.arange(12))
+        assert np.all(np.abs(points - 0.5).max(axis=1) == pytest.approx(0.25))
+
+    def test_background_cell_removal(self, inner_cube):
+        """Test that cells inside the surface are removed without refinement."""
+        estimate = estimate_snappy_cells(inner_cube, (0, 0, 0), (1, 1, 1), (8, 8, 8),
+                                         surface_levels=0)
+        assert estimate.cells_per_level == [8 ** 3 - 4 ** 3]
+        assert estimate.n_removed == 4 ** 3
+
+        inside = estimate_snappy_cells(inner_cube, (0, 0, 0), (1, 1, 1), (8, 8, 8),
+                                       surface_levels=0, location_in_mesh=(0.5, 0.5, 0.5))
+        assert inside.n_cells == 4 ** 3
+
+    def test_surface_refinement(self, inner_cube):
+        """Test cell counts with one surface level and no buffer layers."""
+        estimate = estimate_snappy_cells(inner_cube, (0, 0, 0), (1, 1, 1), (8, 8, 8),
+                                         surface_levels=(1, 1), n_cells_between_levels=0,
+                                         n_layers=3)
+        # The shell of cells 2..6 cut by the faces is split, cells 3..5 are removed
+        assert estimate.cells_per_level[0] == 8 ** 3 - (5 ** 3 - 3 ** 3) - 3 ** 3
+        # Children 4..13 of the cut cells, minus those inside the cube (4..11)
+        assert estimate.cells_per_level[1] == 10 ** 3 - 8 ** 3
+        assert estimate.n_layer_cells == 3 * estimate.n_surface_faces
+        assert estimate.memory_bytes > 0
+
+    def test_refinement_region(self, inner_cube):
+        """Test that a refinement region splits the cells inside it."""
+        region = RefinementRegion("box", 1, min=(0.0, 0.0, 0.0), max=(0.24, 1.0, 1.0))
+        estimate = estimate_snappy_cells(inner_cube, (0, 0, 0), (1, 1, 1), (8, 8, 8),
+                                         surface_levels=0, regions=[region],
+                                         n_cells_between_levels=0)
+        assert estimate.cells_per_level == [8 ** 3 - 4 ** 3 - 2 * 64, 8 * 2 * 64]
+
+    def test_distance_refinement(self, inner_cube):
+        """Test that distance levels refine the cells near the surface."""
+        plain = estimate_snappy_cells(inner_cube, (0, 0, 0), (1, 1, 1), (8, 8, 8),
+                                      surface_levels=0)
+        refined = estimate_snappy_cells(inner_cube, (0, 0, 0), (1, 1, 1), (8, 8, 8),
+                                        surface_levels=0, distance_levels=[(0.1, 1)],
+                                        n_cells_between_levels=0)
+        assert len(refined.cells_per_level) == 2
+        assert refined.n_cells > plain.n_cells
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 13:58:37 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for spectral analysis of postProcessing series.
+"""
+import os
+import numpy as np
+import pytest
+from src.openfoam import spectral
+from src.openfoam.postprocessing import load_postprocessing
+from src.openfoam.spectral import (resample_uniform, welch_psd, dominant_frequencies,
+                                   series_spectra, strouhal_number)
+from src.utils.cache import ArrayCache
+
+
+def jittered_times(n, time_step, seed=0):
+    """Increasing sample times with a variable step."""
+    steps = time_step * (1 + 0.3 * np.random.default_rng(seed).uniform(-1, 1, n - 1))
+    return np.concatenate([[0.0], np.cumsum(steps)])
+
+
+class TestSpectral:
+    """Test resampling, Welch densities, peaks and the cached series spectra."""
+
+    def test_resample(self):
+        """Test that linear series are resampled exactly and restarts are merged."""
+        time = np.array([0.0, 0.3, 0.7, 0.7, 1.0])
+        values = np.stack([2 * time, -time], axis=1)
+        values[2] = 99
+        grid, resampled = resample_uniform(time, values, 0.25)
+        np.testing.assert_allclose(grid, [0, 0.25, 0.5, 0.75, 1.0])
+        np.testing.assert_allclose(resampled, np.stack([2 * grid, -grid], axis=1))
+        with pytest.raises(ValueError):
+            resample_uniform(np.zeros(3), np.zeros(3))
+
+    def test_welch(self):
+        """Test Parseval's relation and the dominant frequency of two channels."""
+        rate = 200.0
+        time = np.arange(40000) / rate
+        rng = np.random.default_rng(1)
+        values = np.stack([3 * np.sin(2 * np.pi * 12.3 * time),
+                           np.sin(2 * np.pi * 40 * time) + 0.1 * rng.standard_normal(len(time))],
+                          axis=1)
+        frequencies, psd = welch_psd(values, rate, 1024)
+        assert psd.shape == (513, 2)
+        df = frequencies[1]
+        np.testing.assert_allclose(psd.sum(axis=0) * df, values.var(axis=0), rtol=0.02)
+
+        peaks, powers = dominant_frequencies(frequencies, psd, 2, min_frequency=1)
+        assert abs(peaks[0, 0] - 12.3) < 0.1 * df and abs(peaks[0, 1] - 40) < 0.1 * df
+        assert np.isnan(peaks[1, 0]) and powers[0, 1] > 100 * powers[1, 1]
+        np.testing.assert_allclose(strouhal_number(peaks[0, 0], 0.1, 2.0), 12.3 * 0.05, rtol=1e-2)
+        with pytest.raises(ValueError):
+            welch_psd(values, rate, window="kaiser")
+
+    def test_series_spectra(self, tmp_path, monkeypatch):
+        """Test spectra of a probe table sampled with a variable time step."""
+        time = jittered_times(20000, 1e-3)
+        pressure = np.sin(2 * np.pi * 25 * time)
+        directory = tmp_path / "postProcessing" / "probes" / "0"
+        os.makedirs(directory)
+        with open(directory / "p", "w") as f:
+            f.write("# Probe 0 (0 0 0)\n# Probe 1 (1 0 0)\n#   Probe 0 1\n#   Time\n")
+            f.write("".join(f"{t:.9g} {p:.9g} {2 * p:.9g}\n" for t, p in zip(time, pressure)))
+        series = load_postprocessing(str(tmp_path / "postProcessing"))["probes", "p"]
+
+        cache = ArrayCache("spectra", str(tmp_path / "cache"))
+        result = series_spectra(series, start_time=0.1, segment_length=2048, cache=cache)
+        assert result.columns == ["probe0", "probe1"]
+        np.testing.assert_allclose(result.peaks[0], 25, atol=0.1)
+        np.testing.assert_allclose(result.channel("probe1")[1:], 4 * result.channel("probe0")[1:],
+                                   rtol=1e-6, atol=1e-12)
+
+        monkeypatch.setattr(spectral, "welch_psd", None)
+        cached = series_spectra(series, start_time=0.1, segment_length=2048, cache=cache)
+        np.testing.assert_array_equal(cached.psd, result.psd)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:31:08 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for the STL reader and surface statistics.
+"""
+import numpy as np
+import pytest
+from src.openfoam.stl import (read_stl, TriSurface, STLParseError, BINARY_FACET_DTYPE,
+                              unique_rows)
+
+# Unit cube as 12 outward-facing triangles
+CUBE_POINTS = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+                        [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]], dtype=float)
+CUBE_TRIANGLES = np.array([[0, 2, 1], [0, 3, 2], [4, 5, 6], [4, 6, 7],
+                           [0, 1, 5], [0, 5, 4], [2, 3, 7], [2, 7, 6],
+                           [1, 2, 6], [1, 6, 5], [0, 4, 7], [0, 7, 3]])
+
+
+def ascii_solid(name, vertices):
+    """Format triangle vertices as an ASCII STL solid."""
+    lines = [f"solid {name}"]
+    for triangle in vertices:
+        lines.append("  facet normal 0 0 0")
+        lines.append("    outer loop")
+        for v in triangle:
+            lines.append(f"      vertex {v[0]:e} {v[1]:e} {v[2]:e}")
+        lines.append("    endloop")
+        lines.append("  endfacet")
+    lines.append(f"endsolid {name}")
+    return "\n".join(lines) + "\n"
+
+
+def binary_stl(vertices, header=b"solid cube"):
+    """Encode triangle vertices as a binary STL."""
+    facets = np.zeros(len(vertices), dtype=BINARY_FACET_DTYPE)
+    facets["vertices"] = vertices
+    return header.ljust(80, b" ") + np.uint32(len(vertices)).tobytes() + facets.tobytes()
+
+
+class TestSTLReader:
+    """Test reading STL files."""
+
+    def test_binary_cube(self, tmp_path):
+        """Test that a binary cube is merged into a closed surface."""
+        path = tmp_path / "cube.stl"
+        path.write_bytes(binary_stl(CUBE_POINTS[CUBE_TRIANGLES]))
+
+        surface = read_stl(str(path))
+        stats = surface.statistics()
+        assert stats["triangles"] == 12
+        assert stats["points"] == 8
+        assert stats["edges"] == 18
+        assert stats["closed"]
+        assert stats["area"] == pytest.approx(6.0)
+        assert np.allclose(stats["bounds"], [[0, 0, 0], [1, 1, 1]])
+        assert surface.region_names == ["cube"]
+
+    def test_ascii_multiple_solids(self, tmp_path):
+        """Test ASCII parsing with two solids and an open surface."""
+        vertices = CUBE_POINTS[CUBE_TRIANGLES]
+        path = tmp_path / "parts.stl"
+        path.write_text(ascii_solid("box", vertices) + ascii_solid("lid", vertices[:2] + 2.0))
+
+        stats = read_stl(str(path)).statistics()
+        assert stats["regions"] == {"box": 12, "lid": 2}
+        assert stats["open_edges"] == 4
+        assert not stats["closed"]
+
+    def test_unique_rows_signed_zero(self):
+        """Test that -0.0 and 0.0 and mirrored points are merged correctly."""
+        values = np.array([[0.0, 1.0, 2.0], [-0.0, 1.0, 2.0], [-1.0, -1.0, 2.0], [1.0, 1.0, 2.0]])
+        first, inverse = unique_rows(values)
+        assert len(first) == 3
+        assert inverse[0] == inverse[1]
+        assert inverse[2] != inverse[3]
+
+    def test_non_manifold_edge(self):
+        """Test that an edge shared by three triangles is reported."""
+        points = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, -1, 0], [0, 0, 1]], dtype=float)
+        surface = TriSurface(points, [[0, 1, 2], [1, 0, 3], [0, 1, 4]])
+        assert surface.statistics()["non_manifold_edges"] == 1
+
+    def test_invalid_ascii(self, tmp_path):
+        """Test that malformed facet data raises an error."""
+        path = tmp_path / "bad.stl"
+        path.write_text("solid bad\n facet normal 0 0 1\n outer loop\n vertex 0 0\nendsolid bad\n")
+        with pytest.raises(STLParseError):
+            read_stl(str(path))
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 17:58:19 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for streamline tracing by cell walking.
+"""
+import numpy as np
+import pytest
+from src.openfoam import cut_surfaces
+from src.openfoam.block_mesh import BlockMesh
+from src.openfoam.fields import VolField, write_field
+from src.openfoam.streamlines import CellWalkGeometry, StreamlineTracer, line_seeds, streamlines
+from src.utils.cache import ArrayCache
+
+
+@pytest.fixture
+def mesh():
+    """Unit box graded along x."""
+    return BlockMesh.box((0, 0, 0), (1, 1, 1), (16, 16, 16), grading=(2.0, 1.0, 1.0)).build()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Walking geometry cache in a temporary directory."""
+    return ArrayCache("cell_walk", str(tmp_path / "cache"))
+
+
+class TestStreamlines:
+    """Test walking, straight and circular streamlines and the case interface."""
+
+    def test_walk(self, mesh, cache):
+        """Test that walking finds the same cells as the geometry."""
+        geometry = CellWalkGeometry(mesh, cache)
+        assert np.all(np.diff(geometry.point_offsets) == 8)
+        targets = mesh.cell_centres[::-37]
+        cells = geometry.walk(np.zeros(len(targets), dtype=np.int64), targets)
+        np.testing.assert_array_equal(cells, np.arange(mesh.n_cells)[::-37])
+        outside = geometry.walk(np.array([0, 5]), np.array([[-0.1, 0.0, 0.0], [0.5, 0.5, 2.0]]))
+        np.testing.assert_array_equal(outside, [-1, -1])
+
+        cached = CellWalkGeometry(mesh, cache)
+        np.testing.assert_array_equal(cached.across, geometry.across)
+
+    def test_uniform(self, mesh, cache, monkeypatch):
+        """Test straight lines in both directions with worker processes."""
+        direction = np.array([1.0, 0.2, 0.0])
+        tracer = StreamlineTracer(mesh, np.tile(direction, (mesh.n_cells, 1)), cache)
+        # The point stencil is cached next to the walking geometry
+        monkeypatch.setattr(cut_surfaces, "point_weights", None)
+        cached = StreamlineTracer(mesh, np.tile(direction, (mesh.n_cells, 1)), cache)
+        np.testing.assert_array_equal(cached.point_velocity, tracer.point_velocity)
+        seeds = np.vstack([line_seeds((0.5, 0.1, 0.5), (0.5, 0.7, 0.5), 4), [[2.0, 0, 0]]])
+        lines = tracer.trace(seeds, direction="both", workers=1)
+        assert lines.n_lines == 5 and len(lines.line(4)) == 0
+        for i in range(4):
+            line = lines.line(i)
+            np.testing.assert_allclose(np.cross(line - seeds[i], direction), 0, atol=1e-12)
+            assert np.all(np.diff(line[:, 0]) > 0)
+            # The last steps are cut at the boundary
+            np.testing.assert_allclose([line[0, 0], line[-1, 0]], [0, 1], atol=1e-12)
+            np.testing.assert_allclose(line[np.flatnonzero(lines.time[
+                lines.offsets[i]:lines.offsets[i + 1]] == 0)[0]], seeds[i])
+        np.testing.assert_allclose(lines.velocity, np.tile(direction, (len(lines.points), 1)))
+
+        pooled = tracer.trace(seeds, direction="both", workers=2)
+        np.testing.assert_array_equal(pooled.points, lines.points)
+        short = tracer.trace(seeds[:1], max_length=0.2, workers=1)
+        assert 0.2 <= short.lengths()[0] < 0.3
+        empty = tracer.trace(np.zeros((0, 3)))
+        assert empty.n_lines == 0 and len(empty.points) == 0 and empty.offsets.tolist() == [0]
+        with pytest.raises(ValueError):
+            tracer.trace(seeds, direction="sideways")
+
+    def test_rotation(self, mesh, cache):
+        """Test that streamlines of a solid-body rotation stay on their circles."""
+        radius = mesh.cell_centres - 0.5
+        velocity = np.stack([-radius[:, 1], radius[:, 0], np.zeros(mesh.n_cells)], axis=1)
+        lines = StreamlineTracer(mesh, velocity, cache).trace(
+            line_seeds((0.65, 0.5, 0.5), (0.85, 0.5, 0.5), 3), max_steps=300, workers=1)
+        for i, expected in enumerate([0.15, 0.25, 0.35]):
+            distance = np.linalg.norm(lines.line(i)[:, :2] - 0.5, axis=1)
+            np.testing.assert_allclose(distance, expected, rtol=0.05)
+        # One revolution takes 2 pi
+        assert lines.time[lines.offsets[1] - 1] > 2 * np.pi
+
+    def test_case(self, mesh, cache, tmp_path):
+        """Test tracing the velocity of a case and the VTK export."""
+        case_dir = str(tmp_path / "case")
+        mesh.write(case_dir)
+        write_field(case_dir, VolField("U", np.tile([0, 0, 1.0], (mesh.n_cells, 1)),
+                                       "[0 1 -1 0 0 0 0]"), "1")
+        lines = streamlines(case_dir, "1", [[0.3, 0.3, 0.1], [0.6, 0.6, 0.1]], workers=1,
+                            cache=cache)
+        for i in range(2):
+            line = lines.line(i)
+            np.testing.assert_allclose(line[:, :2], np.tile(line[0, :2], (len(line), 1)))
+            assert line[0, 2] == 0.1
+            np.testing.assert_allclose(line[-1, 2], 1.0)
+        path = str(tmp_path / "lines.vtk")
+        lines.write_vtk(path)
+        with open(path, "rb") as f:
+            content = f.read()
+        assert b"LINES %d" % (len(lines.points) - 2) in content
+        assert b"SCALARS time float" in content
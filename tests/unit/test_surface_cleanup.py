@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 20:48:16 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for STL cleaning, scaling and merging.
+"""
+import numpy as np
+import pytest
+from src.openfoam.stl import TriSurface
+from src.openfoam.surface_cleanup import (load_surface, iter_stl_chunks, orient_surface,
+                                          remove_duplicate_triangles, merge_surfaces)
+from tests.unit.test_stl import CUBE_POINTS, CUBE_TRIANGLES, ascii_solid, binary_stl
+
+
+def signed_volume(surface):
+    """Volume enclosed by a surface, positive for outward normals."""
+    v = surface.triangle_vertices()
+    return np.einsum("ij,ij->i", v[:, 0], np.cross(v[:, 1], v[:, 2])).sum() / 6.0
+
+
+class TestSurfaceCleanup:
+    """Test the STL processing pipeline."""
+
+    def test_stream_ascii_in_small_chunks(self, tmp_path):
+        """Test that chunked ASCII reading keeps facets and solids intact."""
+        path = tmp_path / "two.stl"
+        vertices = CUBE_POINTS[CUBE_TRIANGLES]
+        path.write_text(ascii_solid("top", vertices[:7]) + ascii_solid("part2", vertices[7:]))
+
+        chunks = list(iter_stl_chunks(str(path), chunk_size=2))
+        assert len(chunks) > 2
+        assert np.allclose(np.concatenate([c[0] for c in chunks]), vertices)
+        assert sum(len(c[0]) for c in chunks if c[1] == 1) == 5
+        assert {c[2] for c in chunks} == {"top", "part2"}
+
+    def test_weld_clean_and_orient(self, tmp_path):
+        """Test a noisy, partly flipped cube in millimeters with bad triangles."""
+        vertices = CUBE_POINTS[CUBE_TRIANGLES].copy()
+        vertices[[1, 5, 7]] = vertices[[1, 5, 7]][:, [0, 2, 1]]
+        vertices += np.random.default_rng(0).normal(scale=1e-9, size=vertices.shape)
+        degenerate = np.array([[[0, 0, 0], [0, 0, 0], [1, 1, 1]]], dtype=float)
+        vertices = np.concatenate([vertices, vertices[:1], degenerate]) * 1000.0
+        path = tmp_path / "cube.stl"
+        path.write_bytes(binary_stl(vertices))
+
+        surface, report = load_surface(str(path), units="mm", weld_tolerance=1e-6, chunk_size=4)
+        assert report["degenerate_triangles"] == 1
+        assert report["duplicate_triangles"] == 1
+        assert report["flipped_triangles"] == 3
+        assert surface.n_triangles == 12 and surface.n_points == 8
+        assert surface.statistics()["closed"]
+        assert signed_volume(surface) == pytest.approx(1.0)
+        assert surface.region_names == ["cube"]
+
+    def test_orient_inverted_surface(self):
+        """Test that an inside-out closed surface is turned outward."""
+        surface = TriSurface(CUBE_POINTS, CUBE_TRIANGLES[:, [0, 2, 1]])
+        oriented, n_flipped = orient_surface(surface)
+        assert n_flipped == 12
+        assert signed_volume(oriented) == pytest.approx(1.0)
+
+    def test_merge_files_into_regions(self, tmp_path):
+        """Test that several files become named regions of one surface."""
+        vertices = CUBE_POINTS[CUBE_TRIANGLES]
+        (tmp_path / "body.stl").write_bytes(binary_stl(vertices))
+        (tmp_path / "wing.stl").write_text(ascii_solid("upper", vertices[:6] + 2.0)
+                                           + ascii_solid("lower", vertices[6:] + 2.0))
+
+        surface, report = load_surface([str(tmp_path / "body.stl"), str(tmp_path / "wing.stl")])
+        assert surface.region_names == ["body", "wing_upper", "wing_lower"]
+        assert np.array_equal(np.bincount(surface.regions), [12, 6, 6])
+        assert report["facets"] == 24 and surface.n_points == 16
+
+        merged = merge_surfaces([TriSurface(CUBE_POINTS, CUBE_TRIANGLES)] * 2)
+        assert merged.region_names == ["surface", "surface"]
+        assert remove_duplicate_triangles(merged)[1] == 12
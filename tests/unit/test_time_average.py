@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 11:49:05 2026
+
+@author: adamp
+"""
+
+"""
+Unit tests for offline time-averaging.
+"""
+import numpy as np
+import pytest
+from src.openfoam.block_mesh import BlockMesh
+from src.openfoam.fields import VolField, field_path, read_field, write_field
+from src.openfoam.time_average import (RunningAverage, snapshot_weights, squared_dimensions,
+                                       time_average)
+
+TIMES = ("1", "2", "4", "5")
+
+
+@pytest.fixture
+def case(tmp_path):
+    """Case with random p and U snapshots at unequally spaced times."""
+    mesh = BlockMesh.box((0, 0, 0), (1, 1, 1), (4, 4, 4)).build()
+    case_dir = str(tmp_path)
+    mesh.write(case_dir)
+    rng = np.random.default_rng(0)
+    snapshots = {"p": rng.random((len(TIMES), mesh.n_cells)),
+                 "U": rng.random((len(TIMES), mesh.n_cells, 3))}
+    for i, time in enumerate(TIMES):
+        write_field(case_dir, VolField("p", snapshots["p"][i], "[1 -1 -2 0 0 0 0]"), time)
+        write_field(case_dir, VolField("U", snapshots["U"][i], "[0 1 -1 0 0 0 0]"), time,
+                    binary=True)
+    return case_dir, snapshots
+
+
+class TestTimeAverage:
+    """Test weights, streaming moments and the written fields."""
+
+    def test_running_average(self):
+        """Test the streaming covariance against the weighted covariance."""
+        rng = np.random.default_rng(1)
+        snapshots, weights = rng.random((20, 10, 3)), rng.random(20) + 0.5
+        average = RunningAverage()
+        for snapshot, weight in zip(snapshots, weights):
+            average.update(snapshot, weight)
+        np.testing.assert_allclose(average.mean, np.average(snapshots, axis=0, weights=weights))
+        covariance = np.cov(snapshots[:, 4].T, aweights=weights, bias=True)
+        np.testing.assert_allclose(average.prime2_mean[4],
+                                   covariance[[0, 0, 0, 1, 1, 2], [0, 1, 2, 1, 2, 2]])
+        np.testing.assert_allclose(average.rms[4], np.sqrt(np.diag(covariance)))
+
+        np.testing.assert_allclose(snapshot_weights(TIMES), [1, 1, 2, 1])
+        assert squared_dimensions("[0 1 -1 0 0 0 0]") == "[0 2 -2 0 0 0 0]"
+        with pytest.raises(ValueError):
+            snapshot_weights(TIMES, "harmonic")
+
+    def test_case_average(self, case):
+        """Test averaged fields over a window, written in a process pool."""
+        case_dir, snapshots = case
+        paths = time_average(case_dir, ["p", "U"], start=2, rms=True, workers=2)
+        assert len(paths) == 6
+        weights = np.array([2.0, 2.0, 1.0])
+
+        mean = read_field(field_path(case_dir, "pMean", "5"))
+        np.testing.assert_allclose(mean.values, np.average(snapshots["p"][1:], axis=0,
+                                                           weights=weights), rtol=1e-10)
+        assert mean.dimensions == "[1 -1 -2 0 0 0 0]"
+        variance = read_field(field_path(case_dir, "pPrime2Mean", "5"))
+        assert variance.dimensions == "[2 -2 -4 0 0 0 0]"
+
+        velocity = read_field(field_path(case_dir, "UPrime2Mean", "5"))
+        assert velocity.binary and velocity.values.shape == (64, 6)
+        deviation = snapshots["U"][1:] - np.average(snapshots["U"][1:], axis=0, weights=weights)
+        np.testing.assert_allclose(velocity.values[:, 1], np.average(
+            deviation[..., 0] * deviation[..., 1], axis=0, weights=weights), atol=1e-12)
+        rms = read_field(field_path(case_dir, "URMS", "5")).values
+        np.testing.assert_allclose(rms ** 2, velocity.values[:, [0, 3, 5]], atol=1e-12)
+        with pytest.raises(FileNotFoundError):
+            time_average(case_dir, ["k"])